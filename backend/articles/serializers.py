@@ -165,8 +165,11 @@ class ArticleWriteSerializer(serializers.ModelSerializer):
 
         # 称号チェック
         try:
+            from gamification.achievements import AchievementEvent
             from gamification.services import check_and_grant_achievement_titles, ACHIEVEMENT_COLOR_MAP
-            new_titles = check_and_grant_achievement_titles(article.author)
+            new_titles = check_and_grant_achievement_titles(
+                article.author, [AchievementEvent.article_published(), AchievementEvent.card_obtained()],
+            )
             if new_titles:
                 article._reward_title = new_titles[0]
                 article._reward_title_color = ACHIEVEMENT_COLOR_MAP.get(new_titles[0], 'green')
@@ -163,9 +163,9 @@ class ArticleReactionView(views.APIView):
         # 記事著者へのポイント付与（リアクション種別ごとのTP。未定義は5TP）
         if created and article.author != request.user:
             try:
-                from gamification.services import award_points, REACTION_POINTS
+                from gamification.services import award_points_buffered, REACTION_POINTS
                 pt = REACTION_POINTS.get(reaction_type, 5)
-                award_points(article.author, 'article_reaction_received', pt, 'リアクション受信')
+                award_points_buffered(article.author, 'article_reaction_received', pt, 'リアクション受信')
             except Exception:
                 logger.exception('article reaction pt award failed')
 
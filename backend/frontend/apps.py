@@ -5,3 +5,6 @@ class FrontendConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'frontend'
 
+
+    def ready(self):
+        import frontend.signals  # noqa
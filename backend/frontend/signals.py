@@ -0,0 +1,15 @@
+"""
+Frontend app signals: drop the cached maintenance snapshot when the
+SiteMaintenance row changes.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from toybox.snapshots import invalidate_on_commit, maintenance_cache
+from .models import SiteMaintenance
+
+
+@receiver(post_save, sender=SiteMaintenance)
+@receiver(post_delete, sender=SiteMaintenance)
+def maintenance_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_on_commit(maintenance_cache)
@@ -0,0 +1,196 @@
+"""アチーブメント判定用のユーザー別集計（UserAchievementStats）の更新・再構築。
+
+投稿・リアクション・カード・記事のシグナルで差分だけを反映するため、称号判定は
+ユーザーの履歴量に関係なく集計行1件の読み出しで済む。行は初回参照時に生テーブルから作る
+（未作成ユーザーへの差分更新は捨て、作成時の再集計に任せる）。
+"""
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+
+from .models import UserAchievementStats
+
+JST = ZoneInfo('Asia/Tokyo')
+
+REACTION_FIELDS = (
+    'submit_medal_count', 'awesome_count', 'cute_count', 'funny_count', 'moved_count',
+    'cool_count', 'beautiful_count', 'emotional_count', 'god_game_count',
+)
+
+STAT_FIELDS = (
+    'total_posts', 'game_posts', 'video_posts', 'image_posts',
+    *REACTION_FIELDS, 'total_reactions',
+    'card_count', 'article_count',
+    'post_hours_mask', 'post_weekdays_mask',
+    'last_post_date', 'current_streak', 'max_streak',
+)
+
+_NO_GAME = Q(game_url__isnull=True) | Q(game_url='')
+_NO_VIDEO = Q(video_url__isnull=True) | Q(video_url='')
+
+
+def _submission_kind_field(submission):
+    if submission.game_url:
+        return 'game_posts'
+    if submission.video_url:
+        return 'video_posts'
+    return 'image_posts'
+
+
+def _streaks(dates):
+    """昇順の投稿日リストから (最長連続日数, 最終投稿日までの連続日数) を返す。"""
+    max_streak = current = 0
+    prev = None
+    for d in dates:
+        current = current + 1 if prev is not None and d == prev + timedelta(days=1) else 1
+        max_streak = max(max_streak, current)
+        prev = d
+    return max_streak, current
+
+
+def compute_user_stats(user_id):
+    """生テーブルから集計値を計算する（テーブルごとに集約クエリ1本）。{field: value} を返す。"""
+    from articles.models import Article
+    from submissions.models import Submission, SubmissionReactionStats
+    from users.models import UserCard
+
+    live = Submission.objects.filter(author_id=user_id, deleted_at__isnull=True)
+    values = live.aggregate(
+        total_posts=Count('id'),
+        game_posts=Count('id', filter=~_NO_GAME),
+        video_posts=Count('id', filter=_NO_GAME & ~_NO_VIDEO),
+        image_posts=Count('id', filter=_NO_GAME & _NO_VIDEO),
+    )
+
+    # 投稿日 × 時間帯（JST）の組は「活動した日数 × 24」が上限なので投稿数に比例しない
+    slots = (
+        live.annotate(day=TruncDate('created_at', tzinfo=JST), hour=ExtractHour('created_at', tzinfo=JST))
+        .values_list('day', 'hour')
+        .order_by()
+        .distinct()
+    )
+    hours_mask = weekdays_mask = 0
+    days = set()
+    for day, hour in slots:
+        hours_mask |= 1 << hour
+        weekdays_mask |= 1 << day.weekday()
+        days.add(day)
+    dates = sorted(days)
+    max_streak, current_streak = _streaks(dates)
+    values.update(
+        post_hours_mask=hours_mask,
+        post_weekdays_mask=weekdays_mask,
+        last_post_date=dates[-1] if dates else None,
+        current_streak=current_streak,
+        max_streak=max_streak,
+    )
+
+    values.update(
+        SubmissionReactionStats.objects.filter(
+            submission__author_id=user_id, submission__deleted_at__isnull=True,
+        ).aggregate(**{
+            field: Coalesce(Sum(field), 0) for field in (*REACTION_FIELDS, 'total_reactions')
+        })
+    )
+    values['card_count'] = UserCard.objects.filter(user_id=user_id).count()
+    values['article_count'] = Article.objects.filter(author_id=user_id, status=Article.Status.PUBLISHED).count()
+    return values
+
+
+def rebuild_user_stats(user_id):
+    """集計行を生テーブルから作り直して返す。"""
+    stats, _ = UserAchievementStats.objects.update_or_create(user_id=user_id, defaults=compute_user_stats(user_id))
+    return stats
+
+
+def get_user_stats(user_id):
+    """集計行を返す（無ければ作成）。"""
+    stats = UserAchievementStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = rebuild_user_stats(user_id)
+    return stats
+
+
+def refresh_user_stats(user_id):
+    """作成済みの集計行だけを再集計する（削除・種別変更など差分で表せない変更用）。"""
+    if UserAchievementStats.objects.filter(user_id=user_id).exists():
+        rebuild_user_stats(user_id)
+
+
+def stats_dict(stats):
+    """集計行を称号判定用の dict に変換する。"""
+    s = {field: getattr(stats, field) for field in STAT_FIELDS}
+    hours = stats.post_hours_mask
+    s['has_morning_post'] = bool(hours & 0b111 << 6)          # 6〜8時
+    s['has_night_post'] = bool(hours & 0b1111)                 # 0〜3時
+    s['has_morning_creator_post'] = bool(hours & 1 << 10)      # 10時台
+    s['has_weekend_post'] = bool(stats.post_weekdays_mask & 0b11 << 5)  # 土・日
+    return s
+
+
+def _apply(user_id, **deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if updates:
+        UserAchievementStats.objects.filter(user_id=user_id).update(**updates)
+
+
+def record_post(submission):
+    """新規投稿1件を反映する。投稿日時が最終投稿日より前なら再集計する。"""
+    local = submission.created_at.astimezone(JST)
+    day = local.date()
+    with transaction.atomic():
+        stats = UserAchievementStats.objects.select_for_update().filter(user_id=submission.author_id).first()
+        if stats is None:
+            return
+        if stats.last_post_date and day < stats.last_post_date:
+            rebuild_user_stats(submission.author_id)
+            return
+        stats.total_posts += 1
+        kind = _submission_kind_field(submission)
+        setattr(stats, kind, getattr(stats, kind) + 1)
+        stats.post_hours_mask |= 1 << local.hour
+        stats.post_weekdays_mask |= 1 << day.weekday()
+        if stats.last_post_date != day:
+            if stats.last_post_date and day == stats.last_post_date + timedelta(days=1):
+                stats.current_streak += 1
+            else:
+                stats.current_streak = 1
+            stats.max_streak = max(stats.max_streak, stats.current_streak)
+            stats.last_post_date = day
+        stats.save()
+
+
+def record_reaction_received(author_id, reaction_type, delta):
+    """投稿者が受け取ったリアクション1件の追加（delta=1）／削除（delta=-1）を反映する。"""
+    field = f'{reaction_type}_count'
+    if field not in REACTION_FIELDS:
+        return
+    _apply(author_id, **{field: delta, 'total_reactions': delta})
+
+
+def record_card(user_id, delta):
+    _apply(user_id, card_count=delta)
+
+
+def refresh_article_count(user_id):
+    from articles.models import Article
+
+    published = Article.objects.filter(author_id=user_id, status=Article.Status.PUBLISHED).count()
+    UserAchievementStats.objects.filter(user_id=user_id).update(article_count=published)
+
+
+def verify_user_stats(user_ids):
+    """集計行と生テーブルの差異を返す。[(user_id, field, stored, expected)]"""
+    stored = {row['user_id']: row for row in UserAchievementStats.objects.filter(user_id__in=user_ids).values()}
+    mismatches = []
+    for user_id in user_ids:
+        row = stored.get(user_id)
+        if row is None:
+            continue
+        for field, value in compute_user_stats(user_id).items():
+            if row[field] != value:
+                mismatches.append((user_id, field, row[field], value))
+    return mismatches
@@ -0,0 +1,164 @@
+"""アチーブメント称号の条件レジストリとイベント単位の評価。
+
+各ルールは依存する統計キー（UserAchievementStats 由来）を宣言する。投稿・リアクション受取などの
+イベントからは変化した統計キーだけが分かるので、そのキーに依存するルールだけを判定すればよい。
+称号の表示情報（色・条件文・秘密フラグ）は services.ACHIEVEMENT_DEFINITIONS が正本。
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+POST_FLAG_STATS = ('has_morning_post', 'has_night_post', 'has_morning_creator_post', 'has_weekend_post')
+
+
+@dataclass(frozen=True)
+class AchievementRule:
+    name: str
+    stats: frozenset
+    test: Callable[[dict], bool]
+
+
+def _at_least(name, **thresholds):
+    """すべての統計キーが閾値以上で達成。"""
+    items = tuple(thresholds.items())
+    return AchievementRule(name, frozenset(thresholds), lambda s: all(s.get(k, 0) >= v for k, v in items))
+
+
+def _flag(name, stat):
+    return AchievementRule(name, frozenset([stat]), lambda s: bool(s.get(stat)))
+
+
+def _always(name):
+    """登録だけで達成（どの統計にも依存しないので、どのイベントでも判定対象に含める）。"""
+    return AchievementRule(name, frozenset(), lambda s: True)
+
+
+# 手動付与のみの称号（AYATORI・公式称号）はレジストリに含めない
+ACHIEVEMENT_RULES = [
+    # 入門 (GREEN)
+    _always('駆け出しクリエイター'),
+    _at_least('はじめの一歩', total_posts=1),
+    _at_least('絵師見習い', image_posts=1),
+    _at_least('映像クリエイター見習い', video_posts=1),
+    _at_least('ゲームメーカー見習い', game_posts=1),
+    _at_least('注目の新星', submit_medal_count=10),
+    _at_least('話題の的', total_reactions=30),
+    _at_least('笑わせ屋', funny_count=5),
+    _at_least('感動屋', moved_count=5),
+    _at_least('かわいいの使い手', cute_count=5),
+    _at_least('きれいの使い手', beautiful_count=5),
+    _at_least('エモの伝え手', emotional_count=5),
+    _at_least('神ゲー見習い', god_game_count=5),
+    _flag('朝活クリエイター', 'has_morning_post'),
+    _flag('週末クリエイター', 'has_weekend_post'),
+    # 初級 (BLUE)
+    _at_least('見習いクリエイター', total_posts=5),
+    _at_least('イラストレーター', image_posts=10),
+    _at_least('ビデオアーティスト', video_posts=5),
+    _at_least('ゲームクリエイター', game_posts=5),
+    _at_least('人気クリエイター', submit_medal_count=50),
+    _at_least('コミュニティの星', total_reactions=100),
+    _at_least('クールマン', cool_count=10),
+    _at_least('驚異のクリエイター', awesome_count=10),
+    _at_least('輝きの職人', beautiful_count=10),
+    _at_least('心を揺らす者', emotional_count=10),
+    _at_least('神ゲーの証人', god_game_count=10),
+    _at_least('万能クリエイター', image_posts=1, video_posts=1, game_posts=1),
+    _flag('モーニングクリエイター', 'has_morning_creator_post'),
+    _at_least('カードコレクター', card_count=5),
+    _at_least('3日坊主じゃない', max_streak=3),
+    # 中級 (GOLD)
+    _at_least('中堅クリエイター', total_posts=20),
+    _at_least('ベテランクリエイター', total_posts=50),
+    _at_least('デジタルアーティスト', image_posts=30),
+    _at_least('動画職人', video_posts=15),
+    _at_least('ゲーム職人', game_posts=10),
+    _at_least('トップクリエイター', submit_medal_count=200),
+    _at_least('感動の嵐', total_reactions=500),
+    _at_least('トリプルマスター', image_posts=5, video_posts=5, game_posts=5),
+    _at_least('一週間の炎', max_streak=7),
+    _at_least('レアコレクター', card_count=10),
+    _at_least('美の達人', beautiful_count=25),
+    _at_least('エモの巨匠', emotional_count=25),
+    _at_least('神ゲーの王者', god_game_count=25),
+    # 上級 (RED, 条件秘密)
+    _at_least('マスタークリエイター', total_posts=100),
+    _at_least('絵の達人', image_posts=100),
+    _at_least('動画の達人', video_posts=50),
+    _at_least('ゲームの達人', game_posts=20),
+    _at_least('伝説のスター', submit_medal_count=500),
+    _at_least('継続の意志', max_streak=30),
+    _at_least('熱狂のクリエイター', total_reactions=1000),
+    _at_least('美の化身', beautiful_count=50),
+    _at_least('エモの神託', emotional_count=50),
+    _at_least('神ゲーの覇者', god_game_count=50),
+    # 伝説 (RAINBOW)
+    _at_least('レジェンドクリエイター', total_posts=300),
+    _at_least('ゲームの神様', game_posts=50),
+    _at_least('創造神', image_posts=50, video_posts=30, game_posts=20),
+    _at_least('きらめきの伝説', beautiful_count=100),
+    _at_least('エモの伝説', emotional_count=100),
+    _at_least('神ゲーの神話', god_game_count=100),
+    # 超越 (NEON)
+    _at_least('きらめきの極星', beautiful_count=200),
+    _at_least('エモの星雲', emotional_count=200),
+    _at_least('神ゲーの宇宙', god_game_count=200),
+    # 超秘密
+    _at_least('影の芸術家', video_posts=50),
+    _at_least('深淵のクリエイター', submit_medal_count=1000),
+    _at_least('時を超える者', max_streak=60),
+    _at_least('全知全能', total_posts=500),
+    _at_least('TOYBOXの使者', total_reactions=2000),
+    # 記事
+    _at_least('記事デビュー', article_count=1),
+    _at_least('ブロガー', article_count=3),
+    _at_least('コラムニスト', article_count=10),
+    _at_least('記事の伝道師', article_count=30),
+]
+
+RULES_BY_NAME = {rule.name: rule for rule in ACHIEVEMENT_RULES}
+
+# 統計キー → そのキーに依存するルール（レジストリ順）
+RULES_BY_STAT = {}
+for _rule in ACHIEVEMENT_RULES:
+    for _stat in _rule.stats:
+        RULES_BY_STAT.setdefault(_stat, []).append(_rule)
+del _rule, _stat
+
+
+@dataclass(frozen=True)
+class AchievementEvent:
+    """称号判定のきっかけになった変更。stats は変化しうる統計キー。"""
+    stats: frozenset
+
+    @classmethod
+    def posted(cls, submission_type):
+        """投稿した（submission_type: 'image' / 'video' / 'game'）。"""
+        return cls(frozenset({'total_posts', f'{submission_type}_posts', 'max_streak', *POST_FLAG_STATS}))
+
+    @classmethod
+    def reaction_received(cls, reaction_type):
+        return cls(frozenset({f'{reaction_type}_count', 'total_reactions'}))
+
+    @classmethod
+    def card_obtained(cls):
+        return cls(frozenset({'card_count'}))
+
+    @classmethod
+    def article_published(cls):
+        return cls(frozenset({'article_count'}))
+
+
+def candidate_rules(events=None):
+    """判定対象のルール。events が None なら全ルール。"""
+    if events is None:
+        return ACHIEVEMENT_RULES
+    names = {rule.name for rule in ACHIEVEMENT_RULES if not rule.stats}
+    for event in events:
+        for stat in event.stats:
+            names.update(rule.name for rule in RULES_BY_STAT.get(stat, ()))
+    return [rule for rule in ACHIEVEMENT_RULES if rule.name in names]
+
+
+def evaluate(stats, earned, events=None):
+    """未取得かつ条件を満たした称号名をレジストリ順に返す。"""
+    return [rule.name for rule in candidate_rules(events) if rule.name not in earned and rule.test(stats)]
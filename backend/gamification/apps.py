@@ -8,3 +8,6 @@ class GamificationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gamification'
 
+
+    def ready(self):
+        import gamification.signals  # noqa
@@ -0,0 +1,159 @@
+"""カード抽選プール（プロセス内キャッシュ + エイリアス法）。
+
+旧実装は抽選のたびにカードマスタ全件を読み、種別×レアリティの候補リストと重み表を組み直していた。
+ここでは同じ確率分布（種別 50/50 → レアリティ重み → 候補から一様、候補が空なら種別内で一様）を
+カード単位の確率に展開し、エイリアス表を一度だけ作る。抽選は O(1) で DB を読まない。
+Card の保存・削除（load_card_master コマンドを含む）でキャッシュを無効化する。
+"""
+import random
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from toybox.local_cache import VersionedLocalCache
+
+# 抽選時のレアリティ重み（Next.js 版と同じ）
+RARITY_WEIGHTS = {
+    'SSR': 0.01,
+    'SR': 0.04,
+    'R': 0.20,
+    'N': 0.75,
+}
+
+# Django のレアリティ → 表示用（Next.js 形式）
+RARITY_DISPLAY = {
+    'common': 'N',
+    'rare': 'R',
+    'seasonal': 'SR',
+    'special': 'SSR',
+}
+
+# コード先頭文字 → 種別（エフェクト E101〜 / キャラクター C001〜）
+CARD_TYPE_PREFIXES = ('E', 'C')
+
+
+@dataclass(frozen=True)
+class PoolCard:
+    """抽選用のカード情報（モデルインスタンスをプロセス間で共有しないためのスナップショット）。"""
+    pk: int
+    code: str
+    name: str
+    rarity: str
+    image_url: str
+
+
+class AliasTable:
+    """Vose のエイリアス法。重み付き抽選を O(1) で行う。"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            small_i, large_i = small.pop(), large.pop()
+            self.prob[small_i] = scaled[small_i]
+            self.alias[small_i] = large_i
+            scaled[large_i] -= 1.0 - scaled[small_i]
+            (small if scaled[large_i] < 1.0 else large).append(large_i)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def card_probabilities(cards):
+    """旧 grant_immediate_rewards の抽選手順をカードごとの確率に展開する。"""
+    n = len(cards)
+    probs = [0.0] * n
+    total_weight = sum(RARITY_WEIGHTS.values())
+    type_share = 1.0 / len(CARD_TYPE_PREFIXES)
+    for prefix in CARD_TYPE_PREFIXES:
+        group = [i for i, c in enumerate(cards) if c.code.startswith(prefix)]
+        if not group:
+            # 該当種別が無ければマスタ全体から一様
+            for i in range(n):
+                probs[i] += type_share / n
+            continue
+        by_rarity = {}
+        for i in group:
+            by_rarity.setdefault(RARITY_DISPLAY.get(cards[i].rarity, 'N'), []).append(i)
+        for rarity, weight in RARITY_WEIGHTS.items():
+            share = type_share * weight / total_weight
+            pool = by_rarity.get(rarity) or group
+            for i in pool:
+                probs[i] += share / len(pool)
+    return probs
+
+
+class CardPool:
+    def __init__(self, cards):
+        self.cards = cards
+        self.table = AliasTable(card_probabilities(cards)) if cards else None
+
+    def draw(self, rng=random):
+        """1枚抽選する。プールが空なら None。"""
+        if self.table is None:
+            return None
+        return self.cards[self.table.sample(rng)]
+
+    def draw_many(self, n, rng=random):
+        if self.table is None:
+            return []
+        return [self.cards[self.table.sample(rng)] for _ in range(n)]
+
+
+def _build_pool():
+    from .models import Card
+    from .services import load_card_master
+
+    master = load_card_master()
+    unsaved = [c for c in master if c.pk is None]
+    if unsaved:
+        # TSV 由来のカードは UserCard の参照先として先に登録しておく（bulk_create はシグナルを送らない）
+        Card.objects.bulk_create(unsaved, ignore_conflicts=True)
+        master = list(Card.objects.filter(code__in=[c.code for c in master]))
+    cards = [
+        PoolCard(pk=c.pk, code=c.code, name=c.name, rarity=c.rarity, image_url=c.image_url)
+        for c in sorted(master, key=lambda c: c.code)
+    ]
+    return CardPool(cards)
+
+
+card_pool_cache = VersionedLocalCache('gamification.card_pool', _build_pool)
+
+
+def get_card_pool():
+    return card_pool_cache.get()
+
+
+def invalidate_card_pool():
+    """Card の変更後に呼ぶ。トランザクション中ならコミット後に無効化する。"""
+    transaction.on_commit(card_pool_cache.invalidate)
+
+
+def draw(rng=random):
+    return get_card_pool().draw(rng)
+
+
+def draw_many(n, rng=random):
+    """n 枚まとめて抽選する（イベント報酬などの一括付与用）。"""
+    return get_card_pool().draw_many(n, rng)
+
+
+def grant_cards(user, n, rng=random):
+    """n 枚抽選して UserCard を一括作成し、抽選したカードを返す。"""
+    from users.models import UserCard
+    from .achievement_stats import record_card
+
+    cards = draw_many(n, rng)
+    if cards:
+        UserCard.objects.bulk_create([UserCard(user=user, card_id=c.pk) for c in cards])
+        # bulk_create は post_save を送らないので所持数の集計はここで反映する
+        record_card(user.pk, len(cards))
+    return cards
@@ -0,0 +1,68 @@
+"""
+全ユーザーのアチーブメント称号をまとめて判定し、未付与の称号を付与するコマンド
+集計行（UserAchievementStats）と UserMeta をバッチ単位で読み込み、変更のあった UserMeta だけを一括更新します
+"""
+from django.core.management.base import BaseCommand
+from gamification.achievement_stats import rebuild_user_stats, stats_dict
+from gamification.achievements import evaluate
+from gamification.models import UserAchievementStats
+from users.models import User, UserMeta
+
+
+class Command(BaseCommand):
+    help = 'Evaluate achievement rules for all users in batches and grant missing titles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the titles that would be granted without saving them',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+
+        ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Evaluating achievement titles for {len(ids)} users')
+
+        granted_users = granted_titles = 0
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            stats = {row.user_id: row for row in UserAchievementStats.objects.filter(user_id__in=batch)}
+            metas = {meta.user_id: meta for meta in UserMeta.objects.filter(user_id__in=batch)}
+
+            changed = []
+            for user_id in batch:
+                row = stats.get(user_id) or rebuild_user_stats(user_id)
+                meta = metas.get(user_id)
+                earned = set(meta.earned_titles or []) if meta else set()
+                newly_granted = evaluate(stats_dict(row), earned)
+                if not newly_granted:
+                    continue
+                granted_users += 1
+                granted_titles += len(newly_granted)
+                if dry_run:
+                    self.stdout.write(f'  user {user_id}: {", ".join(newly_granted)}')
+                    continue
+                if meta is None:
+                    meta, _ = UserMeta.objects.get_or_create(user_id=user_id)
+                    earned = set(meta.earned_titles or [])
+                    newly_granted = [name for name in newly_granted if name not in earned]
+                meta.earned_titles = list(earned | set(newly_granted))
+                if not meta.active_title:
+                    meta.active_title = newly_granted[0]
+                    meta.expires_at = None
+                changed.append(meta)
+
+            if changed:
+                UserMeta.objects.bulk_update(changed, ['earned_titles', 'active_title', 'expires_at'])
+
+        verb = 'would be granted' if dry_run else 'granted'
+        self.stdout.write(self.style.SUCCESS(f'{granted_titles} titles {verb} to {granted_users} users'))
@@ -0,0 +1,87 @@
+"""
+カード抽選のベンチマーク（旧: 抽選ごとにマスタ読込＋候補リスト構築 / 新: キャッシュ済みエイリアス表）
+DB への書き込みは行いません（UserCard の INSERT は計測対象外）
+"""
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from gamification.card_pool import RARITY_DISPLAY, RARITY_WEIGHTS, CardPool, PoolCard
+from gamification.services import load_card_master
+
+
+def _legacy_pick(master_cards, rng):
+    """旧 grant_immediate_rewards の抽選手順（比較用にそのまま再現）。"""
+    prefix = 'E' if rng.random() < 0.5 else 'C'
+    group = [c for c in master_cards if c.code.startswith(prefix)]
+    if not group:
+        return rng.choice(master_cards)
+    by_rarity = {}
+    for c in group:
+        by_rarity.setdefault(RARITY_DISPLAY.get(c.rarity, 'N'), []).append(c)
+    r = rng.random() * sum(RARITY_WEIGHTS.values())
+    acc = 0
+    selected = 'N'
+    for rarity, weight in RARITY_WEIGHTS.items():
+        acc += weight
+        if r <= acc:
+            selected = rarity
+            break
+    return rng.choice(by_rarity.get(selected) or group)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark card draw throughput: per-draw master load vs the cached alias-table pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--draws', type=int, default=100_000, help='Draws for the cached pool (default: 100,000)')
+        parser.add_argument('--legacy-draws', type=int, default=2_000, help='Draws for the legacy path (default: 2,000)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        master = load_card_master()
+        if not master:
+            raise CommandError('No cards in the master (DB or TSV)')
+        self.stdout.write(f'Card master: {len(master)} cards')
+
+        legacy_n = options['legacy_draws']
+        legacy_counts = Counter()
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            for _ in range(legacy_n):
+                card = _legacy_pick(load_card_master(), rng)
+                legacy_counts[RARITY_DISPLAY.get(card.rarity, 'N')] += 1
+            legacy_elapsed = time.perf_counter() - t0
+        self.stdout.write(f'legacy        {legacy_n / legacy_elapsed:12,.0f} draws/s  '
+                          f'queries/draw {len(ctx.captured_queries) / legacy_n:.2f}')
+
+        t0 = time.perf_counter()
+        pool = CardPool([
+            PoolCard(pk=c.pk, code=c.code, name=c.name, rarity=c.rarity, image_url=c.image_url)
+            for c in sorted(master, key=lambda c: c.code)
+        ])
+        self.stdout.write(f'pool build    {(time.perf_counter() - t0) * 1000:10.2f} ms (once per process / card change)')
+
+        n = options['draws']
+        pool_counts = Counter()
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                pool_counts[RARITY_DISPLAY.get(pool.draw(rng).rarity, 'N')] += 1
+            single_elapsed = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            pool.draw_many(n, rng)
+            many_elapsed = time.perf_counter() - t0
+        self.stdout.write(f'pool.draw     {n / single_elapsed:12,.0f} draws/s  queries {len(ctx.captured_queries)}')
+        self.stdout.write(f'pool.draw_many{n / many_elapsed:12,.0f} draws/s')
+
+        self.stdout.write('Rarity share (legacy / pool):')
+        for rarity in RARITY_WEIGHTS:
+            self.stdout.write(f'  {rarity:3s} {legacy_counts[rarity] / legacy_n:7.2%} / {pool_counts[rarity] / n:7.2%}')
+        self.stdout.write(self.style.SUCCESS(f'Speed-up per draw: {(n / single_elapsed) / (legacy_n / legacy_elapsed):,.0f}x'))
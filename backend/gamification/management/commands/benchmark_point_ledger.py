@@ -0,0 +1,101 @@
+"""
+ポイント付与の競合ベンチマーク（1投稿に同時にリアクションが集中した場合）
+direct: リクエストごとに UserPoint を行ロックして加算 / buffered: 台帳キューへ INSERT し、後でまとめて反映
+一時的な投稿者ユーザーを作成し、終了時に削除します（行ロックの待ちは PostgreSQL で計測してください）
+"""
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gamification import point_ledger
+from gamification.models import PendingPointAward, PointHistory, UserPoint
+from gamification.services import award_points
+from users.models import User
+
+ACTION = PointHistory.ActionType.REACTION_RECEIVED
+
+
+class Command(BaseCommand):
+    help = 'Benchmark reaction point awards for one author under N concurrent reactors: direct row lock vs buffered ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reactors', type=int, default=200, help='Concurrent reacting requests (default: 200)')
+        parser.add_argument('--points', type=int, default=5)
+
+    def _run(self, reactors, award):
+        """reactors 本のスレッドから同時に award() を呼び、(経過秒, 1回ごとの秒数リスト, 失敗数) を返す。"""
+        barrier = threading.Barrier(reactors)
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                barrier.wait()
+                t0 = time.perf_counter()
+                award()
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    latencies.append(elapsed)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(reactors)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - t0, latencies, errors
+
+    def _report(self, label, wall, latencies, errors):
+        latencies = sorted(latencies) or [0.0]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{label:9s} wall {wall * 1000:9.1f} ms  '
+            f'p50 {statistics.median(latencies) * 1000:8.1f} ms  p99 {p99 * 1000:8.1f} ms  errors {len(errors)}'
+        )
+
+    def handle(self, *args, **options):
+        reactors = options['reactors']
+        points = options['points']
+        suffix = uuid.uuid4().hex[:8]
+        author = User.objects.create_user(
+            email=f'ledger-bench-{suffix}@example.com',
+            password=None,
+            display_id=f'ledgerbench{suffix}',
+        )
+        UserPoint.objects.get_or_create(user=author)
+        self.stdout.write(f'{reactors} concurrent reactors on one author ({connection.vendor})')
+        try:
+            wall, latencies, errors = self._run(
+                reactors, lambda: award_points(author, ACTION, points, 'benchmark'),
+            )
+            self._report('direct', wall, latencies, errors)
+            succeeded = len(latencies)
+
+            wall, latencies, errors = self._run(
+                reactors, lambda: PendingPointAward.objects.create(
+                    user=author, action_type=ACTION, points=points, description='benchmark',
+                ),
+            )
+            self._report('buffered', wall, latencies, errors)
+            succeeded += len(latencies)
+
+            t0 = time.perf_counter()
+            result = point_ledger.flush()
+            self.stdout.write(f'flush     {(time.perf_counter() - t0) * 1000:9.1f} ms  {result}')
+
+            expected = points * succeeded
+            total = UserPoint.objects.get(user=author).total_points
+            style = self.style.SUCCESS if total == expected else self.style.ERROR
+            self.stdout.write(style(f'Balance {total} TP (expected {expected})'))
+        finally:
+            author.delete()
@@ -4,6 +4,7 @@ Management command to load card master data from TSV file.
 import os
 import csv
 from django.core.management.base import BaseCommand
+from gamification.card_pool import card_pool_cache
 from gamification.models import Card
 
 
@@ -157,4 +158,6 @@ class Command(BaseCommand):
             f'\nLoaded {loaded_count} new cards, updated {updated_count} existing cards.'
         ))
         self.stdout.write(f'Total cards in database: {Card.objects.count()}')
+        # 各カードの保存シグナルでも無効化されるが、念のため抽選プールを作り直させる
+        card_pool_cache.invalidate()
 
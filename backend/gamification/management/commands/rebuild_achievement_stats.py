@@ -0,0 +1,55 @@
+"""
+アチーブメント判定用のユーザー別集計（UserAchievementStats）を生テーブルから再構築・検証するコマンド
+既定では集計行のあるユーザーのみ対象。--all で全ユーザーの行を作成します
+"""
+from django.core.management.base import BaseCommand
+from gamification.achievement_stats import rebuild_user_stats, verify_user_stats
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --verify) UserAchievementStats from posts, reactions, cards and articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report mismatches between stored counters and the raw tables (no database updates)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Include users without a stats row yet (creates the rows)',
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='display_ids',
+            help='Limit to the given display_id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        if options['all'] and not verify:
+            users = User.objects.all()
+        else:
+            users = User.objects.filter(achievement_stats__isnull=False)
+        if options['display_ids']:
+            users = users.filter(display_id__in=options['display_ids'])
+        ids_qs = users.order_by('id').values_list('id', flat=True)
+        ids = list(ids_qs)
+        self.stdout.write(f'{"Verifying" if verify else "Rebuilding"} achievement stats for {len(ids)} users')
+
+        if verify:
+            mismatches = verify_user_stats(ids)
+            for user_id, field, stored, expected in mismatches:
+                self.stdout.write(f'  user {user_id}: {field} stored={stored} expected={expected}')
+            if mismatches:
+                self.stdout.write(self.style.ERROR(f'{len(mismatches)} mismatches found in {len(ids)} users'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'All {len(ids)} users are consistent'))
+            return
+
+        for user_id in ids:
+            rebuild_user_stats(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt achievement stats for {len(ids)} users'))
@@ -0,0 +1,49 @@
+# Generated manually: アチーブメント判定用のユーザー別集計テーブル（行は初回判定時に生テーブルから作成）
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0007_v223_reaction_titles_advanced'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAchievementStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='achievement_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+                ('total_posts', models.IntegerField(default=0, verbose_name='投稿数')),
+                ('game_posts', models.IntegerField(default=0, verbose_name='ゲーム投稿数')),
+                ('video_posts', models.IntegerField(default=0, verbose_name='動画投稿数')),
+                ('image_posts', models.IntegerField(default=0, verbose_name='画像投稿数')),
+                ('submit_medal_count', models.IntegerField(default=0, verbose_name='いいね！受取数')),
+                ('awesome_count', models.IntegerField(default=0, verbose_name='すごい！受取数')),
+                ('cute_count', models.IntegerField(default=0, verbose_name='かわいい！受取数')),
+                ('funny_count', models.IntegerField(default=0, verbose_name='笑える！受取数')),
+                ('moved_count', models.IntegerField(default=0, verbose_name='感動した受取数')),
+                ('cool_count', models.IntegerField(default=0, verbose_name='かっこいい！受取数')),
+                ('beautiful_count', models.IntegerField(default=0, verbose_name='きれい受取数')),
+                ('emotional_count', models.IntegerField(default=0, verbose_name='エモい！受取数')),
+                ('god_game_count', models.IntegerField(default=0, verbose_name='神ゲー！受取数')),
+                ('total_reactions', models.IntegerField(default=0, verbose_name='リアクション受取合計')),
+                ('card_count', models.IntegerField(default=0, verbose_name='所持カード数')),
+                ('article_count', models.IntegerField(default=0, verbose_name='公開記事数')),
+                ('post_hours_mask', models.IntegerField(default=0, verbose_name='投稿時間帯ビット')),
+                ('post_weekdays_mask', models.IntegerField(default=0, verbose_name='投稿曜日ビット')),
+                ('last_post_date', models.DateField(blank=True, null=True, verbose_name='最終投稿日（JST）')),
+                ('current_streak', models.IntegerField(default=0, verbose_name='連続投稿日数（最終投稿日まで）')),
+                ('max_streak', models.IntegerField(default=0, verbose_name='最長連続投稿日数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'アチーブメント集計',
+                'verbose_name_plural': 'アチーブメント集計',
+                'db_table': 'user_achievement_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated manually: ポイント履歴の重複防止キー（一意制約）+ 既存の1回限りの付与へのキーの付与
+
+import re
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+_SUB_ID = re.compile(r'id:([0-9A-Za-z-]+)')
+_PLAYER = re.compile(r'player:(\d+)')
+_TARGET = re.compile(r'user:(\d+)')
+_BY = re.compile(r'by:(\d+)')
+
+# 当日最初の1件だけキーを持つ種別（ログインボーナス・投稿の満額分）
+_DAILY_TYPES = ('daily_login', 'submission_image', 'submission_video', 'submission_game')
+
+
+def _key_for(row):
+    """既存の履歴行に対応するキー（gamification.services.dedupe_key と同じ形式）。対象外なら None。"""
+    action, user_id = row.action_type, row.user_id
+    day = timezone.localtime(row.created_at).date() if row.created_at else None
+    description = row.description or ''
+    if action == 'registration_bonus':
+        return f'registration_bonus:{user_id}'
+    if action in _DAILY_TYPES and day:
+        return f'{action}:{user_id}:{day}'
+    if action == 'game_played_player' and day:
+        sub = _SUB_ID.search(description)
+        return f'game_played_player:{sub.group(1)}:{user_id}:{day}' if sub else None
+    if action == 'game_played_author' and day:
+        sub, player = _SUB_ID.search(description), _PLAYER.search(description)
+        return f'game_played_author:{sub.group(1)}:{player.group(1)}:{day}' if sub and player else None
+    if action == 'follow_given':
+        target = _TARGET.search(description)
+        return f'follow_given:{user_id}:{target.group(1)}' if target else None
+    if action == 'follow_received':
+        by = _BY.search(description)
+        return f'follow_received:{user_id}:{by.group(1)}' if by else None
+    return None
+
+
+def backfill_dedupe_keys(apps, schema_editor):
+    PointHistory = apps.get_model('gamification', 'PointHistory')
+    action_types = ('registration_bonus', 'game_played_player', 'game_played_author', 'follow_given', 'follow_received') + _DAILY_TYPES
+    rows = (
+        PointHistory.objects.filter(action_type__in=action_types)
+        .order_by('id')
+        .only('id', 'user_id', 'action_type', 'description', 'created_at')
+    )
+    seen = set()
+    pending = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        key = _key_for(row)
+        # 過去に二重付与された行は最初の1件だけがキーを持つ
+        if key is None or key in seen:
+            continue
+        seen.add(key)
+        row.dedupe_key = key
+        pending.append(row)
+        if len(pending) >= BATCH_SIZE:
+            PointHistory.objects.bulk_update(pending, ['dedupe_key'])
+            pending = []
+    if pending:
+        PointHistory.objects.bulk_update(pending, ['dedupe_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0008_userachievementstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointhistory',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=150, null=True, verbose_name='重複防止キー'),
+        ),
+        migrations.RunPython(backfill_dedupe_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pointhistory',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('dedupe_key__isnull', False)),
+                fields=('dedupe_key',),
+                name='uniq_point_hist_dedupe_key',
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated manually: リアクション受取などのポイント付与をまとめて反映するための台帳キュー
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0009_pointhistory_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pointhistory',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='獲得日時'),
+        ),
+        migrations.CreateModel(
+            name='PendingPointAward',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action_type', models.CharField(max_length=50, verbose_name='アクション種別')),
+                ('points', models.IntegerField(verbose_name='ポイント数')),
+                ('description', models.CharField(blank=True, max_length=200, verbose_name='説明')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='獲得日時')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_point_awards', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': '未反映のポイント付与',
+                'verbose_name_plural': '未反映のポイント付与',
+                'db_table': 'pending_point_awards',
+                'indexes': [models.Index(fields=['user'], name='pending_point_user_idx')],
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ Gamification app models.
 """
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Title(models.Model):
@@ -128,7 +129,10 @@ class PointHistory(models.Model):
     action_type = models.CharField('アクション種別', max_length=50, choices=ActionType.choices)
     points = models.IntegerField('ポイント数')
     description = models.CharField('説明', max_length=200, blank=True)
-    created_at = models.DateTimeField('獲得日時', auto_now_add=True, db_index=True)
+    # 1回限りの付与の重複防止キー（例: daily_login:{user}:{date}）。一意制約で同じ付与の二重登録を防ぐ
+    dedupe_key = models.CharField('重複防止キー', max_length=150, null=True, blank=True)
+    # 台帳キュー（PendingPointAward）から反映した行は獲得時点の日時を引き継ぐ
+    created_at = models.DateTimeField('獲得日時', default=timezone.now, db_index=True)
 
     class Meta:
         db_table = 'point_history'
@@ -138,7 +142,91 @@ class PointHistory(models.Model):
         indexes = [
             models.Index(fields=['user', '-created_at'], name='point_hist_user_idx'),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(dedupe_key__isnull=False),
+                name='uniq_point_hist_dedupe_key',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} +{self.points}TP ({self.action_type})'
 
+
+
+
+class PendingPointAward(models.Model):
+    """台帳キュー: まだ UserPoint / PointHistory に反映していないポイント付与。
+
+    リアクション受取のように1人に集中しやすい付与は、リクエスト内では UserPoint の行ロックを取らず
+    ここへ INSERT するだけにする（POINT_LEDGER_MODE='buffered'）。ワーカー（gamification.point_ledger.flush）が
+    まとめて F() で残高へ加算し、PointHistory を一括作成してから行を消す。
+    反映前の分も残高表示に含める（point_ledger.pending_total）。
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='pending_point_awards',
+        verbose_name='ユーザー',
+    )
+    action_type = models.CharField('アクション種別', max_length=50)
+    points = models.IntegerField('ポイント数')
+    description = models.CharField('説明', max_length=200, blank=True)
+    created_at = models.DateTimeField('獲得日時', default=timezone.now)
+
+    class Meta:
+        db_table = 'pending_point_awards'
+        verbose_name = '未反映のポイント付与'
+        verbose_name_plural = '未反映のポイント付与'
+        indexes = [
+            models.Index(fields=['user'], name='pending_point_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} +{self.points}TP ({self.action_type}, pending)'
+
+
+class UserAchievementStats(models.Model):
+    """アチーブメント判定用のユーザー別集計（投稿・受け取りリアクション・カード・記事）。
+
+    投稿/リアクション/カード/記事のシグナルで差分更新し、削除など差分で表せない変更は再集計する。
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='achievement_stats',
+        verbose_name='ユーザー',
+    )
+    total_posts = models.IntegerField('投稿数', default=0)
+    game_posts = models.IntegerField('ゲーム投稿数', default=0)
+    video_posts = models.IntegerField('動画投稿数', default=0)
+    image_posts = models.IntegerField('画像投稿数', default=0)
+    submit_medal_count = models.IntegerField('いいね！受取数', default=0)
+    awesome_count = models.IntegerField('すごい！受取数', default=0)
+    cute_count = models.IntegerField('かわいい！受取数', default=0)
+    funny_count = models.IntegerField('笑える！受取数', default=0)
+    moved_count = models.IntegerField('感動した受取数', default=0)
+    cool_count = models.IntegerField('かっこいい！受取数', default=0)
+    beautiful_count = models.IntegerField('きれい受取数', default=0)
+    emotional_count = models.IntegerField('エモい！受取数', default=0)
+    god_game_count = models.IntegerField('神ゲー！受取数', default=0)
+    total_reactions = models.IntegerField('リアクション受取合計', default=0)
+    card_count = models.IntegerField('所持カード数', default=0)
+    article_count = models.IntegerField('公開記事数', default=0)
+    # 投稿した時間帯・曜日（JST）のビット集合。bit n = n時 / 曜日 n（月=0）
+    post_hours_mask = models.IntegerField('投稿時間帯ビット', default=0)
+    post_weekdays_mask = models.IntegerField('投稿曜日ビット', default=0)
+    last_post_date = models.DateField('最終投稿日（JST）', null=True, blank=True)
+    current_streak = models.IntegerField('連続投稿日数（最終投稿日まで）', default=0)
+    max_streak = models.IntegerField('最長連続投稿日数', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        db_table = 'user_achievement_stats'
+        verbose_name = 'アチーブメント集計'
+        verbose_name_plural = 'アチーブメント集計'
+
+    def __str__(self):
+        return f'{self.user} - {self.total_posts}posts'
@@ -0,0 +1,155 @@
+"""ポイント付与の台帳キュー（write-behind）。
+
+バズった投稿へのリアクションのように同じユーザーへ付与が集中すると、award_points の
+UserPoint 行ロック（select_for_update）でリクエストが直列になる。POINT_LEDGER_MODE='buffered' では
+付与を PendingPointAward への INSERT だけにし、コミット後に flush を予約する。
+
+- flush: 未反映の行を古い順に POINT_FLUSH_BATCH 件ずつ取り、ユーザーごとに合計して F() で残高へ加算、
+  PointHistory を bulk_create して行を消す（1バッチ1トランザクション、複数ワーカーは SKIP LOCKED で分担）。
+- 予約は POINT_FLUSH_MODE が 'celery' ならタスク（数秒まとめて1回）、'inline' ならその場で実行する。
+  取りこぼしはビートの定期 flush で拾う。
+- 残高・履歴の表示は未反映分を合算するので、本人からは付与直後から見える。
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import PendingPointAward, PointHistory, UserPoint
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_SCHEDULED_KEY = 'point_ledger:flush_scheduled'
+
+
+def buffered():
+    return getattr(settings, 'POINT_LEDGER_MODE', 'direct') == 'buffered'
+
+
+def batch_size():
+    return getattr(settings, 'POINT_FLUSH_BATCH', 1000)
+
+
+# ---------------------------------------------------------------------------
+# 追加
+# ---------------------------------------------------------------------------
+
+def enqueue(user, action_type, points, description=''):
+    """付与を台帳キューへ積む（行ロックを取らない INSERT のみ）。"""
+    award = PendingPointAward.objects.create(
+        user_id=getattr(user, 'pk', user),
+        action_type=action_type,
+        points=points,
+        description=(description or '')[:200],
+    )
+    schedule_flush()
+    return award
+
+
+def schedule_flush():
+    """コミット後に flush を実行（celery なら debounce して countdown 付きのタスク1回）する。"""
+    def _run():
+        if getattr(settings, 'POINT_FLUSH_MODE', 'celery') == 'inline':
+            _flush_quietly()
+            return
+        delay = getattr(settings, 'POINT_FLUSH_DELAY', 2)
+        try:
+            if not cache.add(_FLUSH_SCHEDULED_KEY, 1, delay):
+                return
+            from gamification.tasks import flush_pending_point_awards
+            flush_pending_point_awards.apply_async(countdown=delay)
+        except Exception as e:
+            logger.warning(f'[PointLedger] scheduling flush failed, running inline: {e}')
+            _flush_quietly()
+
+    transaction.on_commit(_run)
+
+
+def _flush_quietly():
+    try:
+        flush()
+    except Exception as e:
+        # 行は残るので定期 flush で再試行される
+        logger.warning(f'[PointLedger] flush failed: {e}')
+
+
+# ---------------------------------------------------------------------------
+# 反映
+# ---------------------------------------------------------------------------
+
+def _fold(rows):
+    """未反映の行を残高と履歴に反映して消す（呼び出し側のトランザクション内）。"""
+    deltas = defaultdict(int)
+    for row in rows:
+        deltas[row.user_id] += row.points
+    UserPoint.objects.bulk_create([UserPoint(user_id=uid) for uid in deltas], ignore_conflicts=True)
+    by_delta = defaultdict(list)
+    for uid, delta in deltas.items():
+        by_delta[delta].append(uid)
+    now = timezone.now()
+    for delta, user_ids in by_delta.items():
+        UserPoint.objects.filter(user_id__in=user_ids).update(total_points=F('total_points') + delta, updated_at=now)
+    PointHistory.objects.bulk_create([
+        PointHistory(
+            user_id=row.user_id,
+            action_type=row.action_type,
+            points=row.points,
+            description=row.description,
+            created_at=row.created_at,
+        )
+        for row in rows
+    ])
+    PendingPointAward.objects.filter(id__in=[row.id for row in rows]).delete()
+    return deltas
+
+
+def flush(limit=None):
+    """未反映の付与をすべて反映する。{'awards', 'users', 'points'} を返す。"""
+    limit = limit or batch_size()
+    result = {'awards': 0, 'users': 0, 'points': 0}
+    while True:
+        with transaction.atomic():
+            rows = list(
+                PendingPointAward.objects.select_for_update(skip_locked=True).order_by('id')[:limit]
+            )
+            if not rows:
+                break
+            deltas = _fold(rows)
+        result['awards'] += len(rows)
+        result['users'] += len(deltas)
+        result['points'] += sum(deltas.values())
+        if len(rows) < limit:
+            break
+    if result['awards']:
+        logger.info('[PointLedger] flushed %s', result)
+    return result
+
+
+def flush_user(user_id):
+    """1ユーザー分の未反映の付与を反映する（消費前など、残高を確定させたいとき。呼び出し側のトランザクション内）。"""
+    rows = list(PendingPointAward.objects.select_for_update().filter(user_id=user_id).order_by('id'))
+    if rows:
+        _fold(rows)
+    return sum(row.points for row in rows)
+
+
+# ---------------------------------------------------------------------------
+# 参照
+# ---------------------------------------------------------------------------
+
+def pending_total(user_id):
+    """未反映の付与の合計ポイント。"""
+    return PendingPointAward.objects.filter(user_id=user_id).aggregate(total=Sum('points'))['total'] or 0
+
+
+def pending_history(user_id, limit=50):
+    """未反映の付与を PointHistory の values() と同じ形で新しい順に返す。"""
+    return list(
+        PendingPointAward.objects.filter(user_id=user_id)
+        .order_by('-created_at', '-id')[:limit]
+        .values('action_type', 'points', 'description', 'created_at')
+    )
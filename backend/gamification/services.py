@@ -2,7 +2,7 @@
 Gamification services.
 """
 from django.utils import timezone
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from users.models import UserMeta, User, UserCard
 from gamification.models import Card, UserPoint, PointHistory
 import random
@@ -108,10 +108,11 @@ def grant_immediate_rewards(meta: UserMeta, boost_rarity: bool = False) -> dict:
     card_id = None
     
     try:
-        # Load card master (from DB or TSV)
-        master_cards = load_card_master()
+        # 抽選プールはプロセス内にキャッシュ済み（Card 変更時に無効化）なので DB は UserCard の INSERT のみ
+        from gamification.card_pool import RARITY_DISPLAY, draw
+        card_row = draw()
         
-        if not master_cards:
+        if card_row is None:
             logger.warning('No cards in master, using fallback')
             card_id = f'C{random.randint(1, 20):03d}'
             card_meta = {
@@ -121,125 +122,16 @@ def grant_immediate_rewards(meta: UserMeta, boost_rarity: bool = False) -> dict:
                 'image_url': None
             }
         else:
-            # Filter by card type (50% Character, 50% Effect)
-            pick_effect = random.random() < 0.5
-            
-            # Weighted random by rarity (same as Next.js)
-            rarity_weights = {
-                'SSR': 0.01,
-                'SR': 0.04,
-                'R': 0.20,
-                'N': 0.75
-            }
-            
-            # Map Django rarity to Next.js format
-            rarity_map_reverse = {
-                'common': 'N',
-                'rare': 'R',
-                'seasonal': 'SR',
-                'special': 'SSR'
-            }
-            
-            if pick_effect:
-                # Effect cards: E101-E136 range
-                effect_cards = [c for c in master_cards if c.code.startswith('E')]
-                if effect_cards:
-                    # Group by rarity
-                    by_rarity = {}
-                    for c in effect_cards:
-                        js_rarity = rarity_map_reverse.get(c.rarity, 'N')
-                        if js_rarity not in by_rarity:
-                            by_rarity[js_rarity] = []
-                        by_rarity[js_rarity].append(c)
-                    
-                    # Weighted pick
-                    total_weight = sum(rarity_weights.values())
-                    r = random.random() * total_weight
-                    acc = 0
-                    selected_rarity = 'N'
-                    for rarity, weight in rarity_weights.items():
-                        acc += weight
-                        if r <= acc:
-                            selected_rarity = rarity
-                            break
-                    
-                    # Pick from selected rarity pool
-                    pool = by_rarity.get(selected_rarity, [])
-                    if pool:
-                        card_row = random.choice(pool)
-                    else:
-                        card_row = random.choice(effect_cards)
-                else:
-                    card_row = random.choice(master_cards)
-            else:
-                # Character cards: C001-C020
-                char_cards = [c for c in master_cards if c.code.startswith('C')]
-                if char_cards:
-                    # Group by rarity
-                    by_rarity = {}
-                    for c in char_cards:
-                        js_rarity = rarity_map_reverse.get(c.rarity, 'N')
-                        if js_rarity not in by_rarity:
-                            by_rarity[js_rarity] = []
-                        by_rarity[js_rarity].append(c)
-                    
-                    # Weighted pick
-                    total_weight = sum(rarity_weights.values())
-                    r = random.random() * total_weight
-                    acc = 0
-                    selected_rarity = 'N'
-                    for rarity, weight in rarity_weights.items():
-                        acc += weight
-                        if r <= acc:
-                            selected_rarity = rarity
-                            break
-                    
-                    # Pick from selected rarity pool
-                    pool = by_rarity.get(selected_rarity, [])
-                    if pool:
-                        card_row = random.choice(pool)
-                    else:
-                        card_row = random.choice(char_cards)
-                else:
-                    card_row = random.choice(master_cards)
-            
             card_id = card_row.code
             
-            # Get or create Card in DB (for UserCard relationship)
-            defaults = {
-                'name': card_row.name,
-                'rarity': card_row.rarity,
-                'image_url': card_row.image_url,
-            }
-            if hasattr(card_row, 'description') and card_row.description is not None:
-                defaults['description'] = card_row.description
-            if hasattr(card_row, 'attribute') and card_row.attribute is not None:
-                defaults['attribute'] = card_row.attribute
-            if hasattr(card_row, 'atk_points') and card_row.atk_points is not None:
-                defaults['atk_points'] = card_row.atk_points
-            if hasattr(card_row, 'def_points') and card_row.def_points is not None:
-                defaults['def_points'] = card_row.def_points
-            if hasattr(card_row, 'card_type') and card_row.card_type:
-                defaults['card_type'] = card_row.card_type
-            if hasattr(card_row, 'buff_effect') and card_row.buff_effect is not None:
-                defaults['buff_effect'] = card_row.buff_effect
-            db_card, _ = Card.objects.get_or_create(code=card_id, defaults=defaults)
-            
             # Create UserCard (allow duplicates - same card can be owned multiple times)
             UserCard.objects.create(
                 user=meta.user,
-                card=db_card,
+                card_id=card_row.pk,
                 obtained_at=now
             )
             
-            # Map Django rarity to Next.js format
-            rarity_map_reverse = {
-                'common': 'N',
-                'rare': 'R',
-                'seasonal': 'SR',
-                'special': 'SSR'
-            }
-            rarity = rarity_map_reverse.get(card_row.rarity, 'N')
+            rarity = RARITY_DISPLAY.get(card_row.rarity, 'N')
             
             # Use /uploads/cards/ URL for card images (consistent with frontend)
             image_url = card_row.image_url
@@ -382,9 +274,13 @@ NEON_TITLE_NAMES = frozenset(
 
 
 def get_title_color(title_name: str) -> str:
-    """称号名から表示ティア色を返す。"""
+    """称号名から表示ティア色を返す（Title マスタにある称号は称号レジストリから）。"""
     if not title_name:
         return 'gold'
+    from gamification.title_registry import get_entry
+    entry = get_entry(title_name)
+    if entry is not None:
+        return entry.color
     return ACHIEVEMENT_COLOR_MAP.get(title_name, 'gold')
 
 
@@ -399,7 +295,14 @@ def get_title_display_name(title_name: str) -> str:
 
 
 def _compute_user_stats(user: User) -> dict:
-    """全アチーブメント判定に必要な統計を一括計算して返す。"""
+    """全アチーブメント判定に必要な統計を返す（UserAchievementStats の集計行1件から）。"""
+    from gamification import achievement_stats
+
+    return achievement_stats.stats_dict(achievement_stats.get_user_stats(user.id))
+
+
+def _compute_user_stats_scan(user: User) -> dict:
+    """旧実装: 生テーブルを都度走査して統計を計算する（検証用）。"""
     from submissions.models import Submission, Reaction
     from django.db.models import Q
     from zoneinfo import ZoneInfo
@@ -489,131 +392,31 @@ def _compute_user_stats(user: User) -> dict:
 
 def _check_achievement(name: str, s: dict) -> bool:
     """統計データ s に基づき、指定した称号の条件を満たしているか返す。"""
-    tp  = s['total_posts']
-    gp  = s['game_posts']
-    ip  = s['image_posts']
-    vp  = s['video_posts']
-    lk  = s['submit_medal_count']
-    tr  = s['total_reactions']
-    fn  = s['funny_count']
-    mv  = s['moved_count']
-    ct  = s['cute_count']
-    cl  = s['cool_count']
-    aw  = s['awesome_count']
-    bf  = s['beautiful_count']
-    em  = s['emotional_count']
-    gg  = s['god_game_count']
-    cc  = s['card_count']
-    str_= s['max_streak']
-
-    checks = {
-        # 入門 (GREEN)
-        '駆け出しクリエイター':   True,
-        'はじめの一歩':           tp >= 1,
-        '絵師見習い':             ip >= 1,
-        '映像クリエイター見習い': vp >= 1,
-        'ゲームメーカー見習い':   gp >= 1,
-        '注目の新星':             lk >= 10,
-        '話題の的':               tr >= 30,
-        '笑わせ屋':               fn >= 5,
-        '感動屋':                 mv >= 5,
-        'かわいいの使い手':       ct >= 5,
-        'きれいの使い手':         bf >= 5,
-        'エモの伝え手':           em >= 5,
-        '神ゲー見習い':           gg >= 5,
-        '朝活クリエイター':       s['has_morning_post'],
-        '週末クリエイター':       s['has_weekend_post'],
-        # 初級 (BLUE)
-        '見習いクリエイター':     tp >= 5,
-        'イラストレーター':       ip >= 10,
-        'ビデオアーティスト':     vp >= 5,
-        'ゲームクリエイター':     gp >= 5,
-        '人気クリエイター':       lk >= 50,
-        'コミュニティの星':       tr >= 100,
-        'クールマン':             cl >= 10,
-        '驚異のクリエイター':     aw >= 10,
-        '輝きの職人':             bf >= 10,
-        '心を揺らす者':           em >= 10,
-        '神ゲーの証人':           gg >= 10,
-        '万能クリエイター':       ip >= 1 and vp >= 1 and gp >= 1,
-        'モーニングクリエイター': s['has_morning_creator_post'],
-        'カードコレクター':       cc >= 5,
-        '3日坊主じゃない':        str_ >= 3,
-        # 中級 (GOLD)
-        '中堅クリエイター':       tp >= 20,
-        'ベテランクリエイター':   tp >= 50,
-        'デジタルアーティスト':   ip >= 30,
-        '動画職人':               vp >= 15,
-        'ゲーム職人':             gp >= 10,
-        'トップクリエイター':     lk >= 200,
-        '感動の嵐':               tr >= 500,
-        'トリプルマスター':       ip >= 5 and vp >= 5 and gp >= 5,
-        '一週間の炎':             str_ >= 7,
-        'レアコレクター':         cc >= 10,
-        '美の達人':               bf >= 25,
-        'エモの巨匠':             em >= 25,
-        '神ゲーの王者':           gg >= 25,
-        # 上級 (RED, 条件秘密)
-        'マスタークリエイター':   tp >= 100,
-        '絵の達人':               ip >= 100,
-        '動画の達人':             vp >= 50,
-        'ゲームの達人':           gp >= 20,
-        '伝説のスター':           lk >= 500,
-        '継続の意志':             str_ >= 30,
-        '熱狂のクリエイター':     tr >= 1000,
-        '美の化身':               bf >= 50,
-        'エモの神託':             em >= 50,
-        '神ゲーの覇者':           gg >= 50,
-        # 伝説 (RAINBOW)
-        'レジェンドクリエイター': tp >= 300,
-        'ゲームの神様':           gp >= 50,
-        '創造神':                 ip >= 50 and vp >= 30 and gp >= 20,
-        'きらめきの伝説':         bf >= 100,
-        'エモの伝説':             em >= 100,
-        '神ゲーの神話':           gg >= 100,
-        # 超越 (NEON)
-        'きらめきの極星':         bf >= 200,
-        'エモの星雲':             em >= 200,
-        '神ゲーの宇宙':           gg >= 200,
-        # 超秘密
-        '影の芸術家':             vp >= 50,
-        '深淵のクリエイター':     lk >= 1000,
-        '時を超える者':           str_ >= 60,
-        '全知全能':               tp >= 500,
-        'TOYBOXの使者':          tr >= 2000,
-        'AYATORI':               False,  # 管理者のみ手動付与
-        # 記事
-        '記事デビュー':          s.get('article_count', 0) >= 1,
-        'ブロガー':              s.get('article_count', 0) >= 3,
-        'コラムニスト':          s.get('article_count', 0) >= 10,
-        '記事の伝道師':          s.get('article_count', 0) >= 30,
-    }
-    return checks.get(name, False)
+    from gamification.achievements import RULES_BY_NAME
+
+    rule = RULES_BY_NAME.get(name)
+    return rule is not None and rule.test(s)
 
 
-def check_and_grant_achievement_titles(user: User) -> list:
+def check_and_grant_achievement_titles(user: User, events=None) -> list:
     """アチーブメント条件をチェックし、未取得の称号を付与する。
     
     投稿・リアクション受け取りなどのタイミングで呼び出す。
+    events（achievements.AchievementEvent のリスト）を渡すと、そのイベントで変化する統計に
+    依存する称号だけを判定する。None なら全称号を判定する。
     新たに付与された称号のリストを返す。
     """
-    meta, _ = UserMeta.objects.get_or_create(user=user)
+    from gamification.achievements import evaluate
 
+    meta, _ = UserMeta.objects.get_or_create(user=user)
     earned = set(meta.earned_titles or [])
-    newly_granted = []
-
-    stats = _compute_user_stats(user)
-
-    for defn in ACHIEVEMENT_DEFINITIONS:
-        title_name = defn['name']
-        if title_name not in earned and _check_achievement(title_name, stats):
-            earned.add(title_name)
-            newly_granted.append(title_name)
-            if not meta.active_title:
-                meta.active_title = title_name
-                meta.expires_at = None
+    newly_granted = evaluate(_compute_user_stats(user), earned, events)
 
     if newly_granted:
+        earned.update(newly_granted)
+        if not meta.active_title:
+            meta.active_title = newly_granted[0]
+            meta.expires_at = None
         meta.earned_titles = list(earned)
         meta.save(update_fields=['earned_titles', 'active_title', 'expires_at'])
         logger.info('achievement.titles_granted', extra={
@@ -655,23 +458,73 @@ def _get_or_create_user_point(user):
     return point
 
 
+def _credit(user, points: int) -> int:
+    """UserPoint に加算して新しい残高を返す（呼び出し側のトランザクション内で行ロック）。"""
+    up = UserPoint.objects.select_for_update().get_or_create(user=user)[0]
+    up.total_points += points
+    up.save(update_fields=['total_points', 'updated_at'])
+    return up.total_points
+
+
+def dedupe_key(kind: str, *parts) -> str:
+    """PointHistory.dedupe_key の値（例: dedupe_key('daily_login', user.id, date) → 'daily_login:1:2025-01-01'）。"""
+    return ':'.join([kind, *(str(p) for p in parts)])
+
+
 @transaction.atomic
 def award_points(user, action_type: str, points: int, description: str = '') -> PointHistory:
     """ポイントを付与して履歴を記録する。points は正の整数を想定。"""
     if points <= 0:
         return None
 
-    up = UserPoint.objects.select_for_update().get_or_create(user=user)[0]
-    up.total_points += points
-    up.save(update_fields=['total_points', 'updated_at'])
-
+    total = _credit(user, points)
     history = PointHistory.objects.create(
         user=user,
         action_type=action_type,
         points=points,
         description=description,
     )
-    logger.info(f'[Point] user={user.id} +{points}pt ({action_type}) total={up.total_points}')
+    logger.info(f'[Point] user={user.id} +{points}pt ({action_type}) total={total}')
+    return history
+
+
+def award_points_buffered(user, action_type: str, points: int, description: str = ''):
+    """集中しやすい付与（リアクション受取など）用。
+
+    POINT_LEDGER_MODE='buffered' なら台帳キューへ積むだけで UserPoint の行ロックを取らない
+    （反映は gamification.point_ledger.flush）。'direct' なら award_points と同じ。
+    """
+    from gamification import point_ledger
+
+    if points <= 0:
+        return None
+    if not point_ledger.buffered():
+        return award_points(user, action_type, points, description)
+    return point_ledger.enqueue(user, action_type, points, description)
+
+
+def award_points_once(user, key: str, action_type: str, points: int, description: str = '') -> PointHistory:
+    """dedupe_key=key の付与がまだ無いときだけポイントを付与する。付与済みなら None を返す。
+
+    存在確認の SELECT はせず、履歴の INSERT が一意制約（uniq_point_hist_dedupe_key）に
+    当たったら付与済みとみなす。同時に呼ばれても付与されるのは1回だけ。
+    """
+    if points <= 0:
+        return None
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                history = PointHistory.objects.create(
+                    user=user,
+                    action_type=action_type,
+                    points=points,
+                    description=(description or '')[:200],
+                    dedupe_key=key,
+                )
+        except IntegrityError:
+            return None
+        total = _credit(user, points)
+    logger.info(f'[Point] user={user.id} +{points}pt ({action_type}, {key}) total={total}')
     return history
 
 
@@ -682,7 +535,12 @@ def spend_points(user, action_type: str, points: int, description: str = ''):
         return None
     up = UserPoint.objects.select_for_update().get_or_create(user=user)[0]
     if up.total_points < points:
-        return None
+        # 台帳キューに未反映の付与があれば先に反映して残高を確定させる
+        from gamification import point_ledger
+        if point_ledger.flush_user(user.pk):
+            up.refresh_from_db()
+        if up.total_points < points:
+            return None
     up.total_points -= points
     up.save(update_fields=['total_points', 'updated_at'])
     history = PointHistory.objects.create(
@@ -697,14 +555,9 @@ def spend_points(user, action_type: str, points: int, description: str = ''):
 
 def award_registration_bonus(user) -> bool:
     """初回登録ボーナス（100pt）。既に付与済みなら False を返す。"""
-    up, created = UserPoint.objects.get_or_create(user=user)
-    if not created:
-        # 既にレコードあり → 登録ボーナスが済んでいるか否かは履歴で判断
-        if PointHistory.objects.filter(user=user, action_type=PointHistory.ActionType.REGISTRATION_BONUS).exists():
-            return False
-
-    award_points(user, PointHistory.ActionType.REGISTRATION_BONUS, 100, '初回登録ボーナス')
-    return True
+    UserPoint.objects.get_or_create(user=user)
+    key = dedupe_key(PointHistory.ActionType.REGISTRATION_BONUS, user.pk)
+    return award_points_once(user, key, PointHistory.ActionType.REGISTRATION_BONUS, 100, '初回登録ボーナス') is not None
 
 
 def award_migration_bonus(user) -> bool:
@@ -720,16 +573,11 @@ def award_migration_bonus(user) -> bool:
 
 def award_daily_login(user) -> bool:
     """毎日ログインボーナス（30pt）。1日1回限り。"""
-    today = timezone.now().date()
-    already = PointHistory.objects.filter(
-        user=user,
-        action_type=PointHistory.ActionType.DAILY_LOGIN,
-        created_at__date=today,
-    ).exists()
-    if already:
-        return False
-    award_points(user, PointHistory.ActionType.DAILY_LOGIN, 30, '毎日ログインボーナス')
-    return True
+    from users import daily_activity
+
+    daily_activity.record_login(user.pk)
+    key = dedupe_key(PointHistory.ActionType.DAILY_LOGIN, user.pk, timezone.localdate())
+    return award_points_once(user, key, PointHistory.ActionType.DAILY_LOGIN, 30, '毎日ログインボーナス') is not None
 
 
 def award_submission_points(user, submission_type: str) -> int:
@@ -748,19 +596,14 @@ def award_submission_points(user, submission_type: str) -> int:
         'game':  PointHistory.ActionType.SUBMISSION_GAME,
     }
     action_type = action_map[submission_type]
-
-    # 当日の同種投稿数を確認
-    today = timezone.now().date()
-    count_today = PointHistory.objects.filter(
-        user=user,
-        action_type=action_type,
-        created_at__date=today,
-    ).count()
-
-    points = base if count_today == 0 else half
     label = {'image': '画像投稿', 'video': '動画投稿', 'game': 'ゲーム投稿'}[submission_type]
-    award_points(user, action_type, points, label)
-    return points
+
+    # 当日の同種投稿の1件目だけキー付き（満額）、2件目以降は半額
+    key = dedupe_key(action_type, user.pk, timezone.localdate())
+    if award_points_once(user, key, action_type, base, label):
+        return base
+    award_points(user, action_type, half, label)
+    return half
 
 
 def award_reaction_received_points(post_author, reaction_type: str) -> int:
@@ -784,7 +627,8 @@ def award_reaction_received_points(post_author, reaction_type: str) -> int:
         'god_game':     '神ゲー！',
     }
     label = emoji_labels.get(reaction_type, reaction_type)
-    award_points(
+    # 人気投稿ではリアクションが投稿者1人に集中するので台帳キュー経由
+    award_points_buffered(
         post_author,
         PointHistory.ActionType.REACTION_RECEIVED,
         points,
@@ -794,15 +638,20 @@ def award_reaction_received_points(post_author, reaction_type: str) -> int:
 
 
 def get_point_summary(user) -> dict:
-    """ポイント残高と最近の履歴を返す。"""
+    """ポイント残高と最近の履歴を返す（台帳キューに未反映の付与も含める）。"""
+    from gamification import point_ledger
+
     up = _get_or_create_user_point(user)
     history = list(
         PointHistory.objects.filter(user=user)
         .order_by('-created_at')[:50]
         .values('action_type', 'points', 'description', 'created_at')
     )
+    pending = point_ledger.pending_history(user.pk)
+    if pending:
+        history = sorted(pending + history, key=lambda h: h['created_at'], reverse=True)[:50]
     return {
-        'total_points': up.total_points,
+        'total_points': up.total_points + point_ledger.pending_total(user.pk),
         'history': history,
     }
 
@@ -814,37 +663,28 @@ def award_game_played(player, submission) -> dict:
     - 投稿者: 10TP（同条件）
     戻り値: {'player_awarded': bool, 'author_awarded': bool}
     """
+    from users import daily_activity
+
+    daily_activity.record_game_play(player.pk)
     if submission.author == player:
         return {'player_awarded': False, 'author_awarded': False}
 
-    today = timezone.now().date()
+    today = timezone.localdate()
     sub_id = str(submission.id)
 
-    player_already = PointHistory.objects.filter(
-        user=player,
-        action_type='game_played_player',
-        created_at__date=today,
-        description__icontains=sub_id,
-    ).exists()
-    player_awarded = False
-    if not player_already:
-        award_points(player, 'game_played_player', 5, f'ゲームをプレイした (id:{sub_id})')
-        player_awarded = True
-
-    author_already = PointHistory.objects.filter(
-        user=submission.author,
-        action_type='game_played_author',
-        created_at__date=today,
-        description__icontains=f'player:{player.id}',
-    ).exists()
-    author_awarded = False
-    if not author_already:
-        award_points(
-            submission.author,
-            'game_played_author',
-            10,
-            f'ゲームがプレイされた (id:{sub_id}, player:{player.id})',
-        )
-        author_awarded = True
+    player_awarded = award_points_once(
+        player,
+        dedupe_key('game_played_player', sub_id, player.id, today),
+        'game_played_player',
+        5,
+        f'ゲームをプレイした (id:{sub_id})',
+    ) is not None
+    author_awarded = award_points_once(
+        submission.author,
+        dedupe_key('game_played_author', sub_id, player.id, today),
+        'game_played_author',
+        10,
+        f'ゲームがプレイされた (id:{sub_id}, player:{player.id})',
+    ) is not None
 
     return {'player_awarded': player_awarded, 'author_awarded': author_awarded}
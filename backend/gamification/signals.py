@@ -0,0 +1,110 @@
+"""
+Gamification app signals: keep UserAchievementStats in sync with posts,
+received reactions, cards and articles, and drop the cached card pool when
+the card master changes, and the title registry when a Title changes.
+"""
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from articles.models import Article
+from submissions.models import Submission, Reaction
+from users.models import UserCard
+from . import achievement_stats
+from .card_pool import invalidate_card_pool
+from .models import Card, Title
+from .title_registry import invalidate_title_registry
+
+# 差分で表せない投稿の変更（ソフト削除・復元・種別変更）は再集計する
+_SUBMISSION_REBUILD_FIELDS = {'deleted_at', 'game_url', 'video_url', 'author', 'created_at'}
+_SUBMISSION_REBUILD_ATTNAMES = ('deleted_at', 'game_url', 'video_url', 'author_id', 'created_at')
+
+
+@receiver(pre_save, sender=Submission)
+def remember_stats_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    """再集計の判定用に、保存前の該当列の値を記録する（コメント設定・本文の編集などでは再集計しない）。"""
+    if raw or not instance.pk:
+        return
+    if update_fields is None or _SUBMISSION_REBUILD_FIELDS & set(update_fields):
+        instance._stats_fields = (
+            Submission.objects.filter(pk=instance.pk).values_list(*_SUBMISSION_REBUILD_ATTNAMES).first()
+        )
+
+
+@receiver(post_save, sender=Submission)
+def submission_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = instance.__dict__.pop('_stats_fields', False)
+    if created:
+        if instance.deleted_at is None:
+            achievement_stats.record_post(instance)
+        return
+    if before is False:
+        return
+    after = tuple(getattr(instance, name) for name in _SUBMISSION_REBUILD_ATTNAMES)
+    if before == after:
+        return
+    achievement_stats.refresh_user_stats(instance.author_id)
+    # 投稿者の付け替えでは元の投稿者も再集計する
+    if before is not None and before[3] != instance.author_id:
+        achievement_stats.refresh_user_stats(before[3])
+
+
+@receiver(post_delete, sender=Submission)
+def submission_deleted(sender, instance, **kwargs):
+    achievement_stats.refresh_user_stats(instance.author_id)
+
+
+def _reaction_changed(reaction, delta):
+    try:
+        submission = reaction.submission
+    except Submission.DoesNotExist:
+        return
+    if submission.deleted_at is None:
+        achievement_stats.record_reaction_received(submission.author_id, reaction.type, delta)
+
+
+@receiver(post_save, sender=Reaction)
+def reaction_received(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _reaction_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Reaction)
+def reaction_withdrawn(sender, instance, **kwargs):
+    _reaction_changed(instance, -1)
+
+
+@receiver(post_save, sender=UserCard)
+def card_obtained(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        achievement_stats.record_card(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=UserCard)
+def card_removed(sender, instance, **kwargs):
+    achievement_stats.record_card(instance.user_id, -1)
+
+
+@receiver(post_save, sender=Article)
+def article_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        achievement_stats.refresh_article_count(instance.author_id)
+
+
+@receiver(post_delete, sender=Article)
+def article_deleted(sender, instance, **kwargs):
+    achievement_stats.refresh_article_count(instance.author_id)
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def card_master_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_card_pool()
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_master_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_title_registry()
@@ -0,0 +1,14 @@
+"""Gamification app Celery tasks."""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_pending_point_awards():
+    """台帳キュー（PendingPointAward）の付与を UserPoint / PointHistory にまとめて反映する。"""
+    from gamification.point_ledger import flush
+
+    return flush()
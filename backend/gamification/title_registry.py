@@ -0,0 +1,69 @@
+"""称号レジストリ: 称号名 → 表示色・ネオン演出・バナー画像URL をプロセス内に保持する。
+
+Title マスタは数百件程度なので全件を1回読み込み、VersionedLocalCache で共有する（Title の保存・削除で
+gamification.signals から無効化）。投稿・プロフィールのバッジ表示は読み込み済みの UserMeta.active_title と
+このレジストリから解決するので、投稿ごとのクエリは発行しない。
+"""
+from collections import namedtuple
+
+from django.db import transaction
+
+from toybox.local_cache import VersionedLocalCache
+
+# バナー画像未設定時のフォールバック（バッジはフロントで SVG を生成するので URL としては返さない）
+FALLBACK_IMAGE_SUFFIX = 'toybox-title.png'
+
+# title: Title インスタンス（読み取り専用）/ image_url: バッジ用の画像URL（無ければ None）
+# image_is_file: image_url が ImageField のファイル（リクエストごとに絶対URLへ変換する）か
+TitleEntry = namedtuple('TitleEntry', ['title', 'color', 'neon', 'image_url', 'image_is_file'])
+
+
+def _badge_image(title):
+    """バッジ用の画像URL。実ファイル → 外部URL（フォールバック画像は除外）の順。"""
+    if title.image and title.image.name:
+        try:
+            return title.image.url, True
+        except Exception:
+            pass
+    if title.image_url and not title.image_url.endswith(FALLBACK_IMAGE_SUFFIX):
+        return title.image_url, False
+    return None, False
+
+
+def _build_registry():
+    from .models import Title
+    from .services import ACHIEVEMENT_COLOR_MAP
+
+    registry = {}
+    for title in Title.objects.all():
+        color = ACHIEVEMENT_COLOR_MAP.get(title.name, 'gold')
+        image_url, image_is_file = _badge_image(title)
+        registry[title.name] = TitleEntry(title, color, color == 'neon', image_url, image_is_file)
+    return registry
+
+
+title_registry_cache = VersionedLocalCache('gamification.title_registry', _build_registry)
+
+
+def get_entry(title_name):
+    """称号名のエントリ（Title マスタに無ければ None）。"""
+    if not title_name:
+        return None
+    return title_registry_cache.get().get(title_name)
+
+
+def badge_image_url(title_name, request=None):
+    """バッジに表示する称号のバナー画像URL（未設定なら None。フロントでテキストバッジを表示する）。"""
+    entry = get_entry(title_name)
+    if entry is None or not entry.image_url:
+        return None
+    if entry.image_is_file and request:
+        from toybox.image_utils import build_https_absolute_uri
+        return build_https_absolute_uri(request, entry.image_url)
+    return entry.image_url
+
+
+def invalidate_title_registry():
+    """Title の変更後に呼ぶ。このプロセスではすぐに、他のプロセスにはコミット後にもう一度無効化を伝える。"""
+    title_registry_cache.invalidate()
+    transaction.on_commit(title_registry_cache.invalidate)
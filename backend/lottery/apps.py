@@ -8,3 +8,6 @@ class LotteryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lottery'
 
+
+    def ready(self):
+        import lottery.signals  # noqa
@@ -4,7 +4,6 @@ Lottery services.
 import uuid
 from django.utils import timezone
 from django.db import models
-from datetime import datetime
 from submissions.models import Submission
 from users.models import UserMeta, User
 from gamification.services import grant_immediate_rewards
@@ -14,17 +13,10 @@ logger = logging.getLogger('toybox')
 
 
 def has_submitted_today(user: User) -> bool:
-    """Check if user has submitted today."""
-    today = timezone.now().date()
-    start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-    end = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-    
-    return Submission.objects.filter(
-        author=user,
-        created_at__gte=start,
-        created_at__lte=end,
-        deleted_at__isnull=True
-    ).exists()
+    """Check if user has submitted today (JST, from the daily activity row)."""
+    from users import daily_activity
+
+    return daily_activity.posts_today(user.pk) > 0
 
 
 def handle_submission_and_lottery(user: User, aim: str, steps: list, frame_type: str,
@@ -178,8 +170,12 @@ def handle_submission_and_lottery(user: User, aim: str, steps: list, frame_type:
     reward = grant_immediate_rewards(meta, boost_rarity=bool(game_url))
     
     # アチーブメント称号チェック（投稿後に新たな称号が解放されていないか確認）
+    from gamification.achievements import AchievementEvent
     from gamification.services import check_and_grant_achievement_titles
-    newly_granted_titles = check_and_grant_achievement_titles(user)
+    newly_granted_titles = check_and_grant_achievement_titles(user, [
+        AchievementEvent.posted('game' if game_url else 'video' if video_url else 'image'),
+        AchievementEvent.card_obtained(),
+    ])
     
     # 新たに取得した称号があればレスポンスに含める
     reward_title = newly_granted_titles[0] if newly_granted_titles else None
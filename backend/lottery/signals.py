@@ -0,0 +1,15 @@
+"""
+Lottery app signals: drop the cached active-rule snapshot when a
+LotteryRule changes.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from toybox.snapshots import invalidate_on_commit, lottery_rule_cache
+from .models import LotteryRule
+
+
+@receiver(post_save, sender=LotteryRule)
+@receiver(post_delete, sender=LotteryRule)
+def lottery_rule_changed(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_on_commit(lottery_rule_cache)
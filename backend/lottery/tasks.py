@@ -15,22 +15,17 @@ logger = logging.getLogger('toybox')
 def process_submission_notification(anon_id: str, submission_id: int, title: str = None, card_id: str = None):
     """Process submission notification."""
     try:
-        from users.models import User
+        from users.models import User, Notification
+        from users import notifications as user_notifications
         user = User.objects.get(display_id=anon_id)  # Adjust based on your user model
-        meta = UserMeta.objects.get(user=user)
-        notification = {
-            'type': 'submission',
-            'message': '提出ありがとうございます！',
-            'title': title,
-            'card_id': card_id,
-            'submission_id': submission_id,
-            'created_at': timezone.now().isoformat(),
-            'read': False,
-        }
-        notifications = meta.notifications or []
-        notifications.insert(0, notification)
-        meta.notifications = notifications
-        meta.save()
+        user_notifications.notify(
+            user,
+            Notification.Type.SUBMISSION,
+            '提出ありがとうございます！',
+            title=title,
+            card_id=card_id,
+            submission_id=submission_id,
+        )
         logger.info('notification.created', extra={'anon_id': anon_id})
     except Exception as e:
         logger.warning('notification.failed', extra={'anon_id': anon_id, 'error': str(e)})
@@ -92,32 +87,26 @@ def rotate_seasonal_titles():
 @shared_task
 def daily_submit_cap_enforcer():
     """Enforce daily submission cap."""
-    from submissions.models import Submission
-    from lottery.models import LotteryRule
+    from toybox.snapshots import active_lottery_rule
     
-    rule = LotteryRule.objects.filter(is_active=True).first()
+    rule = active_lottery_rule()
     if not rule:
         logger.warning('daily_cap.no_rule')
         return 0
     
-    from datetime import datetime
-    today = timezone.now().date()
-    start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-    end = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-    
-    # Count submissions per user today
-    from django.db.models import Count
-    user_counts = Submission.objects.filter(
-        created_at__gte=start,
-        created_at__lte=end,
-        deleted_at__isnull=True
-    ).values('author').annotate(count=Count('id')).filter(count__gt=rule.daily_cap)
+    # Users over the cap today (JST), straight from the daily activity rows
+    from users import daily_activity
+    from users.models import UserDailyActivity
+    user_counts = list(
+        UserDailyActivity.objects.filter(jst_date=daily_activity.jst_date(), posts__gt=rule.daily_cap)
+        .values('user_id', 'posts')
+    )
     
     # Log users exceeding cap
     for item in user_counts:
         logger.warning('daily_cap.exceeded', extra={
-            'user_id': item['author'],
-            'count': item['count'],
+            'user_id': item['user_id'],
+            'count': item['posts'],
             'cap': rule.daily_cap
         })
     
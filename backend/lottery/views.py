@@ -7,8 +7,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db.models import Q
-from .models import LotteryRule, JackpotWin
+from .models import JackpotWin
 from users.models import UserMeta
+from toybox.snapshots import active_lottery_rule
 
 
 class LotteryViewSet(viewsets.ViewSet):
@@ -20,32 +21,22 @@ class LotteryViewSet(viewsets.ViewSet):
         """Draw lottery (once per day)."""
         user = request.user
         
-        # Check if already drawn today
-        from datetime import datetime
-        today = timezone.now().date()
-        start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-        end = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-        
-        existing_win = JackpotWin.objects.filter(
-            user=user,
-            won_at__gte=start,
-            won_at__lte=end
-        ).first()
-        
-        if existing_win:
-            return Response(
-                {'error': 'Already drawn today'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         # Get active lottery rule
-        rule = LotteryRule.objects.filter(is_active=True).first()
+        rule = active_lottery_rule()
         if not rule:
             return Response(
                 {'error': 'No active lottery rule'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
+        # Once per day (JST): claim today's draw on the daily activity row
+        from users import daily_activity
+        if not daily_activity.claim_lottery_draw(user.pk):
+            return Response(
+                {'error': 'Already drawn today'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Calculate probability (simplified)
         user_meta, _ = UserMeta.objects.get_or_create(user=user)
         consecutive_loses = user_meta.lottery_bonus_count
@@ -8,3 +8,5 @@ class SubmissionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'submissions'
 
+    def ready(self):
+        import submissions.signals  # noqa
@@ -0,0 +1,144 @@
+"""フィードのキーセットカーソル（署名付き・不透明）。
+
+カーソルは並び順のキー（例: 投稿日時・ID、スコア・投稿日時・ID）の組を署名して文字列にしたもの。
+次ページは「最後の行のキーより後ろ」を WHERE で絞り込むので、OFFSET を使わず深いページでも
+先頭ページと同じコストで読め、ページ間に新しい投稿が入っても重複・欠落が起きない。
+各キーセットの並びは models のインデックス（submission_feed_idx 等）と一致させている。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+SALT = 'submissions.feed_cursor'
+
+
+class InvalidCursor(Exception):
+    """改ざん・別フィードのカーソル・形式不正。"""
+
+
+@dataclass(frozen=True)
+class KeyField:
+    lookup: str
+    get: Callable
+    is_datetime: bool = False
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """降順に並べるキーの組（最後のキーは一意な ID）。"""
+    name: str
+    fields: tuple
+
+    def order_by(self):
+        return [f'-{f.lookup}' for f in self.fields]
+
+    def values_of(self, obj):
+        return tuple(f.get(obj) for f in self.fields)
+
+    def after(self, values):
+        """values より後ろ（降順で次）の行を表す Q。(a < x) | (a = x & b < y) | ..."""
+        q = Q()
+        for i, field in enumerate(self.fields):
+            cond = Q(**{f'{field.lookup}__lt': values[i]})
+            for prev, value in zip(self.fields[:i], values[:i]):
+                cond &= Q(**{prev.lookup: value})
+            q |= cond
+        return q
+
+
+def encode(keyset, values):
+    payload = [keyset.name, [v.isoformat() if isinstance(v, datetime) else v for v in values]]
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def decode(keyset, token):
+    try:
+        name, raw = signing.loads(token, salt=SALT)
+    except (signing.BadSignature, ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if name != keyset.name or len(raw) != len(keyset.fields):
+        raise InvalidCursor('cursor does not belong to this feed')
+    values = []
+    for field, value in zip(keyset.fields, raw):
+        if field.is_datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError) as e:
+                raise InvalidCursor(str(e))
+        values.append(value)
+    return tuple(values)
+
+
+def resolve(keyset, token, legacy=None):
+    """カーソル文字列をキーの組にする（無ければ None）。legacy は paginate と同じ。"""
+    if not token:
+        return None
+    values = legacy(token) if legacy is not None else None
+    return values if values is not None else decode(keyset, token)
+
+
+def paginate(queryset, keyset, token=None, limit=24, legacy=None):
+    """キーセットで1ページ読み、(items, next_cursor) を返す。
+
+    legacy: 旧形式のカーソル（ID や ISO 日時）をキーの組に変換する関数。変換できなければ None を返す。
+    次ページの有無は limit + 1 件読んで判定する（最終ページで空のページを返さない）。
+    """
+    values = resolve(keyset, token, legacy)
+    if values is not None:
+        queryset = queryset.filter(keyset.after(values))
+    rows = list(queryset.order_by(*keyset.order_by())[:limit + 1])
+    items = rows[:limit]
+    next_cursor = encode(keyset, keyset.values_of(items[-1])) if len(rows) > limit else None
+    return items, next_cursor
+
+
+# ---------------------------------------------------------------------------
+# フィードごとのキーセット
+# ---------------------------------------------------------------------------
+
+# 新着順（フィード・フォロー中・タイムライン・ユーザー別）
+RECENT = Keyset('recent', (
+    KeyField('created_at', lambda s: s.created_at, is_datetime=True),
+    KeyField('id', lambda s: s.id),
+))
+
+# おすすめ・人気 sort=hot（時間減衰つきスコア順、submissions.hot_scores）
+HOT = Keyset('hot', (
+    KeyField('reaction_stats__hot_score', lambda s: s.reaction_stats.hot_score),
+    KeyField('reaction_stats__submission_created_at', lambda s: s.reaction_stats.submission_created_at, is_datetime=True),
+    KeyField('reaction_stats__submission_id', lambda s: s.id),
+))
+
+# 人気（獲得TP順）
+POPULAR = Keyset('popular', (
+    KeyField('reaction_stats__tp_score', lambda s: s.reaction_stats.tp_score),
+    KeyField('reaction_stats__submission_created_at', lambda s: s.reaction_stats.submission_created_at, is_datetime=True),
+    KeyField('reaction_stats__submission_id', lambda s: s.id),
+))
+
+# ブックマーク（ブックマークした日時順、SubmissionBookmark の行で並べる）
+BOOKMARKS = Keyset('bookmarks', (
+    KeyField('created_at', lambda b: b.created_at, is_datetime=True),
+    KeyField('id', lambda b: b.id),
+))
+
+
+def legacy_recent_cursor(token):
+    """旧カーソル（最後の投稿 ID、またはユーザー別一覧の ISO 日時）を RECENT のキーに変換する。"""
+    from .models import Submission
+
+    if token.isdigit():
+        created_at = Submission.objects.filter(id=int(token)).values_list('created_at', flat=True).first()
+        return (created_at, int(token)) if created_at else None
+    try:
+        dt = datetime.fromisoformat(token.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    # 「その日時より前」と同じ意味になるよう ID は下限にする
+    return (dt, 0)
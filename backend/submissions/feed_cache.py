@@ -0,0 +1,175 @@
+"""公開フィード（FeedView / HashtagsView / PopularFeedView / ランキング）のレスポンスキャッシュと条件付き GET。
+
+- 閲覧者に依存しない「骨格」（未ログインで見える JSON）を FEED_CACHE_TTL 秒キャッシュする。キーはビュー名・
+  クエリ（mode / cursor / hashtag / limit など）・ホスト（絶対URLを含むため）と、投稿の作成・ソフト削除／復元・
+  削除で差し替える全体の世代（feed_generation）。リアクション数などの変化は TTL の範囲で遅れて反映される。
+- ログイン中の閲覧者には骨格をコピーし、表示中の投稿に対する自分のリアクション・リポスト・ブックマークと
+  自分の投稿かどうかだけを3クエリで重ねる（フィード全体は作り直さない）。
+- レスポンス本文のハッシュを強い ETag として返し、If-None-Match が一致すれば 304 を返す。
+"""
+import copy
+import hashlib
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+_GENERATION_KEY = 'feed_generation'
+_ENTRY_KEY = 'feed_cache:{generation}:{view}:{digest}'
+
+# 骨格の各アイテムから外して保持する投稿者ID（isOwnPost の判定用。レスポンスには含めない）
+AUTHOR_KEY = '_authorId'
+
+
+def ttl():
+    return getattr(settings, 'FEED_CACHE_TTL', 15)
+
+
+# ---------------------------------------------------------------------------
+# 世代
+# ---------------------------------------------------------------------------
+
+def bump_generation():
+    try:
+        cache.set(_GENERATION_KEY, uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f'[FeedCache] generation bump failed: {e}')
+
+
+def bump_generation_on_commit():
+    """投稿の作成・ソフト削除／復元・削除のコミット後に、キャッシュ済みのフィードを無効にする。"""
+    transaction.on_commit(bump_generation)
+
+
+def _generation():
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        cache.add(_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(_GENERATION_KEY)
+    return generation
+
+
+# ---------------------------------------------------------------------------
+# ETag
+# ---------------------------------------------------------------------------
+
+def etag_for(data):
+    body = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return '"%s"' % hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+def _not_modified(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def conditional_response(request, data, private=False):
+    """ETag を付けた 200、または If-None-Match が一致すれば本文なしの 304 を返す。"""
+    etag = etag_for(data)
+    if _not_modified(request, etag):
+        response = Response(status=304)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    response['Vary'] = 'Authorization, Cookie'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# 骨格のキャッシュ
+# ---------------------------------------------------------------------------
+
+def _entry_key(request, view, params):
+    parts = [request.get_host()] + [f'{name}={request.query_params.get(name) or ""}' for name in params]
+    digest = hashlib.sha1('&'.join(parts).encode('utf-8')).hexdigest()
+    return _ENTRY_KEY.format(generation=_generation(), view=view, digest=digest)
+
+
+def get_skeleton(request, view, params, build):
+    """閲覧者に依存しない JSON をキャッシュから返す（無ければ build() で作成）。
+
+    build() は (data, status) を返す。200 以外（不正なカーソルなど）はキャッシュしない。
+    """
+    try:
+        key = _entry_key(request, view, params)
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f'[FeedCache] lookup failed for {view}: {e}')
+        key, data = None, None
+    if data is not None:
+        return data, 200
+
+    data, status = build()
+    if status == 200 and key is not None:
+        try:
+            cache.set(key, data, ttl())
+        except Exception as e:
+            logger.warning(f'[FeedCache] store failed for {view}: {e}')
+    return data, status
+
+
+def strip_private(data):
+    """骨格から投稿者ID（内部用）を外したコピー。"""
+    data = dict(data)
+    data['items'] = [{k: v for k, v in item.items() if k != AUTHOR_KEY} for item in data.get('items', [])]
+    return data
+
+
+def personalize(data, user):
+    """骨格に閲覧者のリアクション・リポスト・ブックマーク・自分の投稿フラグを重ねたコピーを返す。"""
+    from .models import Reaction, SubmissionBookmark, SubmissionRepost
+
+    data = copy.deepcopy(data)
+    items = data.get('items', [])
+    sub_ids = [int(item['id']) for item in items if item.get('id')]
+    if not sub_ids:
+        return strip_private(data)
+
+    reacted = set(
+        Reaction.objects.filter(user=user, submission_id__in=sub_ids).values_list('submission_id', 'type')
+    )
+    has_reposts = any('userReposted' in item for item in items)
+    has_bookmarks = any('userBookmarked' in item for item in items)
+    reposted = set(
+        SubmissionRepost.objects.filter(user=user, submission_id__in=sub_ids).values_list('submission_id', flat=True)
+    ) if has_reposts else set()
+    bookmarked = set(
+        SubmissionBookmark.objects.filter(user=user, submission_id__in=sub_ids).values_list('submission_id', flat=True)
+    ) if has_bookmarks else set()
+
+    medal = Reaction.Type.SUBMIT_MEDAL.value
+    for item in items:
+        sub_id = int(item['id'])
+        if 'liked' in item:
+            item['liked'] = (sub_id, medal) in reacted
+        for reaction in item.get('allReactions') or []:
+            reaction['user_reacted'] = (sub_id, reaction.get('type')) in reacted
+        if 'userReposted' in item:
+            item['userReposted'] = sub_id in reposted
+        if 'userBookmarked' in item:
+            item['userBookmarked'] = sub_id in bookmarked
+        if 'isOwnPost' in item:
+            item['isOwnPost'] = item.get(AUTHOR_KEY) == user.pk
+    return strip_private(data)
+
+
+def respond(request, view, params, build, personal=True):
+    """キャッシュ済みの骨格から（ログイン中なら閲覧者の状態を重ねて）条件付きレスポンスを返す。"""
+    data, status = get_skeleton(request, view, params, build)
+    if status != 200:
+        return Response(data, status=status)
+    user = getattr(request, 'user', None)
+    if personal and user is not None and user.is_authenticated:
+        return conditional_response(request, personalize(data, user), private=True)
+    return conditional_response(request, strip_private(data) if personal else data)
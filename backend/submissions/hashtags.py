@@ -0,0 +1,119 @@
+"""ハッシュタグ索引（SubmissionHashtag）とタグ集計（HashtagCount・1時間ごとの HashtagHourlyBucket）の同期・検索。
+
+Submission.hashtags（JSONField）が正本で、索引は投稿の保存時にシグナルから同期する。
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import trending
+from .models import HashtagCount, Submission, SubmissionHashtag
+
+MAX_TAG_LENGTH = 100
+
+
+def normalize_hashtags(raw):
+    """JSON のタグ配列を [(tag, tag_lower)] に正規化する（前後空白除去・小文字で重複排除・大文字小文字は保持）。"""
+    result = []
+    seen = set()
+    if not isinstance(raw, list):
+        return result
+    for tag in raw:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip()[:MAX_TAG_LENGTH]
+        lower = tag.lower()
+        if not tag or lower in seen:
+            continue
+        seen.add(lower)
+        result.append((tag, lower))
+    return result
+
+
+def _bump_count(tag, delta):
+    updated = HashtagCount.objects.filter(tag=tag).update(count=F('count') + delta)
+    if updated or delta < 0:
+        if delta < 0:
+            HashtagCount.objects.filter(tag=tag, count__lte=0).delete()
+        return
+    try:
+        with transaction.atomic():
+            HashtagCount.objects.create(tag=tag, tag_lower=tag.lower(), count=delta)
+    except IntegrityError:
+        HashtagCount.objects.filter(tag=tag).update(count=F('count') + delta)
+
+
+def sync_submission_hashtags(submission):
+    """投稿1件の索引行とタグ集計を Submission.hashtags / deleted_at に合わせる。"""
+    desired = {} if submission.deleted_at else {lower: tag for tag, lower in normalize_hashtags(submission.hashtags)}
+    existing = {row.tag_lower: row for row in SubmissionHashtag.objects.filter(submission_id=submission.pk)}
+
+    stale = [row for lower, row in existing.items() if desired.get(lower) != row.tag]
+    added = [(tag, lower) for lower, tag in desired.items() if lower not in existing or existing[lower].tag != tag]
+    if not stale and not added:
+        return
+
+    with transaction.atomic():
+        if stale:
+            SubmissionHashtag.objects.filter(id__in=[row.id for row in stale]).delete()
+            for row in stale:
+                _bump_count(row.tag, -1)
+                trending.record(row.tag, row.created_at, -1)
+        if added:
+            SubmissionHashtag.objects.bulk_create([
+                SubmissionHashtag(submission_id=submission.pk, tag=tag, tag_lower=lower, created_at=submission.created_at)
+                for tag, lower in added
+            ])
+            for tag, _ in added:
+                _bump_count(tag, 1)
+                trending.record(tag, submission.created_at, 1)
+
+
+def remove_submission_hashtags(submission):
+    """投稿の物理削除前に索引行とタグ集計を取り除く。"""
+    rows = list(SubmissionHashtag.objects.filter(submission_id=submission.pk))
+    if not rows:
+        return
+    SubmissionHashtag.objects.filter(submission_id=submission.pk).delete()
+    for row in rows:
+        _bump_count(row.tag, -1)
+        trending.record(row.tag, row.created_at, -1)
+
+
+def rebuild_hashtag_index(batch_size=1000):
+    """全公開投稿から索引とタグ集計を作り直す。索引行数を返す。"""
+    counts = {}
+    rows = []
+    live = Submission.objects.filter(deleted_at__isnull=True).order_by('id').values_list('id', 'hashtags', 'created_at')
+    for sid, raw, created_at in live.iterator(chunk_size=batch_size):
+        for tag, lower in normalize_hashtags(raw):
+            rows.append(SubmissionHashtag(submission_id=sid, tag=tag, tag_lower=lower, created_at=created_at))
+            counts[tag] = counts.get(tag, 0) + 1
+
+    with transaction.atomic():
+        SubmissionHashtag.objects.all().delete()
+        HashtagCount.objects.all().delete()
+        SubmissionHashtag.objects.bulk_create(rows, batch_size=batch_size)
+        HashtagCount.objects.bulk_create(
+            [HashtagCount(tag=tag, tag_lower=tag.lower(), count=cnt) for tag, cnt in counts.items()],
+            batch_size=batch_size,
+        )
+    trending.rebuild_buckets(batch_size=batch_size)
+    return len(rows)
+
+
+def submission_ids_with_tag(tag):
+    """完全一致（大文字小文字を区別しない）のサブクエリ用 values('submission_id')。"""
+    return SubmissionHashtag.objects.filter(tag_lower=tag.strip().lower()).values('submission_id')
+
+
+def submission_ids_with_tag_containing(query):
+    """部分一致: タグ集計（種類数分の行）で一致タグを引き、索引から投稿IDを返すサブクエリ。"""
+    matched = HashtagCount.objects.filter(tag_lower__contains=query.strip().lower()).values('tag_lower')
+    return SubmissionHashtag.objects.filter(tag_lower__in=matched).values('submission_id')
+
+
+def popular_hashtags(limit=20):
+    """公開投稿数の多いタグ [(tag, count)]。"""
+    return list(
+        HashtagCount.objects.filter(count__gt=0).order_by('-count', 'tag').values_list('tag', 'count')[:limit]
+    )
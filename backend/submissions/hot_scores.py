@@ -0,0 +1,107 @@
+"""おすすめ・人気（sort=hot）フィード用の時間減衰スコア（SubmissionReactionStats.hot_score）。
+
+- ポイントは種別ごとの重み付きリアクション数 + 旧いいね×FEED_HOT_LEGACY_LIKE_WEIGHT。
+  重みは FEED_HOT_REACTION_WEIGHTS（未設定なら獲得TPと同じ REACTION_POINTS）。
+- 「(1 + ポイント) × 0.5^(経過時間 / 半減期)」の順位は、どの時点で比べても
+  log2(1 + ポイント) + 投稿時刻 / 半減期 の順位と一致する（Reddit の hot と同じ形）。
+  列には後者を保存するので、時間が経っても値を書き換えずに減衰した順で並び、
+  インデックスの先頭を読むだけで済む。キーセットカーソルもページ間でずれない。
+- リアクション・旧いいねの変更時に集計行から計算し直す（submissions.reaction_stats から呼ばれる）。
+  Celery Beat（refresh_hot_scores）が直近の投稿を定期的に再計算し、重み・半減期の設定変更や
+  ズレを反映する。全件は `manage.py rebuild_reaction_stats` で作り直せる。
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Reaction, SubmissionReactionStats
+
+# 保存値を小さく保つための基準時刻（これより前の投稿は負のスコアになるだけで順位は変わらない）
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+COUNT_FIELDS = {rtype.value: f'{rtype.value}_count' for rtype in Reaction.Type}
+
+
+def half_life_hours():
+    return getattr(settings, 'FEED_HOT_HALF_LIFE_HOURS', 12)
+
+
+def reaction_weights():
+    weights = getattr(settings, 'FEED_HOT_REACTION_WEIGHTS', None)
+    if weights is None:
+        from gamification.services import REACTION_POINTS
+
+        weights = REACTION_POINTS
+    return weights
+
+
+def legacy_like_weight():
+    return getattr(settings, 'FEED_HOT_LEGACY_LIKE_WEIGHT', 2)
+
+
+def refresh_hours():
+    return getattr(settings, 'FEED_HOT_REFRESH_HOURS', 72)
+
+
+def points(counts, likes_count=0):
+    """{'<type>_count': 件数} と旧いいね数から重み付きポイントを返す。"""
+    weights = reaction_weights()
+    total = sum(counts.get(field, 0) * weights.get(rtype, 0) for rtype, field in COUNT_FIELDS.items())
+    return total + (likes_count or 0) * legacy_like_weight()
+
+
+def score(points, created_at):
+    """ポイントと投稿日時から hot_score を返す（投稿日時が無ければ減衰なし）。"""
+    value = math.log2(1 + max(points, 0))
+    if created_at is not None:
+        value += (created_at - EPOCH).total_seconds() / (half_life_hours() * 3600.0)
+    return round(value, 9)
+
+
+def _rows(queryset):
+    return queryset.values(
+        'submission_id', 'submission_created_at', 'submission__likes_count', 'hot_score', *COUNT_FIELDS.values(),
+    )
+
+
+def _score_of(row):
+    return score(points(row, row['submission__likes_count']), row['submission_created_at'])
+
+
+def update(submission_id):
+    """集計行のカウンタから hot_score を計算し直す（リアクション・旧いいねの変更時）。"""
+    row = _rows(SubmissionReactionStats.objects.filter(submission_id=submission_id)).first()
+    if row is None:
+        return
+    SubmissionReactionStats.objects.filter(submission_id=submission_id).update(hot_score=_score_of(row))
+
+
+def recompute(queryset=None, batch_size=1000):
+    """集計行の hot_score を作り直す（既定は全件）。値が変わった行数を返す。"""
+    if queryset is None:
+        queryset = SubmissionReactionStats.objects.all()
+    rows = _rows(queryset.order_by())
+    changed = []
+    updated = 0
+    for row in rows.iterator(chunk_size=batch_size):
+        value = _score_of(row)
+        if value != row['hot_score']:
+            changed.append(SubmissionReactionStats(submission_id=row['submission_id'], hot_score=value))
+        if len(changed) >= batch_size:
+            SubmissionReactionStats.objects.bulk_update(changed, ['hot_score'])
+            updated += len(changed)
+            changed = []
+    if changed:
+        SubmissionReactionStats.objects.bulk_update(changed, ['hot_score'])
+        updated += len(changed)
+    return updated
+
+
+def refresh(now=None, batch_size=1000):
+    """直近 FEED_HOT_REFRESH_HOURS 時間の投稿の hot_score を再計算する（Celery Beat から）。"""
+    now = now or timezone.now()
+    since = now - timedelta(hours=refresh_hours())
+    queryset = SubmissionReactionStats.objects.filter(submission_created_at__gte=since)
+    return {'updated': recompute(queryset, batch_size=batch_size)}
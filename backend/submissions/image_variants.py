@@ -0,0 +1,151 @@
+"""レスポンシブ画像バリアント（幅ラダー × WebP/AVIF/JPEG）の生成とマニフェスト。
+
+投稿画像ごとに IMAGE_VARIANT_WIDTHS の幅で縮小版を作り、ImageVariantManifest に一覧を記録する。
+フィードはページ単位でマニフェストを一括取得し（build_feed_context）、srcset 形式のリストを返す。
+生成はメディア加工ジョブ（アップロード時）と generate_thumbnails --variants（既存画像の補完）で行う。
+"""
+import logging
+import os
+import re
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from toybox.image_optimizer import VARIANT_FORMATS, render_variants, supported_variant_formats
+
+from . import media_catalog
+from .media_jobs import SUBMISSIONS_URL_BASE
+from .models import ImageVariantManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (160, 320, 640, 1280)
+DEFAULT_FORMATS = ('avif', 'webp', 'jpeg')
+
+# バリアント自身（{stem}_w320.webp など）は補完対象から外す
+VARIANT_NAME_RE = re.compile(r'_w\d+\.(?:avif|webp|jpg)$')
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS))
+
+
+def variant_formats():
+    return supported_variant_formats(getattr(settings, 'IMAGE_VARIANT_FORMATS', DEFAULT_FORMATS))
+
+
+def variant_path(source_path, width, fmt):
+    stem, _ = os.path.splitext(source_path)
+    return f'{stem}_w{width}.{VARIANT_FORMATS[fmt][1]}'
+
+
+def is_variant_file(name):
+    return bool(VARIANT_NAME_RE.search(name))
+
+
+def build_variants(source_path):
+    """バリアントを生成してストレージに保存し、マニフェスト用の dict を返す（DB には書かない）。
+
+    並列実行（generate_thumbnails --variants）のワーカースレッドから呼ぶため DB アクセスをしない。
+    """
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    with default_storage.open(source_path, 'rb') as f:
+        rendered = render_variants(f, variant_widths(), variant_formats(), quality=quality)
+    if rendered is None:
+        return None
+    (width, height), outputs = rendered
+    variants = []
+    for fmt, w, h, data in outputs:
+        path = variant_path(source_path, w, fmt)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        saved = default_storage.save(path, ContentFile(data.getvalue()))
+        variants.append({'format': fmt, 'width': w, 'height': h, 'path': saved, 'bytes': data.getbuffer().nbytes})
+    return {'source_path': source_path, 'width': width, 'height': height, 'variants': variants}
+
+
+def save_manifests(rows):
+    """build_variants の結果をまとめて upsert する。"""
+    rows = [row for row in rows if row]
+    if not rows:
+        return 0
+    ImageVariantManifest.objects.bulk_create(
+        [ImageVariantManifest(**row) for row in rows],
+        update_conflicts=True,
+        unique_fields=['source_path'],
+        update_fields=['width', 'height', 'variants', 'updated_at'],
+    )
+    media_catalog.register(*(v['path'] for row in rows for v in row['variants']))
+    return len(rows)
+
+
+def generate_variants(source_path):
+    """1枚分のバリアントを生成してマニフェストを保存する。失敗時は None。"""
+    row = build_variants(source_path)
+    if row is None:
+        return None
+    save_manifests([row])
+    return row
+
+
+def submission_image_path(submission):
+    """投稿画像の MEDIA_ROOT 相対パス（ゲーム・動画や外部 URL は None）。"""
+    if submission.game_url or submission.video_url:
+        return None
+    if submission.image:
+        return submission.image.name
+    path = urlparse(submission.image_url or '').path
+    if path.startswith(SUBMISSIONS_URL_BASE):
+        return path[len(SUBMISSIONS_URL_BASE):]
+    return None
+
+
+def manifests_for(submissions):
+    """{submission_id: ImageVariantManifest} を1クエリで返す（マニフェストの無い投稿は含まない）。"""
+    paths = {}
+    for sub in submissions:
+        if getattr(sub, 'media_pending', False):
+            continue
+        path = submission_image_path(sub)
+        if path:
+            paths.setdefault(path, []).append(sub.id)
+    if not paths:
+        return {}
+    result = {}
+    for manifest in ImageVariantManifest.objects.filter(source_path__in=list(paths)):
+        for sub_id in paths[manifest.source_path]:
+            result[sub_id] = manifest
+    return result
+
+
+def variant_payload(manifest, request=None):
+    """フィード用の表現。srcset は形式ごとの `URL 幅w, ...`、variants は幅の昇順。"""
+    if manifest is None or not manifest.variants:
+        return None
+    from .utils import build_file_url
+
+    def url(path):
+        return build_file_url(request, path) if request is not None else settings.MEDIA_URL.rstrip('/') + '/' + path
+
+    variants = sorted(manifest.variants, key=lambda v: (v['width'], v['format']))
+    srcset = {}
+    items = []
+    for v in variants:
+        u = url(v['path'])
+        srcset.setdefault(v['format'], []).append(f'{u} {v["width"]}w')
+        items.append({
+            'format': v['format'],
+            'type': VARIANT_FORMATS.get(v['format'], (None, None, None))[2],
+            'width': v['width'],
+            'height': v['height'],
+            'url': u,
+        })
+    return {
+        'width': manifest.width,
+        'height': manifest.height,
+        # <picture> で優先する順（AVIF → WebP → JPEG）
+        'srcset': {fmt: ', '.join(srcset[fmt]) for fmt in VARIANT_FORMATS if fmt in srcset},
+        'variants': items,
+    }
@@ -0,0 +1,152 @@
+"""
+ランキング集計エンジンのベンチマーク（旧: 期間ごとの reactions 走査 / 新: スコアバケット合算）
+合成データを1トランザクション内で投入し、計測後にロールバックします（本番DBでは実行しないこと）
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from submissions import ranking_service
+from submissions.models import Reaction, Submission
+from submissions.reaction_stats import rebuild_reaction_stats
+from users.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def _manual_timestamps(*models):
+    """bulk_create で created_at を指定できるよう auto_now_add を一時的に外す。"""
+    fields = [m._meta.get_field('created_at') for m in models]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f in fields:
+            f.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the legacy scan ranking engine against the bucket engine on synthetic data (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reactions', type=int, default=1_000_000, help='Number of synthetic reactions (default: 1,000,000)')
+        parser.add_argument('--users', type=int, default=5_000, help='Number of synthetic users (default: 5,000)')
+        parser.add_argument('--submissions', type=int, default=50_000, help='Number of synthetic submissions (default: 50,000)')
+        parser.add_argument('--days', type=int, default=120, help='Spread submissions over the last N days (default: 120)')
+        parser.add_argument('--quiet-days', type=int, default=3, help='Leave the most recent N days without posts so the fallback path is exercised (default: 3)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions per engine (default: 3)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--yes', action='store_true', help='Confirm that synthetic rows may be written (they are rolled back)')
+
+    def handle(self, *args, **options):
+        if not options['yes']:
+            raise CommandError('This benchmark writes synthetic rows inside a transaction that is rolled back. Re-run with --yes.')
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('Synthetic data rolled back.')
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        span = timedelta(days=options['days'])
+        quiet = timedelta(days=options['quiet_days'])
+        types = [t.value for t in Reaction.Type]
+
+        started = time.perf_counter()
+        users = User.objects.bulk_create([
+            User(display_id=f'bench_rank_{i}', email=f'bench_rank_{i}@toybox.local', password='!')
+            for i in range(options['users'])
+        ], batch_size=5000)
+        user_ids = [u.pk for u in users]
+
+        with _manual_timestamps(Submission, Reaction):
+            subs = Submission.objects.bulk_create([
+                Submission(
+                    author_id=rng.choice(user_ids),
+                    title=f'bench {i}',
+                    created_at=now - quiet - span * rng.random(),
+                )
+                for i in range(options['submissions'])
+            ], batch_size=5000)
+            sub_meta = [(s.pk, s.created_at) for s in subs]
+
+            seen = set()
+            batch = []
+            total = 0
+            target = options['reactions']
+            max_unique = len(user_ids) * len(sub_meta) * len(types)
+            if target > max_unique:
+                raise CommandError(f'--reactions exceeds the number of unique (user, submission, type) triples ({max_unique})')
+            while total < target:
+                sub_id, sub_created = rng.choice(sub_meta)
+                key = (rng.choice(user_ids), sub_id, rng.choice(types))
+                if key in seen:
+                    continue
+                seen.add(key)
+                # 多くは投稿直後、一部は数日後に付く
+                delay = timedelta(hours=rng.expovariate(1 / 30))
+                batch.append(Reaction(
+                    user_id=key[0], submission_id=sub_id, type=key[2],
+                    created_at=min(now, sub_created + delay),
+                ))
+                total += 1
+                if len(batch) >= 20000:
+                    Reaction.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Reaction.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {len(user_ids)} users / {len(sub_meta)} submissions / {total} reactions '
+                          f'in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        ids = [sid for sid, _ in sub_meta]
+        for offset in range(0, len(ids), 5000):
+            rebuild_reaction_stats(ids[offset:offset + 5000])
+        self.stdout.write(f'Built SubmissionReactionStats in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        buckets = ranking_service.rebuild_ranking_buckets()
+        self.stdout.write(f'Built {buckets} ranking buckets in {time.perf_counter() - started:.1f}s '
+                          f'(one-off; afterwards updated per reaction)')
+
+        engines = (
+            ('scan (old)', ranking_service.compute_daily_ranking_payload_scan, ranking_service.compute_weekly_ranking_payload_scan),
+            ('buckets (new)', ranking_service.compute_daily_ranking_payload, ranking_service.compute_weekly_ranking_payload),
+        )
+        results = {}
+        for name, daily_fn, weekly_fn in engines:
+            timings = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = time.perf_counter()
+                    daily = daily_fn()
+                    weekly = weekly_fn()
+                    timings.append(time.perf_counter() - t0)
+            results[name] = (daily, weekly)
+            self.stdout.write(
+                f'{name:14s} best {min(timings) * 1000:8.1f} ms  median {sorted(timings)[len(timings) // 2] * 1000:8.1f} ms  '
+                f'queries {len(ctx.captured_queries):4d}  daily={daily["periodLabel"]} weekly={weekly["periodLabel"]}'
+            )
+
+        old_daily, old_weekly = results['scan (old)']
+        new_daily, new_weekly = results['buckets (new)']
+        # 旧エンジンは同点の並び（とTop-N境界の同点者）が不定なので、スコア列と期間で比較する
+        same = all(
+            (a['periodLabel'], [r['score'] for r in a['ranking']]) == (b['periodLabel'], [r['score'] for r in b['ranking']])
+            for a, b in ((old_daily, new_daily), (old_weekly, new_weekly))
+        )
+        style = self.style.SUCCESS if same else self.style.ERROR
+        self.stdout.write(style(f'Rankings identical: {same}'))
@@ -0,0 +1,133 @@
+"""
+人気／急上昇ハッシュタグのベンチマーク（旧: 公開投稿を Python で全件走査 / 新: タグ集計・時間別バケット）
+合成データを1トランザクション内で投入し、計測後にロールバックします（本番DBでは実行しないこと）
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from submissions import hashtags, trending
+from submissions.models import Submission
+from users.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def _manual_timestamps(*models):
+    """bulk_create で created_at を指定できるよう auto_now_add を一時的に外す。"""
+    fields = [m._meta.get_field('created_at') for m in models]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f in fields:
+            f.auto_now_add = True
+
+
+def _legacy_popular(limit=20):
+    """旧実装: 公開投稿の hashtags を毎回すべて読み込んで数える。"""
+    counts = {}
+    for raw in Submission.objects.filter(deleted_at__isnull=True).values_list('hashtags', flat=True).iterator(chunk_size=5000):
+        for tag, _ in hashtags.normalize_hashtags(raw):
+            counts[tag] = counts.get(tag, 0) + 1
+    return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark popular/trending hashtags (legacy scan vs HashtagCount and hourly buckets) on synthetic data (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=1_000_000, help='Number of synthetic tagged submissions (default: 1,000,000)')
+        parser.add_argument('--tags', type=int, default=20_000, help='Size of the tag vocabulary (default: 20,000)')
+        parser.add_argument('--users', type=int, default=5_000, help='Number of synthetic users (default: 5,000)')
+        parser.add_argument('--days', type=int, default=60, help='Spread submissions over the last N days (default: 60)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions per query (default: 3)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--yes', action='store_true', help='Confirm that synthetic rows may be written (they are rolled back)')
+
+    def handle(self, *args, **options):
+        if not options['yes']:
+            raise CommandError('This benchmark writes synthetic rows inside a transaction that is rolled back. Re-run with --yes.')
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('Synthetic data rolled back.')
+
+    def _time(self, label, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                result = fn()
+                timings.append(time.perf_counter() - t0)
+        self.stdout.write(
+            f'{label:22s} best {min(timings) * 1000:9.1f} ms  median {sorted(timings)[len(timings) // 2] * 1000:9.1f} ms  '
+            f'queries {len(ctx.captured_queries):3d}'
+        )
+        return result
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        span = timedelta(days=options['days'])
+        vocabulary = [f'tag{i}' for i in range(options['tags'])]
+
+        started = time.perf_counter()
+        users = User.objects.bulk_create([
+            User(display_id=f'bench_tag_{i}', email=f'bench_tag_{i}@toybox.local', password='!')
+            for i in range(options['users'])
+        ], batch_size=5000)
+        user_ids = [u.pk for u in users]
+
+        def pick_tag():
+            # 少数のタグに投稿が集中する（パレート分布）
+            return vocabulary[min(len(vocabulary) - 1, int(rng.paretovariate(1.2)) - 1)] if rng.random() < 0.7 else rng.choice(vocabulary)
+
+        with _manual_timestamps(Submission):
+            batch = []
+            for i in range(options['submissions']):
+                batch.append(Submission(
+                    author_id=rng.choice(user_ids),
+                    title=f'bench {i}',
+                    hashtags=list({pick_tag() for _ in range(rng.randint(1, 3))}),
+                    created_at=now - span * rng.random(),
+                ))
+                if len(batch) >= 20000:
+                    Submission.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Submission.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {len(user_ids)} users / {options["submissions"]} tagged submissions '
+                          f'in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        rows = hashtags.rebuild_hashtag_index()
+        self.stdout.write(f'Built {rows} index rows, tag counts and hourly buckets in {time.perf_counter() - started:.1f}s '
+                          f'(one-off; afterwards updated per submission)')
+
+        repeat = options['repeat']
+        legacy = self._time('all: scan (old)', _legacy_popular, repeat)
+        current = self._time('all: HashtagCount', lambda: hashtags.popular_hashtags(limit=20), repeat)
+        for window in trending.WINDOWS:
+            self._time(f'{window}: compute', lambda: trending.compute(window, now=now, limit=trending.top_size()), repeat)
+        self._time('rotate (beat)', lambda: trending.rotate(now=now), 1)
+        self.stdout.write(f'cache backend: {type(caches["default"]).__name__}')
+        for window in trending.WINDOWS:
+            self._time(f'{window}: served', lambda: trending.trending_hashtags(window, limit=20), repeat)
+
+        same = [tuple(r) for r in legacy] == [tuple(r) for r in current]
+        style = self.style.SUCCESS if same else self.style.ERROR
+        self.stdout.write(style(f'All-time top 20 identical: {same}'))
@@ -1,10 +1,13 @@
 """
 既存画像のサムネイルを生成する管理コマンド
+--variants を付けると投稿画像のレスポンシブ用バリアント（WebP/AVIF/JPEG × 幅ラダー）を並列に補完します
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.core.management.base import BaseCommand
 from pathlib import Path
 from django.conf import settings
 from toybox.image_optimizer import create_thumbnail_from_path
+from submissions.image_variants import build_variants, is_variant_file, save_manifests
 import os
 
 
@@ -24,6 +27,17 @@ class Command(BaseCommand):
             action='store_true',
             help='Force regeneration of existing thumbnails'
         )
+        parser.add_argument(
+            '--variants',
+            action='store_true',
+            help='Also backfill responsive image variants for submission images'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of parallel workers for variant generation (default: 4)'
+        )
 
     def handle(self, *args, **options):
         image_type = options['type']
@@ -39,6 +53,10 @@ class Command(BaseCommand):
             self.stdout.write('Processing submission images...')
             self.process_directory(media_root / 'submissions', force)
         
+        if options['variants']:
+            self.stdout.write('Generating responsive image variants...')
+            self.process_variants(media_root / 'submissions', force, max(1, options['workers']))
+        
         self.stdout.write(self.style.SUCCESS('Thumbnail generation completed!'))
 
     def process_directory(self, directory: Path, force: bool = False):
@@ -53,6 +71,7 @@ class Command(BaseCommand):
             f for f in directory.iterdir()
             if f.is_file() and f.suffix.lower() in image_extensions
             and not f.name.endswith('_thumb.jpg')
+            and not is_variant_file(f.name)
         ]
         
         self.stdout.write(f'Found {len(image_files)} image files in {directory}')
@@ -94,3 +113,51 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR(f'  ✗ Error processing {image_file.name}: {e}'))
         
         self.stdout.write(f'Processed: {processed}, Skipped: {skipped}, Errors: {errors}')
+
+    def process_variants(self, directory: Path, force: bool = False, workers: int = 4):
+        """投稿画像のバリアントを並列に生成し、マニフェストをまとめて保存する"""
+        from submissions.models import ImageVariantManifest
+
+        if not directory.exists():
+            self.stdout.write(self.style.WARNING(f'Directory not found: {directory}'))
+            return
+
+        media_root = Path(settings.MEDIA_ROOT)
+        image_extensions = ('.jpg', '.jpeg', '.png', '.webp')
+        sources = [
+            str(f.relative_to(media_root)).replace(os.sep, '/')
+            for f in directory.iterdir()
+            if f.is_file() and f.suffix.lower() in image_extensions
+            and not f.name.endswith('_thumb.jpg')
+            and not is_variant_file(f.name)
+        ]
+        skipped = 0
+        if not force:
+            done = set(ImageVariantManifest.objects.filter(source_path__in=sources).values_list('source_path', flat=True))
+            skipped = len(done)
+            sources = [s for s in sources if s not in done]
+
+        self.stdout.write(f'Generating variants for {len(sources)} images with {workers} workers')
+
+        # 画像処理はワーカースレッド（Pillow のエンコードは GIL を解放する）、DB 書き込みはこのスレッドでまとめて行う
+        rows = []
+        errors = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(build_variants, source): source for source in sources}
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    row = None
+                    self.stdout.write(self.style.ERROR(f'  ✗ Error processing {source}: {e}'))
+                if row is None:
+                    errors += 1
+                    continue
+                rows.append(row)
+                if len(rows) >= 100:
+                    save_manifests(rows)
+                    rows = []
+        save_manifests(rows)
+
+        self.stdout.write(f'Variants: {len(sources) - errors}, Skipped: {skipped}, Errors: {errors}')
@@ -0,0 +1,70 @@
+"""
+メディア加工ジョブ（MediaJob）の段階別所要時間を集計するコマンド
+種別 × 段階（store / audit / queue / optimize / thumbnail / variants / poster / extract / total）ごとに
+件数・p50・p95 と所要時間の分布を表示します
+"""
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from submissions.models import MediaJob
+
+# 分布のバケット上限（ミリ秒）。最後のバケットはそれ以上
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+STAGES = ('store', 'audit', 'queue', 'optimize', 'thumbnail', 'variants', 'poster', 'extract', 'total')
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _histogram(values):
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for value in values:
+        counts[bisect_left(BUCKETS_MS, value)] += 1
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Show per-stage timing percentiles and histograms for media processing jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Only include jobs created in the last N days (default: 7)')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        jobs = MediaJob.objects.filter(created_at__gte=since).values_list('kind', 'status', 'timings')
+
+        samples = {}
+        statuses = {}
+        for kind, job_status, timings in jobs.iterator():
+            statuses.setdefault(kind, {}).setdefault(job_status, 0)
+            statuses[kind][job_status] += 1
+            for stage, ms in (timings or {}).items():
+                samples.setdefault((kind, stage), []).append(float(ms))
+
+        if not statuses:
+            self.stdout.write(f'No media jobs in the last {options["days"]} days')
+            return
+
+        labels = [f'<{b}' for b in BUCKETS_MS] + [f'>={BUCKETS_MS[-1]}']
+        for kind in sorted(statuses):
+            summary = ', '.join(f'{s}={n}' for s, n in sorted(statuses[kind].items()))
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{kind} ({summary})'))
+            self.stdout.write(f'  {"stage":<10} {"n":>6} {"p50ms":>9} {"p95ms":>9}  ' + ' '.join(f'{label:>7}' for label in labels))
+            for stage in STAGES:
+                values = sorted(samples.get((kind, stage), ()))
+                if not values:
+                    continue
+                hist = _histogram(values)
+                self.stdout.write(
+                    f'  {stage:<10} {len(values):>6} {_percentile(values, 0.5):>9.1f} {_percentile(values, 0.95):>9.1f}  '
+                    + ' '.join(f'{c:>7}' for c in hist)
+                )
+        self.stdout.write(self.style.SUCCESS('Done'))
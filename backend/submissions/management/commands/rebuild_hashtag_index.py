@@ -0,0 +1,21 @@
+"""
+ハッシュタグ索引（SubmissionHashtag）とタグ集計（HashtagCount）を Submission.hashtags から再構築するコマンド
+"""
+from django.core.management.base import BaseCommand
+from submissions.hashtags import rebuild_hashtag_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild SubmissionHashtag / HashtagCount from Submission.hashtags'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_hashtag_index(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt hashtag index ({rows} rows)'))
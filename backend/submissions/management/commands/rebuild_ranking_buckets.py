@@ -0,0 +1,64 @@
+"""
+ランキング用スコアバケット（RankingScoreBucket）を reactions から再構築するコマンド
+--verify を付けると、バケット集計と旧エンジン（期間ごとの reactions 走査）の結果を比較します
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from submissions import ranking_service
+
+
+class Command(BaseCommand):
+    help = 'Rebuild RankingScoreBucket rows from reactions (or compare engines with --verify)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Only rebuild buckets for reactions in the last N days (default: all)',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Compare bucket-based rankings with the legacy scan (no database updates)',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self._verify()
+            return
+
+        since = None
+        if options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+        created = ranking_service.rebuild_ranking_buckets(since=since)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {created} ranking buckets' + (f' since {since.isoformat()}' if since else '')
+        ))
+
+    def _verify(self):
+        ok = True
+        pairs = (
+            ('daily', ranking_service.compute_daily_ranking_payload, ranking_service.compute_daily_ranking_payload_scan),
+            ('weekly', ranking_service.compute_weekly_ranking_payload, ranking_service.compute_weekly_ranking_payload_scan),
+        )
+        for name, bucket_fn, scan_fn in pairs:
+            bucket = bucket_fn()
+            scan = scan_fn()
+            bucket_rows = [(r['userId'], r['score']) for r in bucket['ranking']]
+            scan_rows = [(r['userId'], r['score']) for r in scan['ranking']]
+            same_period = (bucket['periodStart'], bucket['periodLabel']) == (scan['periodStart'], scan['periodLabel'])
+            # 旧エンジンは同点の並び（とTop-N境界の同点者）が不定なので、スコア列で比較する
+            if same_period and [r[1] for r in bucket_rows] == [r[1] for r in scan_rows]:
+                self.stdout.write(f'{name}: OK ({bucket["periodLabel"]}, {len(bucket_rows)} users)')
+            else:
+                ok = False
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: MISMATCH buckets={bucket["periodLabel"]} {bucket_rows} '
+                    f'scan={scan["periodLabel"]} {scan_rows}'
+                ))
+        if ok:
+            self.stdout.write(self.style.SUCCESS('Ranking buckets are consistent with the raw reactions'))
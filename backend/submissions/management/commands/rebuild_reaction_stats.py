@@ -0,0 +1,61 @@
+"""
+投稿ごとのリアクション集計（SubmissionReactionStats）を生テーブルから再構築・検証するコマンド
+reactions / submission_reposts / submission_bookmarks を投稿単位で再集計します
+"""
+from django.core.management.base import BaseCommand
+from submissions.models import Submission
+from submissions.reaction_stats import rebuild_reaction_stats, verify_reaction_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --verify) SubmissionReactionStats from the raw reaction tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report mismatches between stored counters and the raw tables (no database updates)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of submissions per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--submission',
+            type=int,
+            action='append',
+            dest='submission_ids',
+            help='Limit to the given submission id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        batch_size = max(1, options['batch_size'])
+
+        ids_qs = Submission.objects.order_by('id').values_list('id', flat=True)
+        if options['submission_ids']:
+            ids_qs = ids_qs.filter(id__in=options['submission_ids'])
+        ids = list(ids_qs)
+        self.stdout.write(f'{"Verifying" if verify else "Rebuilding"} reaction stats for {len(ids)} submissions')
+
+        processed = 0
+        mismatch_count = 0
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            if verify:
+                for sid, field, stored, expected in verify_reaction_stats(batch):
+                    mismatch_count += 1
+                    self.stdout.write(f'  submission {sid}: {field} stored={stored} expected={expected}')
+            else:
+                rebuild_reaction_stats(batch)
+            processed += len(batch)
+
+        if verify:
+            if mismatch_count:
+                self.stdout.write(self.style.ERROR(f'{mismatch_count} mismatches found in {processed} submissions'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'All {processed} submissions are consistent'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt reaction stats for {processed} submissions'))
@@ -0,0 +1,30 @@
+"""
+メディアカタログ（StoredMediaFile）を MEDIA_ROOT の実ファイルと突き合わせるコマンド
+未登録の実ファイルを登録し、--prune を付けると実ファイルの無い行を削除します
+"""
+from django.core.management.base import BaseCommand
+
+from submissions import media_catalog
+
+
+class Command(BaseCommand):
+    help = 'Register files under MEDIA_ROOT in the media catalog (and prune missing ones with --prune)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directories',
+            nargs='*',
+            help='Subdirectories of MEDIA_ROOT to scan (default: all)',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete catalog rows whose files no longer exist',
+        )
+
+    def handle(self, *args, **options):
+        scanned, removed = media_catalog.reconcile(options['directories'] or None, prune=options['prune'])
+        message = f'Scanned {scanned} files'
+        if options['prune']:
+            message += f', pruned {removed} missing entries'
+        self.stdout.write(self.style.SUCCESS(message))
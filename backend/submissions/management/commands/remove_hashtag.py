@@ -3,6 +3,7 @@ Django management command to remove a specific hashtag from all submissions.
 """
 from django.core.management.base import BaseCommand
 from submissions.models import Submission
+from submissions.hashtags import submission_ids_with_tag
 
 
 class Command(BaseCommand):
@@ -27,10 +28,11 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
 
-        # Get all submissions with hashtags
+        # ハッシュタグ索引から対象の投稿だけを取得（save() のシグナルで索引・タグ集計も更新される）
         submissions = Submission.objects.filter(
-            deleted_at__isnull=True
-        ).exclude(hashtags__isnull=True).exclude(hashtags=[])
+            deleted_at__isnull=True,
+            id__in=submission_ids_with_tag(hashtag_to_remove),
+        ).select_related('author')
 
         updated_count = 0
         total_removed = 0
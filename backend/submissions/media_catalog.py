@@ -0,0 +1,248 @@
+"""保存済みメディアのカタログ（StoredMediaFile）による存在確認と派生ファイルの非同期生成。
+
+URL 生成のたびに os.path.exists を呼ぶと、ネットワークマウントの MEDIA_ROOT ではフィードの
+応答時間の大半をファイルシステムの stat が占める。ここでは保存時に登録したパスの表で判定し、
+フィードではページ分のパス（元画像・サムネイル・派生ファイル）を1クエリで先読みしてリクエストに持たせる。
+
+- 元ファイル: カタログに無い場合、MEDIA_CATALOG_STRICT が False ならファイルシステムで確認し、
+  存在すれば登録する（未登録の既存ファイルの自己修復）。True ならカタログを正とする。
+- 派生ファイル（_thumb.jpg / _opt.jpg）: カタログに無ければ GET 中に生成せず、生成をワーカーに投入する。
+"""
+import logging
+import os
+from pathlib import Path
+from urllib.parse import urlparse, urlunparse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import StoredMediaFile
+
+logger = logging.getLogger(__name__)
+
+MEDIA_URL_PREFIX = '/uploads/'
+
+# 派生ファイルの種類 → (ファイル名の接尾辞, 最大サイズ, 品質)
+DERIVATIVES = {
+    'thumb': ('_thumb.jpg', 300, 80),
+    'opt': ('_opt.jpg', None, 85),
+}
+
+_MEMO_ATTR = '_media_catalog'
+_ENQUEUE_TTL = 600
+
+
+def is_strict():
+    return getattr(settings, 'MEDIA_CATALOG_STRICT', False)
+
+
+def relative_path(value):
+    """URL（/uploads/... や絶対 URL）・MEDIA_ROOT 配下の絶対パスを MEDIA_ROOT 相対パスにする。範囲外は None。"""
+    if not value:
+        return None
+    value = str(value)
+    if value.startswith(('http://', 'https://')):
+        value = urlparse(value).path
+    if value.startswith(MEDIA_URL_PREFIX):
+        return value[len(MEDIA_URL_PREFIX):] or None
+    media_root = str(settings.MEDIA_ROOT).rstrip('/') + '/'
+    if value.startswith(media_root):
+        return value[len(media_root):] or None
+    if value.startswith('/'):
+        # 旧データの /submissions/... 等（_get_file_path_from_url と同じ解釈）
+        return value.lstrip('/') or None
+    return value
+
+
+def derivative_path(path, kind):
+    suffix = DERIVATIVES[kind][0]
+    stem, _ = os.path.splitext(path)
+    return f'{stem}{suffix}'
+
+
+# ---------------------------------------------------------------------------
+# 登録（書き込み時）
+# ---------------------------------------------------------------------------
+
+def register(*paths):
+    """保存したファイルをカタログに登録する（登録済みは無視）。"""
+    rows = []
+    for path in {relative_path(p) for p in paths if p}:
+        if not path:
+            continue
+        try:
+            size = os.path.getsize(os.path.join(settings.MEDIA_ROOT, path))
+        except OSError:
+            size = 0
+        rows.append(StoredMediaFile(path=path, size=size))
+    if rows:
+        StoredMediaFile.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def unregister(*paths):
+    paths = [p for p in (relative_path(p) for p in paths if p) if p]
+    if paths:
+        StoredMediaFile.objects.filter(path__in=paths).delete()
+
+
+# ---------------------------------------------------------------------------
+# 参照（URL 生成時）
+# ---------------------------------------------------------------------------
+
+def _memo(request):
+    if request is None:
+        return None
+    memo = getattr(request, _MEMO_ATTR, None)
+    if memo is None:
+        memo = {}
+        try:
+            setattr(request, _MEMO_ATTR, memo)
+        except AttributeError:
+            return None
+    return memo
+
+
+def prefetch(request, paths, derivatives=()):
+    """paths（と各パスの派生ファイル）の登録有無を1クエリで読み、リクエストに記憶する。"""
+    memo = _memo(request)
+    if memo is None:
+        return
+    wanted = set()
+    for value in paths:
+        path = relative_path(value)
+        if not path:
+            continue
+        wanted.add(path)
+        for kind in derivatives:
+            wanted.add(derivative_path(path, kind))
+    wanted -= memo.keys()
+    if not wanted:
+        return
+    found = set(StoredMediaFile.objects.filter(path__in=wanted).values_list('path', flat=True))
+    for path in wanted:
+        if path in found:
+            memo[path] = True
+        elif is_strict():
+            memo[path] = False
+        # 非 strict ではカタログに無い元ファイルは exists() 時にファイルシステムで確認する
+
+
+def _lookup(path, request):
+    memo = _memo(request)
+    if memo is not None and path in memo:
+        return memo[path]
+    found = StoredMediaFile.objects.filter(path=path).exists()
+    if memo is not None and (found or is_strict()):
+        memo[path] = found
+    return found
+
+
+def exists(value, request=None):
+    """元ファイルが存在するか（カタログ優先、非 strict ならファイルシステムで補完して登録）。"""
+    path = relative_path(value)
+    if not path:
+        return False
+    if _lookup(path, request):
+        return True
+    if is_strict():
+        return False
+    found = os.path.isfile(os.path.join(settings.MEDIA_ROOT, path))
+    if found:
+        register(path)
+    memo = _memo(request)
+    if memo is not None:
+        memo[path] = found
+    return found
+
+
+def derivative_url(url, kind, request=None):
+    """派生ファイルの URL（登録済みのとき）。未登録なら生成を投入して None を返す。"""
+    path = relative_path(url)
+    if not path:
+        return None
+    target = derivative_path(path, kind)
+    if _lookup(target, request):
+        parsed = urlparse(url)
+        new_path = parsed.path.rsplit('/', 1)[0] + '/' + os.path.basename(target)
+        return urlunparse(parsed._replace(path=new_path))
+    enqueue_derivative(path, kind)
+    return None
+
+
+def enqueue_derivative(path, kind):
+    """派生ファイルの生成をコミット後に投入する（同じパスは一定時間に一度だけ）。"""
+    if not cache.add(f'media_derivative:{kind}:{path}', 1, _ENQUEUE_TTL):
+        return
+
+    def _dispatch():
+        if getattr(settings, 'MEDIA_JOB_MODE', 'celery') == 'inline':
+            generate_derivative(path, kind)
+            return
+        try:
+            from submissions.tasks import generate_media_derivative
+            generate_media_derivative.delay(path, kind)
+        except Exception as e:
+            logger.warning(f'[MediaCatalog] enqueue failed for {path} ({kind}): {e}')
+
+    transaction.on_commit(_dispatch)
+
+
+def generate_derivative(path, kind):
+    """派生ファイルを生成（既にあれば登録のみ）して登録する。生成したパスか None を返す。"""
+    from toybox.image_optimizer import convert_and_save_image
+
+    target = derivative_path(path, kind)
+    media_root = Path(settings.MEDIA_ROOT)
+    if (media_root / target).is_file():
+        register(target)
+        return target
+    source = media_root / path
+    if not source.is_file():
+        return None
+    _, max_size, quality = DERIVATIVES[kind]
+    success, saved = convert_and_save_image(str(source), target, max_width=max_size, max_height=max_size, quality=quality)
+    if not success:
+        return None
+    register(saved)
+    return saved
+
+
+# ---------------------------------------------------------------------------
+# 突き合わせ
+# ---------------------------------------------------------------------------
+
+def reconcile(directories=None, prune=False, batch_size=1000):
+    """MEDIA_ROOT 配下の実ファイルを登録し、prune なら実ファイルの無い行を削除する。(登録数, 削除数) を返す。"""
+    media_root = Path(settings.MEDIA_ROOT)
+    roots = [media_root / d for d in directories] if directories else [media_root]
+    seen = set()
+    batch = []
+    for root in roots:
+        if not root.exists():
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full = Path(dirpath) / filename
+                path = str(full.relative_to(media_root)).replace(os.sep, '/')
+                seen.add(path)
+                batch.append(StoredMediaFile(path=path, size=full.stat().st_size))
+                if len(batch) >= batch_size:
+                    StoredMediaFile.objects.bulk_create(batch, ignore_conflicts=True)
+                    batch = []
+    if batch:
+        StoredMediaFile.objects.bulk_create(batch, ignore_conflicts=True)
+
+    removed = 0
+    if prune:
+        prefixes = [str(root.relative_to(media_root)).replace(os.sep, '/') for root in roots]
+        qs = StoredMediaFile.objects.all()
+        stale = []
+        for pk, path in qs.values_list('pk', 'path').iterator():
+            in_scope = not directories or any(path == p or path.startswith(p + '/') for p in prefixes)
+            if in_scope and path not in seen:
+                stale.append(pk)
+        for i in range(0, len(stale), batch_size):
+            removed += StoredMediaFile.objects.filter(pk__in=stale[i:i + batch_size]).delete()[0]
+    return len(seen), removed
@@ -0,0 +1,469 @@
+"""アップロード後のメディア加工パイプライン（MediaJob）。
+
+アップロードはリクエスト内で一度だけ保存して MediaJob を返し、重い加工
+（JPEG 最適化・サムネイル・ffmpeg による動画ポスター・ゲーム ZIP の展開）は
+Celery ワーカーで行う。MEDIA_JOB_MODE = 'inline'（開発・テスト）ではコミット後に同じプロセスで実行する。
+
+投稿作成時に主ファイルのパスで未完了ジョブと紐付け、完了までは media_pending で
+プレースホルダーを表示する。同じ冪等キーの再送は既存ジョブを返す。
+"""
+import logging
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from urllib.parse import urlparse, urlunparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.templatetags.static import static
+from django.utils import timezone
+
+from . import media_catalog
+from .models import MediaJob, Submission
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_STATIC_PATH = 'frontend/hero/nowloading.gif'
+
+SUBMISSIONS_URL_BASE = '/uploads/'
+GAMES_URL_BASE = '/media/'
+
+
+class MediaJobError(Exception):
+    """加工に失敗した（再試行の対象）。"""
+
+
+def max_attempts():
+    return getattr(settings, 'MEDIA_JOB_MAX_ATTEMPTS', 3)
+
+
+def placeholder_url(request=None):
+    url = static(PLACEHOLDER_STATIC_PATH)
+    if request is not None:
+        from toybox.image_utils import build_https_absolute_uri
+        return build_https_absolute_uri(request, url)
+    return url
+
+
+@contextmanager
+def _timed(timings, stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _ms_between(start, end):
+    return round((end - start).total_seconds() * 1000, 1)
+
+
+# ---------------------------------------------------------------------------
+# ジョブ作成（リクエスト内）
+# ---------------------------------------------------------------------------
+
+def _find_index_html(names):
+    """ZIP 内の index.html のうち最も浅いもの（同じ深さなら名前順）。"""
+    candidates = [n for n in names if n.replace('\\', '/').rsplit('/', 1)[-1] == 'index.html']
+    if not candidates:
+        return None
+    return min(candidates, key=lambda n: (n.replace('\\', '/').count('/'), n)).replace('\\', '/')
+
+
+def _store_upload(user, kind, upload, token):
+    """アップロードを一度だけ保存し (source_path, main_path) を返す。"""
+    stamp = f'{user.id}_{int(timezone.now().timestamp())}_{token}'
+    if kind == MediaJob.Kind.IMAGE:
+        ext = os.path.splitext(upload.name)[1].lower() or '.png'
+        source = default_storage.save(f'submissions/{stamp}_src{ext}', ContentFile(upload.read()))
+        return source, f'submissions/{stamp}.jpg'
+    if kind == MediaJob.Kind.VIDEO:
+        ext = os.path.splitext(upload.name)[1] or '.mp4'
+        source = default_storage.save(f'submissions/{stamp}{ext}', ContentFile(upload.read()))
+        return source, source
+    # ゲーム: ZIP は展開先ディレクトリに置き、展開はワーカーで行う
+    game_dir = f'games/{user.display_id}/{int(timezone.now().timestamp())}_{token}'
+    base_path = os.path.join(settings.MEDIA_ROOT, game_dir)
+    os.makedirs(base_path, exist_ok=True)
+    zip_name = os.path.basename(upload.name) or 'game.zip'
+    with open(os.path.join(base_path, zip_name), 'wb') as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+    return f'{game_dir}/{zip_name}', None
+
+
+def create_job(user, kind, upload, idempotency_key=None):
+    """アップロードを保存して MediaJob を作成し、コミット後に加工を投入する。(job, created) を返す。
+
+    idempotency_key が同じユーザーの既存ジョブと一致した場合は保存も投入もせず既存ジョブを返す。
+    """
+    if idempotency_key:
+        existing = MediaJob.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if existing:
+            return existing, False
+
+    timings = {}
+    token = uuid.uuid4().hex[:8]
+    with _timed(timings, 'store'):
+        source_path, stored_main = _store_upload(user, kind, upload, token)
+    try:
+        with transaction.atomic():
+            job = MediaJob.objects.create(
+                user=user,
+                kind=kind,
+                idempotency_key=idempotency_key or None,
+                source_path=source_path,
+                main_path=stored_main,
+                timings=timings,
+            )
+    except IntegrityError:
+        # 同じ冪等キーの同時リクエスト: 先に作られたジョブを返し、今回の保存分は捨てる
+        _discard_source(kind, source_path)
+        return MediaJob.objects.get(user=user, idempotency_key=idempotency_key), False
+    enqueue(job)
+    return job, True
+
+
+def _discard_source(kind, source_path):
+    try:
+        if kind == MediaJob.Kind.GAME:
+            shutil.rmtree(os.path.join(settings.MEDIA_ROOT, os.path.dirname(source_path)), ignore_errors=True)
+        else:
+            default_storage.delete(source_path)
+    except Exception as e:
+        logger.warning(f'[MediaJob] failed to discard {source_path}: {e}')
+
+
+def create_game_job(user, upload, idempotency_key=None):
+    """ゲーム ZIP を保存・監査し、展開ジョブを作成する。(job, created, error_response_data) を返す。
+
+    監査と index.html の確認は ZIP の目次を読むだけなので同期で行い、不正な ZIP はその場で弾く。
+    """
+    from submissions.utils import audit_zip_file
+
+    if idempotency_key:
+        existing = MediaJob.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if existing:
+            return existing, False, None
+
+    timings = {}
+    token = uuid.uuid4().hex[:8]
+    with _timed(timings, 'store'):
+        source_path, _ = _store_upload(user, MediaJob.Kind.GAME, upload, token)
+    zip_path = os.path.join(settings.MEDIA_ROOT, source_path)
+
+    with _timed(timings, 'audit'):
+        try:
+            audit_result = audit_zip_file(zip_path)
+            with zipfile.ZipFile(zip_path) as zf:
+                index_name = _find_index_html(zf.namelist())
+        except zipfile.BadZipFile:
+            _discard_source(MediaJob.Kind.GAME, source_path)
+            return None, False, {'error': 'Invalid ZIP file'}
+
+    if not audit_result['is_safe']:
+        _discard_source(MediaJob.Kind.GAME, source_path)
+        error_messages = list(audit_result['errors']) + list(audit_result['warnings'])
+        main_error = audit_result['errors'][0] if audit_result['errors'] else 'ZIPファイルの監査に失敗しました'
+        return None, False, {
+            'error': main_error,
+            'message': main_error,
+            'details': error_messages,
+            'audit_result': {
+                'has_index_html': audit_result['has_index_html'],
+                'suspicious_files': audit_result['suspicious_files'][:10],
+                'web_files_count': len(audit_result['web_files']),
+            },
+        }
+    if not index_name:
+        _discard_source(MediaJob.Kind.GAME, source_path)
+        return None, False, {'error': 'index.html not found in ZIP'}
+
+    main_path = f'{os.path.dirname(source_path)}/{index_name}'
+    try:
+        with transaction.atomic():
+            job = MediaJob.objects.create(
+                user=user,
+                kind=MediaJob.Kind.GAME,
+                idempotency_key=idempotency_key or None,
+                source_path=source_path,
+                main_path=main_path,
+                timings=timings,
+            )
+    except IntegrityError:
+        _discard_source(MediaJob.Kind.GAME, source_path)
+        return MediaJob.objects.get(user=user, idempotency_key=idempotency_key), False, None
+    enqueue(job)
+    return job, True, None
+
+
+def enqueue(job):
+    """コミット後に加工を投入する。ブローカーに繋がらなければインラインで実行する。"""
+    job_id = str(job.id)
+
+    def _dispatch():
+        if getattr(settings, 'MEDIA_JOB_MODE', 'celery') == 'inline':
+            run_inline(job_id)
+            return
+        try:
+            from submissions.tasks import process_media_job
+            process_media_job.delay(job_id)
+        except Exception as e:
+            logger.warning(f'[MediaJob] enqueue failed, running inline: {e}')
+            run_inline(job_id)
+
+    transaction.on_commit(_dispatch)
+
+
+# ---------------------------------------------------------------------------
+# 加工（ワーカー）
+# ---------------------------------------------------------------------------
+
+def _process_image(job, timings):
+    from toybox.image_optimizer import generate_thumbnail, optimize_image_to_jpg
+
+    with _timed(timings, 'optimize'):
+        if not default_storage.exists(job.source_path) and default_storage.exists(job.main_path):
+            # 前回の試行で最適化までは済んでいる
+            main = job.main_path
+        else:
+            with default_storage.open(job.source_path, 'rb') as src:
+                optimized = optimize_image_to_jpg(src, max_width=1920, max_height=1920, quality=85)
+            if optimized:
+                if default_storage.exists(job.main_path):
+                    default_storage.delete(job.main_path)
+                main = default_storage.save(job.main_path, ContentFile(optimized.read()))
+                default_storage.delete(job.source_path)
+                media_catalog.unregister(job.source_path)
+            else:
+                # 最適化できない画像は元ファイルをそのまま使う（従来と同じ挙動）
+                main = job.source_path
+
+    result = {'imageUrl': SUBMISSIONS_URL_BASE + main, 'thumbnailUrl': None}
+    with _timed(timings, 'thumbnail'):
+        with default_storage.open(main, 'rb') as f:
+            thumbnail = generate_thumbnail(f, max_size=300, quality=80)
+        if thumbnail:
+            name = os.path.splitext(os.path.basename(main))[0]
+            thumb = default_storage.save(f'submissions/{name}_thumb.jpg', ContentFile(thumbnail.read()))
+            result['thumbnailUrl'] = SUBMISSIONS_URL_BASE + thumb
+    media_catalog.register(main, result['thumbnailUrl'])
+    with _timed(timings, 'variants'):
+        # レスポンシブ用バリアントは無くても表示できるので、失敗してもジョブは成功扱い
+        try:
+            from submissions.image_variants import generate_variants
+            generate_variants(main)
+        except Exception as e:
+            logger.warning(f'[MediaJob] {job.id} variant generation failed: {e}', exc_info=True)
+    return result
+
+
+def _process_video(job, timings):
+    from submissions.utils import generate_video_poster
+
+    result = {'videoUrl': SUBMISSIONS_URL_BASE + job.main_path, 'thumbnailUrl': None}
+    with _timed(timings, 'poster'):
+        poster = generate_video_poster(job.main_path)
+    if poster:
+        result['thumbnailUrl'] = urlparse(poster).path
+    media_catalog.register(job.main_path, result['thumbnailUrl'])
+    return result
+
+
+def _process_game(job, timings):
+    base_path = os.path.join(settings.MEDIA_ROOT, os.path.dirname(job.source_path))
+    zip_path = os.path.join(settings.MEDIA_ROOT, job.source_path)
+    with _timed(timings, 'extract'):
+        if os.path.exists(zip_path):
+            with zipfile.ZipFile(zip_path) as zf:
+                zf.extractall(base_path)
+            os.remove(zip_path)
+    if not os.path.exists(os.path.join(settings.MEDIA_ROOT, job.main_path)):
+        raise MediaJobError('index.htmlが見つかりませんでした')
+    media_catalog.register(job.main_path)
+    return {'gameUrl': GAMES_URL_BASE + job.main_path}
+
+
+_PROCESSORS = {
+    MediaJob.Kind.IMAGE: _process_image,
+    MediaJob.Kind.VIDEO: _process_video,
+    MediaJob.Kind.GAME: _process_game,
+}
+
+
+def run_media_job(job_id):
+    """ジョブを1回試行する。失敗時は再試行回数が残っていれば例外を送出し、尽きていれば失敗で確定する。"""
+    with transaction.atomic():
+        job = MediaJob.objects.select_for_update().filter(id=job_id).first()
+        if job is None or job.is_finished:
+            # 再配送・重複投入は何もしない
+            return job
+        now = timezone.now()
+        job.status = MediaJob.Status.RUNNING
+        job.attempts += 1
+        if job.started_at is None:
+            job.started_at = now
+            job.timings = {**job.timings, 'queue': _ms_between(job.created_at, now)}
+        job.save(update_fields=['status', 'attempts', 'started_at', 'timings'])
+
+    timings = dict(job.timings)
+    try:
+        result = _PROCESSORS[job.kind](job, timings)
+    except Exception as e:
+        logger.warning(f'[MediaJob] {job.id} attempt {job.attempts} failed: {e}', exc_info=True)
+        if job.attempts >= max_attempts():
+            _finish(job, MediaJob.Status.FAILED, timings, error=str(e))
+            return job
+        MediaJob.objects.filter(id=job.id).update(status=MediaJob.Status.PENDING, error=str(e), timings=timings)
+        raise
+    _finish(job, MediaJob.Status.SUCCEEDED, timings, result=result)
+    return job
+
+
+def run_inline(job_id):
+    """Celery を使わずに再試行込みで実行する。"""
+    for _ in range(max_attempts()):
+        try:
+            return run_media_job(job_id)
+        except Exception:
+            continue
+    return MediaJob.objects.filter(id=job_id).first()
+
+
+def _replace_url_path(url, path):
+    if not url:
+        return url
+    return urlunparse(urlparse(url)._replace(path=path))
+
+
+def _apply_result_image(submission, result):
+    """最適化に失敗して元ファイルを使う場合に投稿の画像 URL を差し替える。差し替えたら True。"""
+    image_path = (result or {}).get('imageUrl')
+    if image_path and submission.image_url and urlparse(submission.image_url).path != image_path:
+        submission.image_url = _replace_url_path(submission.image_url, image_path)
+        return True
+    return False
+
+
+def _finish(job, status, timings, result=None, error=''):
+    now = timezone.now()
+    timings['total'] = _ms_between(job.created_at, now)
+    with transaction.atomic():
+        # 投稿側の紐付け（link_submission）と直列化する
+        MediaJob.objects.select_for_update().filter(id=job.id).first()
+        job.status = status
+        job.result = result or {}
+        job.error = error
+        job.timings = timings
+        job.finished_at = now
+        job.save(update_fields=['status', 'result', 'error', 'timings', 'finished_at'])
+
+        linked = list(Submission.objects.filter(media_job_id=job.id, media_pending=True))
+        for submission in linked:
+            submission.media_pending = False
+            fields = ['media_pending']
+            if _apply_result_image(submission, result):
+                fields.append('image_url')
+            submission.save(update_fields=fields)
+    logger.info(f'[MediaJob] {job.id} {status} attempts={job.attempts} timings={timings}')
+
+
+# ---------------------------------------------------------------------------
+# 投稿との紐付け・API 表現
+# ---------------------------------------------------------------------------
+
+def _storage_path_from_url(url):
+    """投稿の URL（/uploads/... または /media/...）からストレージ相対パスを取り出す。"""
+    if not url:
+        return None
+    path = urlparse(url).path
+    for base in (SUBMISSIONS_URL_BASE, GAMES_URL_BASE):
+        if path.startswith(base):
+            return path[len(base):]
+    return None
+
+
+def link_submission(submission):
+    """新規投稿の主ファイルが未完了ジョブの生成物なら紐付け、加工中フラグを立てる。"""
+    paths = [p for p in (
+        _storage_path_from_url(submission.image_url),
+        _storage_path_from_url(submission.video_url),
+        _storage_path_from_url(submission.game_url),
+    ) if p]
+    if not paths:
+        return
+    with transaction.atomic():
+        job = (
+            MediaJob.objects.select_for_update()
+            .filter(user_id=submission.author_id, main_path__in=paths)
+            .order_by('-created_at')
+            .first()
+        )
+        if job is None:
+            return
+        updates = {'media_job': job, 'media_pending': not job.is_finished}
+        # 投稿より先にジョブが終わっていれば、_finish と同じく結果の画像パスに合わせる
+        if job.is_finished and _apply_result_image(submission, job.result):
+            updates['image_url'] = submission.image_url
+        Submission.objects.filter(pk=submission.pk).update(**updates)
+        submission.media_job = job
+        submission.media_pending = not job.is_finished
+
+
+def job_payload(job, request=None):
+    """ステータス API 用の表現（URL は絶対 URL に変換）。"""
+    from submissions.utils import build_file_url
+
+    def absolute(path):
+        if not path or request is None:
+            return path
+        base = GAMES_URL_BASE if path.startswith(GAMES_URL_BASE) else SUBMISSIONS_URL_BASE
+        return build_file_url(request, path, base_path=base)
+
+    return {
+        'id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': {key: absolute(value) for key, value in (job.result or {}).items()},
+        'error': job.error or None,
+        'timings': job.timings,
+        'createdAt': job.created_at.isoformat() if job.created_at else None,
+        'finishedAt': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def upload_payload(job, request):
+    """アップロード API の応答（従来のキー + mediaJob）。未完了の間は表示用 URL をプレースホルダーにする。"""
+    from submissions.utils import build_file_url
+
+    job.refresh_from_db()
+    result = job.result or {}
+    pending = not job.is_finished
+    payload = {'mediaJob': job_payload(job, request)}
+
+    if job.kind == MediaJob.Kind.GAME:
+        path = result.get('gameUrl') or GAMES_URL_BASE + job.main_path
+        payload.update(ok=True, gameUrl=build_file_url(request, path, base_path=GAMES_URL_BASE))
+        return payload
+
+    def absolute(path):
+        return build_file_url(request, path, base_path=SUBMISSIONS_URL_BASE) if path else None
+
+    thumbnail = absolute(result.get('thumbnailUrl'))
+    if job.kind == MediaJob.Kind.VIDEO:
+        main = absolute(result.get('videoUrl') or SUBMISSIONS_URL_BASE + job.main_path)
+        payload.update(imageUrl=None, videoUrl=main)
+    else:
+        main = absolute(result.get('imageUrl') or SUBMISSIONS_URL_BASE + job.main_path)
+        payload.update(imageUrl=main, videoUrl=None)
+    payload.update(
+        displayImageUrl=placeholder_url(request) if pending else (thumbnail or main),
+        thumbnailUrl=thumbnail,
+    )
+    return payload
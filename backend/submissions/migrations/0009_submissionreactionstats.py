@@ -0,0 +1,98 @@
+# Generated manually: 投稿ごとのリアクション集計テーブル（非正規化カウンタ）+ 既存データの初期集計
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+# gamification.services.REACTION_POINTS（作成時点）
+REACTION_POINTS = {
+    'submit_medal': 3,
+    'awesome': 5,
+    'cute': 4,
+    'funny': 4,
+    'moved': 4,
+    'cool': 5,
+    'beautiful': 3,
+    'emotional': 5,
+    'god_game': 10,
+}
+
+BATCH_SIZE = 1000
+
+
+def backfill_reaction_stats(apps, schema_editor):
+    Submission = apps.get_model('submissions', 'Submission')
+    Reaction = apps.get_model('submissions', 'Reaction')
+    SubmissionRepost = apps.get_model('submissions', 'SubmissionRepost')
+    SubmissionBookmark = apps.get_model('submissions', 'SubmissionBookmark')
+    SubmissionReactionStats = apps.get_model('submissions', 'SubmissionReactionStats')
+
+    ids = list(Submission.objects.order_by('id').values_list('id', flat=True))
+    for offset in range(0, len(ids), BATCH_SIZE):
+        batch = ids[offset:offset + BATCH_SIZE]
+        values = {
+            sid: {'tp_score': (likes or 0) * 2, 'total_reactions': 0, 'reaction_score': 0}
+            for sid, likes in Submission.objects.filter(id__in=batch).values_list('id', 'likes_count')
+        }
+        rows = (
+            Reaction.objects.filter(submission_id__in=batch)
+            .values('submission_id')
+            .annotate(**{f'{t}_count': Count('id', filter=Q(type=t)) for t in REACTION_POINTS})
+            .order_by()
+        )
+        for row in rows:
+            v = values[row['submission_id']]
+            for rtype, weight in REACTION_POINTS.items():
+                cnt = row[f'{rtype}_count']
+                v[f'{rtype}_count'] = cnt
+                v['total_reactions'] += cnt
+                v['reaction_score'] += cnt * weight
+                v['tp_score'] += cnt * weight
+        for model, field in ((SubmissionRepost, 'repost_count'), (SubmissionBookmark, 'bookmark_count')):
+            for row in model.objects.filter(submission_id__in=batch).values('submission_id').annotate(cnt=Count('id')).order_by():
+                values[row['submission_id']][field] = row['cnt']
+        SubmissionReactionStats.objects.bulk_create(
+            [SubmissionReactionStats(submission_id=sid, **v) for sid, v in values.items()]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0008_reaction_types_bookmark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionReactionStats',
+            fields=[
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reaction_stats', serialize=False, to='submissions.submission', verbose_name='投稿')),
+                ('submit_medal_count', models.IntegerField(default=0, verbose_name='いいね！数')),
+                ('awesome_count', models.IntegerField(default=0, verbose_name='すごい！数')),
+                ('cute_count', models.IntegerField(default=0, verbose_name='かわいい！数')),
+                ('funny_count', models.IntegerField(default=0, verbose_name='笑える！数')),
+                ('moved_count', models.IntegerField(default=0, verbose_name='感動した数')),
+                ('cool_count', models.IntegerField(default=0, verbose_name='かっこいい！数')),
+                ('beautiful_count', models.IntegerField(default=0, verbose_name='きれい数')),
+                ('emotional_count', models.IntegerField(default=0, verbose_name='エモい！数')),
+                ('god_game_count', models.IntegerField(default=0, verbose_name='神ゲー！数')),
+                ('total_reactions', models.IntegerField(default=0, verbose_name='リアクション合計')),
+                ('reaction_score', models.IntegerField(default=0, verbose_name='リアクションスコア')),
+                ('tp_score', models.IntegerField(default=0, verbose_name='獲得TP')),
+                ('repost_count', models.IntegerField(default=0, verbose_name='リポスト数')),
+                ('bookmark_count', models.IntegerField(default=0, verbose_name='ブックマーク数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'リアクション集計',
+                'verbose_name_plural': 'リアクション集計',
+                'db_table': 'submission_reaction_stats',
+                'indexes': [
+                    models.Index(fields=['-tp_score'], name='subrxstats_tp_idx'),
+                    models.Index(fields=['-reaction_score'], name='subrxstats_score_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_reaction_stats, migrations.RunPython.noop),
+    ]
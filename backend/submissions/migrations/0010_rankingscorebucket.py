@@ -0,0 +1,99 @@
+# Generated manually: ランキング用スコアバケット（投稿 × リアクション日）+ 既存リアクションからの初期構築
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import django.db.models.deletion
+
+
+# gamification.services.REACTION_POINTS（作成時点）
+REACTION_POINTS = {
+    'submit_medal': 3,
+    'awesome': 5,
+    'cute': 4,
+    'funny': 4,
+    'moved': 4,
+    'cool': 5,
+    'beautiful': 3,
+    'emotional': 5,
+    'god_game': 10,
+}
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def backfill_ranking_buckets(apps, schema_editor):
+    Reaction = apps.get_model('submissions', 'Reaction')
+    RankingScoreBucket = apps.get_model('submissions', 'RankingScoreBucket')
+
+    score = Case(
+        *[When(type=k, then=Value(v)) for k, v in REACTION_POINTS.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rows = (
+        Reaction.objects.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('submission_id', 'submission__author_id', 'submission__created_at', 'day')
+        .annotate(score=Sum(score))
+        .order_by()
+    )
+    buckets = []
+    for row in rows.iterator():
+        posted_on = timezone.localtime(row['submission__created_at']).date()
+        reacted_on = row['day']
+        if not row['score'] or _week_start(posted_on) != _week_start(reacted_on):
+            continue
+        buckets.append(RankingScoreBucket(
+            submission_id=row['submission_id'],
+            author_id=row['submission__author_id'],
+            posted_on=posted_on,
+            posted_week=_week_start(posted_on),
+            reacted_on=reacted_on,
+            reacted_week=_week_start(reacted_on),
+            score=row['score'],
+        ))
+    RankingScoreBucket.objects.bulk_create(buckets, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('submissions', '0009_submissionreactionstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posted_on', models.DateField(verbose_name='投稿日')),
+                ('posted_week', models.DateField(verbose_name='投稿週（月曜）')),
+                ('reacted_on', models.DateField(verbose_name='リアクション日')),
+                ('reacted_week', models.DateField(verbose_name='リアクション週（月曜）')),
+                ('score', models.IntegerField(default=0, verbose_name='スコア')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_buckets', to=settings.AUTH_USER_MODEL, verbose_name='投稿者')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_buckets', to='submissions.submission', verbose_name='投稿')),
+            ],
+            options={
+                'verbose_name': 'ランキングスコアバケット',
+                'verbose_name_plural': 'ランキングスコアバケット',
+                'db_table': 'ranking_score_buckets',
+                'constraints': [
+                    models.UniqueConstraint(fields=('submission', 'reacted_on'), name='uniq_ranking_bucket_submission_day'),
+                ],
+                'indexes': [
+                    models.Index(fields=['reacted_on', 'posted_on'], name='rankbucket_day_idx'),
+                    models.Index(fields=['reacted_week', 'posted_week'], name='rankbucket_week_idx'),
+                    models.Index(fields=['author', 'reacted_on'], name='rankbucket_author_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_ranking_buckets, migrations.RunPython.noop),
+    ]
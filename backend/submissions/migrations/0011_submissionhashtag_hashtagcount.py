@@ -0,0 +1,113 @@
+# Generated manually: ハッシュタグ索引 + タグ集計テーブル（PostgreSQL では pg_trgm による部分一致用インデックス）
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _normalize(raw):
+    result = []
+    seen = set()
+    if not isinstance(raw, list):
+        return result
+    for tag in raw:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip()[:100]
+        lower = tag.lower()
+        if not tag or lower in seen:
+            continue
+        seen.add(lower)
+        result.append((tag, lower))
+    return result
+
+
+def backfill_hashtag_index(apps, schema_editor):
+    Submission = apps.get_model('submissions', 'Submission')
+    SubmissionHashtag = apps.get_model('submissions', 'SubmissionHashtag')
+    HashtagCount = apps.get_model('submissions', 'HashtagCount')
+
+    counts = {}
+    rows = []
+    live = Submission.objects.filter(deleted_at__isnull=True).order_by('id').values_list('id', 'hashtags', 'created_at')
+    for sid, raw, created_at in live.iterator(chunk_size=1000):
+        for tag, lower in _normalize(raw):
+            rows.append(SubmissionHashtag(submission_id=sid, tag=tag, tag_lower=lower, created_at=created_at))
+            counts[tag] = counts.get(tag, 0) + 1
+    SubmissionHashtag.objects.bulk_create(rows, batch_size=1000)
+    HashtagCount.objects.bulk_create(
+        [HashtagCount(tag=tag, tag_lower=tag.lower(), count=cnt) for tag, cnt in counts.items()],
+        batch_size=1000,
+    )
+
+
+def create_trigram_index(apps, schema_editor):
+    """部分一致検索用の GIN(pg_trgm) インデックス。拡張を作れない環境では通常の LIKE 検索のまま。"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SAVEPOINT hashtag_trgm')
+        try:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS hashtagcount_lower_trgm_idx '
+                'ON hashtag_counts USING gin (tag_lower gin_trgm_ops)'
+            )
+            cursor.execute('RELEASE SAVEPOINT hashtag_trgm')
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT hashtag_trgm')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS hashtagcount_lower_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0010_rankingscorebucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashtagCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100, unique=True, verbose_name='ハッシュタグ')),
+                ('tag_lower', models.CharField(db_index=True, max_length=100, verbose_name='ハッシュタグ（小文字）')),
+                ('count', models.IntegerField(default=0, verbose_name='投稿数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'ハッシュタグ集計',
+                'verbose_name_plural': 'ハッシュタグ集計',
+                'db_table': 'hashtag_counts',
+                'indexes': [models.Index(fields=['-count'], name='hashtagcount_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SubmissionHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100, verbose_name='ハッシュタグ')),
+                ('tag_lower', models.CharField(max_length=100, verbose_name='ハッシュタグ（小文字）')),
+                ('created_at', models.DateTimeField(verbose_name='投稿日時')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashtag_index', to='submissions.submission', verbose_name='投稿')),
+            ],
+            options={
+                'verbose_name': 'ハッシュタグ索引',
+                'verbose_name_plural': 'ハッシュタグ索引',
+                'db_table': 'submission_hashtags',
+                'constraints': [
+                    models.UniqueConstraint(fields=('submission', 'tag_lower'), name='uniq_submission_hashtag_lower'),
+                ],
+                'indexes': [
+                    models.Index(fields=['tag_lower', '-created_at', '-submission'], name='subhashtag_lower_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_hashtag_index, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
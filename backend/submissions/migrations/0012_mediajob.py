@@ -0,0 +1,57 @@
+# Generated manually: アップロード後のメディア加工ジョブ + 投稿側の紐付け・加工中フラグ
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('submissions', '0011_submissionhashtag_hashtagcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('image', '画像'), ('video', '動画'), ('game', 'ゲーム')], max_length=10, verbose_name='種別')),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '処理中'), ('succeeded', '完了'), ('failed', '失敗')], default='pending', max_length=10, verbose_name='状態')),
+                ('idempotency_key', models.CharField(blank=True, max_length=100, null=True, verbose_name='冪等キー')),
+                ('source_path', models.CharField(max_length=500, verbose_name='アップロード保存先')),
+                ('main_path', models.CharField(db_index=True, max_length=500, verbose_name='主ファイル保存先')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='生成結果')),
+                ('error', models.TextField(blank=True, verbose_name='エラー')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='試行回数')),
+                ('timings', models.JSONField(blank=True, default=dict, verbose_name='工程別所要時間（ms）')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': 'メディア加工ジョブ',
+                'verbose_name_plural': 'メディア加工ジョブ',
+                'db_table': 'media_jobs',
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('user', 'idempotency_key'), name='uniq_media_job_idempotency_key'),
+                ],
+                'indexes': [
+                    models.Index(fields=['status', 'created_at'], name='mediajob_status_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='media_job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='submissions.mediajob', verbose_name='メディア加工ジョブ'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='media_pending',
+            field=models.BooleanField(default=False, verbose_name='メディア加工中'),
+        ),
+    ]
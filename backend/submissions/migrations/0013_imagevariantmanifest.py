@@ -0,0 +1,30 @@
+# Generated manually: レスポンシブ画像バリアント（WebP/AVIF/JPEG × 幅ラダー）のマニフェスト
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0012_mediajob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariantManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_path', models.CharField(max_length=500, unique=True, verbose_name='元画像')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='元画像の幅')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='元画像の高さ')),
+                ('variants', models.JSONField(blank=True, default=list, verbose_name='バリアント')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '画像バリアント',
+                'verbose_name_plural': '画像バリアント',
+                'db_table': 'image_variant_manifests',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated manually: 保存済みメディアのカタログ（URL 生成時のファイル存在確認を置き換える）
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0013_imagevariantmanifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredMediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True, verbose_name='パス')),
+                ('size', models.BigIntegerField(default=0, verbose_name='サイズ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='登録日時')),
+            ],
+            options={
+                'verbose_name': '保存済みメディア',
+                'verbose_name_plural': '保存済みメディア',
+                'db_table': 'stored_media_files',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated manually: フィードのキーセットページング用の複合インデックス + 集計行への投稿日時の複製
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_submission_created_at(apps, schema_editor):
+    Submission = apps.get_model('submissions', 'Submission')
+    SubmissionReactionStats = apps.get_model('submissions', 'SubmissionReactionStats')
+    SubmissionReactionStats.objects.filter(submission_created_at__isnull=True).update(
+        submission_created_at=Subquery(
+            Submission.objects.filter(id=OuterRef('submission_id')).values('created_at')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0014_storedmediafile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionreactionstats',
+            name='submission_created_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='投稿日時'),
+        ),
+        migrations.RunPython(backfill_submission_created_at, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='submissionreactionstats',
+            name='subrxstats_tp_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='submissionreactionstats',
+            name='subrxstats_score_idx',
+        ),
+        migrations.AddIndex(
+            model_name='submissionreactionstats',
+            index=models.Index(fields=['-tp_score', '-submission_created_at', '-submission'], name='subrxstats_tp_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionreactionstats',
+            index=models.Index(fields=['-reaction_score', '-submission_created_at', '-submission'], name='subrxstats_score_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['-created_at', '-id'], name='submission_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='submission_author_feed_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='submissionbookmark',
+            name='submbm_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='submissionbookmark',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='submbm_user_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated manually: ハッシュタグの1時間ごとの投稿数（24時間／7日間の急上昇タグ用）+ 直近7日分のバックフィル
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_hashtag_buckets(apps, schema_editor):
+    SubmissionHashtag = apps.get_model('submissions', 'SubmissionHashtag')
+    HashtagHourlyBucket = apps.get_model('submissions', 'HashtagHourlyBucket')
+    since = timezone.now() - timedelta(hours=24 * 7 + 1)
+    counts = {}
+    for tag, created_at in SubmissionHashtag.objects.filter(created_at__gte=since).values_list('tag', 'created_at').iterator():
+        hour = created_at.replace(minute=0, second=0, microsecond=0)
+        counts[(tag, hour)] = counts.get((tag, hour), 0) + 1
+    HashtagHourlyBucket.objects.bulk_create(
+        [HashtagHourlyBucket(tag=tag, hour=hour, count=cnt) for (tag, hour), cnt in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0015_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashtagHourlyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100, verbose_name='ハッシュタグ')),
+                ('hour', models.DateTimeField(verbose_name='投稿時刻（1時間単位）')),
+                ('count', models.IntegerField(default=0, verbose_name='投稿数')),
+            ],
+            options={
+                'verbose_name': 'ハッシュタグ時間別集計',
+                'verbose_name_plural': 'ハッシュタグ時間別集計',
+                'db_table': 'hashtag_hourly_buckets',
+                'indexes': [models.Index(fields=['hour'], name='hashtag_bucket_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tag', 'hour'), name='uniq_hashtag_hour')],
+            },
+        ),
+        migrations.RunPython(backfill_hashtag_buckets, migrations.RunPython.noop),
+    ]
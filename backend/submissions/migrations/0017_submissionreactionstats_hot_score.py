@@ -0,0 +1,66 @@
+# Generated manually: 時間減衰つきスコア（おすすめ・人気 sort=hot 用）+ 既存の集計行のバックフィル
+
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations, models
+
+
+# gamification.services.REACTION_POINTS と submissions.hot_scores の既定値（作成時点）
+REACTION_POINTS = {
+    'submit_medal': 3,
+    'awesome': 5,
+    'cute': 4,
+    'funny': 4,
+    'moved': 4,
+    'cool': 5,
+    'beautiful': 3,
+    'emotional': 5,
+    'god_game': 10,
+}
+LEGACY_LIKE_WEIGHT = 2
+HALF_LIFE_HOURS = 12
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+BATCH_SIZE = 1000
+
+
+def backfill_hot_score(apps, schema_editor):
+    SubmissionReactionStats = apps.get_model('submissions', 'SubmissionReactionStats')
+    count_fields = {rtype: f'{rtype}_count' for rtype in REACTION_POINTS}
+    rows = SubmissionReactionStats.objects.values(
+        'submission_id', 'submission_created_at', 'submission__likes_count', *count_fields.values(),
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        points = sum(row[field] * REACTION_POINTS[rtype] for rtype, field in count_fields.items())
+        points += (row['submission__likes_count'] or 0) * LEGACY_LIKE_WEIGHT
+        value = math.log2(1 + max(points, 0))
+        if row['submission_created_at'] is not None:
+            value += (row['submission_created_at'] - EPOCH).total_seconds() / (HALF_LIFE_HOURS * 3600.0)
+        batch.append(SubmissionReactionStats(submission_id=row['submission_id'], hot_score=round(value, 9)))
+        if len(batch) >= BATCH_SIZE:
+            SubmissionReactionStats.objects.bulk_update(batch, ['hot_score'])
+            batch = []
+    if batch:
+        SubmissionReactionStats.objects.bulk_update(batch, ['hot_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0016_hashtaghourlybucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionreactionstats',
+            name='hot_score',
+            field=models.FloatField(default=0, verbose_name='ホットスコア'),
+        ),
+        migrations.RunPython(backfill_hot_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='submissionreactionstats',
+            index=models.Index(fields=['-hot_score', '-submission_created_at', '-submission'], name='subrxstats_hot_feed_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 """
 Submissions app models - RDB redesign with soft delete.
 """
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
@@ -53,6 +55,13 @@ class Submission(models.Model):
     jp_result = models.CharField(max_length=10, default='none', blank=True)
     likes_count = models.IntegerField(default=0)
     
+    # メディア加工ジョブ（アップロード後の最適化・サムネイル生成）。完了までは表示をプレースホルダーにする
+    media_job = models.ForeignKey(
+        'MediaJob', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='submissions', verbose_name='メディア加工ジョブ',
+    )
+    media_pending = models.BooleanField('メディア加工中', default=False)
+    
     # ETL tracking
     old_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     
@@ -70,11 +79,19 @@ class Submission(models.Model):
             models.Index(fields=['author', '-created_at']),
             models.Index(fields=['status']),
             models.Index(fields=['old_id']),
+            # キーセットページング用（submissions.cursors.RECENT と同じ並び）
+            models.Index(fields=['-created_at', '-id'], name='submission_feed_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='submission_author_feed_idx'),
         ]
     
     def __str__(self):
         return f'{self.author.display_id}の投稿 ({self.created_at})'
     
+    def save(self, *args, **kwargs):
+        # post_save シグナルで更新するカウンタ（UserCounters 等）を投稿の保存と同じトランザクションにする
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def soft_delete(self, reason=None):
         """Soft delete the submission."""
         self.deleted_at = timezone.now()
@@ -200,9 +217,292 @@ class SubmissionBookmark(models.Model):
             ),
         ]
         indexes = [
-            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', '-created_at', '-id'], name='submbm_user_feed_idx'),
             models.Index(fields=['submission', '-created_at']),
         ]
 
     def __str__(self):
         return f'bookmark {self.user_id} -> submission {self.submission_id}'
+
+
+class SubmissionReactionStats(models.Model):
+    """投稿ごとのリアクション集計（非正規化カウンタ）。
+
+    Reaction / SubmissionRepost / SubmissionBookmark の追加・削除時に F() で増減する
+    （submissions.signals → submissions.reaction_stats）。フィード・ランキングは
+    reactions テーブルを GROUP BY せずにこの行のインデックス列で並べ替え・絞り込みを行う。
+    ズレた場合は `manage.py rebuild_reaction_stats` で生テーブルから再構築できる。
+    """
+
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='reaction_stats',
+        verbose_name='投稿',
+    )
+    submit_medal_count = models.IntegerField('いいね！数', default=0)
+    awesome_count = models.IntegerField('すごい！数', default=0)
+    cute_count = models.IntegerField('かわいい！数', default=0)
+    funny_count = models.IntegerField('笑える！数', default=0)
+    moved_count = models.IntegerField('感動した数', default=0)
+    cool_count = models.IntegerField('かっこいい！数', default=0)
+    beautiful_count = models.IntegerField('きれい数', default=0)
+    emotional_count = models.IntegerField('エモい！数', default=0)
+    god_game_count = models.IntegerField('神ゲー！数', default=0)
+    total_reactions = models.IntegerField('リアクション合計', default=0)
+    # REACTION_POINTS による重み付き合計（おすすめフィード用）
+    reaction_score = models.IntegerField('リアクションスコア', default=0)
+    # reaction_score + 旧いいね（likes_count）×2（人気フィード用・獲得TP相当）
+    tp_score = models.IntegerField('獲得TP', default=0)
+    # 時間減衰つきの重み付きスコア（おすすめ・人気 sort=hot 用、submissions.hot_scores）
+    hot_score = models.FloatField('ホットスコア', default=0)
+    repost_count = models.IntegerField('リポスト数', default=0)
+    bookmark_count = models.IntegerField('ブックマーク数', default=0)
+    # Submission.created_at の複製。スコア順フィードの同点を投稿日時・ID で並べる
+    # キーセットページングを、投稿テーブルを結合せずにこの行のインデックスだけで引くため
+    submission_created_at = models.DateTimeField('投稿日時', null=True, blank=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        db_table = 'submission_reaction_stats'
+        verbose_name = 'リアクション集計'
+        verbose_name_plural = 'リアクション集計'
+        indexes = [
+            models.Index(fields=['-tp_score', '-submission_created_at', '-submission'], name='subrxstats_tp_feed_idx'),
+            models.Index(fields=['-reaction_score', '-submission_created_at', '-submission'], name='subrxstats_score_feed_idx'),
+            models.Index(fields=['-hot_score', '-submission_created_at', '-submission'], name='subrxstats_hot_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f'stats for submission {self.submission_id} (tp={self.tp_score})'
+
+
+class RankingScoreBucket(models.Model):
+    """ランキング用のスコアバケット（投稿 × リアクション日 単位、日付はローカル日付）。
+
+    デイリー／週間ランキングは「期間内に投稿された作品に期間内に付いたリアクション」を
+    集計するため、投稿週と同じ週に付いたリアクションのみを保持する（それ以外は累計用の
+    SubmissionReactionStats で扱う）。投稿者・投稿日・投稿週を非正規化して持つので、
+    ランキングは reactions を走査せずこのテーブルの GROUP BY author だけで求まる。
+    """
+
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='ranking_buckets',
+        verbose_name='投稿',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='ranking_buckets',
+        verbose_name='投稿者',
+    )
+    posted_on = models.DateField('投稿日')
+    posted_week = models.DateField('投稿週（月曜）')
+    reacted_on = models.DateField('リアクション日')
+    reacted_week = models.DateField('リアクション週（月曜）')
+    score = models.IntegerField('スコア', default=0)
+
+    class Meta:
+        db_table = 'ranking_score_buckets'
+        verbose_name = 'ランキングスコアバケット'
+        verbose_name_plural = 'ランキングスコアバケット'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['submission', 'reacted_on'],
+                name='uniq_ranking_bucket_submission_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['reacted_on', 'posted_on'], name='rankbucket_day_idx'),
+            models.Index(fields=['reacted_week', 'posted_week'], name='rankbucket_week_idx'),
+            models.Index(fields=['author', 'reacted_on'], name='rankbucket_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'bucket submission {self.submission_id} @ {self.reacted_on}: {self.score}'
+
+
+class SubmissionHashtag(models.Model):
+    """Submission.hashtags の正規化インデックス（公開中＝未削除の投稿のみ）。
+
+    投稿の作成・編集・ソフト削除／復元に合わせて submissions.hashtags で同期する。
+    完全一致検索は tag_lower の B-tree インデックスを使い、投稿日時の降順で並べる。
+    """
+
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='hashtag_index',
+        verbose_name='投稿',
+    )
+    tag = models.CharField('ハッシュタグ', max_length=100)
+    tag_lower = models.CharField('ハッシュタグ（小文字）', max_length=100)
+    created_at = models.DateTimeField('投稿日時')
+
+    class Meta:
+        db_table = 'submission_hashtags'
+        verbose_name = 'ハッシュタグ索引'
+        verbose_name_plural = 'ハッシュタグ索引'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['submission', 'tag_lower'],
+                name='uniq_submission_hashtag_lower',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tag_lower', '-created_at', '-submission'], name='subhashtag_lower_idx'),
+        ]
+
+    def __str__(self):
+        return f'#{self.tag} on submission {self.submission_id}'
+
+
+class HashtagCount(models.Model):
+    """ハッシュタグごとの公開投稿数（人気タグ用のマテリアライズド集計、大文字小文字を区別）。
+
+    部分一致検索はタグの種類数しか行が無いこのテーブルの tag_lower で引く
+    （PostgreSQL ではマイグレーションで pg_trgm の GIN インデックスを張る）。
+    """
+
+    tag = models.CharField('ハッシュタグ', max_length=100, unique=True)
+    tag_lower = models.CharField('ハッシュタグ（小文字）', max_length=100, db_index=True)
+    count = models.IntegerField('投稿数', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        db_table = 'hashtag_counts'
+        verbose_name = 'ハッシュタグ集計'
+        verbose_name_plural = 'ハッシュタグ集計'
+        indexes = [
+            models.Index(fields=['-count'], name='hashtagcount_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'#{self.tag} ({self.count})'
+
+
+class HashtagHourlyBucket(models.Model):
+    """ハッシュタグごと・投稿時刻の1時間ごとの公開投稿数（24時間／7日間の急上昇タグ用のローリングバケット）。
+
+    投稿の作成・編集・ソフト削除／復元で HashtagCount と一緒に増減し、保持期間
+    （HASHTAG_BUCKET_RETENTION_HOURS）を過ぎた行は submissions.trending.rotate で削除する。
+    """
+
+    tag = models.CharField('ハッシュタグ', max_length=100)
+    hour = models.DateTimeField('投稿時刻（1時間単位）')
+    count = models.IntegerField('投稿数', default=0)
+
+    class Meta:
+        db_table = 'hashtag_hourly_buckets'
+        verbose_name = 'ハッシュタグ時間別集計'
+        verbose_name_plural = 'ハッシュタグ時間別集計'
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'hour'], name='uniq_hashtag_hour'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='hashtag_bucket_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f'#{self.tag} {self.hour:%Y-%m-%d %H}:00 ({self.count})'
+
+
+class MediaJob(models.Model):
+    """アップロード後のメディア加工ジョブ（JPEG 最適化・サムネイル・動画ポスター・ゲーム ZIP 展開）。
+
+    アップロードは一度だけ保存し、加工は Celery ワーカー（開発環境ではコミット後にインライン）で行う。
+    result には生成物の URL パス（/uploads/... や /media/...）、timings には工程ごとの所要ミリ秒を入れる。
+    """
+
+    class Kind(models.TextChoices):
+        IMAGE = 'image', '画像'
+        VIDEO = 'video', '動画'
+        GAME = 'game', 'ゲーム'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', '待機中'
+        RUNNING = 'running', '処理中'
+        SUCCEEDED = 'succeeded', '完了'
+        FAILED = 'failed', '失敗'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='media_jobs', verbose_name='ユーザー')
+    kind = models.CharField('種別', max_length=10, choices=Kind.choices)
+    status = models.CharField('状態', max_length=10, choices=Status.choices, default=Status.PENDING)
+    idempotency_key = models.CharField('冪等キー', max_length=100, blank=True, null=True)
+    source_path = models.CharField('アップロード保存先', max_length=500)
+    # 投稿に使われる主ファイルの保存先（投稿作成時にこのパスでジョブと紐付ける）
+    main_path = models.CharField('主ファイル保存先', max_length=500, db_index=True)
+    result = models.JSONField('生成結果', default=dict, blank=True)
+    error = models.TextField('エラー', blank=True)
+    attempts = models.PositiveSmallIntegerField('試行回数', default=0)
+    timings = models.JSONField('工程別所要時間（ms）', default=dict, blank=True)
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    started_at = models.DateTimeField('開始日時', null=True, blank=True)
+    finished_at = models.DateTimeField('終了日時', null=True, blank=True)
+
+    class Meta:
+        db_table = 'media_jobs'
+        verbose_name = 'メディア加工ジョブ'
+        verbose_name_plural = 'メディア加工ジョブ'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='uniq_media_job_idempotency_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='mediajob_status_idx'),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+    def __str__(self):
+        return f'{self.kind} job {self.id} ({self.status})'
+
+
+class ImageVariantManifest(models.Model):
+    """画像1枚分のレスポンシブ用バリアント（幅ラダー × 形式）の一覧。
+
+    source_path は MEDIA_ROOT からの相対パス（投稿の image / image_url が指すファイル）。
+    variants は [{'format': 'webp', 'width': 320, 'height': 240, 'path': '...', 'bytes': 1234}, ...]。
+    """
+    source_path = models.CharField('元画像', max_length=500, unique=True)
+    width = models.PositiveIntegerField('元画像の幅', default=0)
+    height = models.PositiveIntegerField('元画像の高さ', default=0)
+    variants = models.JSONField('バリアント', default=list, blank=True)
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        db_table = 'image_variant_manifests'
+        verbose_name = '画像バリアント'
+        verbose_name_plural = '画像バリアント'
+
+    def __str__(self):
+        return f'{self.source_path} ({len(self.variants)} variants)'
+
+
+class StoredMediaFile(models.Model):
+    """MEDIA_ROOT 配下に保存済みのファイル一覧（メディアカタログ）。
+
+    URL 生成時のファイル存在確認をファイルシステムではなくこの表で行う。
+    保存時に登録し、reconcile_media_catalog コマンドで実ファイルと突き合わせる。
+    """
+    path = models.CharField('パス', max_length=500, unique=True)
+    size = models.BigIntegerField('サイズ', default=0)
+    created_at = models.DateTimeField('登録日時', auto_now_add=True)
+
+    class Meta:
+        db_table = 'stored_media_files'
+        verbose_name = '保存済みメディア'
+        verbose_name_plural = '保存済みメディア'
+
+    def __str__(self):
+        return self.path
@@ -2,13 +2,18 @@
 
 ランキングは「期間内に投稿された作品」に付いたリアクションのみを集計し、
 ユーザー単位で順位を決める（同一ユーザーの重複表示・バッジ不一致を防ぐ）。
+
+集計はリアクション到着時に更新される RankingScoreBucket（投稿 × リアクション日）を
+合算して求める。直近の非空期間もバケットの MAX(日付) 1回で引けるため、
+期間ごとに reactions を走査するループ（旧エンジン・*_scan）は不要になった。
 """
 from __future__ import annotations
 
 from datetime import datetime, timedelta
 
 from django.core.cache import cache
-from django.db.models import Sum
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
 from django.utils import timezone
 
 CACHE_DAILY_KEY = 'reaction_ranking:daily:v2'
@@ -63,10 +68,10 @@ def _author_display_fields(user):
     return anon_id, display_name, url_id
 
 
-def _submission_feed_fields(sub, request=None):
+def _submission_feed_fields(sub, request=None, context=None):
     from submissions.serializers import SubmissionSerializer
 
-    sub_data = SubmissionSerializer(sub, context={'request': request}).data
+    sub_data = SubmissionSerializer(sub, context=context or {'request': request}).data
     display_image_url = sub_data.get('display_image_url') or sub_data.get('image_url') or None
     return {
         'id': str(sub.id),
@@ -117,7 +122,7 @@ def _top_submission_for_user_in_period(user_id, start, end, request=None, restri
 
 
 def _user_ranking_for_period(start, end, limit=10, request=None, restrict_submission_dates=True):
-    """期間内投稿に付いたリアクションをユーザー単位で集計したランキング。"""
+    """期間内投稿に付いたリアクションをユーザー単位で集計したランキング（旧エンジン）。"""
     from users.models import User
 
     rows = (
@@ -159,30 +164,134 @@ def _user_ranking_for_period(start, end, limit=10, request=None, restrict_submis
     return ranking, user_ranks
 
 
-def _all_time_user_ranking(request=None, limit=10):
-    from submissions.models import Reaction
-    from users.models import User
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _local_day(dt):
+    return timezone.localtime(dt).date()
+
+
+def record_reaction_score(reaction, delta):
+    """リアクション1件の追加（delta=1）／削除（delta=-1）をランキングバケットへ反映する。"""
+    from gamification.services import REACTION_POINTS
+    from submissions.models import RankingScoreBucket
+
+    weight = REACTION_POINTS.get(reaction.type, 0) * delta
+    if not weight or reaction.created_at is None:
+        return
+    submission = reaction.submission
+    posted_on = _local_day(submission.created_at)
+    reacted_on = _local_day(reaction.created_at)
+    if _week_start(posted_on) != _week_start(reacted_on):
+        # 投稿週の外で付いたリアクションはデイリー／週間どちらにも数えない
+        return
+
+    bucket = RankingScoreBucket.objects.filter(submission_id=submission.pk, reacted_on=reacted_on)
+    if bucket.update(score=F('score') + weight) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            RankingScoreBucket.objects.create(
+                submission_id=submission.pk,
+                author_id=submission.author_id,
+                posted_on=posted_on,
+                posted_week=_week_start(posted_on),
+                reacted_on=reacted_on,
+                reacted_week=_week_start(reacted_on),
+                score=weight,
+            )
+    except IntegrityError:
+        bucket.update(score=F('score') + weight)
+
+
+def rebuild_ranking_buckets(since=None, batch_size=5000):
+    """reactions からランキングバケットを再構築する（since 以降のリアクション日のみ）。作成件数を返す。"""
+    from django.db.models.functions import TruncDate
+    from submissions.models import Reaction, RankingScoreBucket
+
+    reactions = Reaction.objects.all()
+    buckets = RankingScoreBucket.objects.all()
+    if since is not None:
+        start = timezone.make_aware(datetime.combine(since, datetime.min.time()))
+        reactions = reactions.filter(created_at__gte=start)
+        buckets = buckets.filter(reacted_on__gte=since)
 
     rows = (
-        Reaction.objects.filter(submission__deleted_at__isnull=True)
-        .values('submission__author')
+        reactions.annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('submission_id', 'submission__author_id', 'submission__created_at', 'day')
         .annotate(score=Sum(_reaction_score_case()))
-        .order_by('-score')[:limit]
+        .order_by()
     )
+    new_buckets = []
+    for row in rows.iterator():
+        posted_on = _local_day(row['submission__created_at'])
+        reacted_on = row['day']
+        if not row['score'] or _week_start(posted_on) != _week_start(reacted_on):
+            continue
+        new_buckets.append(RankingScoreBucket(
+            submission_id=row['submission_id'],
+            author_id=row['submission__author_id'],
+            posted_on=posted_on,
+            posted_week=_week_start(posted_on),
+            reacted_on=reacted_on,
+            reacted_week=_week_start(reacted_on),
+            score=row['score'],
+        ))
+
+    with transaction.atomic():
+        buckets.delete()
+        RankingScoreBucket.objects.bulk_create(new_buckets, batch_size=batch_size)
+    return len(new_buckets)
+
+
+def _live_buckets():
+    from submissions.models import RankingScoreBucket
+
+    return RankingScoreBucket.objects.filter(submission__deleted_at__isnull=True, score__gt=0)
+
+
+def _daily_filter(day):
+    return {'posted_on': day, 'reacted_on': day}
+
+
+def _weekly_filter(monday):
+    return {'posted_week': monday, 'reacted_week': monday}
+
+
+def _latest_daily_period(today):
+    """直近 DAILY_LOOKBACK_DAYS 日で、当日投稿に当日リアクションが付いた最新の日。"""
+    earliest = today - timedelta(days=DAILY_LOOKBACK_DAYS - 1)
+    return _live_buckets().filter(
+        posted_on=F('reacted_on'), reacted_on__gte=earliest, reacted_on__lte=today,
+    ).aggregate(day=Max('reacted_on'))['day']
+
+
+def _latest_weekly_period(this_monday):
+    """直近 WEEKLY_LOOKBACK_WEEKS 週で、同週投稿に同週リアクションが付いた最新の週（月曜）。"""
+    earliest = this_monday - timedelta(weeks=WEEKLY_LOOKBACK_WEEKS - 1)
+    return _live_buckets().filter(
+        posted_week=F('reacted_week'), reacted_week__gte=earliest, reacted_week__lte=this_monday,
+    ).aggregate(week=Max('reacted_week'))['week']
+
+
+def _hydrate_ranking(score_rows, top_submission_ids, request=None):
+    """(author_id, score) 行と投稿者ごとのトップ作品IDから、ユーザー・作品を一括取得して整形する。"""
+    from submissions.models import Submission
+    from submissions.serializers import build_feed_context
+    from users.models import User
+
+    users = User.objects.select_related('meta').in_bulk([row[0] for row in score_rows])
+    subs = Submission.objects.select_related('author', 'author__meta').in_bulk(top_submission_ids.values())
+    context = build_feed_context(request, list(subs.values()))
 
     ranking = []
     user_ranks = {}
-    for rank, row in enumerate(rows, start=1):
-        score = row['score'] or 0
-        if score <= 0:
-            continue
-        user_id = row['submission__author']
+    for rank, (user_id, score) in enumerate(score_rows, start=1):
         user_ranks[str(user_id)] = rank
-        try:
-            user = User.objects.select_related('meta').get(id=user_id)
-        except User.DoesNotExist:
+        user = users.get(user_id)
+        if user is None:
             continue
-
         anon_id, display_name, url_id = _author_display_fields(user)
         entry = {
             'userId': user.id,
@@ -192,29 +301,70 @@ def _all_time_user_ranking(request=None, limit=10):
             'displayName': display_name,
             'score': int(score),
         }
-        top_row = (
-            Reaction.objects.filter(
-                submission__author_id=user_id,
-                submission__deleted_at__isnull=True,
-            )
-            .values('submission')
-            .annotate(sub_score=Sum(_reaction_score_case()))
-            .order_by('-sub_score')
-            .first()
-        )
-        if top_row and (top_row['sub_score'] or 0) > 0:
-            from submissions.models import Submission
-
-            try:
-                top_sub = Submission.objects.select_related('author', 'author__meta').get(id=top_row['submission'])
-                entry.update(_submission_feed_fields(top_sub, request=request))
-            except Submission.DoesNotExist:
-                pass
+        top_sub = subs.get(top_submission_ids.get(user_id))
+        if top_sub:
+            entry.update(_submission_feed_fields(top_sub, request=request, context=context))
         ranking.append(entry)
-
     return ranking, user_ranks
 
 
+def _bucket_user_ranking(period_filter, limit=10, request=None):
+    """期間のバケットを投稿者単位で合算したランキング（ユーザー・トップ作品は一括取得）。"""
+    buckets = _live_buckets().filter(**period_filter)
+    score_rows = list(
+        buckets.values('author_id')
+        .annotate(total=Sum('score'))
+        .order_by('-total', 'author_id')
+        .values_list('author_id', 'total')[:limit]
+    )
+    if not score_rows:
+        return [], {}
+
+    # 投稿者ごとのトップ作品（同点は古い作品を優先）
+    top_submission_ids = {}
+    best = {}
+    sub_rows = (
+        buckets.filter(author_id__in=[row[0] for row in score_rows])
+        .values('author_id', 'submission_id')
+        .annotate(total=Sum('score'))
+        .order_by()
+    )
+    for row in sub_rows:
+        key = (row['total'], -row['submission_id'])
+        if row['author_id'] not in best or key > best[row['author_id']]:
+            best[row['author_id']] = key
+            top_submission_ids[row['author_id']] = row['submission_id']
+    return _hydrate_ranking(score_rows, top_submission_ids, request=request)
+
+
+def _all_time_user_ranking(request=None, limit=10):
+    """累計ランキング（投稿ごとの集計行 SubmissionReactionStats を合算。reactions の全件走査はしない）。"""
+    from submissions.models import SubmissionReactionStats
+
+    live_stats = SubmissionReactionStats.objects.filter(
+        submission__deleted_at__isnull=True,
+        reaction_score__gt=0,
+    )
+    score_rows = list(
+        live_stats.values('submission__author')
+        .annotate(total=Sum('reaction_score'))
+        .order_by('-total', 'submission__author')
+        .values_list('submission__author', 'total')[:limit]
+    )
+    if not score_rows:
+        return [], {}
+
+    top_submission_ids = {}
+    top_rows = (
+        live_stats.filter(submission__author__in=[row[0] for row in score_rows])
+        .order_by('-reaction_score', 'submission_id')
+        .values_list('submission__author', 'submission_id')
+    )
+    for author_id, submission_id in top_rows:
+        top_submission_ids.setdefault(author_id, submission_id)
+    return _hydrate_ranking(score_rows, top_submission_ids, request=request)
+
+
 def _build_period_payload(period, period_start, period_end, is_fallback, period_label, ranking, user_ranks):
     return {
         'ranking': ranking,
@@ -229,6 +379,40 @@ def _build_period_payload(period, period_start, period_end, is_fallback, period_
 
 
 def compute_daily_ranking_payload(request=None) -> dict:
+    today = timezone.localdate()
+    day = _latest_daily_period(today)
+    if day is not None:
+        ranking, user_ranks = _bucket_user_ranking(_daily_filter(day), request=request)
+        if ranking:
+            days_ago = (today - day).days
+            return _build_period_payload(
+                'daily', day.isoformat(), day.isoformat(), days_ago > 0,
+                _daily_period_label(days_ago), ranking, user_ranks,
+            )
+
+    ranking, user_ranks = _all_time_user_ranking(request=request)
+    return _build_period_payload('daily', None, None, True, '累計', ranking, user_ranks)
+
+
+def compute_weekly_ranking_payload(request=None) -> dict:
+    today = timezone.localdate()
+    this_monday = _week_start(today)
+    monday = _latest_weekly_period(this_monday)
+    if monday is not None:
+        ranking, user_ranks = _bucket_user_ranking(_weekly_filter(monday), request=request)
+        if ranking:
+            weeks_ago = (this_monday - monday).days // 7
+            return _build_period_payload(
+                'weekly', monday.isoformat(), (monday + timedelta(days=6)).isoformat(),
+                weeks_ago > 0, _weekly_period_label(weeks_ago), ranking, user_ranks,
+            )
+
+    ranking, user_ranks = _all_time_user_ranking(request=request)
+    return _build_period_payload('weekly', None, None, True, '累計', ranking, user_ranks)
+
+
+def compute_daily_ranking_payload_scan(request=None) -> dict:
+    """旧エンジン: 1日ずつ reactions を走査する（ベンチマーク・整合性検証用）。"""
     today = timezone.localdate()
     for days_ago in range(DAILY_LOOKBACK_DAYS):
         day = today - timedelta(days=days_ago)
@@ -244,7 +428,8 @@ def compute_daily_ranking_payload(request=None) -> dict:
     return _build_period_payload('daily', None, None, True, '累計', ranking, user_ranks)
 
 
-def compute_weekly_ranking_payload(request=None) -> dict:
+def compute_weekly_ranking_payload_scan(request=None) -> dict:
+    """旧エンジン: 1週ずつ reactions を走査する（ベンチマーク・整合性検証用）。"""
     today = timezone.localdate()
     this_monday = today - timedelta(days=today.weekday())
     for weeks_ago in range(WEEKLY_LOOKBACK_WEEKS):
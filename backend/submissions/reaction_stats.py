@@ -0,0 +1,169 @@
+"""投稿ごとのリアクション集計（SubmissionReactionStats）の更新・再構築。
+
+カウンタは F() 式で増減するため、同時リアクションでも行ロックは UPDATE 1文分で済む。
+呼び出し側（シグナル）は Reaction 等の INSERT/DELETE と同じトランザクション内で動く。
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from . import hot_scores
+from .models import Reaction, Submission, SubmissionBookmark, SubmissionRepost, SubmissionReactionStats
+
+logger = logging.getLogger(__name__)
+
+# リアクション種別 → カウンタ列名
+REACTION_COUNT_FIELDS = {rtype.value: f'{rtype.value}_count' for rtype in Reaction.Type}
+
+
+def _reaction_weight(reaction_type):
+    from gamification.services import REACTION_POINTS
+
+    return REACTION_POINTS.get(reaction_type, 0)
+
+
+def _apply(submission_id, create_missing=True, **deltas):
+    """集計行へ差分を F() で加算する。行が無ければ生テーブルから作成する。"""
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates:
+        return
+    updated = SubmissionReactionStats.objects.filter(submission_id=submission_id).update(**updates)
+    if updated or not create_missing:
+        return
+    # 未作成（マイグレーション前の投稿など）: 生テーブルには今回の変更が反映済みなので再集計で作る
+    try:
+        with transaction.atomic():
+            rebuild_reaction_stats([submission_id])
+    except IntegrityError:
+        # 並行リクエストが先に作成した場合は差分加算に戻る
+        SubmissionReactionStats.objects.filter(submission_id=submission_id).update(**updates)
+
+
+def record_reaction(submission_id, reaction_type, delta):
+    """リアクション1件の追加（delta=1）／削除（delta=-1）を反映する。"""
+    field = REACTION_COUNT_FIELDS.get(reaction_type)
+    if not field:
+        return
+    weight = _reaction_weight(reaction_type) * delta
+    _apply(
+        submission_id,
+        create_missing=delta > 0,
+        **{field: delta, 'total_reactions': delta, 'reaction_score': weight, 'tp_score': weight},
+    )
+    hot_scores.update(submission_id)
+
+
+def record_repost(submission_id, delta):
+    _apply(submission_id, create_missing=delta > 0, repost_count=delta)
+
+
+def record_bookmark(submission_id, delta):
+    _apply(submission_id, create_missing=delta > 0, bookmark_count=delta)
+
+
+def sync_legacy_likes(submission):
+    """旧いいね（likes_count）の変更を tp_score に反映する。"""
+    SubmissionReactionStats.objects.filter(submission_id=submission.pk).update(
+        tp_score=F('reaction_score') + submission.likes_count * 2,
+    )
+    hot_scores.update(submission.pk)
+
+
+def get_stats(submission_id):
+    """集計行を返す（無ければ作成）。"""
+    stats = SubmissionReactionStats.objects.filter(submission_id=submission_id).first()
+    if stats is None:
+        rebuild_reaction_stats([submission_id])
+        stats = SubmissionReactionStats.objects.get(submission_id=submission_id)
+    return stats
+
+
+def compute_reaction_stats(submission_ids):
+    """生テーブルから集計値を計算する。{submission_id: {field: value}} を返す。"""
+    weights = {rtype: _reaction_weight(rtype) for rtype in REACTION_COUNT_FIELDS}
+    submission_ids = list(submission_ids)
+    result = {
+        sid: {'likes_count': likes or 0, 'submission_created_at': created_at}
+        for sid, likes, created_at in (
+            Submission.objects.filter(id__in=submission_ids).values_list('id', 'likes_count', 'created_at')
+        )
+    }
+    for values in result.values():
+        values.update({field: 0 for field in REACTION_COUNT_FIELDS.values()})
+        values.update(total_reactions=0, reaction_score=0, repost_count=0, bookmark_count=0)
+
+    annotations = {
+        field: Count('id', filter=Q(type=rtype)) for rtype, field in REACTION_COUNT_FIELDS.items()
+    }
+    rows = (
+        Reaction.objects.filter(submission_id__in=submission_ids)
+        .values('submission_id')
+        .annotate(**annotations)
+        .order_by()
+    )
+    for row in rows:
+        values = result.get(row['submission_id'])
+        if values is None:
+            continue
+        for rtype, field in REACTION_COUNT_FIELDS.items():
+            values[field] = row[field]
+            values['total_reactions'] += row[field]
+            values['reaction_score'] += row[field] * weights[rtype]
+
+    for model, field in ((SubmissionRepost, 'repost_count'), (SubmissionBookmark, 'bookmark_count')):
+        rows = (
+            model.objects.filter(submission_id__in=submission_ids)
+            .values('submission_id')
+            .annotate(cnt=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            if row['submission_id'] in result:
+                result[row['submission_id']][field] = row['cnt']
+
+    for values in result.values():
+        likes = values.pop('likes_count')
+        values['tp_score'] = values['reaction_score'] + likes * 2
+        values['hot_score'] = hot_scores.score(hot_scores.points(values, likes), values['submission_created_at'])
+    return result
+
+
+def rebuild_reaction_stats(submission_ids):
+    """指定投稿の集計行を生テーブルから作り直す。作成/更新した行数を返す。"""
+    computed = compute_reaction_stats(submission_ids)
+    if not computed:
+        return 0
+    existing = set(
+        SubmissionReactionStats.objects.filter(submission_id__in=computed.keys()).values_list('submission_id', flat=True)
+    )
+    to_create = []
+    to_update = []
+    for sid, values in computed.items():
+        stats = SubmissionReactionStats(submission_id=sid, **values)
+        (to_update if sid in existing else to_create).append(stats)
+    if to_create:
+        SubmissionReactionStats.objects.bulk_create(to_create)
+    if to_update:
+        fields = [f for f in next(iter(computed.values())).keys()]
+        SubmissionReactionStats.objects.bulk_update(to_update, fields)
+    return len(computed)
+
+
+def verify_reaction_stats(submission_ids):
+    """集計行と生テーブルの差異を返す。[(submission_id, field, stored, expected)]"""
+    computed = compute_reaction_stats(submission_ids)
+    stored = {
+        row['submission_id']: row
+        for row in SubmissionReactionStats.objects.filter(submission_id__in=computed.keys()).values()
+    }
+    mismatches = []
+    for sid, expected in computed.items():
+        row = stored.get(sid)
+        if row is None:
+            mismatches.append((sid, '(missing)', None, None))
+            continue
+        for field, value in expected.items():
+            if row[field] != value:
+                mismatches.append((sid, field, row[field], value))
+    return mismatches
@@ -8,6 +8,93 @@ from users.models import UserMeta
 from django.conf import settings
 
 
+def build_feed_context(request, submissions, anonymous=False):
+    """フィード1ページ分のリアクション集計・閲覧ユーザーの状態を一括取得し、シリアライザ用 context を返す。
+
+    SubmissionSerializer は context にこれらのキーがあれば投稿ごとのクエリを発行しない（N+1解消）。
+    ページサイズに関係なく、リアクション1・リポスト1・ブックマーク1クエリで済む（称号はプロセス内の称号レジストリから解決する）。
+    anonymous=True ではログイン中でも未ログインとして作る（feed_cache の共有する骨格用）。
+    """
+    from django.db.models import Count, Q
+    from .models import SubmissionBookmark, SubmissionRepost
+
+    sub_ids = [s.id for s in submissions]
+    viewer = getattr(request, 'user', None)
+    viewer_id = viewer.pk if viewer is not None and viewer.is_authenticated and not anonymous else None
+
+    reaction_counts = {}  # {submission_id: {rtype: count}}
+    viewer_reactions = set()  # {(submission_id, rtype)}
+    repost_counts = {}  # {submission_id: count}
+    viewer_reposts = set()  # {submission_id}
+    viewer_bookmarks = set()  # {submission_id}
+    image_variants = {}  # {submission_id: ImageVariantManifest}
+
+    if sub_ids:
+        # 種別ごとのカウントと閲覧ユーザーのリアクション有無を1クエリで取得
+        annotations = {'cnt': Count('id')}
+        if viewer_id:
+            annotations['mine'] = Count('id', filter=Q(user_id=viewer_id))
+        rows = (
+            Reaction.objects.filter(submission_id__in=sub_ids)
+            .values('submission_id', 'type')
+            .annotate(**annotations)
+            .order_by()
+        )
+        for row in rows:
+            reaction_counts.setdefault(row['submission_id'], {})[row['type']] = row['cnt']
+            if row.get('mine'):
+                viewer_reactions.add((row['submission_id'], row['type']))
+
+        rows = (
+            SubmissionRepost.objects.filter(submission_id__in=sub_ids)
+            .values('submission_id')
+            .annotate(**annotations)
+            .order_by()
+        )
+        for row in rows:
+            repost_counts[row['submission_id']] = row['cnt']
+            if row.get('mine'):
+                viewer_reposts.add(row['submission_id'])
+
+        if viewer_id:
+            viewer_bookmarks = set(
+                SubmissionBookmark.objects.filter(user_id=viewer_id, submission_id__in=sub_ids)
+                .values_list('submission_id', flat=True)
+            )
+
+        # レスポンシブ画像バリアント（画像投稿のぶんだけ1クエリ）
+        from .image_variants import manifests_for
+        image_variants = manifests_for(submissions)
+
+        # URL 生成時の存在確認に使うメディアカタログ（元画像・サムネイル・派生ファイルを1クエリ）
+        from . import media_catalog
+        media_paths = []
+        for sub in submissions:
+            media_paths.extend(f.name for f in (sub.image, sub.thumbnail) if f)
+            if sub.image_url:
+                media_paths.append(sub.image_url)
+        media_catalog.prefetch(request, media_paths, derivatives=media_catalog.DERIVATIVES)
+
+    return {
+        'request': request,
+        'viewer_id': viewer_id,
+        'reaction_counts': reaction_counts,
+        'viewer_reactions': viewer_reactions,
+        'repost_counts': repost_counts,
+        'viewer_reposts': viewer_reposts,
+        'viewer_bookmarks': viewer_bookmarks,
+        'image_variants': image_variants,
+    }
+
+
+def _get_author_meta(obj):
+    """投稿者の UserMeta（select_related('author__meta') 済みならクエリ無し）。"""
+    try:
+        return obj.author.meta
+    except UserMeta.DoesNotExist:
+        return None
+
+
 class SubmissionSerializer(serializers.ModelSerializer):
     """Submission serializer."""
     author_display_id = serializers.SerializerMethodField()
@@ -42,19 +129,20 @@ class SubmissionSerializer(serializers.ModelSerializer):
     thumbnail = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
     ai_tool_label = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Submission
         fields = [
             'id', 'author', 'author_display_id', 'author_url_id', 'author_avatar_url',
             'image', 'display_image_url', 'image_thumbnail_url', 'thumbnail', 'thumbnail_url',
-            'image_url', 'video_url', 'game_url',
+            'image_variants', 'image_url', 'video_url', 'game_url',
             'title', 'caption', 'hashtags', 'spell', 'ai_tool', 'ai_tool_label', 'comment_enabled', 'status',
             'active_title', 'active_title_image_url', 'title_color',
             'reactions_count', 'user_reacted', 'user_bookmarked', 'all_reactions',
-            'created_at', 'deleted_at'
+            'media_pending', 'created_at', 'deleted_at'
         ]
-        read_only_fields = ['id', 'author', 'created_at', 'deleted_at', 'status']
+        read_only_fields = ['id', 'author', 'media_pending', 'created_at', 'deleted_at', 'status']
     
     def get_ai_tool_label(self, obj):
         from submissions.constants import AI_TOOL_LABELS
@@ -103,6 +191,8 @@ class SubmissionSerializer(serializers.ModelSerializer):
     
     def get_image_thumbnail_url(self, obj):
         """Get thumbnail URL for display lists (games, videos, images)."""
+        if obj.media_pending:
+            return self._get_media_placeholder_url()
         stored = self._get_stored_thumbnail_url(obj, self.context.get('request'))
         if stored:
             return stored
@@ -112,7 +202,7 @@ class SubmissionSerializer(serializers.ModelSerializer):
             from toybox.image_optimizer import get_thumbnail_url
             image_url = self.get_image(obj)
             if image_url:
-                thumbnail_url = get_thumbnail_url(image_url, max_size=300, quality=80)
+                thumbnail_url = get_thumbnail_url(image_url, max_size=300, quality=80, request=self.context.get('request'))
                 if thumbnail_url and thumbnail_url != image_url:
                     return thumbnail_url
         except Exception as e:
@@ -121,14 +211,19 @@ class SubmissionSerializer(serializers.ModelSerializer):
             logger.debug(f'Failed to get image thumbnail URL for submission {obj.id}: {e}')
         return None
     
+    def _get_media_placeholder_url(self):
+        """メディア加工中の投稿に表示するプレースホルダー。"""
+        from submissions.media_jobs import placeholder_url
+        return placeholder_url(self.context.get('request'))
+    
     def _get_stored_thumbnail_url(self, obj, request):
         """Submission.thumbnail (ImageField) の表示用URL。"""
         if not obj.thumbnail:
             return None
-        import os
         from django.conf import settings
+        from submissions import media_catalog
         try:
-            if hasattr(obj.thumbnail, 'path') and not os.path.exists(obj.thumbnail.path):
+            if not media_catalog.exists(obj.thumbnail.name, request):
                 if getattr(settings, 'CLEAN_INVALID_MEDIA_URLS', False):
                     obj.thumbnail = None
                     obj.save(update_fields=['thumbnail'])
@@ -149,11 +244,14 @@ class SubmissionSerializer(serializers.ModelSerializer):
     
     def get_display_image_url(self, obj):
         """Get display image URL (thumbnail for games/videos, then images)."""
-        import os
         from django.conf import settings
         from urllib.parse import urlparse
+        from submissions import media_catalog
         request = self.context.get('request')
         
+        if obj.media_pending:
+            return self._get_media_placeholder_url()
+        
         # 画像投稿: 生成サムネイルを優先
         if not obj.game_url and not obj.video_url and (obj.image or obj.image_url):
             thumbnail_url = self.get_image_thumbnail_url(obj)
@@ -178,9 +276,7 @@ class SubmissionSerializer(serializers.ModelSerializer):
                 
                 # /uploads/submissions/ から始まる場合、ファイルの存在確認
                 if file_path.startswith('/uploads/submissions/'):
-                    filename = file_path.replace('/uploads/submissions/', '')
-                    full_path = settings.MEDIA_ROOT / 'submissions' / filename
-                    if not full_path.exists():
+                    if not media_catalog.exists(file_path, request):
                         # ファイルが存在しない場合はNoneを返す（DBクリアはオプション）
                         if getattr(settings, 'CLEAN_INVALID_MEDIA_URLS', False):
                             obj.image_url = None
@@ -199,14 +295,13 @@ class SubmissionSerializer(serializers.ModelSerializer):
         # imageフィールドを使用
         if obj.image:
             try:
-                # ファイルの存在確認
-                if hasattr(obj.image, 'path'):
-                    if not os.path.exists(obj.image.path):
-                        # ファイルが存在しない場合はNoneを返す（DBクリアはオプション）
-                        if getattr(settings, 'CLEAN_INVALID_MEDIA_URLS', False):
-                            obj.image = None
-                            obj.save(update_fields=['image'])
-                        return None
+                # ファイルの存在確認（メディアカタログ）
+                if not media_catalog.exists(obj.image.name, request):
+                    # ファイルが存在しない場合はNoneを返す（DBクリアはオプション）
+                    if getattr(settings, 'CLEAN_INVALID_MEDIA_URLS', False):
+                        obj.image = None
+                        obj.save(update_fields=['image'])
+                    return None
                 
                 if request:
                     from toybox.image_utils import build_https_absolute_uri
@@ -256,21 +351,13 @@ class SubmissionSerializer(serializers.ModelSerializer):
     
     def get_active_title(self, obj):
         """Get author's active title (v2.0: 有効期限チェック廃止)."""
-        try:
-            meta = UserMeta.objects.get(user=obj.author)
-            return meta.active_title
-        except UserMeta.DoesNotExist:
-            pass
-        return None
+        meta = _get_author_meta(obj)
+        return meta.active_title if meta else None
     
     def get_title_color(self, obj):
         """Get author's title color (v2.0: 有効期限チェック廃止)."""
-        try:
-            meta = UserMeta.objects.get(user=obj.author)
-            return meta.title_color
-        except UserMeta.DoesNotExist:
-            pass
-        return None
+        meta = _get_author_meta(obj)
+        return meta.title_color if meta else None
     
     def get_active_title_image_url(self, obj):
         """Get author's active title image URL.
@@ -278,56 +365,49 @@ class SubmissionSerializer(serializers.ModelSerializer):
         v2.0: 実際に画像が設定されている場合のみURLを返す。
         未設定の場合は None を返し、フロントエンドでテキスト称号バッジを表示する。
         """
+        meta = _get_author_meta(obj)
+        if not meta or not meta.active_title:
+            return None
         try:
-            meta = UserMeta.objects.get(user=obj.author)
-            if not meta.active_title:
-                return None
-            try:
-                from gamification.models import Title
-                from toybox.image_utils import build_https_absolute_uri
-                request = self.context.get('request')
-                title_obj = Title.objects.filter(name=meta.active_title).first()
-                if not title_obj:
-                    return None
-                # ImageField に実ファイルが設定されている場合のみ返す
-                if title_obj.image and title_obj.image.name:
-                    try:
-                        image_url = title_obj.image.url
-                        if request:
-                            return build_https_absolute_uri(request, image_url)
-                        return image_url
-                    except Exception:
-                        pass
-                # image_url フィールドが設定されている場合（フォールバックパスは除外）
-                if title_obj.image_url:
-                    fallback = '/static/frontend/hero/toybox-title.png'
-                    if title_obj.image_url == fallback or title_obj.image_url.endswith('toybox-title.png'):
-                        return None
-                    return title_obj.image_url
-                return None
-            except Exception as e:
-                import logging
-                logging.getLogger(__name__).warning(f'Failed to get title image for {meta.active_title}: {e}')
-                return None
-        except UserMeta.DoesNotExist:
-            pass
-        return None
+            from gamification.title_registry import badge_image_url
+            return badge_image_url(meta.active_title, self.context.get('request'))
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning(f'Failed to get title image for {meta.active_title}: {e}')
+            return None
     
     def get_reactions_count(self, obj):
         """Get total reactions count (いいね！のみ / 後方互換)."""
+        if 'reaction_counts' in self.context:
+            return self.context['reaction_counts'].get(obj.id, {}).get(Reaction.Type.SUBMIT_MEDAL.value, 0)
         if hasattr(obj, 'reactions_count'):
             return obj.reactions_count
         return obj.reactions.filter(type=Reaction.Type.SUBMIT_MEDAL).count()
     
     def get_user_reacted(self, obj):
         """Check if current user has reacted with いいね (後方互換)."""
+        if 'viewer_reactions' in self.context:
+            return (obj.id, Reaction.Type.SUBMIT_MEDAL.value) in self.context['viewer_reactions']
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.reactions.filter(user=request.user, type=Reaction.Type.SUBMIT_MEDAL).exists()
         return False
     
+    def get_image_variants(self, obj):
+        """レスポンシブ画像バリアント（srcset）。加工中・未生成なら None。"""
+        from .image_variants import manifests_for, variant_payload
+        if obj.media_pending:
+            return None
+        if 'image_variants' in self.context:
+            manifest = self.context['image_variants'].get(obj.id)
+        else:
+            manifest = manifests_for([obj]).get(obj.id)
+        return variant_payload(manifest, self.context.get('request'))
+    
     def get_user_bookmarked(self, obj):
         """Check if current user has bookmarked this submission."""
+        if 'viewer_bookmarks' in self.context:
+            return obj.id in self.context['viewer_bookmarks']
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             from .models import SubmissionBookmark
@@ -336,6 +416,21 @@ class SubmissionSerializer(serializers.ModelSerializer):
 
     def get_all_reactions(self, obj):
         """Get all reaction counts and current user's reactions per type."""
+        if 'reaction_counts' in self.context:
+            # build_feed_context による一括取得結果から構築
+            sub_counts = self.context['reaction_counts'].get(obj.id, {})
+            viewer_reactions = self.context.get('viewer_reactions', set())
+            return [
+                {
+                    'type': rtype.value,
+                    'label': rtype.label,
+                    'emoji': Reaction.EMOJI_MAP.get(rtype.value, '👍'),
+                    'count': sub_counts.get(rtype.value, 0),
+                    'user_reacted': (obj.id, rtype.value) in viewer_reactions,
+                }
+                for rtype in Reaction.Type
+            ]
+
         request = self.context.get('request')
         current_user = request.user if request and request.user.is_authenticated else None
         
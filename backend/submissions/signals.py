@@ -0,0 +1,171 @@
+"""
+Submissions app signals: keep SubmissionReactionStats, the ranking buckets,
+the hashtag index, the follower timelines (posts), the per-user counters
+(posts and reactions) and the daily activity rows in sync with the raw
+tables, and bump the public feed cache generation.
+"""
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Submission, Reaction, SubmissionRepost, SubmissionBookmark, SubmissionReactionStats
+from . import feed_cache, hashtags, hot_scores, media_catalog, media_jobs, reaction_stats, timelines
+from .ranking_service import record_reaction_score
+from users import counters as user_counters
+from users import daily_activity
+
+
+@receiver(post_save, sender=Submission)
+def init_reaction_stats(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """新規投稿に集計行を作成し、旧いいね数の変更を tp_score / hot_score に反映する。"""
+    if raw:
+        return
+    if created:
+        SubmissionReactionStats.objects.get_or_create(
+            submission=instance,
+            defaults={
+                'tp_score': (instance.likes_count or 0) * 2,
+                'hot_score': hot_scores.score(hot_scores.points({}, instance.likes_count), instance.created_at),
+                'submission_created_at': instance.created_at,
+            },
+        )
+    elif update_fields is None or 'likes_count' in update_fields:
+        reaction_stats.sync_legacy_likes(instance)
+
+
+@receiver(post_save, sender=Submission)
+def sync_hashtag_index(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """作成・編集・ソフト削除／復元でハッシュタグ索引とタグ集計を同期する。"""
+    if raw:
+        return
+    if created or update_fields is None or {'hashtags', 'deleted_at'} & set(update_fields):
+        hashtags.sync_submission_hashtags(instance)
+
+
+@receiver(post_save, sender=Submission)
+def link_media_job(sender, instance, created, raw=False, **kwargs):
+    """新規投稿の主ファイルを生成中のメディアジョブと紐付ける。"""
+    if created and not raw:
+        media_jobs.link_submission(instance)
+
+
+@receiver(post_save, sender=Submission)
+def register_submission_media(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """ImageField で保存された画像・サムネイルをメディアカタログに登録する。"""
+    if raw:
+        return
+    if created or (update_fields is not None and {'image', 'thumbnail'} & set(update_fields)):
+        files = [f.name for f in (instance.image, instance.thumbnail) if f]
+        if files:
+            media_catalog.register(*files)
+
+
+@receiver(post_save, sender=Submission)
+def fan_out_timelines(sender, instance, created, raw=False, **kwargs):
+    """新規投稿・ソフト削除／復元をフォロワーのタイムラインに反映する。"""
+    if raw:
+        return
+    if created or getattr(instance, '_visibility_changed', False):
+        timelines.enqueue_submission(instance.pk)
+
+
+@receiver(pre_save, sender=Submission)
+def remember_visibility(sender, instance, raw=False, update_fields=None, **kwargs):
+    """この保存がソフト削除／復元か（公開状態が変わるか）を記録する。post_save の各レシーバーは読むだけにする。"""
+    if raw:
+        return
+    instance._visibility_changed = False
+    if not instance.pk:
+        return
+    if update_fields is None or 'deleted_at' in update_fields:
+        was_live = Submission.objects.filter(pk=instance.pk, deleted_at__isnull=True).exists()
+        instance._visibility_changed = was_live != (instance.deleted_at is None)
+
+
+@receiver(post_save, sender=Submission)
+def bump_feed_generation(sender, instance, created, raw=False, **kwargs):
+    """公開中の投稿の追加・ソフト削除・復元でキャッシュ済みの公開フィードを無効にする。"""
+    if raw:
+        return
+    if (created and instance.deleted_at is None) or getattr(instance, '_visibility_changed', False):
+        feed_cache.bump_generation_on_commit()
+
+
+@receiver(post_save, sender=Submission)
+def count_posts(sender, instance, created, raw=False, **kwargs):
+    """投稿・ソフト削除・復元を投稿者のカウンタ（投稿数・もらったリアクション）と投稿日の日別アクティビティに反映する。"""
+    if raw:
+        return
+    is_live = instance.deleted_at is None
+    if created:
+        if is_live:
+            user_counters.record_post(instance.author_id, 1)
+            daily_activity.record_post(instance, 1)
+        return
+    if not getattr(instance, '_visibility_changed', False):
+        return
+    stats = SubmissionReactionStats.objects.filter(submission_id=instance.pk).values('total_reactions', 'reaction_score').first()
+    sign = 1 if is_live else -1
+    daily_activity.record_post(instance, sign)
+    user_counters.record_post(
+        instance.author_id,
+        sign,
+        reactions=sign * (stats['total_reactions'] if stats else 0),
+        reaction_score=sign * (stats['reaction_score'] if stats else 0),
+    )
+
+
+@receiver(post_delete, sender=Submission)
+def uncount_post(sender, instance, **kwargs):
+    # もらったリアクションは CASCADE で先に削除される Reaction ごとに減算済み
+    if instance.deleted_at is None:
+        user_counters.record_post(instance.author_id, -1)
+        daily_activity.record_post(instance, -1)
+        feed_cache.bump_generation_on_commit()
+
+
+@receiver(pre_delete, sender=Submission)
+def drop_hashtag_index(sender, instance, **kwargs):
+    hashtags.remove_submission_hashtags(instance)
+
+
+@receiver(post_save, sender=Reaction)
+def reaction_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        reaction_stats.record_reaction(instance.submission_id, instance.type, 1)
+        record_reaction_score(instance, 1)
+        _count_received_reaction(instance, 1)
+
+
+@receiver(post_delete, sender=Reaction)
+def reaction_removed(sender, instance, **kwargs):
+    reaction_stats.record_reaction(instance.submission_id, instance.type, -1)
+    record_reaction_score(instance, -1)
+    _count_received_reaction(instance, -1)
+
+
+def _count_received_reaction(reaction, delta):
+    """公開中の投稿へのリアクションだけを投稿者のカウンタに反映する（削除済み投稿の分はソフト削除時に差し引き済み）。"""
+    submission = reaction.submission
+    if submission.deleted_at is None:
+        user_counters.record_reaction(submission.author_id, reaction.type, delta)
+
+
+@receiver(post_save, sender=SubmissionRepost)
+def repost_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        reaction_stats.record_repost(instance.submission_id, 1)
+
+
+@receiver(post_delete, sender=SubmissionRepost)
+def repost_removed(sender, instance, **kwargs):
+    reaction_stats.record_repost(instance.submission_id, -1)
+
+
+@receiver(post_save, sender=SubmissionBookmark)
+def bookmark_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        reaction_stats.record_bookmark(instance.submission_id, 1)
+
+
+@receiver(post_delete, sender=SubmissionBookmark)
+def bookmark_removed(sender, instance, **kwargs):
+    reaction_stats.record_bookmark(instance.submission_id, -1)
@@ -14,3 +14,60 @@ def refresh_reaction_rankings_hourly():
     result = refresh_ranking_cache()
     logger.info('refresh_reaction_rankings_hourly: %s', result)
     return result
+
+
+@shared_task
+def rotate_hashtag_buckets():
+    """保持期間を過ぎたハッシュタグの時間別バケットを削除し、24時間／7日間の急上昇タグを作り直す。"""
+    from submissions.trending import rotate
+
+    result = rotate()
+    logger.info('rotate_hashtag_buckets: %s', result)
+    return result
+
+
+@shared_task
+def refresh_hot_scores():
+    """直近の投稿のホットスコアを再計算し、重み・半減期の設定変更やズレを反映する。"""
+    from submissions.hot_scores import refresh
+
+    result = refresh()
+    logger.info('refresh_hot_scores: %s', result)
+    return result
+
+
+@shared_task(bind=True, acks_late=True)
+def process_media_job(self, job_id):
+    """アップロード後のメディア加工（MediaJob）。失敗時は指数バックオフで再試行する。"""
+    from submissions.media_jobs import max_attempts, run_media_job
+
+    try:
+        job = run_media_job(job_id)
+    except Exception as exc:
+        # run_media_job は試行回数が尽きると失敗で確定して戻るので、ここに来るのは再試行可能な場合のみ
+        raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries, max_retries=max_attempts())
+    return job.status if job else None
+
+
+@shared_task
+def generate_media_derivative(path, kind):
+    """URL 生成時に見つからなかった派生ファイル（サムネイル・最適化画像）を生成してカタログに登録する。"""
+    from submissions.media_catalog import generate_derivative
+
+    return generate_derivative(path, kind)
+
+
+@shared_task
+def sync_submission_timelines(submission_id):
+    """投稿の公開／削除をフォロワーのタイムラインに反映する（ファンアウト）。"""
+    from submissions.timelines import sync_submission
+
+    sync_submission(submission_id)
+
+
+@shared_task
+def sync_follow_timeline(follower_id, followee_id):
+    """フォロー／フォロー解除に合わせてフォロワーのタイムラインを補充・削除する。"""
+    from submissions.timelines import sync_follow
+
+    sync_follow(follower_id, followee_id)
@@ -0,0 +1,316 @@
+"""フォロー中フィードのタイムライン（書き込み時ファンアウト）。
+
+投稿時にフォロワーごとの上限付きソート済み集合（Redis の ZSET、スコアは投稿日時のマイクロ秒）へ
+投稿 ID を追加しておき、フォロー中フィードは範囲読み1回 + 投稿の一括取得1回で返す。
+
+- タイムラインは初回の読み込み時に DB から作る（TIMELINE_TTL 読まれなければ消える）。
+  ファンアウトは既に作られているタイムラインにだけ追加する。
+- フォロー数が TIMELINE_PULL_THRESHOLD を超えるユーザー、上限より古いページ、
+  バックエンド障害時は従来どおり DB から取得する（フォールバック）。
+- フォロー／フォロー解除で相手の投稿を追加／削除し、ソフト削除・復元でも削除／追加する。
+  どの更新も現在の DB の状態から決めるので、重複して実行されても結果は同じ。
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Submission
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# 同じスコア（同一マイクロ秒）の投稿を取りこぼさないよう多めに読む件数
+_TIE_MARGIN = 16
+
+
+def to_score(created_at):
+    delta = created_at - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_score(score):
+    return _EPOCH + timedelta(microseconds=int(score))
+
+
+def max_length():
+    return getattr(settings, 'TIMELINE_MAX_LENGTH', 800)
+
+
+def pull_threshold():
+    return getattr(settings, 'TIMELINE_PULL_THRESHOLD', 500)
+
+
+# ---------------------------------------------------------------------------
+# バックエンド
+# ---------------------------------------------------------------------------
+
+class MemoryTimelineBackend:
+    """プロセス内のタイムライン（開発・テスト用）。"""
+
+    def __init__(self):
+        self._timelines = {}
+        self._lock = threading.Lock()
+
+    def exists(self, user_id):
+        return user_id in self._timelines
+
+    def size(self, user_id):
+        return len(self._timelines.get(user_id, ()))
+
+    def replace(self, user_id, entries):
+        with self._lock:
+            self._timelines[user_id] = dict(entries)
+            self._trim(user_id)
+
+    def add(self, user_ids, entries):
+        with self._lock:
+            for user_id in user_ids:
+                timeline = self._timelines.get(user_id)
+                if timeline is None:
+                    continue
+                timeline.update(entries)
+                self._trim(user_id)
+
+    def remove(self, user_ids, submission_ids):
+        with self._lock:
+            for user_id in user_ids:
+                timeline = self._timelines.get(user_id)
+                for sid in submission_ids if timeline is not None else ():
+                    timeline.pop(sid, None)
+
+    def clear(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._timelines.pop(user_id, None)
+
+    def page(self, user_id, max_score, count):
+        timeline = self._timelines.get(user_id, {})
+        rows = [(sid, score) for sid, score in timeline.items() if max_score is None or score <= max_score]
+        rows.sort(key=lambda r: (r[1], r[0]), reverse=True)
+        return rows[:count]
+
+    def _trim(self, user_id):
+        timeline = self._timelines[user_id]
+        overflow = len(timeline) - max_length()
+        if overflow > 0:
+            for sid, _ in sorted(timeline.items(), key=lambda r: (r[1], r[0]))[:overflow]:
+                del timeline[sid]
+
+
+class RedisTimelineBackend:
+    """Redis の ZSET によるタイムライン。キー: timeline:{user_id}（構築済みの印: timeline:{user_id}:built）。"""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _key(user_id):
+        return f'timeline:{user_id}'
+
+    @staticmethod
+    def _built_key(user_id):
+        return f'timeline:{user_id}:built'
+
+    def _ttl(self):
+        return getattr(settings, 'TIMELINE_TTL', 7 * 24 * 3600)
+
+    def exists(self, user_id):
+        return bool(self.client.exists(self._built_key(user_id)))
+
+    def size(self, user_id):
+        return self.client.zcard(self._key(user_id))
+
+    def replace(self, user_id, entries):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if entries:
+            pipe.zadd(key, {str(sid): score for sid, score in entries})
+            pipe.zremrangebyrank(key, 0, -(max_length() + 1))
+            pipe.expire(key, self._ttl())
+        pipe.set(self._built_key(user_id), 1, ex=self._ttl())
+        pipe.execute()
+
+    def add(self, user_ids, entries):
+        user_ids = list(user_ids)
+        pipe = self.client.pipeline()
+        for user_id in user_ids:
+            pipe.exists(self._built_key(user_id))
+        built = [uid for uid, ok in zip(user_ids, pipe.execute()) if ok]
+        if not built:
+            return
+        mapping = {str(sid): score for sid, score in entries}
+        pipe = self.client.pipeline()
+        for user_id in built:
+            key = self._key(user_id)
+            pipe.zadd(key, mapping)
+            pipe.zremrangebyrank(key, 0, -(max_length() + 1))
+            pipe.expire(key, self._ttl())
+        pipe.execute()
+
+    def remove(self, user_ids, submission_ids):
+        members = [str(sid) for sid in submission_ids]
+        if not members:
+            return
+        pipe = self.client.pipeline()
+        for user_id in user_ids:
+            pipe.zrem(self._key(user_id), *members)
+        pipe.execute()
+
+    def clear(self, user_ids):
+        keys = [k for uid in user_ids for k in (self._key(uid), self._built_key(uid))]
+        if keys:
+            self.client.delete(*keys)
+
+    def page(self, user_id, max_score, count):
+        rows = self.client.zrevrangebyscore(
+            self._key(user_id), '+inf' if max_score is None else max_score, '-inf',
+            start=0, num=count, withscores=True,
+        )
+        rows = [(int(member), int(score)) for member, score in rows]
+        rows.sort(key=lambda r: (r[1], r[0]), reverse=True)
+        return rows
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """TIMELINE_BACKEND（'redis' / 'memory' / 空で無効）に応じたバックエンド。無効なら None。"""
+    global _backend
+    name = getattr(settings, 'TIMELINE_BACKEND', '')
+    if not name:
+        return None
+    with _backend_lock:
+        if _backend is None or getattr(_backend, 'name', None) != name:
+            if name == 'memory':
+                _backend = MemoryTimelineBackend()
+            else:
+                _backend = RedisTimelineBackend(getattr(settings, 'TIMELINE_REDIS_URL', 'redis://localhost:6379/2'))
+            _backend.name = name
+        return _backend
+
+
+def reset_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+# ---------------------------------------------------------------------------
+# 読み込み
+# ---------------------------------------------------------------------------
+
+def _recent_entries(author_ids, limit):
+    rows = (
+        Submission.objects.filter(author_id__in=author_ids, deleted_at__isnull=True)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:limit]
+    )
+    return [(sid, to_score(created_at)) for sid, created_at in rows]
+
+
+def read_page(user_id, author_ids, after=None, limit=6):
+    """タイムラインから1ページ分の投稿 ID を読む。
+
+    after: 前ページ最後の (created_at, id)。(ids, next_after) を返す。
+    タイムラインで返せない場合（無効・フォロー数過多・上限より古いページ・障害）は None を返すので、
+    呼び出し側は DB から取得する。
+    """
+    backend = get_backend()
+    if backend is None or len(author_ids) > pull_threshold() + 1:
+        return None
+    try:
+        if not backend.exists(user_id):
+            backend.replace(user_id, _recent_entries(author_ids, max_length()))
+        max_score = to_score(after[0]) if after else None
+        rows = backend.page(user_id, max_score, limit + 1 + _TIE_MARGIN)
+        if after:
+            rows = [r for r in rows if (r[1], r[0]) < (max_score, after[1])]
+        if len(rows) <= limit and backend.size(user_id) >= max_length():
+            # 上限で切り捨てた範囲に入った
+            return None
+    except Exception as e:
+        logger.warning(f'[Timeline] read failed for user {user_id}, falling back to DB: {e}')
+        return None
+    rows = rows[:limit + 1]
+    page = rows[:limit]
+    next_after = (from_score(page[-1][1]), page[-1][0]) if len(rows) > limit else None
+    return [sid for sid, _ in page], next_after
+
+
+def hydrate(ids):
+    """ID の順に投稿を1クエリで取得する（削除済みは除く）。"""
+    by_id = Submission.objects.filter(id__in=ids, deleted_at__isnull=True).select_related('author', 'author__meta').in_bulk()
+    return [by_id[sid] for sid in ids if sid in by_id]
+
+
+# ---------------------------------------------------------------------------
+# 更新（ファンアウト）
+# ---------------------------------------------------------------------------
+
+def _audience(author_id):
+    from users.models import UserFollow
+
+    return [author_id] + list(UserFollow.objects.filter(following_id=author_id).values_list('follower_id', flat=True))
+
+
+def sync_submission(submission_id):
+    """投稿の現在の状態（公開中／削除済み）を投稿者とフォロワーのタイムラインに反映する。"""
+    backend = get_backend()
+    if backend is None:
+        return
+    row = Submission.objects.filter(id=submission_id).values('author_id', 'created_at', 'deleted_at').first()
+    if row is None:
+        return
+    audience = _audience(row['author_id'])
+    if row['deleted_at'] is None:
+        backend.add(audience, [(submission_id, to_score(row['created_at']))])
+    else:
+        backend.remove(audience, [submission_id])
+
+
+def sync_follow(follower_id, followee_id):
+    """フォロー関係の現在の状態に合わせて、フォロワーのタイムラインに相手の投稿を追加（backfill）／削除（prune）する。"""
+    from users.models import UserFollow
+
+    backend = get_backend()
+    if backend is None or not backend.exists(follower_id):
+        return
+    entries = _recent_entries([followee_id], max_length())
+    if UserFollow.objects.filter(follower_id=follower_id, following_id=followee_id).exists():
+        backend.add([follower_id], entries)
+    else:
+        backend.remove([follower_id], [sid for sid, _ in entries])
+
+
+def _dispatch(func, task_name, *args):
+    """コミット後に func を実行する（TIMELINE_FANOUT_MODE が 'celery' ならワーカーのタスク task_name で）。"""
+    def _run():
+        try:
+            if getattr(settings, 'TIMELINE_FANOUT_MODE', 'celery') != 'inline':
+                from submissions import tasks
+                getattr(tasks, task_name).delay(*args)
+                return
+        except Exception as e:
+            logger.warning(f'[Timeline] enqueue {task_name} failed, running inline: {e}')
+        try:
+            func(*args)
+        except Exception as e:
+            logger.warning(f'[Timeline] {task_name}{args} failed: {e}')
+
+    transaction.on_commit(_run)
+
+
+def enqueue_submission(submission_id):
+    _dispatch(sync_submission, 'sync_submission_timelines', submission_id)
+
+
+def enqueue_follow(follower_id, followee_id):
+    _dispatch(sync_follow, 'sync_follow_timeline', follower_id, followee_id)
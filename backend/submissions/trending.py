@@ -0,0 +1,161 @@
+"""急上昇ハッシュタグ（24時間／7日間）と通算の人気タグ。
+
+- 投稿の作成・編集・ソフト削除／復元で、投稿時刻の1時間ごとのバケット（HashtagHourlyBucket）を
+  HashtagCount と一緒に F() で増減する（submissions.hashtags から呼ばれる）。
+- 期間ごとのスコアはバケットの投稿数に半減期 HASHTAG_TREND_HALF_LIFE_HOURS の指数減衰を掛けた合計で、
+  同じ期間の投稿数も一緒に返す。上位 HASHTAG_TREND_TOP 件をスコア順に並べたリストを共有キャッシュに置き、
+  /api/hashtags/?window=24h|7d はそれを切り出すだけにする。
+- Celery Beat（rotate_hashtag_buckets）が保持期間を過ぎたバケットを消し、リストを作り直す。
+  キャッシュに無いとき（ワーカー停止中など）は読み込み時に作る。
+- window=all は従来どおり HashtagCount（件数の降順インデックス）から返す。
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import HashtagHourlyBucket, SubmissionHashtag
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = {'24h': 24, '7d': 24 * 7}
+ALL = 'all'
+
+_RANKING_KEY = 'trending_hashtags:{window}'
+
+
+def half_life_hours():
+    return getattr(settings, 'HASHTAG_TREND_HALF_LIFE_HOURS', 24)
+
+
+def retention_hours():
+    # 7日間の窓は現在の時間帯を含めて 24*7 個のバケットにまたがる
+    return getattr(settings, 'HASHTAG_BUCKET_RETENTION_HOURS', max(WINDOWS.values()) + 1)
+
+
+def top_size():
+    return getattr(settings, 'HASHTAG_TREND_TOP', 200)
+
+
+def hour_of(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+# ---------------------------------------------------------------------------
+# 更新
+# ---------------------------------------------------------------------------
+
+def record(tag, posted_at, delta):
+    """投稿時刻の1時間バケットにタグの投稿数の差分を加える（保持期間より古い投稿は対象外）。"""
+    if not delta or posted_at is None:
+        return
+    hour = hour_of(posted_at)
+    if hour < hour_of(timezone.now()) - timedelta(hours=retention_hours() - 1):
+        return
+    updated = HashtagHourlyBucket.objects.filter(tag=tag, hour=hour).update(count=F('count') + delta)
+    if updated or delta < 0:
+        if delta < 0:
+            HashtagHourlyBucket.objects.filter(tag=tag, hour=hour, count__lte=0).delete()
+        return
+    try:
+        with transaction.atomic():
+            HashtagHourlyBucket.objects.create(tag=tag, hour=hour, count=delta)
+    except IntegrityError:
+        HashtagHourlyBucket.objects.filter(tag=tag, hour=hour).update(count=F('count') + delta)
+
+
+def rebuild_buckets(now=None, batch_size=1000):
+    """保持期間内のバケットを索引（SubmissionHashtag）から作り直す。バケット数を返す。"""
+    now = now or timezone.now()
+    since = hour_of(now) - timedelta(hours=retention_hours() - 1)
+    counts = {}
+    rows = SubmissionHashtag.objects.filter(created_at__gte=since).values_list('tag', 'created_at')
+    for tag, created_at in rows.iterator(chunk_size=batch_size * 10):
+        key = (tag, hour_of(created_at))
+        counts[key] = counts.get(key, 0) + 1
+    with transaction.atomic():
+        HashtagHourlyBucket.objects.all().delete()
+        HashtagHourlyBucket.objects.bulk_create(
+            [HashtagHourlyBucket(tag=tag, hour=hour, count=cnt) for (tag, hour), cnt in counts.items()],
+            batch_size=batch_size,
+        )
+    return len(counts)
+
+
+# ---------------------------------------------------------------------------
+# 集計
+# ---------------------------------------------------------------------------
+
+def compute(window, now=None, limit=None):
+    """期間内のバケットから [(tag, count, score)] をスコアの降順で返す。"""
+    hours = WINDOWS[window]
+    now = now or timezone.now()
+    current = hour_of(now)
+    cutoff = current - timedelta(hours=hours - 1)
+    half_life = half_life_hours() * 3600.0
+
+    counts = {}
+    scores = {}
+    weights = {}
+    rows = HashtagHourlyBucket.objects.filter(hour__gte=cutoff, count__gt=0).values_list('tag', 'hour', 'count')
+    for tag, hour, count in rows.iterator(chunk_size=10000):
+        weight = weights.get(hour)
+        if weight is None:
+            # バケットの中央の時刻からの経過で減衰させる（現在の時間帯は経過した分だけ）
+            age = max(0.0, (now - hour).total_seconds() - 1800.0)
+            weight = weights[hour] = 0.5 ** (age / half_life)
+        counts[tag] = counts.get(tag, 0) + count
+        scores[tag] = scores.get(tag, 0.0) + count * weight
+
+    ranking = sorted(scores, key=lambda tag: (-scores[tag], -counts[tag], tag))
+    if limit is not None:
+        ranking = ranking[:limit]
+    return [(tag, counts[tag], round(scores[tag], 3)) for tag in ranking]
+
+
+def refresh(now=None):
+    """各期間の上位リストを作り直して共有キャッシュに置く。{window: 件数} を返す。"""
+    result = {}
+    for window in WINDOWS:
+        ranking = compute(window, now=now, limit=top_size())
+        try:
+            cache.set(_RANKING_KEY.format(window=window), ranking, getattr(settings, 'HASHTAG_TREND_CACHE_TTL', 900))
+        except Exception as e:
+            logger.warning(f'[Trending] storing {window} ranking failed: {e}')
+        result[window] = len(ranking)
+    return result
+
+
+def rotate(now=None):
+    """保持期間を過ぎたバケットを削除し、上位リストを作り直す（Celery Beat から）。"""
+    now = now or timezone.now()
+    cutoff = hour_of(now) - timedelta(hours=retention_hours() - 1)
+    deleted, _ = HashtagHourlyBucket.objects.filter(hour__lt=cutoff).delete()
+    result = refresh(now=now)
+    result['deleted_buckets'] = deleted
+    return result
+
+
+# ---------------------------------------------------------------------------
+# 参照
+# ---------------------------------------------------------------------------
+
+def trending_hashtags(window, limit=20):
+    """期間の急上昇タグ [(tag, count, score)]（上位リストから切り出す。無ければ作る）。"""
+    key = _RANKING_KEY.format(window=window)
+    try:
+        ranking = cache.get(key)
+    except Exception as e:
+        logger.warning(f'[Trending] reading {window} ranking failed: {e}')
+        ranking = None
+    if ranking is None:
+        ranking = compute(window, limit=top_size())
+        try:
+            cache.set(key, ranking, getattr(settings, 'HASHTAG_TREND_CACHE_TTL', 900))
+        except Exception:
+            pass
+    return ranking[:limit]
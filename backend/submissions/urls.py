@@ -18,6 +18,8 @@ urlpatterns = [
     path('submit/uploadGame', views.SubmitGameUploadView.as_view(), name='submit-upload-game'),
     # Trailing-slash variant
     path('submit/uploadGame/', views.SubmitGameUploadView.as_view(), name='submit-upload-game-slash'),
+    # Media processing job status (poll after upload)
+    path('media-jobs/<uuid:job_id>/', views.MediaJobStatusView.as_view(), name='media-job-status'),
     # Submit endpoint (compatible with Next.js - returns rewards)
     path('submit/', views.SubmitView.as_view(), name='submit'),
     # No-trailing-slash variant (avoid 301 on POST from some clients)
@@ -26,6 +28,8 @@ urlpatterns = [
     path('feed/popular/', views.PopularFeedView.as_view(), name='feed-popular'),
     # Hashtags endpoint (ordered by usage count) - must be before feed/
     path('feed/hashtags/', views.HashtagsView.as_view(), name='feed-hashtags'),
+    # Trending hashtags: window=24h|7d|all
+    path('hashtags/', views.HashtagsView.as_view(), name='hashtags'),
     path('feed/following/', views.FollowingFeedView.as_view(), name='feed-following'),
     # Feed endpoint (compatible with Next.js)
     path('feed/', views.FeedView.as_view(), name='feed'),
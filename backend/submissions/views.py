@@ -7,14 +7,23 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Q, Count, F, IntegerField, Sum, Case, When, Value
-from django.db.models.functions import Coalesce
+from django.db.models import Q, IntegerField, Sum, Case, When, Value
+from django.core.exceptions import ObjectDoesNotExist
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Submission, Reaction, SubmissionRepost, SubmissionBookmark
-from .serializers import SubmissionSerializer, SubmissionCreateSerializer, ReactionSerializer
-from users.models import UserMeta, User, UserFollow
+from .models import Submission, Reaction, SubmissionBookmark
+from . import reaction_stats
+from . import hashtags as hashtag_index
+from . import cursors as feed_cursors
+from . import feed_cache
+from . import timelines
+from . import trending
+from .serializers import SubmissionSerializer, SubmissionCreateSerializer, ReactionSerializer, build_feed_context
+from users.models import User, UserFollow
+from toybox.authentication import request_meta
 from lottery.services import handle_submission_and_lottery
 
 logger = logging.getLogger(__name__)
@@ -94,8 +103,9 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         submission = self.get_object()
 
         if request.method == 'DELETE':
-            SubmissionBookmark.objects.filter(user=request.user, submission=submission).delete()
-            count = SubmissionBookmark.objects.filter(submission=submission).count()
+            with transaction.atomic():
+                SubmissionBookmark.objects.filter(user=request.user, submission=submission).delete()
+            count = reaction_stats.get_stats(submission.id).bookmark_count
             return Response({'ok': True, 'bookmarked': False, 'bookmarkCount': count})
 
         if submission.author_id == request.user.id:
@@ -104,11 +114,12 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        _, created = SubmissionBookmark.objects.get_or_create(
-            user=request.user,
-            submission=submission,
-        )
-        count = SubmissionBookmark.objects.filter(submission=submission).count()
+        with transaction.atomic():
+            _, created = SubmissionBookmark.objects.get_or_create(
+                user=request.user,
+                submission=submission,
+            )
+        count = reaction_stats.get_stats(submission.id).bookmark_count
         return Response({'ok': True, 'bookmarked': True, 'created': created, 'bookmarkCount': count})
 
     @action(detail=True, methods=['post'], url_path='react/submit_medal')
@@ -130,39 +141,38 @@ class SubmissionViewSet(viewsets.ModelViewSet):
     def _toggle_reaction(self, request, pk, reaction_type):
         """リアクションのトグル共通処理。"""
         submission = self.get_object()
-        reaction, created = Reaction.objects.get_or_create(
-            user=request.user,
-            submission=submission,
-            type=reaction_type,
-        )
+        # リアクション行と集計行（SubmissionReactionStats）を同一トランザクションで更新
+        with transaction.atomic():
+            reaction, created = Reaction.objects.get_or_create(
+                user=request.user,
+                submission=submission,
+                type=reaction_type,
+            )
+            if not created:
+                reaction.delete()
+        count_field = reaction_stats.REACTION_COUNT_FIELDS[reaction_type]
         
         if created:
             # 通知（いいね以外も同様に通知、自分には通知しない）
             if submission.author != request.user:
                 try:
-                    from users.models import UserMeta
-                    target_meta, _ = UserMeta.objects.get_or_create(user=submission.author)
-                    liker_meta, _ = UserMeta.objects.get_or_create(user=request.user)
+                    from users.models import Notification
+                    from users import notifications as user_notifications
+                    liker_meta = request_meta(request)
                     liker_name = liker_meta.display_name or request.user.display_id
                     emoji = Reaction.EMOJI_MAP.get(reaction_type, '👍')
                     label = dict(Reaction.Type.choices).get(reaction_type, reaction_type)
-                    notifications = list(target_meta.notifications or [])
-                    notifications.append({
-                        'type': 'reaction',
-                        'reactionType': reaction_type,
-                        'emoji': emoji,
-                        'label': label,
-                        'fromAnonId': request.user.display_id,
-                        'fromDisplayName': liker_name,
-                        'submissionId': str(submission.id),
-                        'message': f'{liker_name} さんから「{emoji} {label}」がつきました',
-                        'read': False,
-                        'createdAt': str(timezone.now().isoformat()),
-                    })
-                    if len(notifications) > 50:
-                        notifications = notifications[-50:]
-                    target_meta.notifications = notifications
-                    target_meta.save(update_fields=['notifications'])
+                    user_notifications.notify(
+                        submission.author,
+                        Notification.Type.REACTION,
+                        f'{liker_name} さんから「{emoji} {label}」がつきました',
+                        reactionType=reaction_type,
+                        emoji=emoji,
+                        label=label,
+                        fromAnonId=request.user.display_id,
+                        fromDisplayName=liker_name,
+                        submissionId=str(submission.id),
+                    )
                 except Exception as e:
                     logger.warning(f'Reaction notification failed: {e}')
             # ポイント付与（投稿者本人以外からのリアクションのみ）
@@ -173,21 +183,23 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                         award_points,
                         check_and_grant_achievement_titles,
                     )
+                    from gamification.achievements import AchievementEvent
                     award_reaction_received_points(submission.author, reaction_type)
-                    check_and_grant_achievement_titles(submission.author)
+                    check_and_grant_achievement_titles(
+                        submission.author, [AchievementEvent.reaction_received(reaction_type)],
+                    )
                     # リアクションを送ったユーザーにも1TP付与
                     award_points(request.user, 'reaction_given', 1, 'リアクションをした')
                 except Exception as e:
                     logger.warning(f'[Point] reaction point award failed: {e}')
 
-            total = Reaction.objects.filter(submission=submission, type=reaction_type).count()
+            total = getattr(reaction_stats.get_stats(submission.id), count_field)
             return Response(
                 {'ok': True, 'action': 'added', 'count': total, 'reacted': True},
                 status=status.HTTP_201_CREATED,
             )
         else:
-            reaction.delete()
-            total = Reaction.objects.filter(submission=submission, type=reaction_type).count()
+            total = getattr(reaction_stats.get_stats(submission.id), count_field)
             return Response(
                 {'ok': True, 'action': 'removed', 'count': total, 'reacted': False},
                 status=status.HTTP_200_OK,
@@ -203,46 +215,33 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         
         if request.method == 'POST':
             # Like
-            reaction, created = Reaction.objects.get_or_create(
-                user=request.user,
-                submission=submission,
-                type=Reaction.Type.SUBMIT_MEDAL,
-                defaults={'user': request.user, 'submission': submission}
-            )
+            with transaction.atomic():
+                reaction, created = Reaction.objects.get_or_create(
+                    user=request.user,
+                    submission=submission,
+                    type=Reaction.Type.SUBMIT_MEDAL,
+                    defaults={'user': request.user, 'submission': submission}
+                )
             
-            likes_count = Reaction.objects.filter(
-                submission=submission,
-                type=Reaction.Type.SUBMIT_MEDAL
-            ).count()
+            likes_count = reaction_stats.get_stats(submission.id).submit_medal_count
             
             # 通知を作成（自分で自分にいいねは通知しない）
             if created and submission.author != request.user:
                 
                 try:
-                    target_meta, _ = UserMeta.objects.get_or_create(user=submission.author)
-                    liker_meta, _ = UserMeta.objects.get_or_create(user=request.user)
+                    from users.models import Notification
+                    from users import notifications as user_notifications
+                    liker_meta = request_meta(request)
                     
                     liker_name = liker_meta.display_name or liker_meta.bio or request.user.display_id
-                    message = f'{liker_name} さんからいいねがつきました'
-                    
-                    notification = {
-                        'type': 'like',
-                        'fromAnonId': request.user.display_id,
-                        'fromDisplayName': liker_name,
-                        'submissionId': str(submission.id),
-                        'message': message,
-                        'createdAt': timezone.now().isoformat(),
-                        'read': False
-                    }
-                    
-                    # 通知を先頭に追加
-                    notifications = target_meta.notifications or []
-                    notifications.insert(0, notification)
-                    # 最大100件まで保持
-                    if len(notifications) > 100:
-                        notifications = notifications[:100]
-                    target_meta.notifications = notifications
-                    target_meta.save()
+                    user_notifications.notify(
+                        submission.author,
+                        Notification.Type.LIKE,
+                        f'{liker_name} さんからいいねがつきました',
+                        fromAnonId=request.user.display_id,
+                        fromDisplayName=liker_name,
+                        submissionId=str(submission.id),
+                    )
                     
                     logger.info(f'Notification created: user={submission.author.display_id}, liker={request.user.display_id}, submission={submission.id}')
                 except Exception as e:
@@ -257,8 +256,11 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                         award_reaction_received_points,
                         check_and_grant_achievement_titles,
                     )
+                    from gamification.achievements import AchievementEvent
                     award_reaction_received_points(submission.author, Reaction.Type.SUBMIT_MEDAL)
-                    check_and_grant_achievement_titles(submission.author)
+                    check_and_grant_achievement_titles(
+                        submission.author, [AchievementEvent.reaction_received(Reaction.Type.SUBMIT_MEDAL)],
+                    )
                 except Exception as e:
                     logger.warning(f'[Point] like point award failed: {e}')
 
@@ -269,16 +271,14 @@ class SubmissionViewSet(viewsets.ModelViewSet):
             })
         else:
             # Unlike (DELETE)
-            Reaction.objects.filter(
-                user=request.user,
-                submission=submission,
-                type=Reaction.Type.SUBMIT_MEDAL
-            ).delete()
+            with transaction.atomic():
+                Reaction.objects.filter(
+                    user=request.user,
+                    submission=submission,
+                    type=Reaction.Type.SUBMIT_MEDAL
+                ).delete()
             
-            likes_count = Reaction.objects.filter(
-                submission=submission,
-                type=Reaction.Type.SUBMIT_MEDAL
-            ).count()
+            likes_count = reaction_stats.get_stats(submission.id).submit_medal_count
             
             return Response({
                 'ok': True,
@@ -351,102 +351,47 @@ class SubmitUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         
-        # Generate filename
-        import os
-        if is_video:
-            # 動画はそのまま保存
-            default_ext = '.mp4'
-            file_ext = os.path.splitext(file.name)[1] or default_ext
-            filename = f'submissions/{request.user.id}_{int(timezone.now().timestamp())}{file_ext}'
-            
-            # Save file safely
-            from submissions.utils import save_file_safely, build_file_url
-            success, saved_path, error_message = save_file_safely(file, filename)
-        else:
-            # 画像はJPGに変換して最適化
-            from toybox.image_optimizer import optimize_image_to_jpg
-            from django.core.files.base import ContentFile
-            
-            optimized_image = optimize_image_to_jpg(
+        # アップロードを保存して加工ジョブを作成（最適化・サムネイル・ポスターはワーカーで生成）
+        from submissions import media_jobs
+        from submissions.models import MediaJob
+        try:
+            job, created = media_jobs.create_job(
+                request.user,
+                MediaJob.Kind.VIDEO if is_video else MediaJob.Kind.IMAGE,
                 file,
-                max_width=1920,  # 投稿画像は1920pxまで
-                max_height=1920,
-                quality=85
+                idempotency_key=_idempotency_key(request),
             )
-            
-            if optimized_image:
-                # 最適化された画像を保存
-                filename = f'submissions/{request.user.id}_{int(timezone.now().timestamp())}.jpg'
-                from submissions.utils import build_file_url
-                from django.core.files.storage import default_storage
-                saved_path = default_storage.save(filename, ContentFile(optimized_image.read()))
-                success = True
-                error_message = None
-            else:
-                # 最適化に失敗した場合は元のファイルを保存
-                if file.content_type == 'image/webp':
-                    default_ext = '.webp'
-                elif file.content_type in ['image/jpeg', 'image/jpg']:
-                    default_ext = '.jpg'
-                else:
-                    default_ext = '.png'
-                file_ext = os.path.splitext(file.name)[1] or default_ext
-                filename = f'submissions/{request.user.id}_{int(timezone.now().timestamp())}{file_ext}'
-                
-                from submissions.utils import save_file_safely, build_file_url
-                success, saved_path, error_message = save_file_safely(file, filename)
-        
-        if not success:
-            logger.error(f'File upload failed: {error_message}')
+        except Exception as e:
+            logger.error(f'File upload failed: {e}', exc_info=True)
             return Response({
                 'error': 'ファイルの保存に失敗しました',
-                'detail': error_message
+                'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # 画像の場合、サムネイルを生成
-        thumbnail_url = None
-        if is_video:
-            try:
-                from submissions.utils import generate_video_poster
-                thumbnail_url = generate_video_poster(saved_path, request=request)
-            except Exception as e:
-                logger.warning(f'Failed to generate video poster: {e}')
-        elif not is_video:
-            try:
-                from toybox.image_optimizer import generate_thumbnail
-                from django.core.files.storage import default_storage
-                from django.core.files.base import ContentFile
-                from django.conf import settings
-                import os
-                
-                full_path = default_storage.path(saved_path)
-                if os.path.exists(full_path):
-                    thumbnail_data = generate_thumbnail(full_path, max_size=300, quality=80)
-                    if thumbnail_data:
-                        # サムネイルファイル名を生成（元ファイル名に_thumbを追加）
-                        base_name = os.path.basename(saved_path)
-                        name_without_ext = os.path.splitext(base_name)[0]
-                        thumbnail_filename = f'{name_without_ext}_thumb.jpg'
-                        thumbnail_filepath = default_storage.save(f'submissions/{thumbnail_filename}', ContentFile(thumbnail_data.read()))
-                        thumbnail_url_path = f'/uploads/submissions/{thumbnail_filename}'
-                        thumbnail_url = build_file_url(request, thumbnail_url_path, base_path='/uploads/submissions/')
-                        logger.info(f'Generated thumbnail: {thumbnail_filepath}')
-            except Exception as e:
-                logger.warning(f'Failed to generate thumbnail: {e}')
-        
-        # URLを構築（/uploads/submissions/パスを使用）
-        url_path = f'/uploads/submissions/{os.path.basename(saved_path)}'
-        absolute_url = build_file_url(request, url_path, base_path='/uploads/submissions/')
+        payload = media_jobs.upload_payload(job, request)
+        logger.info(f'File uploaded: job={job.id} status={job.status} created={created}')
         
-        logger.info(f'File uploaded successfully: {saved_path} -> {absolute_url}')
-        
-        # Return URLs compatible with Next.js format
-        return Response({
-            'imageUrl': absolute_url if not is_video else None,
-            'videoUrl': absolute_url if is_video else None,
-            'displayImageUrl': thumbnail_url or absolute_url,  # サムネイルがあればそれを使用
-            'thumbnailUrl': thumbnail_url
-        })
+        # Return URLs compatible with Next.js format（加工中は 202 + プレースホルダー）
+        return Response(payload, status=status.HTTP_200_OK if job.is_finished else status.HTTP_202_ACCEPTED)
+
+
+def _idempotency_key(request):
+    """Idempotency-Key ヘッダー（またはフォームの idempotencyKey）。"""
+    key = request.headers.get('Idempotency-Key') or request.data.get('idempotencyKey') or ''
+    return key.strip()[:100] or None
+
+
+class MediaJobStatusView(APIView):
+    """メディア加工ジョブの状態（アップロード後のポーリング用）。"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        from submissions import media_jobs
+        from submissions.models import MediaJob
+        job = MediaJob.objects.filter(id=job_id, user=request.user).first()
+        if job is None:
+            return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(media_jobs.job_payload(job, request))
 
 
 class SubmitGameUploadView(APIView):
@@ -481,143 +426,24 @@ class SubmitGameUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         
-        import zipfile
-        import os
-        import shutil
-        from submissions.utils import normalize_url_path, build_file_url
-        
-        base_path = None
+        # 保存と ZIP の監査（目次の読み取りのみ）は同期、展開はワーカーで行う
+        from submissions import media_jobs
         try:
-            # Get user's display_id for directory structure
-            user = request.user
-            display_id = user.display_id
-            
-            # Create directory structure: uploads/games/{display_id}/{timestamp}/
-            timestamp = int(timezone.now().timestamp())
-            game_dir = f'games/{display_id}/{timestamp}'
-            base_path = os.path.join(settings.MEDIA_ROOT, game_dir)
-            
-            # ディレクトリの存在確認と作成
-            try:
-                os.makedirs(base_path, exist_ok=True)
-                logger.info(f'Created game directory: {base_path}')
-            except Exception as e:
-                logger.error(f'Failed to create directory {base_path}: {str(e)}', exc_info=True)
-                return Response({
-                    'error': 'ディレクトリの作成に失敗しました',
-                    'detail': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Save ZIP file temporarily
-            zip_path = os.path.join(base_path, file.name)
-            try:
-                with open(zip_path, 'wb') as f:
-                    for chunk in file.chunks():
-                        f.write(chunk)
-                logger.info(f'ZIP file saved: {zip_path}')
-            except Exception as e:
-                logger.error(f'Failed to save ZIP file {zip_path}: {str(e)}', exc_info=True)
-                shutil.rmtree(base_path, ignore_errors=True)
-                return Response({
-                    'error': 'ZIPファイルの保存に失敗しました',
-                    'detail': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Verify ZIP file was saved
-            if not os.path.exists(zip_path):
-                return Response({
-                    'error': 'ZIPファイルの保存に失敗しました'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Audit ZIP file before extraction
-            from submissions.utils import audit_zip_file
-            audit_result = audit_zip_file(zip_path)
-            
-            # 監査結果に基づいてエラーまたは警告を返す
-            if not audit_result['is_safe']:
-                # Clean up on error
-                shutil.rmtree(base_path, ignore_errors=True)
-                
-                error_messages = []
-                if audit_result['errors']:
-                    error_messages.extend(audit_result['errors'])
-                if audit_result['warnings']:
-                    error_messages.extend(audit_result['warnings'])
-                
-                # エラーメッセージを構築
-                main_error = 'ZIPファイルの監査に失敗しました'
-                if audit_result['errors']:
-                    main_error = audit_result['errors'][0]  # 最初のエラーをメインメッセージに
-                
-                return Response({
-                    'error': main_error,
-                    'message': main_error,
-                    'details': error_messages,
-                    'audit_result': {
-                        'has_index_html': audit_result['has_index_html'],
-                        'suspicious_files': audit_result['suspicious_files'][:10],  # 最初の10個のみ
-                        'web_files_count': len(audit_result['web_files'])
-                    }
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Extract ZIP file
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(base_path)
-            
-            # Remove ZIP file after extraction
-            os.remove(zip_path)
-            
-            # Find index.html
-            def find_index_html(directory):
-                """Recursively find index.html."""
-                for root, dirs, files in os.walk(directory):
-                    if 'index.html' in files:
-                        return os.path.relpath(os.path.join(root, 'index.html'), settings.MEDIA_ROOT)
-                return None
-            
-            index_path = find_index_html(base_path)
-            if not index_path:
-                # Clean up on error
-                shutil.rmtree(base_path, ignore_errors=True)
-                return Response({'error': 'index.html not found in ZIP'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Verify index.html exists
-            index_full_path = os.path.join(settings.MEDIA_ROOT, index_path)
-            if not os.path.exists(index_full_path):
-                logger.error(f'index.html not found at {index_full_path} after extraction')
-                shutil.rmtree(base_path, ignore_errors=True)
-                return Response({
-                    'error': 'index.htmlが見つかりませんでした'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Convert to URL path (use forward slashes)
-            game_url = f'/media/{normalize_url_path(index_path)}'
-            
-            # Build absolute URL
-            absolute_game_url = build_file_url(request, game_url, base_path='/media/')
-            
-            logger.info(f'Game uploaded successfully: {index_path} -> {absolute_game_url}')
-            
-            return Response({
-                'ok': True,
-                'gameUrl': absolute_game_url
-            })
-            
-        except zipfile.BadZipFile:
-            if base_path and os.path.exists(base_path):
-                shutil.rmtree(base_path, ignore_errors=True)
-            return Response({'error': 'Invalid ZIP file'}, status=status.HTTP_400_BAD_REQUEST)
+            job, created, error_data = media_jobs.create_game_job(
+                request.user, file, idempotency_key=_idempotency_key(request),
+            )
         except Exception as e:
             logger.error(f'Failed to process ZIP file: {str(e)}', exc_info=True)
-            if base_path and os.path.exists(base_path):
-                try:
-                    shutil.rmtree(base_path, ignore_errors=True)
-                except:
-                    pass
             return Response({
                 'error': 'ゲームファイルの処理に失敗しました',
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if error_data:
+            return Response(error_data, status=status.HTTP_400_BAD_REQUEST)
+        
+        payload = media_jobs.upload_payload(job, request)
+        logger.info(f'Game uploaded: job={job.id} status={job.status} created={created} -> {payload["gameUrl"]}')
+        return Response(payload, status=status.HTTP_200_OK if job.is_finished else status.HTTP_202_ACCEPTED)
 
 
 class SubmitView(APIView):
@@ -718,9 +544,14 @@ class SubmitView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _build_feed_item_payload(request, item, logger, user_reposted_ids=None):
-    """Serialize one submission for feed JSON (camelCase)."""
-    serializer = SubmissionSerializer(item, context={'request': request})
+def _build_feed_item_payload(request, item, logger, context=None):
+    """Serialize one submission for feed JSON (camelCase).
+
+    context には build_feed_context() の戻り値を渡す（ページ単位で一括取得した集計を使い回す）。
+    """
+    if context is None:
+        context = {'request': request}
+    serializer = SubmissionSerializer(item, context=context)
     item_data = serializer.data
     image_url = item_data.get('image') or item_data.get('image_url')
     thumbnail_url = item_data.get('thumbnail_url') or item_data.get('thumbnail')
@@ -747,12 +578,16 @@ def _build_feed_item_payload(request, item, logger, user_reposted_ids=None):
     if not title:
         title = item_data.get('caption') or None
 
-    repost_count = getattr(item, 'repost_count', None)
-    if repost_count is None:
-        repost_count = 0
-    user_reposted = False
-    if user_reposted_ids is not None and item.id in user_reposted_ids:
-        user_reposted = True
+    if 'repost_counts' in context:
+        repost_count = context['repost_counts'].get(item.id, 0)
+    else:
+        repost_count = getattr(item, 'repost_count', None) or 0
+    user_reposted = item.id in context.get('viewer_reposts', ())
+    if 'viewer_id' in context:
+        viewer_id = context['viewer_id']
+    else:
+        user = getattr(request, 'user', None)
+        viewer_id = user.pk if user is not None and getattr(user, 'is_authenticated', False) else None
 
     return {
         'id': str(item_data.get('id', '')),
@@ -766,6 +601,7 @@ def _build_feed_item_payload(request, item, logger, user_reposted_ids=None):
         'thumbnailUrl': thumbnail_url,
         'videoUrl': item_data.get('video_url'),
         'displayImageUrl': display_image_url,
+        'imageVariants': item_data.get('image_variants'),
         'title': title,
         'caption': item_data.get('caption'),
         'hashtags': item_data.get('hashtags', []),
@@ -773,6 +609,7 @@ def _build_feed_item_payload(request, item, logger, user_reposted_ids=None):
         'aiTool': item_data.get('ai_tool') or '',
         'aiToolLabel': item_data.get('ai_tool_label'),
         'gameUrl': item_data.get('game_url'),
+        'mediaPending': bool(item_data.get('media_pending')),
         'likesCount': reactions_count or 0,
         'totalReactionsCount': total_reactions,
         'liked': item_data.get('user_reacted', False),
@@ -783,20 +620,25 @@ def _build_feed_item_payload(request, item, logger, user_reposted_ids=None):
         'repostCount': int(repost_count) if repost_count else 0,
         'userReposted': user_reposted,
         'userBookmarked': item_data.get('user_bookmarked', False),
-        'isOwnPost': bool(
-            getattr(request, 'user', None) is not None
-            and getattr(request.user, 'is_authenticated', False)
-            and getattr(item, 'author_id', None) == getattr(request.user, 'pk', None)
-        ),
+        'isOwnPost': bool(viewer_id is not None and getattr(item, 'author_id', None) == viewer_id),
     }
 
 
+def _invalid_cursor_response():
+    return Response({'error': 'カーソルが不正です'}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class FeedView(APIView):
     """Feed endpoint compatible with Next.js format. 未認証でも閲覧可能（ログインループ防止）。"""
     permission_classes = [AllowAny]
+    CACHE_PARAMS = ('mode', 'cursor', 'limit', 'hashtag', 'hashtag_contains', 'hashtagSearch')
 
     def get(self, request):
         """Get feed items. mode=recent|recommended, hashtag_contains=部分一致検索。"""
+        return feed_cache.respond(request, 'feed', self.CACHE_PARAMS, lambda: self._build(request))
+
+    def _build(self, request):
+        """閲覧者に依存しない骨格（data, status）を作る。閲覧者の状態は feed_cache.personalize で重ねる。"""
         import logging
         logger = logging.getLogger(__name__)
 
@@ -804,28 +646,14 @@ class FeedView(APIView):
             mode = (request.query_params.get('mode') or 'recent').strip().lower()
             queryset = Submission.objects.filter(deleted_at__isnull=True)
 
+            # ハッシュタグ検索は索引テーブル（SubmissionHashtag / HashtagCount）で絞り込む
             hashtag_contains = request.query_params.get('hashtag_contains') or request.query_params.get('hashtagSearch')
             if hashtag_contains and str(hashtag_contains).strip():
-                ql = str(hashtag_contains).strip().lower()
-                cand_ids = []
-                for sid, tags in Submission.objects.filter(deleted_at__isnull=True).order_by('-created_at').values_list('id', 'hashtags')[:5000]:
-                    if not tags or not isinstance(tags, list):
-                        continue
-                    if any(isinstance(t, str) and ql in t.strip().lower() for t in tags):
-                        cand_ids.append(sid)
-                queryset = queryset.filter(id__in=cand_ids) if cand_ids else queryset.none()
+                queryset = queryset.filter(id__in=hashtag_index.submission_ids_with_tag_containing(str(hashtag_contains)))
 
             hashtag = request.query_params.get('hashtag')
             if hashtag and hashtag.strip():
-                hashtag_query = hashtag.strip().lower()
-                submission_ids = []
-                for sub in queryset:
-                    if sub.hashtags and isinstance(sub.hashtags, list):
-                        for tag in sub.hashtags:
-                            if tag and isinstance(tag, str) and tag.strip().lower() == hashtag_query:
-                                submission_ids.append(sub.id)
-                                break
-                queryset = queryset.filter(id__in=submission_ids)
+                queryset = queryset.filter(id__in=hashtag_index.submission_ids_with_tag(hashtag))
 
             try:
                 limit = int(request.query_params.get('limit', 24))
@@ -834,88 +662,49 @@ class FeedView(APIView):
                 limit = 24
 
             cursor = request.query_params.get('cursor')
-            if cursor:
-                try:
-                    cursor_id = int(cursor)
-                    queryset = queryset.filter(id__lt=cursor_id)
-                except (ValueError, TypeError):
-                    pass
-
             if mode == 'recommended':
-                cutoff = timezone.now() - timedelta(hours=24)
-                queryset = queryset.filter(created_at__gte=cutoff)
-                queryset = queryset.select_related('author', 'author__meta').annotate(
-                    reactions_count=Count('reactions', filter=Q(reactions__type=Reaction.Type.SUBMIT_MEDAL)),
-                    _c_awe=Count('reactions', filter=Q(reactions__type=Reaction.Type.AWESOME)),
-                    _c_cute=Count('reactions', filter=Q(reactions__type=Reaction.Type.CUTE)),
-                    _c_fun=Count('reactions', filter=Q(reactions__type=Reaction.Type.FUNNY)),
-                    _c_mov=Count('reactions', filter=Q(reactions__type=Reaction.Type.MOVED)),
-                    _c_cool=Count('reactions', filter=Q(reactions__type=Reaction.Type.COOL)),
-                    _c_beau=Count('reactions', filter=Q(reactions__type=Reaction.Type.BEAUTIFUL)),
-                    _c_emo=Count('reactions', filter=Q(reactions__type=Reaction.Type.EMOTIONAL)),
-                    _c_god=Count('reactions', filter=Q(reactions__type=Reaction.Type.GOD_GAME)),
-                ).annotate(
-                    _total_rx=F('reactions_count') + F('_c_awe') + F('_c_cute') + F('_c_fun') + F('_c_mov') + F('_c_cool') + F('_c_beau') + F('_c_emo') + F('_c_god'),
-                    _score=(
-                        F('reactions_count') * Value(3)
-                        + F('_c_awe') * Value(5)
-                        + F('_c_cute') * Value(4)
-                        + F('_c_fun') * Value(4)
-                        + F('_c_mov') * Value(4)
-                        + F('_c_cool') * Value(5)
-                        + F('_c_beau') * Value(3)
-                        + F('_c_emo') * Value(5)
-                        + F('_c_god') * Value(10)
-                    ),
-                    repost_count=Count('reposts'),
-                ).filter(_total_rx__gte=3).order_by('-_score', '-created_at')
+                # 直近24時間・リアクション3件以上を時間減衰つきスコア順（集計行の hot_score インデックスを使用）
+                cutoff = timezone.now() - timedelta(hours=getattr(settings, 'FEED_RECOMMENDED_WINDOW_HOURS', 24))
+                queryset = queryset.filter(
+                    reaction_stats__submission_created_at__gte=cutoff,
+                    reaction_stats__total_reactions__gte=getattr(settings, 'FEED_RECOMMENDED_MIN_REACTIONS', 3),
+                ).select_related('author', 'author__meta', 'reaction_stats')
+                keyset, legacy = feed_cursors.HOT, None
             else:
-                queryset = queryset.order_by('-created_at')
-                queryset = queryset.select_related('author', 'author__meta').annotate(
-                    reactions_count=Count('reactions', filter=Q(reactions__type=Reaction.Type.SUBMIT_MEDAL)),
-                    repost_count=Count('reposts'),
-                )
+                queryset = queryset.select_related('author', 'author__meta')
+                keyset, legacy = feed_cursors.RECENT, feed_cursors.legacy_recent_cursor
 
-            items = list(queryset[:limit])
-
-            user_reposted_ids = None
-            if request.user.is_authenticated and items:
-                ids = [i.id for i in items]
-                user_reposted_ids = frozenset(
-                    SubmissionRepost.objects.filter(user=request.user, submission_id__in=ids).values_list(
-                        'submission_id', flat=True
-                    )
-                )
+            try:
+                items, next_cursor = feed_cursors.paginate(queryset, keyset, cursor, limit, legacy=legacy)
+            except feed_cursors.InvalidCursor:
+                return {'error': 'カーソルが不正です'}, status.HTTP_400_BAD_REQUEST
+            # リアクション・リポスト・ブックマークはページ単位で一括取得
+            context = build_feed_context(request, items, anonymous=True)
 
             feed_items = []
             for item in items:
                 try:
-                    feed_items.append(_build_feed_item_payload(request, item, logger, user_reposted_ids=user_reposted_ids))
+                    payload = _build_feed_item_payload(request, item, logger, context=context)
+                    payload[feed_cache.AUTHOR_KEY] = item.author_id
+                    feed_items.append(payload)
                 except Exception as e:
                     logger.error(f'Error serializing submission {getattr(item, "id", "unknown")}: {str(e)}', exc_info=True)
                     continue
 
-            next_cursor = None
-            if len(items) == limit and len(items) > 0:
-                try:
-                    next_cursor = str(items[-1].id)
-                except (AttributeError, IndexError):
-                    next_cursor = None
-
-            return Response({
+            return {
                 'items': feed_items,
                 'nextCursor': next_cursor,
                 'mode': mode,
-            })
+            }, status.HTTP_200_OK
         except Exception as e:
             logger.error(f'FeedView error: {str(e)}', exc_info=True)
             import traceback
             error_detail = traceback.format_exc()
             logger.error(f'FeedView traceback: {error_detail}')
-            return Response({
+            return {
                 'error': 'フィードの読み込みに失敗しました',
                 'detail': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            }, status.HTTP_500_INTERNAL_SERVER_ERROR
 
 
 class FollowingFeedView(APIView):
@@ -944,33 +733,31 @@ class FollowingFeedView(APIView):
                 limit = 6
 
             cursor = request.query_params.get('cursor')
-            queryset = Submission.objects.filter(
-                deleted_at__isnull=True,
-            ).filter(author_q).select_related('author', 'author__meta').annotate(
-                reactions_count=Count('reactions', filter=Q(reactions__type=Reaction.Type.SUBMIT_MEDAL)),
-                repost_count=Count('reposts'),
-            ).order_by('-created_at')
-            if cursor:
-                try:
-                    queryset = queryset.filter(id__lt=int(cursor))
-                except (ValueError, TypeError):
-                    pass
-            items = list(queryset[:limit])
-            user_reposted_ids = None
-            if items:
-                ids = [i.id for i in items]
-                user_reposted_ids = frozenset(
-                    SubmissionRepost.objects.filter(user=request.user, submission_id__in=ids).values_list(
-                        'submission_id', flat=True
-                    )
-                )
+            try:
+                after = feed_cursors.resolve(feed_cursors.RECENT, cursor, legacy=feed_cursors.legacy_recent_cursor)
+            except feed_cursors.InvalidCursor:
+                return _invalid_cursor_response()
+
+            # フォロワーごとのタイムライン（書き込み時ファンアウト）から読む。使えない場合は DB から
+            page = timelines.read_page(request.user.pk, [request.user.pk] + following_ids, after, limit)
+            if page is not None:
+                ids, next_after = page
+                items = timelines.hydrate(ids)
+                next_cursor = feed_cursors.encode(feed_cursors.RECENT, next_after) if next_after else None
+            else:
+                queryset = Submission.objects.filter(
+                    deleted_at__isnull=True,
+                ).filter(author_q).select_related('author', 'author__meta')
+                if after is not None:
+                    queryset = queryset.filter(feed_cursors.RECENT.after(after))
+                items, next_cursor = feed_cursors.paginate(queryset, feed_cursors.RECENT, None, limit)
+            context = build_feed_context(request, items)
             feed_items = []
             for item in items:
                 try:
-                    feed_items.append(_build_feed_item_payload(request, item, logger, user_reposted_ids=user_reposted_ids))
+                    feed_items.append(_build_feed_item_payload(request, item, logger, context=context))
                 except Exception as e:
                     logger.error(f'FollowingFeed serialize error: {e}', exc_info=True)
-            next_cursor = str(items[-1].id) if len(items) == limit and items else None
             return Response({'items': feed_items, 'nextCursor': next_cursor})
         except Exception as e:
             logger.error(f'FollowingFeedView error: {e}', exc_info=True)
@@ -978,11 +765,14 @@ class FollowingFeedView(APIView):
 
 
 class HashtagsView(APIView):
-    """Get popular hashtags ordered by usage count. 未認証でも取得可能."""
+    """Get popular hashtags. window=all（通算の件数順）|24h|7d（時間減衰スコア順）。未認証でも取得可能."""
     permission_classes = [AllowAny]
 
     def get(self, request):
         """Get hashtags ordered by usage count."""
+        return feed_cache.respond(request, 'hashtags', ('limit', 'window'), lambda: self._build(request), personal=False)
+
+    def _build(self, request):
         import logging
         logger = logging.getLogger(__name__)
         
@@ -994,49 +784,35 @@ class HashtagsView(APIView):
             except (ValueError, TypeError):
                 limit = 20
             
-            # Get all submissions with hashtags
-            submissions = Submission.objects.filter(
-                deleted_at__isnull=True
-            ).exclude(hashtags__isnull=True).exclude(hashtags=[])
-            
-            # Count hashtag usage (大文字小文字を区別)
-            hashtag_counts = {}
-            for submission in submissions:
-                if submission.hashtags and isinstance(submission.hashtags, list):
-                    for tag in submission.hashtags:
-                        if tag and isinstance(tag, str) and tag.strip():
-                            # 大文字小文字を区別してカウント
-                            tag_normalized = tag.strip()
-                            hashtag_counts[tag_normalized] = hashtag_counts.get(tag_normalized, 0) + 1
-            
-            # Sort by count descending and get top N
-            sorted_hashtags = sorted(
-                hashtag_counts.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:limit]
-            
-            # Format response (大文字小文字を保持)
-            hashtags = []
-            for tag, count in sorted_hashtags:
-                if tag:  # 空文字列でない場合のみ追加
-                    hashtags.append({
-                        'tag': str(tag).strip(),
-                        'count': count
-                    })
+            window = (request.query_params.get('window') or trending.ALL).strip().lower()
+            if window == trending.ALL:
+                # マテリアライズドなタグ集計（HashtagCount）から取得（大文字小文字を区別）
+                hashtags = [
+                    {'tag': tag, 'count': count}
+                    for tag, count in hashtag_index.popular_hashtags(limit=limit)
+                ]
+            elif window in trending.WINDOWS:
+                # 期間内の投稿数に時間減衰を掛けたスコア順（Beat で作り直す上位リストから切り出す）
+                hashtags = [
+                    {'tag': tag, 'count': count, 'score': score}
+                    for tag, count, score in trending.trending_hashtags(window, limit=limit)
+                ]
+            else:
+                return {'error': 'window は 24h / 7d / all のいずれかです'}, status.HTTP_400_BAD_REQUEST
             
-            return Response({
-                'hashtags': hashtags
-            })
+            return {
+                'hashtags': hashtags,
+                'window': window,
+            }, status.HTTP_200_OK
         except Exception as e:
             logger.error(f'HashtagsView error: {str(e)}', exc_info=True)
             import traceback
             error_detail = traceback.format_exc()
             logger.error(f'HashtagsView traceback: {error_detail}')
-            return Response({
+            return {
                 'error': 'ハッシュタグの取得に失敗しました',
                 'detail': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            }, status.HTTP_500_INTERNAL_SERVER_ERROR
 
 
 class PopularFeedView(APIView):
@@ -1044,7 +820,11 @@ class PopularFeedView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        """Get popular feed items ordered by total acquired TP (weighted reactions + legacy likes×2)."""
+        """Get popular feed items ordered by total acquired TP (weighted reactions + legacy likes×2), or by time-decayed score with sort=hot."""
+        return feed_cache.respond(request, 'popular', ('sort', 'cursor', 'limit'), lambda: self._build(request))
+
+    def _build(self, request):
+        """閲覧者に依存しない骨格（data, status）を作る。"""
         queryset = Submission.objects.filter(deleted_at__isnull=True)
         
         # Get limit param
@@ -1054,29 +834,22 @@ class PopularFeedView(APIView):
         except (ValueError, TypeError):
             limit = 12
         
-        # 旧いいね（likes_count）は 2TP として加算
-        # モダンリアクションは REACTION_POINTS に従って重み付け合算
-        from gamification.services import REACTION_POINTS
-        reaction_score_expr = Case(
-            *[When(reactions__type=k, then=Value(v)) for k, v in REACTION_POINTS.items()],
-            default=Value(0),
-            output_field=IntegerField(),
-        )
-        queryset = queryset.annotate(
-            reactions_count=Count('reactions', filter=Q(reactions__type=Reaction.Type.SUBMIT_MEDAL)),
-            reaction_tp=Coalesce(Sum(reaction_score_expr), Value(0)),
-        ).annotate(
-            tp_score=F('reaction_tp') + (F('likes_count') * Value(2)),
-        )
-        
-        # Order by TP score descending, then by created_at descending
-        queryset = queryset.order_by('-tp_score', '-created_at')
-        
-        # Get items
-        items = list(queryset[:limit])
+        # 獲得TP（REACTION_POINTS の重み付き合計 + 旧いいね×2）は集計行の tp_score を使用
+        # sort=hot は経過時間で減衰させたスコア（hot_score）順。同点は投稿日時・ID 順で、カーソルで続きを取得できる
+        sort = (request.query_params.get('sort') or 'tp').strip().lower()
+        if sort not in ('tp', 'hot'):
+            return {'error': 'sort は tp または hot を指定してください'}, status.HTTP_400_BAD_REQUEST
+        keyset = feed_cursors.HOT if sort == 'hot' else feed_cursors.POPULAR
+        queryset = queryset.select_related('author', 'author__meta', 'reaction_stats')
+        try:
+            items, next_cursor = feed_cursors.paginate(
+                queryset, keyset, request.query_params.get('cursor'), limit,
+            )
+        except feed_cursors.InvalidCursor:
+            return {'error': 'カーソルが不正です'}, status.HTTP_400_BAD_REQUEST
         
         # Serialize items
-        serializer = SubmissionSerializer(items, many=True, context={'request': request})
+        serializer = SubmissionSerializer(items, many=True, context=build_feed_context(request, items, anonymous=True))
         
         # Transform to Next.js format
         feed_items = []
@@ -1111,8 +884,8 @@ class PopularFeedView(APIView):
             tp_score = 0
             try:
                 if idx < len(items):
-                    tp_score = int(getattr(items[idx], 'tp_score', 0) or 0)
-            except (AttributeError, ValueError, TypeError):
+                    tp_score = int(items[idx].reaction_stats.tp_score or 0)
+            except (AttributeError, ValueError, TypeError, ObjectDoesNotExist):
                 tp_score = 0
             feed_items.append({
                 'id': str(item_data['id']),
@@ -1133,9 +906,10 @@ class PopularFeedView(APIView):
                 'allReactions': item_data.get('all_reactions', []),
             })
         
-        return Response({
-            'items': feed_items
-        })
+        return {
+            'items': feed_items,
+            'nextCursor': next_cursor,
+        }, status.HTTP_200_OK
 
 
 class UserSubmissionsView(APIView):
@@ -1168,24 +942,20 @@ class UserSubmissionsView(APIView):
                 author=user,
                 deleted_at__isnull=True
             )
-            queryset = queryset.select_related('author', 'author__meta').order_by('-created_at')
+            queryset = queryset.select_related('author', 'author__meta')
             
-            # Pagination
-            page_size = int(request.query_params.get('limit', 12))
+            # Pagination（投稿日時・ID のキーセット。旧形式の ISO 日時カーソルも受け付ける）
+            try:
+                page_size = max(1, min(50, int(request.query_params.get('limit', 12))))
+            except (ValueError, TypeError):
+                page_size = 12
             cursor = request.query_params.get('cursor')
-            
-            if cursor:
-                try:
-                    from datetime import datetime
-                    cursor_date = datetime.fromisoformat(cursor.replace('Z', '+00:00'))
-                    # Make timezone-aware if needed
-                    if timezone.is_naive(cursor_date):
-                        cursor_date = timezone.make_aware(cursor_date)
-                    queryset = queryset.filter(created_at__lt=cursor_date)
-                except (ValueError, AttributeError, TypeError):
-                    pass
-            
-            submissions_qs = list(queryset[:page_size])
+            try:
+                submissions_qs, next_cursor = feed_cursors.paginate(
+                    queryset, feed_cursors.RECENT, cursor, page_size, legacy=feed_cursors.legacy_recent_cursor,
+                )
+            except feed_cursors.InvalidCursor:
+                return _invalid_cursor_response()
             
             # Check if current user has liked each submission
             current_user = request.user if request.user.is_authenticated else None
@@ -1388,15 +1158,6 @@ class UserSubmissionsView(APIView):
                     # エラーが発生しても次の提出物の処理を続行
                     continue
             
-            next_cursor = None
-            if len(submissions_qs) == page_size:
-                try:
-                    last_submission = submissions_qs[-1]
-                    if last_submission.created_at:
-                        next_cursor = last_submission.created_at.isoformat()
-                except (AttributeError, ValueError, IndexError):
-                    next_cursor = None
-            
             return Response({
                 'items': items,
                 'nextCursor': next_cursor,
@@ -1598,7 +1359,7 @@ class RankingDailyView(APIView):
     def get(self, request):
         from submissions.ranking_service import get_daily_ranking_response
 
-        return Response(get_daily_ranking_response(request=request))
+        return feed_cache.conditional_response(request, get_daily_ranking_response(request=request))
 
 
 class RankingWeeklyView(APIView):
@@ -1608,7 +1369,7 @@ class RankingWeeklyView(APIView):
     def get(self, request):
         from submissions.ranking_service import get_weekly_ranking_response
 
-        return Response(get_weekly_ranking_response(request=request))
+        return feed_cache.conditional_response(request, get_weekly_ranking_response(request=request))
 
 
 class RankingUserBadgesView(APIView):
@@ -1652,18 +1413,15 @@ class TimelineView(APIView):
             
             queryset = Submission.objects.filter(
                 deleted_at__isnull=True
-            ).select_related('author').order_by('-created_at')
+            ).select_related('author', 'author__meta')
             
-            # If cursor provided, decode and filter
-            if cursor:
-                try:
-                    cursor_id = int(cursor)
-                    queryset = queryset.filter(id__lt=cursor_id)
-                except (ValueError, TypeError):
-                    pass
-            
-            # Get items
-            submissions = list(queryset[:limit])
+            # Get items（投稿日時・ID のキーセット。旧形式の ID カーソルも受け付ける）
+            try:
+                submissions, next_cursor = feed_cursors.paginate(
+                    queryset, feed_cursors.RECENT, cursor, limit, legacy=feed_cursors.legacy_recent_cursor,
+                )
+            except feed_cursors.InvalidCursor:
+                return _invalid_cursor_response()
             
             timeline_items = []
             for sub in submissions:
@@ -1714,11 +1472,6 @@ class TimelineView(APIView):
                     logger.error(f'Error processing timeline item {sub.id}: {str(e)}', exc_info=True)
                     continue
             
-            # Determine next cursor
-            next_cursor = None
-            if len(submissions) == limit and submissions:
-                next_cursor = str(submissions[-1].id)
-            
             return Response({
                 'items': timeline_items,
                 'nextCursor': next_cursor
@@ -1752,24 +1505,27 @@ class UserBookmarksView(APIView):
         except (ValueError, TypeError):
             limit = 30
 
-        bookmarks = (
-            SubmissionBookmark.objects.filter(
-                user=user,
-                submission__deleted_at__isnull=True,
+        queryset = SubmissionBookmark.objects.filter(
+            user=user,
+            submission__deleted_at__isnull=True,
+        ).select_related('submission', 'submission__author', 'submission__author__meta')
+        try:
+            bookmarks, next_cursor = feed_cursors.paginate(
+                queryset, feed_cursors.BOOKMARKS, request.query_params.get('cursor'), limit,
             )
-            .select_related('submission', 'submission__author', 'submission__author__meta')
-            .order_by('-created_at')[:limit]
-        )
+        except feed_cursors.InvalidCursor:
+            return _invalid_cursor_response()
+        context = build_feed_context(request, [bm.submission for bm in bookmarks])
 
         items = []
         for bm in bookmarks:
             try:
-                items.append(_build_feed_item_payload(request, bm.submission, logger))
+                items.append(_build_feed_item_payload(request, bm.submission, logger, context=context))
             except Exception as e:
                 logger.error(f'Error serializing bookmark {bm.id}: {e}', exc_info=True)
                 continue
 
-        return Response({'items': items, 'count': len(items)})
+        return Response({'items': items, 'count': len(items), 'nextCursor': next_cursor})
 
 
 def _detect_submission_type(submission) -> str:
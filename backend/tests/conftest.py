@@ -14,6 +14,27 @@ from adminpanel.models import AdminAuditLog
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def reset_timelines():
+    """Drop in-memory follower timelines so IDs reused across tests start clean."""
+    from submissions import timelines
+    timelines.reset_backend()
+    yield
+    timelines.reset_backend()
+
+
+@pytest.fixture(autouse=True)
+def reset_settings_snapshots():
+    """Drop process-local snapshots (settings, title registry) so rows rolled back by other tests are not served."""
+    from toybox import snapshots
+    from gamification.title_registry import title_registry_cache
+    snapshots.invalidate_all()
+    title_registry_cache.invalidate()
+    yield
+    snapshots.invalidate_all()
+    title_registry_cache.invalidate()
+
+
 @pytest.fixture
 def user(db):
     """Create a test user."""
@@ -25,6 +46,20 @@ def user(db):
     )
 
 
+@pytest.fixture
+def make_user(db):
+    """Factory fixture: create a FREE_USER with the given display_id."""
+    def _make_user(display_id, **extra_fields):
+        extra_fields.setdefault('role', User.Role.FREE_USER)
+        return User.objects.create_user(
+            email=f'{display_id}@example.com',
+            password='testpass123',
+            display_id=display_id,
+            **extra_fields
+        )
+    return _make_user
+
+
 @pytest.fixture
 def admin_user(db):
     """Create a test admin user."""
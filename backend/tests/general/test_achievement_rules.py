@@ -0,0 +1,65 @@
+"""
+Tests for the achievement rule registry and event-driven title grants.
+"""
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from gamification.achievements import ACHIEVEMENT_RULES, AchievementEvent, candidate_rules, evaluate
+from gamification.services import ACHIEVEMENT_DEFINITIONS, check_and_grant_achievement_titles
+from submissions.models import Submission, Reaction
+from users.models import UserMeta
+
+
+class TestAchievementRegistry:
+    """Registry mirrors ACHIEVEMENT_DEFINITIONS and events narrow the rules to check."""
+
+    def test_registry_follows_definition_order(self):
+        defined = [d['name'] for d in ACHIEVEMENT_DEFINITIONS]
+        names = [rule.name for rule in ACHIEVEMENT_RULES]
+        assert names == [name for name in defined if name in names]
+        assert set(defined) - set(names) == {'AYATORI', 'TOYBOX!公式'}
+
+    def test_reaction_event_only_checks_dependent_rules(self):
+        names = {rule.name for rule in candidate_rules([AchievementEvent.reaction_received('god_game')])}
+        assert {'神ゲー見習い', '神ゲーの宇宙', '話題の的', 'TOYBOXの使者', '駆け出しクリエイター'} <= names
+        assert '笑わせ屋' not in names
+        assert 'はじめの一歩' not in names
+
+    def test_evaluate_skips_earned_titles(self):
+        stats = {'god_game_count': 10, 'total_reactions': 10}
+        granted = evaluate(stats, {'駆け出しクリエイター'}, [AchievementEvent.reaction_received('god_game')])
+        assert granted == ['神ゲー見習い', '神ゲーの証人']
+
+
+@pytest.mark.django_db
+class TestAchievementGrants:
+    """Event-driven checks and the bulk backfill grant the same titles."""
+
+    def test_reaction_event_grants_title(self, make_user):
+        author = make_user('rxtitleauthor')
+        sub = Submission.objects.create(author=author, title='gg')
+        for i in range(5):
+            Reaction.objects.create(user=make_user(f'rxfan{i}'), submission=sub, type=Reaction.Type.GOD_GAME)
+
+        granted = check_and_grant_achievement_titles(author, [AchievementEvent.reaction_received('god_game')])
+        assert granted == ['駆け出しクリエイター', '神ゲー見習い']
+        # 投稿系の称号はこのイベントでは判定しない
+        assert 'はじめの一歩' not in UserMeta.objects.get(user=author).earned_titles
+
+        assert 'はじめの一歩' in check_and_grant_achievement_titles(author)
+
+    def test_backfill_command_grants_missing_titles(self, make_user):
+        author = make_user('backfillauthor')
+        Submission.objects.create(author=author, title='first')
+
+        out = StringIO()
+        call_command('backfill_achievement_titles', '--dry-run', stdout=out)
+        assert 'would be granted' in out.getvalue()
+        meta = UserMeta.objects.filter(user=author).first()
+        assert meta is None or not meta.earned_titles
+
+        call_command('backfill_achievement_titles', '--batch-size', '1', stdout=StringIO())
+        meta = UserMeta.objects.get(user=author)
+        assert {'駆け出しクリエイター', 'はじめの一歩', '絵師見習い'} <= set(meta.earned_titles)
+        assert meta.active_title == '駆け出しクリエイター'
+        assert check_and_grant_achievement_titles(author) == []
@@ -0,0 +1,122 @@
+"""
+Tests for the incremental UserAchievementStats engine behind achievement checks.
+"""
+import pytest
+from datetime import datetime, timedelta
+from io import StringIO
+from zoneinfo import ZoneInfo
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from gamification.achievement_stats import get_user_stats, verify_user_stats
+from gamification.models import Card, UserAchievementStats
+from gamification.services import _compute_user_stats, _compute_user_stats_scan, check_and_grant_achievement_titles
+from submissions.models import Submission, Reaction
+from users.models import UserCard
+
+JST = ZoneInfo('Asia/Tokyo')
+
+
+def _post(author, when, **fields):
+    sub = Submission.objects.create(author=author, title='post', **fields)
+    Submission.objects.filter(pk=sub.pk).update(created_at=when)
+    sub.refresh_from_db()
+    return sub
+
+
+def _assert_matches_scan(user):
+    stats = _compute_user_stats(user)
+    legacy = _compute_user_stats_scan(user)
+    assert {key: stats[key] for key in legacy} == legacy
+
+
+@pytest.mark.django_db
+class TestUserAchievementStats:
+    """Stats row follows posts, reactions and cards, and agrees with the legacy scan."""
+
+    def test_rebuild_matches_legacy_scan(self, make_user):
+        author = make_user('achauthor')
+        fan = make_user('achfan')
+        day = datetime(2026, 3, 2, 7, 30, tzinfo=JST)  # 月曜 7時
+        subs = [
+            _post(author, day),
+            _post(author, day + timedelta(days=1, hours=3), game_url='https://example.com/g'),
+            _post(author, day + timedelta(days=2), video_url='https://example.com/v'),
+            _post(author, day + timedelta(days=5, hours=-5)),  # 土曜 2時
+        ]
+        Reaction.objects.create(user=fan, submission=subs[0], type=Reaction.Type.GOD_GAME)
+        Reaction.objects.create(user=fan, submission=subs[1], type=Reaction.Type.CUTE)
+
+        stats = _compute_user_stats(author)
+        assert stats['max_streak'] == 3
+        assert stats['has_morning_post'] and stats['has_morning_creator_post']
+        assert stats['has_night_post'] and stats['has_weekend_post']
+        _assert_matches_scan(author)
+
+    def test_incremental_updates_follow_events(self, make_user):
+        author = make_user('incauthor')
+        fan = make_user('incfan')
+        first = Submission.objects.create(author=author, title='first')
+        get_user_stats(author.id)
+
+        second = Submission.objects.create(author=author, title='second', game_url='https://example.com/g')
+        reaction = Reaction.objects.create(user=fan, submission=first, type=Reaction.Type.BEAUTIFUL)
+        card = Card.objects.create(code='ach-card', name='card')
+        UserCard.objects.create(user=author, card=card)
+
+        stats = UserAchievementStats.objects.get(user=author)
+        assert (stats.total_posts, stats.game_posts, stats.image_posts) == (2, 1, 1)
+        assert (stats.beautiful_count, stats.total_reactions, stats.card_count) == (1, 1, 1)
+        assert stats.current_streak == 1
+        _assert_matches_scan(author)
+
+        reaction.delete()
+        second.soft_delete()
+        stats.refresh_from_db()
+        assert (stats.total_posts, stats.game_posts, stats.total_reactions) == (1, 0, 0)
+        assert verify_user_stats([author.id]) == []
+
+    def test_unrelated_edits_skip_rebuild(self, make_user, monkeypatch):
+        from gamification import achievement_stats
+        author = make_user('editauthor')
+        sub = Submission.objects.create(author=author, title='edit')
+        rebuilt = []
+        monkeypatch.setattr(achievement_stats, 'refresh_user_stats', rebuilt.append)
+
+        sub.title = 'edited'
+        sub.save()
+        sub.comment_enabled = not sub.comment_enabled
+        sub.save()
+        assert rebuilt == []
+
+        sub.game_url = 'https://example.com/g'
+        sub.save()
+        assert rebuilt == [author.id]
+
+    def test_check_titles_query_count_is_constant(self, make_user):
+        author = make_user('qcauthor')
+        fan = make_user('qcfan')
+        for i in range(5):
+            sub = Submission.objects.create(author=author, title=f'p{i}')
+            Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.FUNNY)
+        check_and_grant_achievement_titles(author)
+
+        for i in range(20):
+            Submission.objects.create(author=author, title=f'more{i}')
+        with CaptureQueriesContext(connection) as ctx:
+            check_and_grant_achievement_titles(author)
+        assert len(ctx.captured_queries) <= 4
+        _assert_matches_scan(author)
+
+    def test_rebuild_command_repairs_drift(self, make_user):
+        author = make_user('achdrift')
+        Submission.objects.create(author=author, title='drift')
+        get_user_stats(author.id)
+        UserAchievementStats.objects.filter(user=author).update(total_posts=9, max_streak=0)
+
+        out = StringIO()
+        call_command('rebuild_achievement_stats', '--verify', stdout=out)
+        assert 'mismatches found' in out.getvalue()
+
+        call_command('rebuild_achievement_stats', stdout=StringIO())
+        assert verify_user_stats([author.id]) == []
@@ -0,0 +1,115 @@
+"""
+Tests for the cached JWT principal shared by DRF and the template middleware.
+"""
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+from toybox.authentication import CachedJWTAuthentication, principals, user_from_request
+from users.models import User
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-tests'}}
+    from django.core.cache import cache
+    cache.clear()
+    principals.clear_local()
+    yield cache
+    principals.clear_local()
+    cache.clear()
+
+
+def _request(user):
+    return RequestFactory().get('/api/users/me/meta/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+def _user_queries(ctx):
+    return [q for q in ctx.captured_queries if 'FROM "users"' in q['sql']]
+
+
+@pytest.mark.django_db
+class TestCachedPrincipal:
+    """The user is read once, then served from the cache until it changes."""
+
+    def test_warm_lookup_skips_user_query(self, make_user, locmem_cache):
+        user = make_user('authwarm')
+        backend = CachedJWTAuthentication()
+        backend.authenticate(_request(user))
+
+        with CaptureQueriesContext(connection) as ctx:
+            resolved, _token = backend.authenticate(_request(user))
+        assert resolved.pk == user.pk
+        assert resolved.display_id == 'authwarm'
+        assert not _user_queries(ctx)
+
+        # 他のプロセス（プロセス内コピーなし）からは共有キャッシュで解決できる
+        principals.clear_local()
+        with CaptureQueriesContext(connection) as ctx:
+            backend.authenticate(_request(user))
+        assert not _user_queries(ctx)
+
+    def test_role_and_suspension_changes_invalidate(self, make_user, locmem_cache, django_capture_on_commit_callbacks):
+        user = make_user('authrole')
+        backend = CachedJWTAuthentication()
+        assert backend.authenticate(_request(user))[0].role == User.Role.FREE_USER
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.role = User.Role.SUPERUSER
+            user.is_suspended = True
+            user.save()
+        resolved = backend.authenticate(_request(user))[0]
+        assert resolved.role == User.Role.SUPERUSER
+        assert resolved.is_suspended is True
+
+    def test_deactivated_user_is_rejected(self, make_user, locmem_cache, django_capture_on_commit_callbacks):
+        user = make_user('authinactive')
+        backend = CachedJWTAuthentication()
+        backend.authenticate(_request(user))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+        with pytest.raises(AuthenticationFailed):
+            backend.authenticate(_request(user))
+        assert not user_from_request(_request(user)).is_authenticated
+
+    def test_snapshot_saves_only_named_fields(self, make_user, locmem_cache):
+        user = make_user('authpassword')
+        resolved = CachedJWTAuthentication().authenticate(_request(user))[0]
+        assert 'password' in resolved.get_deferred_fields()
+        # スナップショット取得後に管理者が凍結しても、アバター更新で凍結が戻らない
+        User.objects.filter(pk=user.pk).update(is_suspended=True)
+        resolved.avatar_url = 'https://example.com/a.png'
+        with pytest.raises(ValueError):
+            resolved.save()
+        resolved.save(update_fields=['avatar_url', 'updated_at'])
+        user.refresh_from_db()
+        assert user.avatar_url == 'https://example.com/a.png'
+        assert user.is_suspended is True
+        assert user.check_password('testpass123')
+
+    def test_resolved_once_per_request(self, make_user, locmem_cache):
+        user = make_user('authmemo')
+        request = _request(user)
+        first = CachedJWTAuthentication().authenticate(request)
+        # テンプレート用ミドルウェアも同じ結果を使う
+        assert user_from_request(request) is first[0]
+
+
+@pytest.mark.django_db
+class TestRequestMeta:
+    """Views reuse the meta row resolved for request.user."""
+
+    def test_meta_endpoint_with_jwt(self, make_user, locmem_cache):
+        user = make_user('authmeta')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        response = client.get('/api/users/me/meta/')
+        assert response.status_code == 200
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get('/api/users/me/meta/').status_code == 200
+        assert not _user_queries(ctx)
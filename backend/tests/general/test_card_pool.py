@@ -0,0 +1,84 @@
+"""
+Tests for the cached alias-table card pool used by reward grants.
+"""
+import random
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from gamification.achievement_stats import get_user_stats
+from gamification.card_pool import (
+    AliasTable, PoolCard, card_pool_cache, card_probabilities, draw, get_card_pool, grant_cards,
+)
+from gamification.models import Card
+from gamification.services import grant_immediate_rewards
+from users.models import UserCard, UserMeta
+
+
+def _card(code, rarity):
+    return PoolCard(pk=None, code=code, name=code, rarity=rarity, image_url=None)
+
+
+class TestCardProbabilities:
+    """The flattened distribution reproduces the legacy type → rarity → card steps."""
+
+    def test_probabilities_follow_legacy_steps(self):
+        cards = [_card('C001', 'common'), _card('C002', 'special'), _card('E101', 'common'), _card('E102', 'rare')]
+        probs = dict(zip([c.code for c in cards], card_probabilities(cards)))
+        # キャラクター: N 0.75 → C001, SSR 0.01 → C002, 空の R/SR (0.24) は種別内で一様
+        assert probs['C001'] == pytest.approx(0.5 * (0.75 + 0.12))
+        assert probs['C002'] == pytest.approx(0.5 * (0.01 + 0.12))
+        # エフェクト: N 0.75 → E101, R 0.20 → E102, 空の SR/SSR (0.05) は種別内で一様
+        assert probs['E101'] == pytest.approx(0.5 * (0.75 + 0.025))
+        assert probs['E102'] == pytest.approx(0.5 * (0.20 + 0.025))
+        assert sum(probs.values()) == pytest.approx(1.0)
+
+    def test_alias_table_sampling_matches_weights(self):
+        weights = [0.6, 0.3, 0.1]
+        table = AliasTable(weights)
+        rng = random.Random(1)
+        counts = [0, 0, 0]
+        for _ in range(20000):
+            counts[table.sample(rng)] += 1
+        for count, weight in zip(counts, weights):
+            assert count / 20000 == pytest.approx(weight, abs=0.02)
+
+
+@pytest.mark.django_db
+class TestCardPoolCache:
+    """Draws are served from the cached pool and card changes invalidate it."""
+
+    def test_draw_does_not_query_after_warmup(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            Card.objects.create(code='C001', name='Hero', rarity='common')
+        get_card_pool()
+        with CaptureQueriesContext(connection) as ctx:
+            assert draw().code == 'C001'
+        assert len(ctx.captured_queries) == 0
+
+    def test_card_save_invalidates_pool(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            Card.objects.create(code='C001', name='Hero', rarity='common')
+        assert [c.code for c in get_card_pool().cards] == ['C001']
+        with django_capture_on_commit_callbacks(execute=True):
+            Card.objects.create(code='E101', name='Spark', rarity='rare')
+        assert [c.code for c in get_card_pool().cards] == ['C001', 'E101']
+
+    def test_grant_rewards_and_bulk_grants(self, make_user, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            Card.objects.create(code='E101', name='Spark', rarity='rare')
+        user = make_user('cardgrantee')
+        get_user_stats(user.id)
+
+        meta, _ = UserMeta.objects.get_or_create(user=user)
+        reward = grant_immediate_rewards(meta)
+        assert reward['card_meta'] == {
+            'card_id': 'E101', 'card_name': 'Spark', 'rarity': 'R', 'image_url': '/uploads/cards/E101.png',
+        }
+
+        cards = grant_cards(user, 3)
+        assert [c.code for c in cards] == ['E101'] * 3
+        assert UserCard.objects.filter(user=user).count() == 4
+        assert get_user_stats(user.id).card_count == 4
+
+    def teardown_method(self):
+        card_pool_cache.invalidate()
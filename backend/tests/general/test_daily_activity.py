@@ -0,0 +1,62 @@
+"""
+Tests for the per-user daily (JST) activity rows.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.utils import timezone
+from gamification import services
+from lottery.models import LotteryRule
+from lottery.services import has_submitted_today
+from lottery.tasks import daily_submit_cap_enforcer
+from submissions.models import Submission
+from users import daily_activity
+from users.models import UserDailyActivity
+
+
+@pytest.mark.django_db
+class TestDailyActivity:
+    """Events upsert one row per user and JST day; daily checks read that row."""
+
+    def test_posts_follow_soft_delete_and_cap(self, make_user):
+        user = make_user('dailyposter')
+        assert has_submitted_today(user) is False
+
+        first = Submission.objects.create(author=user, title='one')
+        Submission.objects.create(author=user, title='two', game_url='https://example.com/game.zip')
+        row = UserDailyActivity.objects.get(user=user, jst_date=daily_activity.jst_date())
+        assert (row.posts, row.image_posts, row.game_posts) == (2, 1, 1)
+        assert has_submitted_today(user) is True
+
+        LotteryRule.objects.create(daily_cap=1, is_active=True)
+        assert daily_submit_cap_enforcer() == 1
+
+        first.deleted_at = timezone.now()
+        first.save(update_fields=['deleted_at'])
+        assert daily_activity.posts_today(user.id) == 1
+        assert daily_submit_cap_enforcer() == 0
+
+    def test_jst_day_boundary(self, make_user):
+        user = make_user('dailyboundary')
+        # 2025-01-01 15:30 UTC = 2025-01-02 00:30 JST
+        created = datetime(2025, 1, 1, 15, 30, tzinfo=dt_timezone.utc)
+        sub = Submission.objects.create(author=user, title='late')
+        Submission.objects.filter(pk=sub.pk).update(created_at=created)
+        sub.refresh_from_db()
+        daily_activity.record_post(sub, 1)
+        assert UserDailyActivity.objects.get(user=user, jst_date=created.date() + timedelta(days=1)).posts == 1
+
+    def test_logins_game_plays_and_lottery_draw(self, make_user):
+        player = make_user('dailyplayer')
+        author = make_user('dailyauthor')
+        game = Submission.objects.create(author=author, title='game')
+
+        services.award_daily_login(player)
+        services.award_daily_login(player)
+        services.award_game_played(player, game)
+        row = UserDailyActivity.objects.get(user=player, jst_date=daily_activity.jst_date())
+        assert (row.logins, row.game_plays) == (2, 1)
+
+        assert daily_activity.claim_lottery_draw(player.id) is True
+        assert daily_activity.claim_lottery_draw(player.id) is False
+        assert daily_activity.claim_lottery_draw(author.id) is True
@@ -0,0 +1,92 @@
+"""
+Tests for the public feed response cache, viewer overlay and conditional GET.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from submissions.models import Submission, Reaction, SubmissionBookmark
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'feed-tests'}}
+    from django.core.cache import cache
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def _submission_queries(ctx):
+    return [q for q in ctx.captured_queries if 'FROM "submissions"' in q['sql']]
+
+
+@pytest.mark.django_db
+class TestFeedCache:
+    """Anonymous feeds are served from the cached skeleton until a post is added or removed."""
+
+    def test_anonymous_hit_and_conditional_get(self, make_user, locmem_cache):
+        author = make_user('feedcacheauthor')
+        Submission.objects.create(author=author, title='first')
+        client = APIClient()
+
+        first = client.get('/api/feed/?limit=10')
+        assert first.status_code == 200
+        etag = first['ETag']
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert '_authorId' not in first.data['items'][0]
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = client.get('/api/feed/?limit=10')
+        assert second.data == first.data
+        assert not _submission_queries(ctx)
+
+        not_modified = client.get('/api/feed/?limit=10', HTTP_IF_NONE_MATCH=etag)
+        assert not_modified.status_code == 304
+        assert not_modified['ETag'] == etag
+        assert not not_modified.content
+
+    def test_new_post_bumps_generation(self, make_user, locmem_cache, django_capture_on_commit_callbacks):
+        author = make_user('feedcachebump')
+        Submission.objects.create(author=author, title='old')
+        client = APIClient()
+        first = client.get('/api/feed/?limit=10')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Submission.objects.create(author=author, title='new')
+        response = client.get('/api/feed/?limit=10', HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == 200
+        assert [item['title'] for item in response.data['items']] == ['new', 'old']
+
+    def test_viewer_flags_are_overlaid_on_cached_skeleton(self, make_user, locmem_cache):
+        author = make_user('feedcacheowner')
+        viewer = make_user('feedcacheviewer')
+        liked = Submission.objects.create(author=author, title='liked')
+        own = Submission.objects.create(author=viewer, title='own')
+        Reaction.objects.create(user=viewer, submission=liked, type=Reaction.Type.SUBMIT_MEDAL)
+        SubmissionBookmark.objects.create(user=viewer, submission=liked)
+
+        APIClient().get('/api/feed/?limit=10')  # 未ログインで骨格を作成
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/feed/?limit=10')
+        assert not _submission_queries(ctx)
+        assert 'private' in response['Cache-Control']
+        items = {item['title']: item for item in response.data['items']}
+        assert items['liked']['liked'] is True
+        assert items['liked']['userBookmarked'] is True
+        assert items['liked']['isOwnPost'] is False
+        medal = next(r for r in items['liked']['allReactions'] if r['type'] == Reaction.Type.SUBMIT_MEDAL.value)
+        assert medal['user_reacted'] is True and medal['count'] == 1
+        assert items['own']['isOwnPost'] is True
+        assert str(own.id) == items['own']['id']
+
+        anonymous = APIClient().get('/api/feed/?limit=10')
+        assert all(not item['liked'] and not item['isOwnPost'] for item in anonymous.data['items'])
+
+    def test_ranking_conditional_get(self, locmem_cache):
+        client = APIClient()
+        first = client.get('/api/ranking/daily/')
+        assert first.status_code == 200
+        assert client.get('/api/ranking/daily/', HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
@@ -0,0 +1,93 @@
+"""
+Query-count regression tests for feed-like endpoints.
+
+Each endpoint must issue a constant number of queries regardless of page size
+(reaction counts / viewer state are loaded per page by build_feed_context).
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from submissions.models import Submission, Reaction, SubmissionBookmark, SubmissionRepost
+from users.models import UserMeta, UserFollow
+
+
+def _seed(make_user, count):
+    author = make_user('feedauthor')
+    UserMeta.objects.create(user=author, display_name='Author')
+    viewer = make_user('feedviewer')
+    others = [make_user(f'fan{i}') for i in range(3)]
+    UserFollow.objects.create(follower=viewer, following=author)
+    for i in range(count):
+        sub = Submission.objects.create(author=author, title=f'post {i}', hashtags=['tag'])
+        for fan in others:
+            Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.SUBMIT_MEDAL)
+            Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.GOD_GAME)
+        Reaction.objects.create(user=viewer, submission=sub, type=Reaction.Type.COOL)
+        SubmissionBookmark.objects.create(user=viewer, submission=sub)
+        SubmissionRepost.objects.create(user=others[0], submission=sub)
+    return author, viewer
+
+
+def _count_queries(client, url):
+    client.get(url)  # warm up one-off lookups (e.g. SiteMaintenance singleton creation)
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return len(ctx.captured_queries), response
+
+
+@pytest.mark.django_db
+class TestFeedQueryCount:
+    """Feed endpoints keep a constant query count whatever the page size."""
+
+    @pytest.mark.parametrize('url', [
+        '/api/feed/?limit={n}',
+        '/api/feed/following/?limit={n}',
+        '/api/feed/popular/?limit={n}',
+        '/api/timeline/?limit={n}',
+        '/api/user/bookmarks/feedviewer/?limit={n}',
+    ])
+    def test_constant_queries_authenticated(self, make_user, url):
+        _, viewer = _seed(make_user, 12)
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+
+        small, _ = _count_queries(client, url.format(n=2))
+        large, response = _count_queries(client, url.format(n=12))
+
+        assert small == large
+        assert len(response.data['items']) == 12
+
+    @pytest.mark.parametrize('url', [
+        '/api/feed/?limit={n}',
+        '/api/feed/popular/?limit={n}',
+        '/api/timeline/?limit={n}',
+    ])
+    def test_constant_queries_anonymous(self, make_user, url):
+        _seed(make_user, 12)
+        client = APIClient()
+
+        small, _ = _count_queries(client, url.format(n=2))
+        large, _ = _count_queries(client, url.format(n=12))
+
+        assert small == large
+
+    def test_batched_values_match_viewer_state(self, make_user):
+        _, viewer = _seed(make_user, 3)
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+
+        response = client.get('/api/feed/?limit=3')
+        item = response.data['items'][0]
+        counts = {r['type']: r for r in item['allReactions']}
+
+        assert item['likesCount'] == 3
+        assert item['totalReactionsCount'] == 7
+        assert item['liked'] is False
+        assert item['userBookmarked'] is True
+        assert item['repostCount'] == 1
+        assert item['userReposted'] is False
+        assert counts['god_game']['count'] == 3
+        assert counts['cool']['user_reacted'] is True
+        assert item['displayName'] == 'Author'
@@ -0,0 +1,73 @@
+"""
+Tests for the normalized hashtag index and tag counts.
+"""
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from submissions.models import Submission, SubmissionHashtag, HashtagCount
+
+
+def _counts():
+    return dict(HashtagCount.objects.filter(count__gt=0).values_list('tag', 'count'))
+
+
+@pytest.mark.django_db
+class TestHashtagIndex:
+    """Index rows and counts follow create / edit / soft-delete / remove_hashtag."""
+
+    def test_index_follows_submission_lifecycle(self, make_user):
+        author = make_user('tagauthor')
+        sub = Submission.objects.create(author=author, title='t', hashtags=['Pixel', ' pixel ', 'game'])
+        other = Submission.objects.create(author=author, title='u', hashtags=['game'])
+
+        assert set(SubmissionHashtag.objects.filter(submission=sub).values_list('tag_lower', flat=True)) == {'pixel', 'game'}
+        assert _counts() == {'Pixel': 1, 'game': 2}
+
+        sub.hashtags = ['game', 'Dot']
+        sub.save()
+        assert _counts() == {'Dot': 1, 'game': 2}
+
+        sub.soft_delete()
+        assert not SubmissionHashtag.objects.filter(submission=sub).exists()
+        assert _counts() == {'game': 1}
+
+        sub.restore()
+        assert _counts() == {'Dot': 1, 'game': 2}
+
+        other.delete()
+        assert _counts() == {'Dot': 1, 'game': 1}
+
+    def test_feed_hashtag_search_uses_index(self, make_user):
+        author = make_user('searchauthor')
+        match = Submission.objects.create(author=author, title='m', hashtags=['PixelArt'])
+        Submission.objects.create(author=author, title='n', hashtags=['music'])
+        client = APIClient()
+
+        exact = client.get('/api/feed/?hashtag=pixelart')
+        assert [i['id'] for i in exact.data['items']] == [str(match.id)]
+
+        partial = client.get('/api/feed/?hashtag_contains=xela')
+        assert [i['id'] for i in partial.data['items']] == [str(match.id)]
+
+        popular = client.get('/api/feed/hashtags/')
+        assert {'tag': 'PixelArt', 'count': 1} in popular.data['hashtags']
+
+    def test_hashtag_feed_pages_with_cursor(self, make_user):
+        author = make_user('pageauthor')
+        subs = [Submission.objects.create(author=author, title=str(i), hashtags=['page']) for i in range(5)]
+        client = APIClient()
+
+        first = client.get('/api/feed/?hashtag=page&limit=3')
+        second = client.get(f'/api/feed/?hashtag=page&limit=3&cursor={first.data["nextCursor"]}')
+        ids = [i['id'] for i in first.data['items'] + second.data['items']]
+        assert ids == [str(s.id) for s in reversed(subs)]
+
+    def test_remove_hashtag_command_updates_index(self, make_user):
+        author = make_user('removeauthor')
+        Submission.objects.create(author=author, title='r', hashtags=['Spam', 'keep'])
+
+        call_command('remove_hashtag', 'spam', stdout=StringIO())
+
+        assert _counts() == {'keep': 1}
+        assert not SubmissionHashtag.objects.filter(tag_lower='spam').exists()
@@ -0,0 +1,81 @@
+"""
+Tests for the time-decayed hot score behind the recommended and popular (sort=hot) feeds.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from submissions import hot_scores
+from submissions.models import Submission, Reaction, SubmissionReactionStats
+from submissions.reaction_stats import verify_reaction_stats
+
+
+def _age(submission, hours):
+    created_at = timezone.now() - timedelta(hours=hours)
+    Submission.objects.filter(id=submission.id).update(created_at=created_at)
+    SubmissionReactionStats.objects.filter(submission=submission).update(submission_created_at=created_at)
+
+
+@pytest.mark.django_db
+class TestHotScores:
+    """hot_score follows reactions and ranks like (1 + points) × 0.5^(age / half-life)."""
+
+    def test_score_matches_exponential_decay(self, settings):
+        settings.FEED_HOT_HALF_LIFE_HOURS = 10
+        now = timezone.now()
+        # 10時間前の 42pt は (1 + 42) / 2 = 21.5 → 今の 20pt（21）より上、今の 21pt（22）より下
+        older = hot_scores.score(42, now - timedelta(hours=10))
+        assert hot_scores.score(20, now) < older < hot_scores.score(21, now)
+
+    def test_reactions_update_hot_score(self, make_user):
+        author = make_user('hotauthor')
+        fan = make_user('hotfan')
+        sub = Submission.objects.create(author=author, title='hot')
+        initial = SubmissionReactionStats.objects.get(submission=sub).hot_score
+
+        reaction = Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.GOD_GAME)
+        stats = SubmissionReactionStats.objects.get(submission=sub)
+        assert stats.hot_score == hot_scores.score(10, stats.submission_created_at) > initial
+
+        reaction.delete()
+        stats.refresh_from_db()
+        assert stats.hot_score == pytest.approx(initial)
+        assert verify_reaction_stats([sub.id]) == []
+
+    def test_refresh_applies_weight_changes(self, make_user, settings):
+        author = make_user('hotweights')
+        fan = make_user('hotweightsfan')
+        recent = Submission.objects.create(author=author, title='recent')
+        stale = Submission.objects.create(author=author, title='stale')
+        for sub in (recent, stale):
+            Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.CUTE)
+        _age(stale, 24 * 30)
+        before = dict(SubmissionReactionStats.objects.values_list('submission_id', 'hot_score'))
+
+        settings.FEED_HOT_REACTION_WEIGHTS = {'cute': 100}
+        assert hot_scores.refresh()['updated'] == 1
+        after = dict(SubmissionReactionStats.objects.values_list('submission_id', 'hot_score'))
+        assert after[recent.id] > before[recent.id]
+        assert after[stale.id] == before[stale.id]
+
+    def test_feeds_read_hot_order(self, make_user):
+        author = make_user('hotfeedauthor')
+        fans = [make_user(f'hotfeedfan{i}') for i in range(3)]
+        older = Submission.objects.create(author=author, title='older')
+        newer = Submission.objects.create(author=author, title='newer')
+        for fan in fans:
+            Reaction.objects.create(user=fan, submission=older, type=Reaction.Type.GOD_GAME)
+            Reaction.objects.create(user=fan, submission=newer, type=Reaction.Type.SUBMIT_MEDAL)
+        # 30pt でも20時間前なら、今の 9pt より下がる（半減期12時間）
+        _age(older, 20)
+        hot_scores.update(older.id)
+        client = APIClient()
+
+        recommended = client.get('/api/feed/?mode=recommended')
+        assert [item['id'] for item in recommended.data['items']] == [str(newer.id), str(older.id)]
+        hot = client.get('/api/feed/popular/?sort=hot')
+        assert [item['id'] for item in hot.data['items']] == [str(newer.id), str(older.id)]
+        by_tp = client.get('/api/feed/popular/')
+        assert [item['id'] for item in by_tp.data['items']] == [str(older.id), str(newer.id)]
+        assert client.get('/api/feed/popular/?sort=new').status_code == 400
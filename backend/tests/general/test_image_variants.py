@@ -0,0 +1,71 @@
+"""
+Tests for responsive image variants (width ladder × WebP/JPEG) and their manifest.
+"""
+import io
+import pytest
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APIClient
+from submissions.image_variants import generate_variants, variant_formats
+from submissions.models import ImageVariantManifest, Submission
+from toybox.image_optimizer import render_variants
+
+
+def _save_png(root, name, size=(1000, 500)):
+    (root / 'submissions').mkdir(exist_ok=True)
+    Image.new('RGB', size, (10, 120, 200)).save(root / 'submissions' / name, format='PNG')
+    return f'submissions/{name}'
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+    return tmp_path
+
+
+class TestRenderVariants:
+    """The ladder never upscales and keeps the aspect ratio."""
+
+    def test_ladder_stops_at_original_width(self):
+        buf = io.BytesIO()
+        Image.new('RGB', (1000, 500)).save(buf, format='PNG')
+        buf.seek(0)
+        (width, height), outputs = render_variants(buf, (160, 320, 640, 1280), ['webp', 'jpeg'])
+        assert (width, height) == (1000, 500)
+        assert sorted({(w, h) for _, w, h, _ in outputs}) == [(160, 80), (320, 160), (640, 320), (1000, 500)]
+        assert {fmt for fmt, _, _, _ in outputs} == {'webp', 'jpeg'}
+
+    def test_jpeg_is_always_a_fallback(self, settings):
+        settings.IMAGE_VARIANT_FORMATS = ('webp',)
+        assert variant_formats() == ['webp', 'jpeg']
+
+
+@pytest.mark.django_db
+class TestVariantManifest:
+    """Manifests are written once per image and exposed as srcset lists in the feed."""
+
+    def test_feed_exposes_srcset(self, media_root, make_user):
+        path = _save_png(media_root, 'post.png')
+        generate_variants(path)
+        manifest = ImageVariantManifest.objects.get(source_path=path)
+        assert (manifest.width, manifest.height) == (1000, 500)
+        assert all((media_root / v['path']).exists() for v in manifest.variants)
+
+        author = make_user('variantauthor')
+        Submission.objects.create(author=author, title='post', image_url=f'/uploads/{path}')
+        response = APIClient().get('/api/feed/?limit=5')
+        item = response.data['items'][0]
+        srcset = item['imageVariants']['srcset']
+        assert list(srcset)[-1] == 'jpeg'
+        assert srcset['webp'].endswith('_w1000.webp 1000w')
+        assert '_w160.webp 160w' in srcset['webp']
+
+    def test_generate_thumbnails_backfills_variants_in_parallel(self, media_root):
+        paths = [_save_png(media_root, f'old{i}.png', size=(400, 400)) for i in range(3)]
+        call_command('generate_thumbnails', '--type', 'submissions', '--variants', '--workers', '2', stdout=io.StringIO())
+        manifests = ImageVariantManifest.objects.filter(source_path__in=paths)
+        assert manifests.count() == 3
+        # サムネイルやバリアント自身は補完対象にならない
+        assert ImageVariantManifest.objects.count() == 3
+        assert {v['width'] for v in manifests[0].variants} == {160, 320, 400}
@@ -0,0 +1,92 @@
+"""
+Tests for the media catalog that replaces filesystem stats during URL building.
+"""
+import io
+import os
+import pytest
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APIClient
+from submissions import media_catalog
+from submissions.models import StoredMediaFile, Submission
+
+
+def _save_png(root, name):
+    (root / 'submissions').mkdir(exist_ok=True)
+    Image.new('RGB', (600, 400), (250, 200, 0)).save(root / 'submissions' / name, format='PNG')
+    return f'submissions/{name}'
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_JOB_MODE = 'inline'
+    return tmp_path
+
+
+@pytest.fixture
+def count_stats(monkeypatch):
+    calls = []
+    real_isfile = os.path.isfile
+
+    def isfile(path):
+        calls.append(path)
+        return real_isfile(path)
+
+    monkeypatch.setattr(media_catalog.os.path, 'isfile', isfile)
+    return calls
+
+
+@pytest.mark.django_db
+class TestCatalogLookups:
+    """URL builders consult the catalog and defer missing derivatives to a worker."""
+
+    def test_feed_does_not_stat_or_generate_inline(
+        self, media_root, make_user, count_stats, django_capture_on_commit_callbacks,
+    ):
+        path = _save_png(media_root, 'post.png')
+        media_catalog.register(path)
+        Submission.objects.create(author=make_user('catalogauthor'), title='post', image_url=f'/uploads/{path}')
+
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            response = APIClient().get('/api/feed/?limit=5')
+        item = response.data['items'][0]
+        assert item['imageUrl'].endswith('/uploads/submissions/post.png')
+        assert count_stats == []
+        # サムネイルはリクエスト中に作らず、投入だけする
+        assert not (media_root / 'submissions' / 'post_thumb.jpg').exists()
+        assert callbacks
+
+        for callback in callbacks:
+            callback()
+        assert StoredMediaFile.objects.filter(path='submissions/post_thumb.jpg').exists()
+        response = APIClient().get('/api/feed/?limit=5')
+        assert response.data['items'][0]['displayImageUrl'].endswith('/uploads/submissions/post_thumb.jpg')
+
+    def test_unregistered_file_is_found_and_registered(self, media_root, count_stats):
+        path = _save_png(media_root, 'legacy.png')
+        assert media_catalog.exists(f'/uploads/{path}')
+        assert StoredMediaFile.objects.filter(path=path).exists()
+        assert len(count_stats) == 1
+
+        assert media_catalog.exists(f'https://example.com/uploads/{path}')
+        assert len(count_stats) == 1
+
+    def test_strict_mode_trusts_the_catalog(self, media_root, settings, count_stats):
+        settings.MEDIA_CATALOG_STRICT = True
+        path = _save_png(media_root, 'unknown.png')
+        assert not media_catalog.exists(path)
+        assert count_stats == []
+
+
+@pytest.mark.django_db
+class TestReconcile:
+    """The reconciliation command registers stored files and prunes stale rows."""
+
+    def test_reconcile_registers_and_prunes(self, media_root):
+        path = _save_png(media_root, 'kept.png')
+        StoredMediaFile.objects.create(path='submissions/gone.png')
+
+        call_command('reconcile_media_catalog', 'submissions', '--prune', stdout=io.StringIO())
+
+        assert set(StoredMediaFile.objects.values_list('path', flat=True)) == {path}
@@ -0,0 +1,136 @@
+"""
+Tests for the upload media-job pipeline (store once, process after commit).
+"""
+import io
+import os
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework.test import APIClient
+from submissions import media_jobs
+from submissions.models import MediaJob, Submission
+
+User = get_user_model()
+
+
+def _png_upload(name='photo.png'):
+    buf = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 30, 30)).save(buf, format='PNG')
+    return SimpleUploadedFile(name, buf.getvalue(), content_type='image/png')
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_JOB_MODE = 'inline'
+    return tmp_path
+
+
+@pytest.fixture
+def paid_client(make_user):
+    creator = make_user('creator', role=User.Role.PAID_USER)
+    client = APIClient()
+    client.force_authenticate(user=creator)
+    return creator, client
+
+
+@pytest.mark.django_db
+class TestImageUploadJob:
+    """Image uploads are stored once and optimized by the job."""
+
+    def test_inline_upload_produces_optimized_image_and_thumbnail(
+        self, media_root, paid_client, django_capture_on_commit_callbacks,
+    ):
+        creator, client = paid_client
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post('/api/submit/upload/', {'file': _png_upload()}, format='multipart')
+        assert response.status_code in (200, 202)
+
+        job = MediaJob.objects.get(id=response.data['mediaJob']['id'])
+        assert job.status == MediaJob.Status.SUCCEEDED
+        assert job.attempts == 1
+        assert job.result['imageUrl'] == '/uploads/' + job.main_path
+        assert os.path.exists(media_root / job.main_path)
+        assert not os.path.exists(media_root / job.source_path)
+        assert job.result['thumbnailUrl'].endswith('_thumb.jpg')
+        assert {'store', 'queue', 'optimize', 'thumbnail', 'total'} <= set(job.timings)
+
+    def test_same_idempotency_key_returns_existing_job(
+        self, media_root, paid_client, django_capture_on_commit_callbacks,
+    ):
+        creator, client = paid_client
+        with django_capture_on_commit_callbacks(execute=True):
+            first = client.post('/api/submit/upload/', {'file': _png_upload()}, format='multipart', HTTP_IDEMPOTENCY_KEY='abc')
+            second = client.post('/api/submit/upload/', {'file': _png_upload()}, format='multipart', HTTP_IDEMPOTENCY_KEY='abc')
+        assert first.data['mediaJob']['id'] == second.data['mediaJob']['id']
+        assert MediaJob.objects.filter(user=creator).count() == 1
+
+    def test_status_endpoint_is_owner_only(self, media_root, paid_client, make_user, django_capture_on_commit_callbacks):
+        creator, client = paid_client
+        with django_capture_on_commit_callbacks(execute=True):
+            job, _ = media_jobs.create_job(creator, MediaJob.Kind.IMAGE, _png_upload())
+        response = client.get(f'/api/media-jobs/{job.id}/')
+        assert response.status_code == 200
+        assert response.data['status'] == MediaJob.Status.SUCCEEDED
+
+        other = APIClient()
+        other.force_authenticate(user=make_user('someone'))
+        assert other.get(f'/api/media-jobs/{job.id}/').status_code == 404
+
+
+@pytest.mark.django_db
+class TestPendingSubmission:
+    """Submissions created before the job finishes show a placeholder until it does."""
+
+    def test_pending_submission_is_linked_and_cleared(self, media_root, make_user, django_capture_on_commit_callbacks):
+        creator = make_user('creator', role=User.Role.PAID_USER)
+        # コミット後の投入を実行しないので、ジョブは未完了のまま
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            job, _ = media_jobs.create_job(creator, MediaJob.Kind.IMAGE, _png_upload())
+        submission = Submission.objects.create(author=creator, image_url=f'https://example.com/uploads/{job.main_path}')
+        submission.refresh_from_db()
+        assert submission.media_job_id == job.id
+        assert submission.media_pending is True
+
+        from submissions.serializers import SubmissionSerializer
+        data = SubmissionSerializer(submission, context={}).data
+        assert data['display_image_url'] == media_jobs.placeholder_url()
+
+        for callback in callbacks:
+            callback()
+        submission.refresh_from_db()
+        assert submission.media_pending is False
+        assert SubmissionSerializer(submission, context={}).data['display_image_url'] != media_jobs.placeholder_url()
+
+    def test_finished_fallback_job_rewrites_late_submission(self, media_root, make_user, django_capture_on_commit_callbacks):
+        creator = make_user('creator', role=User.Role.PAID_USER)
+        with django_capture_on_commit_callbacks(execute=True):
+            job, _ = media_jobs.create_job(creator, MediaJob.Kind.IMAGE, _png_upload())
+        # 最適化に失敗して元ファイルで完了した状態
+        fallback = '/uploads/' + job.source_path
+        MediaJob.objects.filter(id=job.id).update(result={'imageUrl': fallback})
+
+        submission = Submission.objects.create(author=creator, image_url=f'https://example.com/uploads/{job.main_path}')
+        submission.refresh_from_db()
+        assert submission.media_job_id == job.id
+        assert submission.media_pending is False
+        assert submission.image_url == f'https://example.com{fallback}'
+
+    def test_job_fails_after_max_attempts(self, media_root, settings, make_user, django_capture_on_commit_callbacks):
+        settings.MEDIA_JOB_MAX_ATTEMPTS = 2
+        creator = make_user('creator', role=User.Role.PAID_USER)
+        broken = SimpleUploadedFile('broken.png', b'not an image', content_type='image/png')
+        with django_capture_on_commit_callbacks(execute=False):
+            job, _ = media_jobs.create_job(creator, MediaJob.Kind.IMAGE, broken)
+        os.remove(media_root / job.source_path)
+        submission = Submission.objects.create(author=creator, image_url=f'/uploads/{job.main_path}')
+
+        media_jobs.run_inline(str(job.id))
+
+        job.refresh_from_db()
+        submission.refresh_from_db()
+        assert job.status == MediaJob.Status.FAILED
+        assert job.attempts == 2
+        assert job.error
+        assert submission.media_pending is False
@@ -0,0 +1,48 @@
+"""
+Tests for the Notification table and its denormalized unread counter.
+"""
+import pytest
+from rest_framework.test import APIClient
+from submissions.models import Submission
+from users import notifications
+from users.models import Notification, NotificationCounter
+
+
+@pytest.mark.django_db
+class TestNotificationStore:
+    """Notifications are appended as rows and the unread counter follows them."""
+
+    def test_reactions_append_rows_and_count_unread(self, make_user):
+        author = make_user('notifauthor')
+        sub = Submission.objects.create(author=author, title='post')
+        for i in range(3):
+            client = APIClient()
+            client.force_authenticate(user=make_user(f'notiffan{i}'))
+            client.post(f'/api/submissions/{sub.id}/react/cool/')
+
+        assert Notification.objects.filter(recipient=author, type='reaction').count() == 3
+        assert notifications.unread_count(author) == 3
+
+        client = APIClient()
+        client.force_authenticate(user=author)
+        response = client.get('/api/users/notifications/?limit=2')
+        assert response.data['unreadCount'] == 3
+        assert response.data['items'][0]['submissionId'] == str(sub.id)
+        assert response.data['items'][0]['read'] is False
+        second = client.get(f'/api/users/notifications/?limit=2&cursor={response.data["nextCursor"]}')
+        assert len(second.data['items']) == 1
+        assert second.data['nextCursor'] is None
+
+        assert client.post('/api/users/notifications/read/').data['updated'] == 3
+        assert notifications.unread_count(author) == 0
+        assert not Notification.objects.filter(recipient=author, is_read=False).exists()
+
+    def test_notify_many_bulk_inserts(self, make_user):
+        users = [make_user(f'notifbulk{i}') for i in range(3)]
+        notifications.notify_many(users + [users[0]], Notification.Type.SUBMISSION, 'hello', submission_id=1)
+
+        assert Notification.objects.count() == 4
+        counts = dict(NotificationCounter.objects.values_list('user_id', 'unread_count'))
+        assert counts == {users[0].pk: 2, users[1].pk: 1, users[2].pk: 1}
+        NotificationCounter.objects.filter(user=users[0]).update(unread_count=99)
+        assert notifications.recount_unread(users[0]) == 2
@@ -0,0 +1,59 @@
+"""
+Tests for idempotent point awards keyed by PointHistory.dedupe_key.
+"""
+import pytest
+from rest_framework.test import APIClient
+from gamification import services
+from gamification.models import PointHistory, UserPoint
+from submissions.models import Submission
+
+
+def _total(user):
+    return UserPoint.objects.get(user=user).total_points
+
+
+@pytest.mark.django_db
+class TestPointDedupe:
+    """One-time awards insert once per key and never credit twice."""
+
+    def test_award_points_once_is_idempotent(self, make_user):
+        user = make_user('dedupeonce')
+        first = services.award_points_once(user, 'custom:1', 'custom', 7, 'once')
+        second = services.award_points_once(user, 'custom:1', 'custom', 7, 'once')
+        assert first is not None and second is None
+        assert _total(user) == 7
+        assert PointHistory.objects.filter(user=user).count() == 1
+
+        assert services.award_daily_login(user) is True
+        assert services.award_daily_login(user) is False
+        assert services.award_registration_bonus(user) is True
+        assert services.award_registration_bonus(user) is False
+        assert _total(user) == 7 + 30 + 100
+
+    def test_submission_and_game_awards(self, make_user):
+        author = make_user('dedupeauthor')
+        player = make_user('dedupeplayer')
+        assert services.award_submission_points(author, 'image') == 10
+        assert services.award_submission_points(author, 'image') == 5
+        assert services.award_submission_points(author, 'image') == 5
+
+        game = Submission.objects.create(author=author, title='game')
+        other = Submission.objects.create(author=author, title='game 2')
+        assert services.award_game_played(player, game) == {'player_awarded': True, 'author_awarded': True}
+        assert services.award_game_played(player, game) == {'player_awarded': False, 'author_awarded': False}
+        assert services.award_game_played(player, other) == {'player_awarded': True, 'author_awarded': True}
+        assert _total(player) == 10
+
+    def test_refollow_does_not_award_again(self, make_user):
+        me = make_user('dedupefollower')
+        make_user('dedupetarget')
+        client = APIClient()
+        client.force_authenticate(user=me)
+
+        first = client.post('/api/users/follow/dedupetarget/')
+        assert first.data['followerAwarded'] and first.data['followedAwarded']
+        client.post('/api/users/follow/dedupetarget/')  # unfollow
+        again = client.post('/api/users/follow/dedupetarget/')
+        assert again.data['following'] is True
+        assert not again.data['followerAwarded'] and not again.data['followedAwarded']
+        assert _total(me) == 10
@@ -0,0 +1,57 @@
+"""
+Tests for the buffered (write-behind) point ledger.
+"""
+import pytest
+from gamification import point_ledger, services
+from gamification.models import PendingPointAward, PointHistory, UserPoint
+
+
+@pytest.mark.django_db
+class TestPointLedger:
+    """Buffered awards skip the row lock, stay visible to the owner and fold in on flush."""
+
+    def test_reaction_awards_are_buffered_then_folded(self, make_user, settings, django_capture_on_commit_callbacks):
+        settings.POINT_LEDGER_MODE = 'buffered'
+        settings.POINT_FLUSH_MODE = 'inline'
+        author = make_user('ledgerauthor')
+        services.award_points(author, 'custom', 10, 'seed')
+
+        services.award_reaction_received_points(author, 'awesome')
+        services.award_reaction_received_points(author, 'cute')
+        assert PendingPointAward.objects.filter(user=author).count() == 2
+        assert UserPoint.objects.get(user=author).total_points == 10
+
+        summary = services.get_point_summary(author)
+        assert summary['total_points'] == 10 + 5 + 4
+        assert [h['points'] for h in summary['history']][:2] == [4, 5]
+
+        result = point_ledger.flush()
+        assert result == {'awards': 2, 'users': 1, 'points': 9}
+        assert not PendingPointAward.objects.exists()
+        assert UserPoint.objects.get(user=author).total_points == 19
+        assert PointHistory.objects.filter(user=author, action_type=PointHistory.ActionType.REACTION_RECEIVED).count() == 2
+        assert services.get_point_summary(author)['total_points'] == 19
+
+        # コミット後の予約（inline）で反映される
+        with django_capture_on_commit_callbacks(execute=True):
+            services.award_reaction_received_points(author, 'god_game')
+        assert UserPoint.objects.get(user=author).total_points == 29
+
+    def test_spend_folds_pending_awards_first(self, make_user, settings):
+        settings.POINT_LEDGER_MODE = 'buffered'
+        user = make_user('ledgerspender')
+        for _ in range(3):
+            services.award_reaction_received_points(user, 'awesome')
+
+        history = services.spend_points(user, 'card_draw', 12, 'draw')
+        assert history is not None
+        assert UserPoint.objects.get(user=user).total_points == 3
+        assert not PendingPointAward.objects.filter(user=user).exists()
+        assert services.spend_points(user, 'card_draw', 12, 'draw') is None
+
+    def test_direct_mode_awards_immediately(self, make_user, settings):
+        settings.POINT_LEDGER_MODE = 'direct'
+        user = make_user('ledgerdirect')
+        services.award_reaction_received_points(user, 'awesome')
+        assert not PendingPointAward.objects.exists()
+        assert UserPoint.objects.get(user=user).total_points == 5
@@ -0,0 +1,76 @@
+"""
+Tests for the versioned public profile cache behind ProfileGetView.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from submissions.models import Submission
+from users import profile_cache
+from users.models import UserFollow, UserMeta
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'profile-tests'}}
+    from django.core.cache import cache
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestProfileCache:
+    """Viewer-independent profile data is cached and invalidated by version bumps."""
+
+    def test_hit_skips_queries_and_keeps_viewer_bits_fresh(self, make_user, locmem_cache, django_capture_on_commit_callbacks):
+        owner = make_user('cachedowner')
+        UserMeta.objects.create(user=owner, display_name='Owner')
+        viewer = make_user('cachedviewer')
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+
+        first = client.get('/api/user/profile/cachedowner/')
+        assert first.data['displayName'] == 'Owner'
+        with CaptureQueriesContext(connection) as ctx:
+            second = client.get('/api/user/profile/cachedowner/')
+        assert second.data['isFollowing'] is False
+        assert 'lookupKeys' not in second.data
+        # 閲覧者ごとのフォロー状態 2 クエリのみ（+ 認証・メンテナンス判定などの共通分）
+        assert not any('user_meta' in q['sql'] for q in ctx.captured_queries)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            UserFollow.objects.create(follower=viewer, following=owner)
+        third = client.get('/api/user/profile/cachedowner/')
+        assert third.data['isFollowing'] is True
+        assert third.data['followerCount'] == 1
+
+        stats = profile_cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+
+    def test_profile_edit_and_new_post_invalidate(self, make_user, locmem_cache, django_capture_on_commit_callbacks):
+        owner = make_user('cachededit')
+        meta = UserMeta.objects.create(user=owner, display_name='Before')
+        client = APIClient()
+        client.get('/api/user/profile/cachededit/')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            meta.display_name = 'After'
+            meta.save()
+        assert client.get('/api/user/profile/cachededit/').data['displayName'] == 'After'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Submission.objects.create(author=owner, title='post')
+        assert client.get('/api/user/profile/cachededit/').data['postCount'] == 1
+
+    def test_stale_lookup_after_display_id_change(self, make_user, locmem_cache, django_capture_on_commit_callbacks):
+        owner = make_user('oldhandle')
+        client = APIClient()
+        assert client.get('/api/user/profile/oldhandle/').data['authorUserId'] == owner.id
+
+        with django_capture_on_commit_callbacks(execute=True):
+            owner.display_id = 'newhandle'
+            owner.save()
+        assert client.get('/api/user/profile/oldhandle/').data['displayName'] is None
+        assert client.get('/api/user/profile/newhandle/').data['authorUserId'] == owner.id
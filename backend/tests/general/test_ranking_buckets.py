@@ -0,0 +1,75 @@
+"""
+Tests for the bucket-based reaction ranking engine.
+"""
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from submissions import ranking_service
+from submissions.models import Submission, Reaction, RankingScoreBucket
+
+
+def _ranked(payload):
+    return [(r['userId'], r['score']) for r in payload['ranking']]
+
+
+@pytest.mark.django_db
+class TestRankingBuckets:
+    """Buckets follow reactions and match the legacy scan."""
+
+    def test_incremental_buckets_match_scan(self, make_user):
+        alice = make_user('rankalice')
+        bob = make_user('rankbob')
+        fans = [make_user(f'rankfan{i}') for i in range(3)]
+        a1 = Submission.objects.create(author=alice, title='a1')
+        a2 = Submission.objects.create(author=alice, title='a2')
+        b1 = Submission.objects.create(author=bob, title='b1')
+        for fan in fans:
+            Reaction.objects.create(user=fan, submission=b1, type=Reaction.Type.GOD_GAME)
+            Reaction.objects.create(user=fan, submission=a1, type=Reaction.Type.SUBMIT_MEDAL)
+        Reaction.objects.create(user=fans[0], submission=a2, type=Reaction.Type.COOL)
+        Reaction.objects.filter(user=fans[2], submission=b1).delete()
+
+        daily = ranking_service.compute_daily_ranking_payload()
+        assert daily['periodLabel'] == '本日'
+        assert _ranked(daily) == [(bob.id, 20), (alice.id, 14)]
+        assert daily['userRanks'] == {str(bob.id): 1, str(alice.id): 2}
+        assert daily['ranking'][1]['id'] == str(a1.id)
+        assert sorted(_ranked(daily)) == sorted(_ranked(ranking_service.compute_daily_ranking_payload_scan()))
+        assert sorted(_ranked(ranking_service.compute_weekly_ranking_payload())) == sorted(
+            _ranked(ranking_service.compute_weekly_ranking_payload_scan())
+        )
+
+        incremental = set(RankingScoreBucket.objects.values_list('submission_id', 'reacted_on', 'score'))
+        ranking_service.rebuild_ranking_buckets()
+        rebuilt = set(RankingScoreBucket.objects.values_list('submission_id', 'reacted_on', 'score'))
+        assert incremental == rebuilt
+
+    def test_fallback_is_a_lookup(self, make_user):
+        author = make_user('oldauthor')
+        fan = make_user('oldfan')
+        sub = Submission.objects.create(author=author, title='old')
+        Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.CUTE)
+        past = timezone.now() - timedelta(days=2)
+        Submission.objects.filter(id=sub.id).update(created_at=past)
+        Reaction.objects.filter(submission=sub).update(created_at=past)
+        ranking_service.rebuild_ranking_buckets()
+
+        with CaptureQueriesContext(connection) as ctx:
+            daily = ranking_service.compute_daily_ranking_payload()
+        assert daily['periodLabel'] == '2日前'
+        assert daily['isFallback'] is True
+        assert _ranked(daily) == [(author.id, 4)]
+        assert len(ctx.captured_queries) < 12
+
+    def test_soft_deleted_submission_is_excluded(self, make_user):
+        author = make_user('delauthor')
+        fan = make_user('delfan')
+        sub = Submission.objects.create(author=author, title='gone')
+        Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.FUNNY)
+        sub.soft_delete()
+
+        daily = ranking_service.compute_daily_ranking_payload()
+        assert daily['ranking'] == []
+        assert daily['periodLabel'] == '累計'
@@ -0,0 +1,90 @@
+"""
+Tests for the denormalized SubmissionReactionStats counters.
+"""
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from submissions.models import Submission, Reaction, SubmissionRepost, SubmissionReactionStats
+from submissions.reaction_stats import verify_reaction_stats
+
+
+@pytest.mark.django_db
+class TestSubmissionReactionStats:
+    """Counters follow reaction / bookmark / repost writes."""
+
+    def test_toggle_reaction_updates_counters(self, make_user):
+        author = make_user('statsauthor')
+        fan = make_user('statsfan')
+        sub = Submission.objects.create(author=author, title='stats')
+        client = APIClient()
+        client.force_authenticate(user=fan)
+
+        response = client.post(f'/api/submissions/{sub.id}/react/god_game/')
+        assert response.status_code == 201
+        assert response.data['count'] == 1
+        client.post(f'/api/submissions/{sub.id}/like/')
+
+        stats = SubmissionReactionStats.objects.get(submission=sub)
+        assert stats.god_game_count == 1
+        assert stats.submit_medal_count == 1
+        assert stats.total_reactions == 2
+        assert stats.reaction_score == 13
+        assert stats.tp_score == 13
+
+        response = client.post(f'/api/submissions/{sub.id}/react/god_game/')
+        assert response.data['count'] == 0
+        stats.refresh_from_db()
+        assert stats.god_game_count == 0
+        assert stats.reaction_score == 3
+        assert verify_reaction_stats([sub.id]) == []
+
+    def test_bookmark_and_repost_counters(self, make_user):
+        author = make_user('bmauthor')
+        fan = make_user('bmfan')
+        sub = Submission.objects.create(author=author, title='bm')
+        client = APIClient()
+        client.force_authenticate(user=fan)
+
+        response = client.post(f'/api/submissions/{sub.id}/bookmark/')
+        assert response.data['bookmarkCount'] == 1
+        SubmissionRepost.objects.create(user=fan, submission=sub)
+
+        stats = SubmissionReactionStats.objects.get(submission=sub)
+        assert stats.bookmark_count == 1
+        assert stats.repost_count == 1
+
+        response = client.delete(f'/api/submissions/{sub.id}/bookmark/')
+        assert response.data['bookmarkCount'] == 0
+
+    def test_rebuild_command_repairs_drift(self, make_user):
+        author = make_user('driftauthor')
+        fan = make_user('driftfan')
+        sub = Submission.objects.create(author=author, title='drift', likes_count=5)
+        Reaction.objects.create(user=fan, submission=sub, type=Reaction.Type.COOL)
+        SubmissionReactionStats.objects.filter(submission=sub).update(cool_count=7, tp_score=0)
+
+        out = StringIO()
+        call_command('rebuild_reaction_stats', '--verify', stdout=out)
+        assert 'mismatches found' in out.getvalue()
+
+        call_command('rebuild_reaction_stats', stdout=StringIO())
+        stats = SubmissionReactionStats.objects.get(submission=sub)
+        assert stats.cool_count == 1
+        assert stats.tp_score == 5 + 5 * 2
+        assert verify_reaction_stats([sub.id]) == []
+
+    def test_recommended_feed_orders_by_stats(self, make_user):
+        author = make_user('recauthor')
+        fans = [make_user(f'recfan{i}') for i in range(3)]
+        low = Submission.objects.create(author=author, title='low')
+        high = Submission.objects.create(author=author, title='high')
+        quiet = Submission.objects.create(author=author, title='quiet')
+        for fan in fans:
+            Reaction.objects.create(user=fan, submission=low, type=Reaction.Type.SUBMIT_MEDAL)
+            Reaction.objects.create(user=fan, submission=high, type=Reaction.Type.GOD_GAME)
+        Reaction.objects.create(user=fans[0], submission=quiet, type=Reaction.Type.GOD_GAME)
+
+        response = APIClient().get('/api/feed/?mode=recommended')
+        ids = [item['id'] for item in response.data['items']]
+        assert ids == [str(high.id), str(low.id)]
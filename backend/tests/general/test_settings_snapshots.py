@@ -0,0 +1,102 @@
+"""
+Tests for the process-local settings snapshots (maintenance flag, active lottery rule).
+"""
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from frontend.models import SiteMaintenance
+from lottery.models import LotteryRule
+from toybox import local_cache, snapshots
+from toybox.local_cache import VersionedLocalCache
+from toybox.maintenance import MaintenanceModeMiddleware
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'snapshot-tests'}}
+    from django.core.cache import cache
+    cache.clear()
+    snapshots.invalidate_all()
+    yield cache
+    cache.clear()
+
+
+def _middleware():
+    return MaintenanceModeMiddleware(lambda request: HttpResponse('ok'))
+
+
+@pytest.mark.django_db
+class TestMaintenanceSnapshot:
+    """The maintenance flag is read from the snapshot, not the DB, on each request."""
+
+    def test_warm_requests_cost_no_queries(self, locmem_cache):
+        middleware = _middleware()
+        request = RequestFactory().get('/api/submissions/')
+        assert middleware(request).status_code == 200
+
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(5):
+                assert middleware(RequestFactory().get('/api/submissions/')).status_code == 200
+        assert len(ctx.captured_queries) == 0
+
+    def test_admin_toggle_reaches_other_processes(self, locmem_cache, django_capture_on_commit_callbacks):
+        middleware = _middleware()
+        assert middleware(RequestFactory().get('/api/submissions/')).status_code == 200
+        # 別のワーカープロセスのスナップショット（同じバージョンキーを参照）
+        other = VersionedLocalCache(
+            snapshots.maintenance_cache.name, snapshots._build_maintenance, ttl=60, check_interval=0,
+        )
+        assert other.get().enabled is False
+
+        with django_capture_on_commit_callbacks(execute=True):
+            s = SiteMaintenance.get_solo()
+            s.enabled = True
+            s.save(update_fields=['enabled', 'updated_at'])
+
+        assert middleware(RequestFactory().get('/api/submissions/')).status_code == 503
+        assert other.get().enabled is True
+        # 管理画面とヘルスチェックは通す
+        assert middleware(RequestFactory().get('/api/health/')).status_code == 200
+
+    def test_fails_open_when_shared_cache_is_down(self, locmem_cache, monkeypatch):
+        assert snapshots.maintenance_state().enabled is False
+
+        class BrokenCache:
+            def get(self, *args, **kwargs):
+                raise ConnectionError('redis down')
+
+            def set(self, *args, **kwargs):
+                raise ConnectionError('redis down')
+
+        monkeypatch.setattr(local_cache, 'cache', BrokenCache())
+        monkeypatch.setattr(snapshots.maintenance_cache, '_next_check', 0.0)
+        with CaptureQueriesContext(connection) as ctx:
+            assert _middleware()(RequestFactory().get('/api/submissions/')).status_code == 200
+        assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db
+class TestLotteryRuleSnapshot:
+    """The active lottery rule is cached and refreshed when rules change."""
+
+    def test_rule_change_is_visible(self, locmem_cache, django_capture_on_commit_callbacks):
+        assert snapshots.active_lottery_rule() is None
+        with django_capture_on_commit_callbacks(execute=True):
+            rule = LotteryRule.objects.create(daily_cap=1)
+        assert snapshots.active_lottery_rule().daily_cap == 1
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = snapshots.active_lottery_rule()
+        assert len(ctx.captured_queries) == 0
+        # 呼び出し側で変更しても共有のスナップショットは変わらない
+        cached.base_rate = Decimal('0.9')
+        assert snapshots.active_lottery_rule().base_rate == rule.base_rate
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rule.daily_cap = 3
+            rule.save()
+        assert snapshots.active_lottery_rule().daily_cap == 3
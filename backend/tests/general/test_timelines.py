@@ -0,0 +1,92 @@
+"""
+Tests for fan-out-on-write follower timelines behind FollowingFeedView.
+"""
+import pytest
+from rest_framework.test import APIClient
+from submissions import timelines
+from submissions.models import Submission
+from users.models import UserFollow
+
+
+def _ids(response):
+    return [int(item['id']) for item in response.data['items']]
+
+
+@pytest.fixture
+def memory_timelines(settings):
+    settings.TIMELINE_BACKEND = 'memory'
+    settings.TIMELINE_FANOUT_MODE = 'inline'
+    return timelines.get_backend()
+
+
+@pytest.mark.django_db
+class TestFollowerTimelines:
+    """Posts, follows and soft-deletes keep the pushed timelines in sync."""
+
+    def test_fan_out_follow_and_soft_delete(self, make_user, memory_timelines, django_capture_on_commit_callbacks):
+        viewer = make_user('tlviewer')
+        author = make_user('tlauthor')
+        other = make_user('tlother')
+        UserFollow.objects.create(follower=viewer, following=author)
+        old = Submission.objects.create(author=author, title='old')
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+
+        assert _ids(client.get('/api/feed/following/?limit=10')) == [old.id]
+        assert memory_timelines.exists(viewer.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            new = Submission.objects.create(author=author, title='new')
+            Submission.objects.create(author=other, title='not followed')
+        assert [sid for sid, _ in memory_timelines.page(viewer.pk, None, 10)] == [new.id, old.id]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            UserFollow.objects.create(follower=viewer, following=other)
+        assert len(_ids(client.get('/api/feed/following/?limit=10'))) == 3
+
+        with django_capture_on_commit_callbacks(execute=True):
+            new.soft_delete()
+            UserFollow.objects.filter(follower=viewer, following=other).delete()
+        assert _ids(client.get('/api/feed/following/?limit=10')) == [old.id]
+
+    def test_plain_edits_do_not_fan_out(self, make_user, memory_timelines, monkeypatch):
+        sub = Submission.objects.create(author=make_user('tleditor'), title='edit')
+        enqueued = []
+        monkeypatch.setattr(timelines, 'enqueue_submission', enqueued.append)
+
+        sub.comment_enabled = not sub.comment_enabled
+        sub.save()
+        sub.caption = 'edited'
+        sub.save(update_fields=['caption'])
+        assert enqueued == []
+
+        sub.soft_delete()
+        assert enqueued == [sub.pk]
+
+    def test_pages_and_falls_back_past_the_cap(self, make_user, memory_timelines, settings):
+        settings.TIMELINE_MAX_LENGTH = 3
+        viewer = make_user('tlpager')
+        subs = [Submission.objects.create(author=viewer, title=f'post {i}') for i in range(5)]
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+
+        first = client.get('/api/feed/following/?limit=2')
+        second = client.get(f'/api/feed/following/?limit=2&cursor={first.data["nextCursor"]}')
+        third = client.get(f'/api/feed/following/?limit=2&cursor={second.data["nextCursor"]}')
+
+        seen = _ids(first) + _ids(second) + _ids(third)
+        assert seen == [s.id for s in reversed(subs)]
+        assert third.data['nextCursor'] is None
+        assert memory_timelines.size(viewer.pk) == 3
+
+    def test_heavy_followers_use_the_pull_path(self, make_user, memory_timelines, settings):
+        settings.TIMELINE_PULL_THRESHOLD = 0
+        viewer = make_user('tlheavy')
+        author = make_user('tlheavyauthor')
+        UserFollow.objects.create(follower=viewer, following=author)
+        sub = Submission.objects.create(author=author, title='post')
+        client = APIClient()
+        client.force_authenticate(user=viewer)
+
+        assert _ids(client.get('/api/feed/following/?limit=5')) == [sub.id]
+        assert not memory_timelines.exists(viewer.pk)
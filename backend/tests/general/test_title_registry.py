@@ -0,0 +1,59 @@
+"""
+Tests for the in-memory title registry used by badge fields.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from gamification.models import Title
+from gamification.services import ACHIEVEMENT_COLOR_MAP, get_title_color, title_has_neon_effects
+from gamification.title_registry import badge_image_url, get_entry
+from submissions.models import Submission
+from users.models import UserMeta
+
+
+@pytest.mark.django_db
+class TestTitleRegistry:
+    """Badge fields resolve from loaded meta and the registry without per-item queries."""
+
+    def test_feed_badges_use_no_title_queries(self, make_user):
+        Title.objects.create(name='Banner', image_url='https://cdn.example.com/banner.png')
+        Title.objects.create(name='Plain', image_url='/static/frontend/hero/toybox-title.png')
+        for i, name in enumerate(['Banner', 'Plain', None]):
+            author = make_user(f'titled{i}')
+            UserMeta.objects.create(user=author, active_title=name)
+            Submission.objects.create(author=author, title=f'post {i}')
+
+        client = APIClient()
+        client.get('/api/feed/?limit=10')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/feed/?limit=10')
+        assert response.status_code == 200
+        assert not [q for q in ctx.captured_queries if 'FROM "titles"' in q['sql']]
+        badges = {item['anonId']: item['activeTitleImageUrl'] for item in response.data['items']}
+        assert badges == {'titled0': 'https://cdn.example.com/banner.png', 'titled1': None, 'titled2': None}
+
+    def test_title_change_invalidates(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            title = Title.objects.create(name='Later')
+        assert badge_image_url('Later') is None
+
+        with django_capture_on_commit_callbacks(execute=True):
+            title.image_url = 'https://cdn.example.com/later.png'
+            title.save()
+        assert badge_image_url('Later') == 'https://cdn.example.com/later.png'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            title.delete()
+        assert get_entry('Later') is None
+
+    def test_title_color_shares_registry(self):
+        neon_name = next(name for name, color in ACHIEVEMENT_COLOR_MAP.items() if color == 'neon')
+        Title.objects.create(name=neon_name)
+        entry = get_entry(neon_name)
+        assert entry.neon is True
+        with CaptureQueriesContext(connection) as ctx:
+            assert get_title_color(neon_name) == 'neon'
+            assert title_has_neon_effects(neon_name) is True
+            assert get_title_color('not-a-title') == 'gold'
+        assert len(ctx.captured_queries) == 0
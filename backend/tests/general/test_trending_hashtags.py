@@ -0,0 +1,69 @@
+"""
+Tests for the hourly hashtag buckets and the 24h / 7d trending windows.
+"""
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from submissions import trending
+from submissions.models import HashtagHourlyBucket, Submission
+
+
+@pytest.mark.django_db
+class TestTrendingHashtags:
+    """Buckets follow posts and soft deletes; windows rank by time-decayed score."""
+
+    def test_buckets_follow_posts_and_soft_delete(self, make_user):
+        author = make_user('trendauthor')
+        sub = Submission.objects.create(author=author, title='a', hashtags=['Art', 'game'])
+        Submission.objects.create(author=author, title='b', hashtags=['Art'])
+        client = APIClient()
+
+        response = client.get('/api/hashtags/?window=24h')
+        assert response.status_code == 200
+        assert response.data['window'] == '24h'
+        assert [(h['tag'], h['count']) for h in response.data['hashtags']] == [('Art', 2), ('game', 1)]
+
+        sub.deleted_at = timezone.now()
+        sub.save(update_fields=['deleted_at'])
+        assert dict(HashtagHourlyBucket.objects.values_list('tag', 'count')) == {'Art': 1}
+        response = client.get('/api/hashtags/?window=7d')
+        assert [(h['tag'], h['count']) for h in response.data['hashtags']] == [('Art', 1)]
+
+    def test_windows_and_decay(self):
+        now = timezone.now()
+        trending.record('old', now - timedelta(hours=30), 3)
+        trending.record('fresh', now, 2)
+        trending.record('expired', now - timedelta(days=9), 5)
+
+        assert [tag for tag, _, _ in trending.compute('24h', now=now)] == ['fresh']
+        ranking = trending.compute('7d', now=now)
+        assert [(tag, count) for tag, count, _ in ranking] == [('fresh', 2), ('old', 3)]
+        scores = {tag: score for tag, _, score in ranking}
+        assert scores['old'] < 1.5 < scores['fresh']
+        assert not HashtagHourlyBucket.objects.filter(tag='expired').exists()
+
+    def test_rotate_drops_expired_buckets(self):
+        now = timezone.now()
+        HashtagHourlyBucket.objects.create(tag='stale', hour=trending.hour_of(now - timedelta(days=8)), count=4)
+        trending.record('live', now, 1)
+        result = trending.rotate(now=now)
+        assert result['deleted_buckets'] == 1
+        assert list(HashtagHourlyBucket.objects.values_list('tag', flat=True)) == ['live']
+
+    def test_served_from_precomputed_list(self, settings):
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'trend-tests'}}
+        from django.core.cache import cache
+        cache.clear()
+        trending.record('cached', timezone.now(), 1)
+        trending.refresh()
+        with CaptureQueriesContext(connection) as ctx:
+            assert trending.trending_hashtags('24h') == [('cached', 1, pytest.approx(1.0, abs=0.05))]
+        assert len(ctx.captured_queries) == 0
+        cache.clear()
+
+    def test_unknown_window_is_rejected(self):
+        assert APIClient().get('/api/hashtags/?window=1y').status_code == 400
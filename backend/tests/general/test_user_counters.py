@@ -0,0 +1,95 @@
+"""
+Tests for the denormalized per-user counters (UserCounters).
+"""
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from submissions.models import Reaction, Submission
+from users.counters import verify_counters
+from users.models import UserCounters
+
+
+@pytest.mark.django_db
+class TestUserCounters:
+    """Counters follow follow / post / soft-delete / reaction writes."""
+
+    def test_follow_toggle_reads_counters(self, make_user):
+        fan = make_user('counterfan')
+        target = make_user('countertarget')
+        client = APIClient()
+        client.force_authenticate(user=fan)
+
+        response = client.post('/api/users/follow/countertarget/')
+        assert response.data['targetFollowersCount'] == 1
+        assert UserCounters.objects.get(user=fan).following_count == 1
+
+        response = client.post('/api/users/follow/countertarget/')
+        assert response.data['targetFollowersCount'] == 0
+        assert verify_counters([fan.pk, target.pk]) == []
+
+    def test_posts_reactions_and_soft_delete(self, make_user):
+        author = make_user('counterauthor')
+        fan = make_user('counterreactor')
+        sub = Submission.objects.create(author=author, title='post')
+        Submission.objects.create(author=author, title='second')
+        client = APIClient()
+        client.force_authenticate(user=fan)
+        client.post(f'/api/submissions/{sub.id}/react/god_game/')
+        client.post(f'/api/submissions/{sub.id}/react/cool/')
+
+        counters = UserCounters.objects.get(user=author)
+        assert (counters.posts_count, counters.reactions_received, counters.reaction_score_received) == (2, 2, 15)
+
+        sub.soft_delete()
+        counters.refresh_from_db()
+        assert (counters.posts_count, counters.reactions_received, counters.reaction_score_received) == (1, 0, 0)
+        # 削除済み投稿へのリアクション取り消しは二重に引かない
+        Reaction.objects.get(submission=sub, type='cool').delete()
+        sub.restore()
+        counters.refresh_from_db()
+        assert (counters.posts_count, counters.reactions_received, counters.reaction_score_received) == (2, 1, 10)
+        assert verify_counters([author.pk]) == []
+
+        response = APIClient().get('/api/user/profile/counterauthor/')
+        assert response.data['totalReactionScore'] == 10
+        assert response.data['postCount'] == 2
+
+    def test_rebuild_command_repairs_drift(self, make_user):
+        author = make_user('counterdrift')
+        Submission.objects.create(author=author, title='post')
+        UserCounters.objects.filter(user=author).update(posts_count=7)
+
+        out = StringIO()
+        call_command('rebuild_user_counters', '--verify', stdout=out)
+        assert 'posts_count stored=7 expected=1' in out.getvalue()
+
+        call_command('rebuild_user_counters', stdout=StringIO())
+        assert UserCounters.objects.get(user=author).posts_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestUserHardDelete:
+    """Hard-deleting a user must not recreate its counter / daily rows from the cascade."""
+
+    def test_delete_user_with_follows_posts_and_reactions(self, make_user):
+        from django.db import connection, transaction
+        from users.models import UserDailyActivity, UserFollow
+
+        a = make_user('harddela')
+        b = make_user('harddelb')
+        UserFollow.objects.create(follower=b, following=a)
+        UserFollow.objects.create(follower=a, following=b)
+        a_post = Submission.objects.create(author=a, title='a post')
+        b_post = Submission.objects.create(author=b, title='b post')
+        Reaction.objects.create(user=b, submission=a_post, type=Reaction.Type.GOD_GAME)
+        Reaction.objects.create(user=a, submission=b_post, type=Reaction.Type.CUTE)
+
+        with transaction.atomic():
+            b.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_key_check')
+            assert cursor.fetchall() == []
+        assert not UserCounters.objects.filter(user_id=b.pk).exists()
+        assert not UserDailyActivity.objects.filter(user_id=b.pk).exists()
+        assert verify_counters([a.pk]) == []
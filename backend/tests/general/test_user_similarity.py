@@ -0,0 +1,59 @@
+"""
+Tests for the precomputed user-similarity index behind RecommendedUsersView.
+"""
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from submissions.models import Submission
+from users import similarity
+from users.models import UserFollow, UserSimilarity
+
+
+@pytest.mark.django_db
+class TestUserSimilarity:
+    """The hourly job ranks creators by tag overlap; the view serves them minus follows."""
+
+    def _post(self, author, *tags, ai_tool=''):
+        return Submission.objects.create(author=author, title='post', hashtags=list(tags), ai_tool=ai_tool)
+
+    def test_build_ranks_by_shared_tags(self, make_user):
+        pytest.importorskip('scipy')
+        me = make_user('simme')
+        close = make_user('simclose')
+        partial = make_user('simpartial')
+        other = make_user('simother')
+        self._post(me, 'Cat', 'dog', ai_tool='chatgpt')
+        self._post(close, 'cat', 'dog', ai_tool='chatgpt')
+        self._post(partial, 'cat', 'fish')
+        self._post(other, 'bird')
+
+        result = similarity.build_index()
+        assert result['users'] == 4
+
+        rows = list(UserSimilarity.objects.filter(user=me).order_by('rank'))
+        assert [r.similar_user_id for r in rows] == [close.id, partial.id]
+        assert rows[0].score > rows[1].score
+        assert set(rows[0].shared_tags) == {'cat', 'dog'}
+        assert not UserSimilarity.objects.filter(user=other).exists()
+
+        # 投稿が無くなったユーザーの行は次回の作り直しで消える
+        Submission.objects.filter(author=me).update(deleted_at=timezone.now())
+        from submissions.models import SubmissionHashtag
+        SubmissionHashtag.objects.filter(submission__author=me).delete()
+        similarity.build_index()
+        assert not UserSimilarity.objects.filter(user=me).exists()
+
+    def test_view_excludes_followed_users(self, make_user):
+        me = make_user('simviewer')
+        followed = make_user('simfollowed')
+        suggested = make_user('simsuggested')
+        now = timezone.now()
+        UserSimilarity.objects.create(user=me, similar_user=followed, rank=1, score=0.9, shared_tags=['cat'], computed_at=now)
+        UserSimilarity.objects.create(user=me, similar_user=suggested, rank=2, score=0.5, shared_tags=['dog'], computed_at=now)
+        UserFollow.objects.create(follower=me, following=followed)
+
+        client = APIClient()
+        client.force_authenticate(user=me)
+        users = client.get('/api/users/recommended-users/').data['users']
+        assert [u['anonId'] for u in users] == ['simsuggested']
+        assert users[0]['recommendationReason'] == '共通のハッシュタグ: #dog'
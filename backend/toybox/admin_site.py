@@ -42,8 +42,8 @@ class CustomAdminSite(admin.AdminSite):
         context['toybox_home_url'] = '/'
         # Maintenance status (used by admin header one-button)
         try:
-            from frontend.models import SiteMaintenance
-            context['maintenance_enabled'] = SiteMaintenance.get_solo().enabled
+            from toybox.snapshots import maintenance_state
+            context['maintenance_enabled'] = maintenance_state().enabled
         except Exception:
             context['maintenance_enabled'] = False
         context['maintenance_toggle_url'] = reverse('admin:maintenance-toggle', current_app=self.name)
@@ -0,0 +1,183 @@
+"""
+JWT 認証（DRF と テンプレートビューで共通）と、認証済みユーザーのキャッシュ。
+
+- トークンの検証とユーザーの解決はリクエストごとに1回だけ行い、結果をリクエストに保持する
+  （DRF の CachedJWTAuthentication とテンプレート用の JWTAuthenticationMiddleware で共有）。
+- ユーザーはフィールド値のスナップショットとして、プロセス内（AUTH_PRINCIPAL_LOCAL_TTL 秒ごとに
+  共有バージョンを確認）と共有キャッシュ（AUTH_PRINCIPAL_TTL 秒）に保持する。キーはユーザー ID と
+  ユーザーごとのバージョン（auth_principal_version:{user_id}）で、User の保存（ロール・凍結・BAN・
+  無効化を含む）でバージョンを差し替える（users.signals）。
+- パスワードハッシュはスナップショットに含めない（deferred フィールドとして参照時に読み込まれ、save() でも上書きされない）。
+- スナップショットのユーザーは update_fields なしの save() を拒否する（古い凍結・BAN・ロールで上書きしないため）。
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger('toybox')
+
+_VERSION_KEY = 'auth_principal_version:{user_id}'
+_SNAPSHOT_KEY = 'auth_principal:{user_id}:{version}'
+# リクエストに保持する認証結果（DRF の Request ではなく元の HttpRequest に付ける）
+_REQUEST_ATTR = '_toybox_jwt_auth'
+_NOT_AUTHENTICATED = object()
+_EXCLUDED_FIELDS = {'password'}
+
+
+class PrincipalCache:
+    """User のスナップショットをプロセス内と共有キャッシュに保持する。"""
+
+    def __init__(self):
+        self._local = {}
+        self._lock = threading.Lock()
+        self._field_names = None
+
+    def _fields(self):
+        if self._field_names is None:
+            self._field_names = [
+                f.attname for f in get_user_model()._meta.concrete_fields if f.attname not in _EXCLUDED_FIELDS
+            ]
+        return self._field_names
+
+    @staticmethod
+    def _local_ttl():
+        return getattr(settings, 'AUTH_PRINCIPAL_LOCAL_TTL', 5)
+
+    @staticmethod
+    def _shared_ttl():
+        return getattr(settings, 'AUTH_PRINCIPAL_TTL', 300)
+
+    def _shared_version(self, user_id):
+        key = _VERSION_KEY.format(user_id=user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+        return version
+
+    def _build(self, values):
+        user = get_user_model().from_db('default', self._fields(), values)
+        # 古い値での全フィールド保存を User.save が拒否する目印
+        user._principal_snapshot = True
+        return user
+
+    def _load(self, user_id):
+        return get_user_model().objects.filter(pk=user_id).values_list(*self._fields()).first()
+
+    def get(self, user_id):
+        """ユーザーを返す（存在しなければ None）。返すインスタンスは呼び出しごとに新しく作る。"""
+        user_id = str(user_id)  # トークンのクレームは文字列、シグナルからは int で来る
+        now = time.monotonic()
+        entry = self._local.get(user_id)
+        if entry is not None and now < entry[2]:
+            return self._build(entry[1])
+
+        try:
+            version = self._shared_version(user_id)
+            if entry is not None and version is not None and entry[0] == version:
+                values = entry[1]
+            else:
+                values = cache.get(_SNAPSHOT_KEY.format(user_id=user_id, version=version)) if version else None
+        except Exception as e:
+            logger.warning(f'[Auth] principal cache lookup failed for user {user_id}: {e}')
+            version, values = None, None
+
+        if values is None:
+            values = self._load(user_id)
+            if values is None:
+                return None
+            if version is not None:
+                try:
+                    cache.set(_SNAPSHOT_KEY.format(user_id=user_id, version=version), values, self._shared_ttl())
+                except Exception as e:
+                    logger.warning(f'[Auth] principal cache store failed for user {user_id}: {e}')
+
+        with self._lock:
+            if len(self._local) >= getattr(settings, 'AUTH_PRINCIPAL_LOCAL_MAX', 10000):
+                self._local.clear()
+            self._local[user_id] = (version, tuple(values), time.monotonic() + self._local_ttl())
+        return self._build(values)
+
+    def invalidate(self, user_id):
+        """このプロセスのコピーを捨て、共有バージョンを差し替えて他のプロセスにも作り直させる。"""
+        user_id = str(user_id)
+        with self._lock:
+            self._local.pop(user_id, None)
+        try:
+            cache.set(_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.warning(f'[Auth] principal version bump failed for user {user_id}: {e}')
+
+    def invalidate_on_commit(self, user_id):
+        """今すぐ無効にし、コミット後にもう一度無効にする（コミット前の行を読んだ他のリクエストの書き込みを捨てる）。"""
+        self.invalidate(user_id)
+        transaction.on_commit(lambda: self.invalidate(user_id))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+principals = PrincipalCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication にリクエスト単位のメモ化とユーザーのキャッシュを加えたもの。"""
+
+    def authenticate(self, request):
+        http_request = getattr(request, '_request', request)
+        memo = getattr(http_request, _REQUEST_ATTR, None)
+        if memo is not None:
+            return None if memo is _NOT_AUTHENTICATED else memo
+        result = super().authenticate(request)
+        setattr(http_request, _REQUEST_ATTR, result if result is not None else _NOT_AUTHENTICATED)
+        return result
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # パスワードハッシュとの照合が必要なので DB から読む
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        user = principals.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+
+def user_from_request(request):
+    """テンプレートビュー用: JWT のユーザー（トークンが無い・無効なら AnonymousUser）。"""
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return AnonymousUser()
+    return result[0] if result else AnonymousUser()
+
+
+def request_meta(request):
+    """request.user の UserMeta（無ければ作成）。同じリクエスト内では1回だけ読む。"""
+    from users.models import UserMeta
+
+    user = request.user
+    try:
+        return user.meta
+    except UserMeta.DoesNotExist:
+        meta, _ = UserMeta.objects.get_or_create(user=user)
+        user.meta = meta
+        return meta
@@ -20,6 +20,19 @@ except ImportError:
     PIL_AVAILABLE = False
     logger.warning('PIL/Pillow is not available. Image optimization will be disabled.')
 
+try:
+    # Pillow 本体が AVIF に未対応のバージョンではプラグインがあれば登録される
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# バリアントの形式 → (Pillow の形式名, 拡張子, MIME タイプ)
+VARIANT_FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
 
 def optimize_gif(
     image_file,
@@ -291,93 +304,38 @@ def create_thumbnail_from_path(
 def get_thumbnail_url(
     original_url: str,
     max_size: int = 300,
-    quality: int = 80
+    quality: int = 80,
+    request=None,
 ) -> Optional[str]:
     """
-    サムネイルURLを取得する（存在しない場合は生成）
-    
+    サムネイルURLを取得する（未生成ならワーカーに生成を依頼する）
+
+    ファイルの存在はメディアカタログ（submissions.media_catalog）で判定し、
+    リクエスト中に画像を生成しない。サムネイルの規格は 300px / 品質80 に固定。
+
     Args:
         original_url: 元の画像URL
-        max_size: 最大サイズ（幅・高さの最大値、デフォルト300px）
-        quality: JPG品質（デフォルト80）
-    
+        max_size: 最大サイズ（互換のため残している。カタログのサムネイルは300px）
+        quality: JPG品質（互換のため残している）
+        request: Django request（フィードで先読みしたカタログを使う）
+
     Returns:
-        str: サムネイルURL、またはNone（元のURLを返す）
+        str: サムネイルURL、未生成なら元のURL、元画像が無ければNone
     """
     try:
         from urllib.parse import urlparse
-        from toybox.image_utils import _get_file_path_from_url
-        
-        # URLからファイルパスを取得
-        parsed = urlparse(original_url)
-        original_path = parsed.path
-        
-        # ファイルパスを解決
-        file_path = _get_file_path_from_url(original_path)
-        if not file_path or not file_path.exists():
-            logger.debug(f'Original file not found: {original_path}')
+        from submissions import media_catalog
+
+        if not media_catalog.exists(original_url, request):
+            logger.debug(f'Original file not found: {original_url}')
             return None
 
         # GIF アニメは JPG サムネにすると1フレーム静止画になるため元URLのまま返す
-        if file_path.suffix.lower() == '.gif':
+        if urlparse(original_url).path.lower().endswith('.gif'):
             return original_url
-        
-        # サムネイルファイルのパスを生成
-        thumbnail_filename = f"{file_path.stem}_thumb.jpg"
-        thumbnail_relative_path = file_path.relative_to(Path(settings.MEDIA_ROOT))
-        thumbnail_dir = thumbnail_relative_path.parent
-        thumbnail_path = thumbnail_dir / thumbnail_filename
-        
-        # サムネイルファイルが存在するか確認
-        thumbnail_full_path = Path(settings.MEDIA_ROOT) / thumbnail_path
-        if thumbnail_full_path.exists():
-            # 既に存在する場合はURLを返す
-            # URLのパス部分を置換
-            parsed_path = parsed.path
-            if parsed_path.endswith(file_path.name):
-                thumbnail_url = parsed_path.replace(file_path.name, thumbnail_filename)
-            else:
-                thumbnail_url = f"{parsed_path.rsplit('/', 1)[0]}/{thumbnail_filename}"
-            
-            # スキームとホストを追加
-            if parsed.scheme and parsed.netloc:
-                thumbnail_url = f"{parsed.scheme}://{parsed.netloc}{thumbnail_url}"
-            elif thumbnail_url.startswith('/'):
-                # 相対パスの場合は元のURLのベースを使用
-                base_url = original_url.rsplit('/', 1)[0]
-                thumbnail_url = f"{base_url}/{thumbnail_filename}"
-            
-            return thumbnail_url
-        
-        # サムネイルを生成
-        success, saved_path = create_thumbnail_from_path(
-            str(file_path),
-            str(thumbnail_path),
-            max_size=max_size,
-            quality=quality
-        )
-        
-        if success:
-            # URLのパス部分を置換
-            parsed_path = parsed.path
-            if parsed_path.endswith(file_path.name):
-                thumbnail_url = parsed_path.replace(file_path.name, thumbnail_filename)
-            else:
-                thumbnail_url = f"{parsed_path.rsplit('/', 1)[0]}/{thumbnail_filename}"
-            
-            # スキームとホストを追加
-            if parsed.scheme and parsed.netloc:
-                thumbnail_url = f"{parsed.scheme}://{parsed.netloc}{thumbnail_url}"
-            elif thumbnail_url.startswith('/'):
-                # 相対パスの場合は元のURLのベースを使用
-                base_url = original_url.rsplit('/', 1)[0]
-                thumbnail_url = f"{base_url}/{thumbnail_filename}"
-            
-            return thumbnail_url
-        
-        # サムネイル生成に失敗した場合は元のURLを返す
-        return original_url
-    
+
+        return media_catalog.derivative_url(original_url, 'thumb', request) or original_url
+
     except Exception as e:
         logger.debug(f'Failed to get thumbnail URL: {e}')
         return None
@@ -387,68 +345,112 @@ def get_optimized_image_url(
     original_url: str,
     max_width: Optional[int] = None,
     max_height: Optional[int] = None,
-    quality: int = 85
+    quality: int = 85,
+    request=None,
 ) -> Optional[str]:
     """
-    最適化された画像URLを取得する（存在しない場合は生成）
-    
+    最適化された画像URLを取得する（未生成ならワーカーに生成を依頼する）
+
     Args:
         original_url: 元の画像URL
-        max_width: 最大幅
-        max_height: 最大高さ
-        quality: JPG品質
-    
+        max_width: 最大幅（互換のため残している。カタログの最適化画像はリサイズしない）
+        max_height: 最大高さ（同上）
+        quality: JPG品質（同上、85）
+        request: Django request（フィードで先読みしたカタログを使う）
+
     Returns:
-        str: 最適化された画像URL、またはNone（元のURLを返す）
+        str: 最適化された画像URL、未生成なら元のURL、元画像が無ければNone
     """
     try:
         from urllib.parse import urlparse
-        from toybox.image_utils import _get_file_path_from_url
-        
-        # URLからファイルパスを取得
-        parsed = urlparse(original_url)
-        original_path = parsed.path
-        
-        # ファイルパスを解決
-        file_path = _get_file_path_from_url(original_path)
-        if not file_path or not file_path.exists():
-            logger.debug(f'Original file not found: {original_path}')
+        from submissions import media_catalog
+
+        if not media_catalog.exists(original_url, request):
+            logger.debug(f'Original file not found: {original_url}')
             return None
-        
+
         # 既にJPGの場合はそのまま返す
-        if file_path.suffix.lower() in ('.jpg', '.jpeg'):
+        if urlparse(original_url).path.lower().endswith(('.jpg', '.jpeg')):
             return original_url
-        
-        # 最適化されたファイルのパスを生成
-        optimized_filename = f"{file_path.stem}_opt.jpg"
-        optimized_relative_path = file_path.relative_to(Path(settings.MEDIA_ROOT))
-        optimized_dir = optimized_relative_path.parent
-        optimized_path = optimized_dir / optimized_filename
-        
-        # 最適化されたファイルが存在するか確認
-        optimized_full_path = Path(settings.MEDIA_ROOT) / optimized_path
-        if optimized_full_path.exists():
-            # 既に存在する場合はURLを返す
-            optimized_url = original_url.replace(file_path.name, optimized_filename)
-            return optimized_url
-        
-        # 最適化されたファイルを生成
-        success, saved_path = convert_and_save_image(
-            str(file_path),
-            str(optimized_path),
-            max_width=max_width,
-            max_height=max_height,
-            quality=quality,
-            preserve_original=True
-        )
-        
-        if success:
-            optimized_url = original_url.replace(file_path.name, optimized_filename)
-            return optimized_url
-        
-        # 最適化に失敗した場合は元のURLを返す
-        return original_url
-    
+
+        return media_catalog.derivative_url(original_url, 'opt', request) or original_url
+
     except Exception as e:
         logger.debug(f'Failed to get optimized image URL: {e}')
         return None
+
+
+def supported_variant_formats(requested=('avif', 'webp', 'jpeg')):
+    """requested のうち Pillow で書き出せる形式（JPEG は常にフォールバックとして含める）。"""
+    if not PIL_AVAILABLE:
+        return []
+    Image.init()
+    formats = [f for f in requested if f in VARIANT_FORMATS and VARIANT_FORMATS[f][0] in Image.SAVE]
+    if 'jpeg' not in formats:
+        formats.append('jpeg')
+    return formats
+
+
+def render_variants(
+    image_file,
+    widths,
+    formats,
+    quality: int = 80,
+):
+    """
+    幅ラダー × 形式のレスポンシブ用バリアントを生成する
+
+    元画像より大きい幅は作らない（元画像がラダーの最小幅より小さい場合は元の幅で1段だけ作る）。
+
+    Args:
+        image_file: 画像ファイルオブジェクト（ファイルパス、BytesIO、またはファイルオブジェクト）
+        widths: 生成する幅のリスト（px）
+        formats: 生成する形式（VARIANT_FORMATS のキー）
+        quality: 品質（1-100、デフォルト80）
+
+    Returns:
+        tuple: ((元の幅, 元の高さ), [(形式, 幅, 高さ, BytesIO), ...])、失敗時は None
+    """
+    if not PIL_AVAILABLE:
+        logger.warning('PIL/Pillow is not available. Cannot render variants.')
+        return None
+
+    try:
+        img = Image.open(image_file)
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[-1])
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        original = img.size
+        ladder = sorted({w for w in widths if w < original[0]})
+        if original[0] <= max(widths):
+            # ラダーの最大幅以下の画像は元の幅も1段として持つ（拡大はしない）
+            ladder.append(original[0])
+
+        results = []
+        # 大きい幅から順に縮小して、縮小元の画素数を段ごとに減らす
+        source = img
+        for width in sorted(ladder, reverse=True):
+            height = max(1, round(original[1] * width / original[0]))
+            resized = source if source.size == (width, height) else source.resize((width, height), Image.Resampling.LANCZOS)
+            source = resized
+            for fmt in formats:
+                pil_format = VARIANT_FORMATS[fmt][0]
+                output = BytesIO()
+                options = {'quality': quality}
+                if pil_format == 'JPEG':
+                    options.update(optimize=True, progressive=True)
+                elif pil_format == 'WEBP':
+                    options.update(method=4)
+                resized.save(output, format=pil_format, **options)
+                output.seek(0)
+                results.append((fmt, width, height, output))
+        return original, results
+
+    except Exception as e:
+        logger.error(f'Failed to render variants: {e}', exc_info=True)
+        return None
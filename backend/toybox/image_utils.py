@@ -82,14 +82,12 @@ def get_image_url(
     # 1. ImageFieldを優先
     if image_field:
         try:
-            if verify_exists and hasattr(image_field, 'path'):
-                try:
-                    if not os.path.exists(image_field.path):
-                        logger.warning(f'Image file not found: {image_field.path}')
-                        return None
-                except Exception:
-                    # リモートストレージ（S3等）では path が使えない場合がある
-                    pass
+            if verify_exists:
+                # 存在確認はメディアカタログで行う（ファイルシステムの stat を避ける）
+                from submissions import media_catalog
+                if not media_catalog.exists(image_field.name, request):
+                    logger.warning(f'Image file not found: {image_field.name}')
+                    return None
 
             image_url = image_field.url
             logger.debug(f'[get_image_url] ImageField.url returned: {image_url}')
@@ -107,7 +105,8 @@ def get_image_url(
                         image_url,
                         max_width=None,
                         max_height=None,
-                        quality=85
+                        quality=85,
+                        request=request,
                     )
                     if optimized_url:
                         logger.debug(f'[get_image_url] Optimized URL: {optimized_url}')
@@ -146,10 +145,9 @@ def get_image_url(
             # 相対パスの場合、絶対URLに変換
             if image_url.startswith('/'):
                 if verify_exists:
-                    # 相対パスからファイルパスを取得
-                    file_path = _get_file_path_from_url(image_url)
-                    if file_path and not file_path.exists():
-                        logger.warning(f'Image file not found: {file_path}')
+                    from submissions import media_catalog
+                    if not media_catalog.exists(image_url, request):
+                        logger.warning(f'Image file not found: {image_url}')
                         return None
                 
                 if request:
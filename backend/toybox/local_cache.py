@@ -0,0 +1,73 @@
+"""
+Process-local cache invalidated through a version key in the shared Django cache.
+
+The built value lives in each worker process. The shared cache holds only a
+small version token, and `invalidate()` replaces it. Other workers see the new
+token at their next check and rebuild. If the shared cache is unavailable or
+is a DummyCache, invalidation only reaches the calling process and the TTL
+bounds staleness elsewhere.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+logger = logging.getLogger('toybox')
+
+_MISSING = object()
+
+
+class VersionedLocalCache:
+    """Lazily build a value once per process and rebuild it when its version changes."""
+
+    def __init__(self, name, builder, ttl=600, check_interval=5):
+        self.name = name
+        self.builder = builder
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._version_key = f'local_cache_version:{name}'
+        self._lock = threading.Lock()
+        self._value = _MISSING
+        self._version = None
+        self._expires_at = 0.0
+        self._next_check = 0.0
+
+    def _shared_version(self):
+        try:
+            return cache.get(self._version_key)
+        except Exception as e:
+            logger.warning(f'[LocalCache] {self.name}: version lookup failed: {e}')
+            return self._version
+
+    def get(self):
+        now = time.monotonic()
+        value = self._value
+        if value is not _MISSING and now < self._expires_at:
+            if now < self._next_check:
+                return value
+            self._next_check = now + self.check_interval
+            if self._shared_version() == self._version:
+                return value
+
+        with self._lock:
+            # 待っている間に別スレッドが作り直していればそれを使う
+            if self._value is not _MISSING and self._value is not value and time.monotonic() < self._expires_at:
+                return self._value
+            version = self._shared_version()
+            value = self.builder()
+            now = time.monotonic()
+            self._value = value
+            self._version = version
+            self._expires_at = now + self.ttl
+            self._next_check = now + self.check_interval
+            return value
+
+    def invalidate(self):
+        """Drop the local copy and bump the shared version so other processes rebuild."""
+        self._value = _MISSING
+        try:
+            cache.set(self._version_key, uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.warning(f'[LocalCache] {self.name}: version bump failed: {e}')
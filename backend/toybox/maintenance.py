@@ -77,17 +77,10 @@ class MaintenanceModeMiddleware:
         return False
 
     def _get_maintenance_state(self):
-        # Lazy import to avoid app-loading issues
+        # Process-local snapshot (no DB query per request); see toybox.snapshots
         try:
-            from frontend.models import SiteMaintenance
-        except Exception:
-            return False, "", None
-
-        try:
-            s = SiteMaintenance.get_solo()
-            return bool(s.enabled), (s.message or ""), s.scheduled_end
+            from toybox.snapshots import maintenance_state
+            return maintenance_state()
         except Exception:
             # Fail open (do not block) if DB is not ready
             return False, "", None
-
-
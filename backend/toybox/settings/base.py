@@ -154,7 +154,7 @@ ADMIN_URL = os.environ.get('ADMIN_URL', 'admin')
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'toybox.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -205,6 +205,72 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
+# アップロード後のメディア加工（'celery': ワーカーで実行 / 'inline': コミット後に同じプロセスで実行）
+MEDIA_JOB_MODE = os.environ.get('MEDIA_JOB_MODE', 'celery')
+MEDIA_JOB_MAX_ATTEMPTS = 3
+
+# 投稿画像のレスポンシブ用バリアント（幅ラダー・形式）。AVIF は Pillow が対応している場合のみ生成
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+IMAGE_VARIANT_FORMATS = ('avif', 'webp', 'jpeg')
+IMAGE_VARIANT_QUALITY = 80
+
+# メディアカタログを正とするか（False ならカタログに無い元ファイルはファイルシステムで確認して登録する）
+# reconcile_media_catalog で登録を済ませてから True にする
+MEDIA_CATALOG_STRICT = os.environ.get('MEDIA_CATALOG_STRICT', 'false').lower() == 'true'
+
+# フォロー中フィードのタイムライン（'redis' / 'memory' / 空で無効＝常に DB から取得）
+TIMELINE_BACKEND = os.environ.get('TIMELINE_BACKEND', 'redis')
+TIMELINE_REDIS_URL = os.environ.get('TIMELINE_REDIS_URL', 'redis://localhost:6379/2')
+TIMELINE_FANOUT_MODE = os.environ.get('TIMELINE_FANOUT_MODE', 'celery')
+TIMELINE_MAX_LENGTH = 800  # 1ユーザーあたりの保持件数（これより古いページは DB から取得）
+TIMELINE_TTL = 7 * 24 * 3600  # 読まれないタイムラインは消して次回の読み込みで作り直す
+TIMELINE_PULL_THRESHOLD = 500  # これより多くフォローしているユーザーは常に DB から取得
+
+# 公開フィード（submissions.feed_cache）の閲覧者に依存しない骨格のキャッシュ秒数
+# （投稿の追加・削除では世代の差し替えで即時無効化。リアクション数はこの秒数だけ遅れうる）
+FEED_CACHE_TTL = 15
+
+# 急上昇ハッシュタグ（submissions.trending）: スコアの半減期（時間）・上位リストの件数・上位リストのキャッシュ秒数
+HASHTAG_TREND_HALF_LIFE_HOURS = 24
+HASHTAG_TREND_TOP = 200
+HASHTAG_TREND_CACHE_TTL = 900
+
+# おすすめ・人気 sort=hot の時間減衰スコア（submissions.hot_scores）: 半減期（時間）・リアクション種別ごとの重み
+# （None なら獲得TPと同じ REACTION_POINTS）・旧いいね1件の重み・定期再計算の対象期間（時間）
+FEED_HOT_HALF_LIFE_HOURS = 12
+FEED_HOT_REACTION_WEIGHTS = None
+FEED_HOT_LEGACY_LIKE_WEIGHT = 2
+FEED_HOT_REFRESH_HOURS = 72
+# おすすめフィードの対象（直近の時間・最低リアクション数）
+FEED_RECOMMENDED_WINDOW_HOURS = 24
+FEED_RECOMMENDED_MIN_REACTIONS = 3
+
+# 公開プロフィールのキャッシュ秒数（編集・投稿・リアクション等ではバージョン差し替えで即時無効化）
+PROFILE_CACHE_TTL = 600
+
+# JWT 認証のユーザーキャッシュ（toybox.authentication）: 共有キャッシュの秒数・プロセス内コピーの確認間隔（秒）
+AUTH_PRINCIPAL_TTL = 300
+AUTH_PRINCIPAL_LOCAL_TTL = 5
+
+# 設定スナップショット（toybox.snapshots: メンテナンス・有効な抽選ルール）: プロセス内の保持秒数・
+# 共有キャッシュのバージョン確認間隔（秒）。管理画面での変更はこの間隔で全ワーカーに反映される
+SETTINGS_SNAPSHOT_TTL = 60
+SETTINGS_SNAPSHOT_CHECK_INTERVAL = 1
+
+# おすすめユーザー（users.similarity）: 類似度の計算に使う投稿の期間・保存する人数・
+# 候補生成に使うハッシュタグの出現ユーザー数の上限・行列積の行数
+SIMILAR_USERS_WINDOW_DAYS = 90
+SIMILAR_USERS_TOP_K = 30
+SIMILAR_USERS_MAX_DF = 2000
+SIMILAR_USERS_CHUNK = 2000
+
+# ポイント台帳: 'buffered' はリアクション受取などの付与を PendingPointAward に積み、ワーカーがまとめて反映する
+# （'direct' は従来どおりリクエスト内で UserPoint を行ロックして加算）。POINT_FLUSH_MODE は 'celery' / 'inline'
+POINT_LEDGER_MODE = os.environ.get('POINT_LEDGER_MODE', 'buffered')
+POINT_FLUSH_MODE = 'celery'
+POINT_FLUSH_DELAY = 2  # 秒。この間の付与を1回の flush にまとめる
+POINT_FLUSH_BATCH = 1000
+
 # Celery Beat Schedule
 CELERY_BEAT_SCHEDULE = {
     'expire-user-titles-daily': {
@@ -231,6 +297,22 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'submissions.tasks.refresh_reaction_rankings_hourly',
         'schedule': 3600.0,  # Every hour
     },
+    'build-user-similarity-hourly': {
+        'task': 'users.tasks.build_user_similarity_hourly',
+        'schedule': 3600.0,  # Every hour
+    },
+    'flush-pending-point-awards': {
+        'task': 'gamification.tasks.flush_pending_point_awards',
+        'schedule': 60.0,  # Every minute (safety net for the debounced flush)
+    },
+    'rotate-hashtag-buckets': {
+        'task': 'submissions.tasks.rotate_hashtag_buckets',
+        'schedule': 300.0,  # Every 5 minutes (drop expired hourly buckets, rebuild 24h/7d trending lists)
+    },
+    'refresh-hot-scores': {
+        'task': 'submissions.tasks.refresh_hot_scores',
+        'schedule': 3600.0,  # Every hour (recent posts; picks up weight / half-life changes)
+    },
 }
 
 # Redis Cache
@@ -52,6 +52,12 @@ CACHES = {
     }
 }
 
+# 開発環境ではワーカー・Redis 無しでメディア加工・タイムライン更新を実行する
+MEDIA_JOB_MODE = os.environ.get('MEDIA_JOB_MODE', 'inline')
+TIMELINE_BACKEND = os.environ.get('TIMELINE_BACKEND', 'memory')
+TIMELINE_FANOUT_MODE = os.environ.get('TIMELINE_FANOUT_MODE', 'inline')
+POINT_FLUSH_MODE = os.environ.get('POINT_FLUSH_MODE', 'inline')
+
 # CORS for development
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -0,0 +1,72 @@
+"""
+Settings snapshots: singleton-style settings rows cached in each process.
+
+Each snapshot is a VersionedLocalCache. Reads cost no DB queries. The shared
+version key is checked at most every SETTINGS_SNAPSHOT_CHECK_INTERVAL seconds,
+so a change saved in the admin reaches every worker within that interval.
+Saves and deletes invalidate through the frontend and lottery signals. If the
+shared cache is down, the last snapshot is kept (fail open) and it is rebuilt
+from the DB after SETTINGS_SNAPSHOT_TTL seconds.
+
+The values are shared between threads and must be treated as read-only.
+"""
+import copy
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from toybox.local_cache import VersionedLocalCache
+
+MaintenanceState = namedtuple('MaintenanceState', ['enabled', 'message', 'scheduled_end'])
+
+MAINTENANCE_OFF = MaintenanceState(False, '', None)
+
+
+def _ttl():
+    return getattr(settings, 'SETTINGS_SNAPSHOT_TTL', 60)
+
+
+def _check_interval():
+    return getattr(settings, 'SETTINGS_SNAPSHOT_CHECK_INTERVAL', 1)
+
+
+def _build_maintenance():
+    from frontend.models import SiteMaintenance
+    s = SiteMaintenance.get_solo()
+    return MaintenanceState(bool(s.enabled), s.message or '', s.scheduled_end)
+
+
+def _build_lottery_rule():
+    from lottery.models import LotteryRule
+    return LotteryRule.objects.filter(is_active=True).first()
+
+
+maintenance_cache = VersionedLocalCache(
+    'frontend.site_maintenance', _build_maintenance, ttl=_ttl(), check_interval=_check_interval(),
+)
+lottery_rule_cache = VersionedLocalCache(
+    'lottery.active_rule', _build_lottery_rule, ttl=_ttl(), check_interval=_check_interval(),
+)
+
+
+def maintenance_state():
+    """現在のメンテナンス設定（MaintenanceState）。"""
+    return maintenance_cache.get()
+
+
+def active_lottery_rule():
+    """有効な抽選ルール（無ければ None）。呼び出し側で変更しても共有のスナップショットに影響しないようコピーを返す。"""
+    rule = lottery_rule_cache.get()
+    return copy.copy(rule) if rule is not None else None
+
+
+def invalidate_on_commit(snapshot):
+    """設定の変更後に呼ぶ。このプロセスではすぐに、他のプロセスにはコミット後にもう一度無効化を伝える。"""
+    snapshot.invalidate()
+    transaction.on_commit(snapshot.invalidate)
+
+
+def invalidate_all():
+    for snapshot in (maintenance_cache, lottery_rule_cache):
+        snapshot.invalidate()
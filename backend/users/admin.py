@@ -9,7 +9,7 @@ from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.http import HttpResponseRedirect
-from .models import UserRegistration, UserMeta, UserCard, UserFollow
+from .models import UserRegistration, UserMeta, UserCard, UserFollow, Notification
 
 User = get_user_model()
 
@@ -465,11 +465,6 @@ class UserMetaAdmin(admin.ModelAdmin):
             'fields': ('lottery_bonus_count',),
             'description': 'ユーザーが持つ抽選ボーナス回数を管理します。'
         }),
-        ('通知', {
-            'fields': ('notifications',),
-            'description': 'ユーザーへの通知情報を管理します。',
-            'classes': ('collapse',)
-        }),
         ('日時情報', {
             'fields': ('created_at', 'updated_at'),
             'description': 'メタ情報の作成日時と最終更新日時です。'
@@ -504,3 +499,13 @@ class UserFollowAdmin(admin.ModelAdmin):
     search_fields = ['follower__display_id', 'following__display_id', 'follower__email', 'following__email']
     readonly_fields = ['created_at']
     ordering = ['-created_at']
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """ユーザーへの通知。"""
+    list_display = ['id', 'recipient', 'type', 'message', 'is_read', 'created_at']
+    list_filter = ['type', 'is_read', 'created_at']
+    search_fields = ['recipient__display_id', 'message']
+    raw_id_fields = ['recipient']
+    ordering = ['-created_at']
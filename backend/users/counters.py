@@ -0,0 +1,152 @@
+"""ユーザー単位カウンタ（UserCounters）の更新・再構築。
+
+カウンタは F() 式で増減し、フォロー・投稿・リアクションの INSERT/DELETE と同じトランザクション内で
+更新する（フォローは users.signals、投稿・リアクションは submissions.signals から呼ぶ）。
+行が無いユーザーは生テーブルから作成する。
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+
+from . import profile_cache
+from .models import UserCounters, UserFollow
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    'followers_count',
+    'following_count',
+    'posts_count',
+    'reactions_received',
+    'reaction_score_received',
+)
+
+
+def _reaction_weight(reaction_type):
+    from gamification.services import REACTION_POINTS
+
+    return REACTION_POINTS.get(reaction_type, 0)
+
+
+def _apply(user_id, **deltas):
+    """カウンタ行へ差分を F() で加算する。行が無ければ生テーブルから作成する。"""
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates or user_id is None:
+        return
+    # カウンタはプロフィールに表示するのでキャッシュ済みのプロフィールを無効にする
+    profile_cache.bump_on_commit(user_id)
+    if UserCounters.objects.filter(user_id=user_id).update(**updates):
+        return
+    # 減算で行が無いのはユーザー削除の CASCADE 中（行が先に消えている）なので作り直さない。
+    # それ以外のズレは rebuild_user_counters で直す
+    if any(delta < 0 for delta in deltas.values()):
+        return
+    # 未作成: 生テーブルには今回の変更が反映済みなので再集計で作る
+    try:
+        with transaction.atomic():
+            rebuild_counters([user_id])
+    except IntegrityError:
+        UserCounters.objects.filter(user_id=user_id).update(**updates)
+
+
+def record_follow(follower_id, following_id, delta):
+    """フォロー1件の追加（delta=1）／削除（delta=-1）を反映する。"""
+    _apply(following_id, followers_count=delta)
+    _apply(follower_id, following_count=delta)
+
+
+def record_post(author_id, delta, reactions=0, reaction_score=0):
+    """投稿の公開（delta=1）／ソフト削除（delta=-1）を反映する。もらっていたリアクション分も増減する。"""
+    _apply(author_id, posts_count=delta, reactions_received=reactions, reaction_score_received=reaction_score)
+
+
+def record_reaction(author_id, reaction_type, delta):
+    """公開中の投稿へのリアクション1件の追加／削除を投稿者のカウンタに反映する。"""
+    _apply(
+        author_id,
+        reactions_received=delta,
+        reaction_score_received=_reaction_weight(reaction_type) * delta,
+    )
+
+
+def get_counters(user):
+    """カウンタ行を返す（無ければ作成）。"""
+    counters = UserCounters.objects.filter(user_id=user.pk).first()
+    if counters is None:
+        rebuild_counters([user.pk])
+        counters = UserCounters.objects.get(user_id=user.pk)
+    return counters
+
+
+def compute_counters(user_ids):
+    """生テーブルから集計値を計算する。{user_id: {field: value}} を返す。"""
+    from gamification.services import REACTION_POINTS
+    from submissions.models import Reaction, Submission
+    from .models import User
+
+    user_ids = list(User.objects.filter(pk__in=list(user_ids)).values_list('pk', flat=True))
+    result = {uid: {field: 0 for field in COUNTER_FIELDS} for uid in user_ids}
+
+    for field, key in (('followers_count', 'following_id'), ('following_count', 'follower_id')):
+        rows = UserFollow.objects.filter(**{f'{key}__in': user_ids}).values(key).annotate(cnt=Count('id')).order_by()
+        for row in rows:
+            result[row[key]][field] = row['cnt']
+
+    rows = (
+        Submission.objects.filter(author_id__in=user_ids, deleted_at__isnull=True)
+        .values('author_id').annotate(cnt=Count('id')).order_by()
+    )
+    for row in rows:
+        result[row['author_id']]['posts_count'] = row['cnt']
+
+    weight = Case(
+        *[When(type=k, then=Value(v)) for k, v in REACTION_POINTS.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rows = (
+        Reaction.objects.filter(submission__author_id__in=user_ids, submission__deleted_at__isnull=True)
+        .values('submission__author_id')
+        .annotate(cnt=Count('id'), score=Sum(weight))
+        .order_by()
+    )
+    for row in rows:
+        values = result[row['submission__author_id']]
+        values['reactions_received'] = row['cnt']
+        values['reaction_score_received'] = row['score'] or 0
+    return result
+
+
+def rebuild_counters(user_ids):
+    """指定ユーザーのカウンタ行を生テーブルから作り直す。作成/更新した行数を返す。"""
+    computed = compute_counters(user_ids)
+    if not computed:
+        return 0
+    existing = set(UserCounters.objects.filter(user_id__in=computed.keys()).values_list('user_id', flat=True))
+    to_create = []
+    to_update = []
+    for uid, values in computed.items():
+        counters = UserCounters(user_id=uid, **values)
+        (to_update if uid in existing else to_create).append(counters)
+    if to_create:
+        UserCounters.objects.bulk_create(to_create)
+    if to_update:
+        UserCounters.objects.bulk_update(to_update, list(COUNTER_FIELDS))
+    return len(computed)
+
+
+def verify_counters(user_ids):
+    """カウンタ行と生テーブルの差異を返す。[(user_id, field, stored, expected)]"""
+    computed = compute_counters(user_ids)
+    stored = {row['user_id']: row for row in UserCounters.objects.filter(user_id__in=computed.keys()).values()}
+    mismatches = []
+    for uid, expected in computed.items():
+        row = stored.get(uid)
+        if row is None:
+            mismatches.append((uid, '(missing)', None, None))
+            continue
+        for field, value in expected.items():
+            if row[field] != value:
+                mismatches.append((uid, field, row[field], value))
+    return mismatches
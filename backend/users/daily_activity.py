@@ -0,0 +1,99 @@
+"""日別アクティビティ（UserDailyActivity）の記録と参照。
+
+日付はアチーブメント集計（gamification.achievement_stats）と同じく JST で区切る。
+記録は (user, jst_date) の行への F() 加算で、行が無ければ作成する（同時作成は一意制約で検出して加算し直す）。
+"""
+from zoneinfo import ZoneInfo
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UserDailyActivity
+
+JST = ZoneInfo('Asia/Tokyo')
+
+POST_KIND_FIELDS = {
+    'image': 'image_posts',
+    'video': 'video_posts',
+    'game': 'game_posts',
+}
+
+
+def jst_date(dt=None):
+    """日時（省略時は現在）の JST の日付。"""
+    return (dt or timezone.now()).astimezone(JST).date()
+
+
+def record(user_id, day=None, **deltas):
+    """(user, day) の行に差分を加算する。行が無ければ（負の差分は 0 として）作成する（減算のみなら何もしない）。"""
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates or user_id is None:
+        return
+    day = day or jst_date()
+    if UserDailyActivity.objects.filter(user_id=user_id, jst_date=day).update(**updates):
+        return
+    # 行が無いのに減算だけなら引く対象が無い（ユーザー削除の CASCADE で先に消えた場合を含む）
+    if all(delta <= 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            UserDailyActivity.objects.create(
+                user_id=user_id,
+                jst_date=day,
+                **{field: max(delta, 0) for field, delta in deltas.items()},
+            )
+    except IntegrityError:
+        UserDailyActivity.objects.filter(user_id=user_id, jst_date=day).update(**updates)
+
+
+def submission_kind(submission):
+    if submission.game_url:
+        return 'game'
+    if submission.video_url:
+        return 'video'
+    return 'image'
+
+
+def record_post(submission, delta):
+    """投稿の公開（delta=1）／ソフト削除（delta=-1）を投稿日の行に反映する。"""
+    record(
+        submission.author_id,
+        jst_date(submission.created_at),
+        posts=delta,
+        **{POST_KIND_FIELDS[submission_kind(submission)]: delta},
+    )
+
+
+def record_login(user_id):
+    record(user_id, logins=1)
+
+
+def record_game_play(user_id):
+    record(user_id, game_plays=1)
+
+
+def claim_lottery_draw(user_id):
+    """今日の抽選権を使う。今日まだ抽選していなければ True（同時に呼ばれても True は1回だけ）。"""
+    day = jst_date()
+    claimed = UserDailyActivity.objects.filter(user_id=user_id, jst_date=day, lottery_draws=0).update(
+        lottery_draws=F('lottery_draws') + 1,
+    )
+    if claimed:
+        return True
+    if UserDailyActivity.objects.filter(user_id=user_id, jst_date=day).exists():
+        return False
+    try:
+        with transaction.atomic():
+            UserDailyActivity.objects.create(user_id=user_id, jst_date=day, lottery_draws=1)
+        return True
+    except IntegrityError:
+        # 同時に作成された行を取り合う
+        return bool(UserDailyActivity.objects.filter(user_id=user_id, jst_date=day, lottery_draws=0).update(
+            lottery_draws=F('lottery_draws') + 1,
+        ))
+
+
+def posts_today(user_id):
+    count = UserDailyActivity.objects.filter(user_id=user_id, jst_date=jst_date()).values_list('posts', flat=True).first()
+    return max(count or 0, 0)
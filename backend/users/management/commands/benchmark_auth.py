@@ -0,0 +1,66 @@
+"""
+JWT 認証のリクエストあたりのコストを計測する管理コマンド
+simplejwt の JWTAuthentication と CachedJWTAuthentication（キャッシュなし/プロセス内ヒット/共有キャッシュのみ）を比較します
+一時的なユーザーを作成し、終了時に削除します
+"""
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from toybox.authentication import CachedJWTAuthentication, principals
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request JWT authentication overhead: simplejwt vs cached principal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Authenticated requests per scenario (default: 2000)')
+
+    def _run(self, label, backend, requests, before_each=None):
+        factory = RequestFactory()
+        elapsed = 0.0
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(requests):
+                if before_each:
+                    before_each()
+                request = factory.get('/api/users/me/meta/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+                t0 = time.perf_counter()
+                user, _token = backend.authenticate(request)
+                # 同じリクエスト内の2回目（DRF とテンプレート用ミドルウェアの両方が参照する場合）
+                backend.authenticate(request)
+                elapsed += time.perf_counter() - t0
+                assert user.pk == self.user.pk
+        self.stdout.write(
+            f'{label:14s} {elapsed / requests * 1e6:8.1f} us/request  '
+            f'{len(ctx.captured_queries) / requests:5.2f} queries/request'
+        )
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        suffix = uuid.uuid4().hex[:8]
+        self.user = User.objects.create_user(
+            email=f'auth-bench-{suffix}@example.com',
+            password=None,
+            display_id=f'authbench{suffix}',
+        )
+        self.token = str(AccessToken.for_user(self.user))
+        backend_name = type(caches['default']).__name__
+        self.stdout.write(f'{requests} requests per scenario ({connection.vendor}, cache: {backend_name})')
+        try:
+            self._run('simplejwt', JWTAuthentication(), requests)
+            cached = CachedJWTAuthentication()
+            self._run('cached-cold', cached, requests, before_each=lambda: principals.invalidate(self.user.pk))
+            self._run('cached-shared', cached, requests, before_each=principals.clear_local)
+            self._run('cached-warm', cached, requests)
+            self.stdout.write(self.style.SUCCESS('Done'))
+        finally:
+            principals.invalidate(self.user.pk)
+            self.user.delete()
@@ -0,0 +1,34 @@
+"""
+おすすめユーザー用の類似クリエイター表（UserSimilarity）を作り直すコマンド
+--benchmark N で N 人の合成データでの実行時間とメモリを計測します（DB は更新しません）
+"""
+from django.core.management.base import BaseCommand, CommandError
+from users import similarity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed similar-creator table used by RecommendedUsersView'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benchmark',
+            type=int,
+            metavar='USERS',
+            help='Run the computation on USERS synthetic users and report runtime and memory (no database updates)',
+        )
+
+    def handle(self, *args, **options):
+        if not similarity.NUMPY_AVAILABLE:
+            raise CommandError('NumPy and SciPy are required (pip install -r requirements.txt)')
+
+        if options['benchmark']:
+            result = similarity.benchmark(options['benchmark'])
+            for key, value in result.items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        result = similarity.build_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {result["pairs"]} similar users for {result["users"]} users '
+            f'({result["features"]} features) in {result["seconds"]}s'
+        ))
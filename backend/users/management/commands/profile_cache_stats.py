@@ -0,0 +1,27 @@
+"""
+公開プロフィールのキャッシュ（users.profile_cache）のヒット率と再構築時間を表示するコマンド
+--reset で集計をリセットします
+"""
+from django.core.management.base import BaseCommand
+
+from users import profile_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit rate and rebuild time of the cached public profile payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        stats = profile_cache.stats()
+        self.stdout.write(f'Lookups:  {stats["hits"] + stats["misses"]} (hits {stats["hits"]}, misses {stats["misses"]})')
+        self.stdout.write(f'Hit rate: {stats["hit_rate"] * 100:.1f}%')
+        self.stdout.write(f'Rebuilds: {stats["rebuilds"]} (avg {stats["avg_rebuild_ms"]:.1f} ms)')
+        if options['reset']:
+            profile_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
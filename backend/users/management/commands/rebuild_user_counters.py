@@ -0,0 +1,61 @@
+"""
+ユーザー単位カウンタ（UserCounters）を生テーブルから再構築・検証するコマンド
+user_follows / submissions / reactions をユーザー単位で再集計します
+"""
+from django.core.management.base import BaseCommand
+from users.counters import rebuild_counters, verify_counters
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --verify) UserCounters from the follow, submission and reaction tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report mismatches between stored counters and the raw tables (no database updates)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Limit to the given user id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        batch_size = max(1, options['batch_size'])
+
+        ids_qs = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user_ids']:
+            ids_qs = ids_qs.filter(id__in=options['user_ids'])
+        ids = list(ids_qs)
+        self.stdout.write(f'{"Verifying" if verify else "Rebuilding"} counters for {len(ids)} users')
+
+        processed = 0
+        mismatch_count = 0
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            if verify:
+                for uid, field, stored, expected in verify_counters(batch):
+                    mismatch_count += 1
+                    self.stdout.write(f'  user {uid}: {field} stored={stored} expected={expected}')
+            else:
+                rebuild_counters(batch)
+            processed += len(batch)
+
+        if verify:
+            if mismatch_count:
+                self.stdout.write(self.style.ERROR(f'{mismatch_count} mismatches found in {processed} users'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'All {processed} users are consistent'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {processed} users'))
@@ -0,0 +1,120 @@
+# Generated manually: 通知を UserMeta.notifications（JSON 配列）から専用テーブルへ移行 + 未読数カウンタ
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import datetime
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+# JSON の項目のうち列として持つもの（残りは data に入れる）
+COLUMN_KEYS = {'type', 'message', 'read', 'createdAt', 'created_at', 'id'}
+
+
+def _parse_created_at(item, fallback):
+    value = item.get('createdAt') or item.get('created_at')
+    try:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return fallback
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def move_notifications(apps, schema_editor):
+    UserMeta = apps.get_model('users', 'UserMeta')
+    Notification = apps.get_model('users', 'Notification')
+    NotificationCounter = apps.get_model('users', 'NotificationCounter')
+
+    rows = []
+    counters = []
+    metas = UserMeta.objects.exclude(notifications=[]).values_list('user_id', 'notifications', 'updated_at')
+    for user_id, items, updated_at in metas.iterator():
+        unread = 0
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            is_read = bool(item.get('read', False))
+            unread += 0 if is_read else 1
+            rows.append(Notification(
+                recipient_id=user_id,
+                type=str(item.get('type') or '')[:30],
+                message=item.get('message') or '',
+                data={k: v for k, v in item.items() if k not in COLUMN_KEYS},
+                is_read=is_read,
+                created_at=_parse_created_at(item, updated_at),
+            ))
+        counters.append(NotificationCounter(user_id=user_id, unread_count=unread))
+        if len(rows) >= BATCH_SIZE:
+            Notification.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        Notification.objects.bulk_create(rows)
+    NotificationCounter.objects.bulk_create(counters, batch_size=BATCH_SIZE)
+
+
+def restore_notifications(apps, schema_editor):
+    UserMeta = apps.get_model('users', 'UserMeta')
+    Notification = apps.get_model('users', 'Notification')
+
+    by_user = {}
+    for n in Notification.objects.order_by('created_at', 'id').iterator():
+        by_user.setdefault(n.recipient_id, []).append({
+            **(n.data or {}),
+            'type': n.type,
+            'message': n.message,
+            'read': n.is_read,
+            'createdAt': n.created_at.isoformat(),
+        })
+    for user_id, items in by_user.items():
+        UserMeta.objects.filter(user_id=user_id).update(notifications=items[-50:])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_userfollow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('follow', 'フォロー'), ('reaction', 'リアクション'), ('like', 'いいね'), ('submission', '投稿')], max_length=30, verbose_name='種別')),
+                ('message', models.TextField(blank=True, verbose_name='メッセージ')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='追加情報')),
+                ('is_read', models.BooleanField(default=False, verbose_name='既読')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='作成日時')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='受信者')),
+            ],
+            options={
+                'verbose_name': '通知',
+                'verbose_name_plural': '通知',
+                'db_table': 'notifications',
+                'indexes': [
+                    models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_idx'),
+                    models.Index(condition=models.Q(('is_read', False)), fields=['recipient'], name='notif_unread_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+                ('unread_count', models.IntegerField(default=0, verbose_name='未読数')),
+            ],
+            options={
+                'verbose_name': '未読通知数',
+                'verbose_name_plural': '未読通知数',
+                'db_table': 'notification_counters',
+            },
+        ),
+        migrations.RunPython(move_notifications, restore_notifications),
+        migrations.RemoveField(
+            model_name='usermeta',
+            name='notifications',
+        ),
+    ]
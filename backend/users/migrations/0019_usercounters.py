@@ -0,0 +1,90 @@
+# Generated manually: ユーザー単位の非正規化カウンタ（フォロー数・投稿数・もらったリアクション）+ 既存データの初期集計
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+
+
+# gamification.services.REACTION_POINTS（作成時点）
+REACTION_POINTS = {
+    'submit_medal': 3,
+    'awesome': 5,
+    'cute': 4,
+    'funny': 4,
+    'moved': 4,
+    'cool': 5,
+    'beautiful': 3,
+    'emotional': 5,
+    'god_game': 10,
+}
+
+BATCH_SIZE = 1000
+
+
+def backfill_user_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserFollow = apps.get_model('users', 'UserFollow')
+    UserCounters = apps.get_model('users', 'UserCounters')
+    Submission = apps.get_model('submissions', 'Submission')
+    Reaction = apps.get_model('submissions', 'Reaction')
+
+    weight = Case(
+        *[When(type=k, then=Value(v)) for k, v in REACTION_POINTS.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    for offset in range(0, len(ids), BATCH_SIZE):
+        batch = ids[offset:offset + BATCH_SIZE]
+        values = {uid: {} for uid in batch}
+        for field, key in (('followers_count', 'following_id'), ('following_count', 'follower_id')):
+            for row in UserFollow.objects.filter(**{f'{key}__in': batch}).values(key).annotate(cnt=Count('id')).order_by():
+                values[row[key]][field] = row['cnt']
+        rows = (
+            Submission.objects.filter(author_id__in=batch, deleted_at__isnull=True)
+            .values('author_id').annotate(cnt=Count('id')).order_by()
+        )
+        for row in rows:
+            values[row['author_id']]['posts_count'] = row['cnt']
+        rows = (
+            Reaction.objects.filter(submission__author_id__in=batch, submission__deleted_at__isnull=True)
+            .values('submission__author_id')
+            .annotate(cnt=Count('id'), score=Sum(weight))
+            .order_by()
+        )
+        for row in rows:
+            values[row['submission__author_id']].update(
+                reactions_received=row['cnt'],
+                reaction_score_received=row['score'] or 0,
+            )
+        UserCounters.objects.bulk_create([UserCounters(user_id=uid, **v) for uid, v in values.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_notification'),
+        ('submissions', '0015_feed_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='フォロワー数')),
+                ('following_count', models.IntegerField(default=0, verbose_name='フォロー数')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='投稿数')),
+                ('reactions_received', models.IntegerField(default=0, verbose_name='もらったリアクション数')),
+                ('reaction_score_received', models.IntegerField(default=0, verbose_name='もらったリアクションスコア')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'ユーザーカウンタ',
+                'verbose_name_plural': 'ユーザーカウンタ',
+                'db_table': 'user_counters',
+            },
+        ),
+        migrations.RunPython(backfill_user_counters, migrations.RunPython.noop),
+    ]
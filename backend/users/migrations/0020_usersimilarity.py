@@ -0,0 +1,34 @@
+# Generated manually: おすすめユーザー用の類似クリエイター表（オフラインで事前計算）
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0019_usercounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='順位')),
+                ('score', models.FloatField(verbose_name='類似度')),
+                ('shared_tags', models.JSONField(blank=True, default=list, verbose_name='共通ハッシュタグ')),
+                ('computed_at', models.DateTimeField(verbose_name='計算日時')),
+                ('similar_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='類似ユーザー')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_users', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': '類似ユーザー',
+                'verbose_name_plural': '類似ユーザー',
+                'db_table': 'user_similarities',
+                'indexes': [models.Index(fields=['user', 'rank'], name='usersim_user_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'similar_user'), name='uniq_user_similarity_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated manually: ユーザー × 日（JST）の行動回数 + 既存の投稿・ログインボーナス・ゲームプレイ・当選からの初期集計
+
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+JST = ZoneInfo('Asia/Tokyo')
+BATCH_SIZE = 1000
+FIELDS = ('posts', 'image_posts', 'video_posts', 'game_posts', 'logins', 'game_plays', 'lottery_draws')
+
+
+def backfill_daily_activity(apps, schema_editor):
+    Submission = apps.get_model('submissions', 'Submission')
+    PointHistory = apps.get_model('gamification', 'PointHistory')
+    JackpotWin = apps.get_model('lottery', 'JackpotWin')
+    UserDailyActivity = apps.get_model('users', 'UserDailyActivity')
+
+    rows = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    posts = Submission.objects.filter(deleted_at__isnull=True).values_list('author_id', 'created_at', 'game_url', 'video_url')
+    for author_id, created_at, game_url, video_url in posts.iterator(chunk_size=BATCH_SIZE):
+        row = rows[(author_id, created_at.astimezone(JST).date())]
+        row['posts'] += 1
+        row['game_posts' if game_url else 'video_posts' if video_url else 'image_posts'] += 1
+
+    # ログイン回数・ゲームプレイ回数はポイント履歴からの下限値（ボーナス付与のあった回数）
+    for action, field in (('daily_login', 'logins'), ('game_played_player', 'game_plays')):
+        history = PointHistory.objects.filter(action_type=action).values_list('user_id', 'created_at')
+        for user_id, created_at in history.iterator(chunk_size=BATCH_SIZE):
+            rows[(user_id, created_at.astimezone(JST).date())][field] += 1
+
+    for user_id, won_at in JackpotWin.objects.values_list('user_id', 'won_at').iterator(chunk_size=BATCH_SIZE):
+        rows[(user_id, won_at.astimezone(JST).date())]['lottery_draws'] += 1
+
+    objs = [UserDailyActivity(user_id=uid, jst_date=day, **values) for (uid, day), values in rows.items()]
+    UserDailyActivity.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_usersimilarity'),
+        ('submissions', '0015_feed_keyset_indexes'),
+        ('gamification', '0010_pendingpointaward'),
+        ('lottery', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jst_date', models.DateField(verbose_name='日付（JST）')),
+                ('posts', models.IntegerField(default=0, verbose_name='投稿数')),
+                ('image_posts', models.IntegerField(default=0, verbose_name='画像投稿数')),
+                ('video_posts', models.IntegerField(default=0, verbose_name='動画投稿数')),
+                ('game_posts', models.IntegerField(default=0, verbose_name='ゲーム投稿数')),
+                ('logins', models.IntegerField(default=0, verbose_name='ログイン回数')),
+                ('game_plays', models.IntegerField(default=0, verbose_name='ゲームプレイ回数')),
+                ('lottery_draws', models.IntegerField(default=0, verbose_name='抽選回数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': '日別アクティビティ',
+                'verbose_name_plural': '日別アクティビティ',
+                'db_table': 'user_daily_activity',
+                'indexes': [models.Index(fields=['jst_date', '-posts'], name='user_daily_posts_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'jst_date'), name='uniq_user_daily_activity')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, migrations.RunPython.noop),
+    ]
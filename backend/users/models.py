@@ -117,6 +117,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f'{self.display_id} ({self.email})'
     
+    def save(self, *args, **kwargs):
+        # 認証キャッシュのスナップショット（toybox.authentication）は古い値を持ちうるので、全フィールドの
+        # 上書き（管理者の凍結・BAN・ロール変更を戻してしまう）を拒否する。update_fields を指定すること
+        if getattr(self, '_principal_snapshot', False) and kwargs.get('update_fields') is None:
+            raise ValueError('Cached principal snapshots must be saved with update_fields.')
+        super().save(*args, **kwargs)
+    
     def get_full_name(self):
         """Return the full name for the user."""
         return self.display_name if hasattr(self, 'meta') and self.meta.display_name else self.display_id
@@ -165,9 +172,6 @@ class UserMeta(models.Model):
     header_url = models.URLField(max_length=500, blank=True)
     lottery_bonus_count = models.IntegerField(default=0)
     
-    # Notifications (JSON array of notification objects)
-    notifications = models.JSONField(default=list, blank=True)
-    
     # Onboarding (page-specific completion status)
     onboarding_completed = models.JSONField('オンボーディング完了状態', default=dict, blank=True, help_text='各ページごとのオンボーディング完了状態 {"me": false, "collection": false, "profile": false, "feed": false}')
     
@@ -254,3 +258,180 @@ class UserFollow(models.Model):
 
     def __str__(self):
         return f'{self.follower.display_id} → {self.following.display_id}'
+
+
+class Notification(models.Model):
+    """ユーザーへの通知（フォロー・リアクション・投稿完了など）。
+
+    旧 UserMeta.notifications（JSON 配列の読み書き）を置き換える。追加は INSERT のみで、
+    未読数は NotificationCounter で非正規化して持つ（users.notifications 経由で更新）。
+    """
+
+    class Type(models.TextChoices):
+        FOLLOW = 'follow', 'フォロー'
+        REACTION = 'reaction', 'リアクション'
+        LIKE = 'like', 'いいね'
+        SUBMISSION = 'submission', '投稿'
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='受信者',
+    )
+    type = models.CharField('種別', max_length=30, choices=Type.choices)
+    message = models.TextField('メッセージ', blank=True)
+    # 種別ごとの追加情報（fromAnonId, submissionId, emoji など。API ではそのまま展開して返す）
+    data = models.JSONField('追加情報', default=dict, blank=True)
+    is_read = models.BooleanField('既読', default=False)
+    created_at = models.DateTimeField('作成日時', default=timezone.now)
+
+    class Meta:
+        db_table = 'notifications'
+        verbose_name = '通知'
+        verbose_name_plural = '通知'
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_idx'),
+            models.Index(
+                fields=['recipient'],
+                name='notif_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.type} -> {self.recipient_id}'
+
+
+class NotificationCounter(models.Model):
+    """ユーザーごとの未読通知数（通知一覧・バッジ表示で COUNT を避けるための非正規化カウンタ）。"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name='ユーザー',
+    )
+    unread_count = models.IntegerField('未読数', default=0)
+
+    class Meta:
+        db_table = 'notification_counters'
+        verbose_name = '未読通知数'
+        verbose_name_plural = '未読通知数'
+
+    def __str__(self):
+        return f'unread {self.unread_count} for {self.user_id}'
+
+
+class UserCounters(models.Model):
+    """プロフィール表示用のユーザー単位カウンタ（非正規化）。
+
+    フォロー・投稿・ソフト削除／復元・リアクションの書き込みと同じトランザクションで F() により増減する
+    （users.counters。呼び出しは submissions.signals）。プロフィールやフォロー応答は COUNT / SUM の
+    代わりにこの行を主キーで1回読む。ズレた場合は `manage.py rebuild_user_counters` で再構築できる。
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='ユーザー',
+    )
+    followers_count = models.IntegerField('フォロワー数', default=0)
+    following_count = models.IntegerField('フォロー数', default=0)
+    # ソフト削除されていない投稿の数
+    posts_count = models.IntegerField('投稿数', default=0)
+    # 公開中の投稿がもらったリアクションの件数と REACTION_POINTS による重み付き合計（獲得TP相当）
+    reactions_received = models.IntegerField('もらったリアクション数', default=0)
+    reaction_score_received = models.IntegerField('もらったリアクションスコア', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        db_table = 'user_counters'
+        verbose_name = 'ユーザーカウンタ'
+        verbose_name_plural = 'ユーザーカウンタ'
+
+    def __str__(self):
+        return f'counters for {self.user_id}'
+
+
+class UserSimilarity(models.Model):
+    """おすすめユーザー用の類似クリエイター（オフラインで事前計算）。
+
+    投稿のハッシュタグ・使用生成AIから作ったユーザーごとの TF-IDF ベクトルのコサイン類似度で、
+    上位 SIMILAR_USERS_TOP_K 人を rank 順に保存する（users.similarity、毎時のタスクで作り直す）。
+    フォロー済みユーザーの除外は表示時に行う。
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='similar_users',
+        verbose_name='ユーザー',
+    )
+    similar_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='類似ユーザー',
+    )
+    rank = models.PositiveSmallIntegerField('順位')
+    score = models.FloatField('類似度')
+    # 類似度への寄与が大きい共通ハッシュタグ（最大3件、おすすめ理由の表示用）
+    shared_tags = models.JSONField('共通ハッシュタグ', default=list, blank=True)
+    computed_at = models.DateTimeField('計算日時')
+
+    class Meta:
+        db_table = 'user_similarities'
+        verbose_name = '類似ユーザー'
+        verbose_name_plural = '類似ユーザー'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'similar_user'], name='uniq_user_similarity_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'], name='usersim_user_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} ~ {self.similar_user_id} ({self.score:.3f})'
+
+
+class UserDailyActivity(models.Model):
+    """ユーザー × 日（JST）の行動回数。
+
+    投稿・ログイン・ゲームプレイ・抽選のたびに F() で加算（行が無ければ作成）する（users.daily_activity）。
+    「今日○○したか／何回したか」の判定や1日の投稿上限のチェックは、この行を1件読むだけで済む。
+    投稿数は公開中（ソフト削除されていない）の投稿のみ数え、投稿日の行で増減する。
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_activity',
+        verbose_name='ユーザー',
+    )
+    jst_date = models.DateField('日付（JST）')
+    posts = models.IntegerField('投稿数', default=0)
+    image_posts = models.IntegerField('画像投稿数', default=0)
+    video_posts = models.IntegerField('動画投稿数', default=0)
+    game_posts = models.IntegerField('ゲーム投稿数', default=0)
+    logins = models.IntegerField('ログイン回数', default=0)
+    game_plays = models.IntegerField('ゲームプレイ回数', default=0)
+    lottery_draws = models.IntegerField('抽選回数', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        db_table = 'user_daily_activity'
+        verbose_name = '日別アクティビティ'
+        verbose_name_plural = '日別アクティビティ'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'jst_date'], name='uniq_user_daily_activity'),
+        ]
+        indexes = [
+            models.Index(fields=['jst_date', '-posts'], name='user_daily_posts_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} @ {self.jst_date}'
@@ -0,0 +1,88 @@
+"""通知の作成・一覧・既読化。
+
+通知は Notification の INSERT のみで追加し（同時に届いても取りこぼさない）、未読数は
+NotificationCounter を F() で増減する。フォロワー全員への通知などは notify_many で一括 INSERT する。
+一覧は (created_at, id) のキーセットカーソルで読む。
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from submissions import cursors
+from .models import Notification, NotificationCounter
+
+NOTIFICATIONS = cursors.Keyset('notifications', (
+    cursors.KeyField('created_at', lambda n: n.created_at, is_datetime=True),
+    cursors.KeyField('id', lambda n: n.id),
+))
+
+
+def notify(recipient, type, message='', **data):
+    """1件の通知を作成する。"""
+    return notify_many([recipient], type, message, **data)[0]
+
+
+def notify_many(recipients, type, message='', **data):
+    """同じ内容の通知を複数ユーザーに一括作成し、未読数を加算する。"""
+    rows = [
+        Notification(recipient_id=getattr(r, 'pk', r), type=type, message=message, data=data)
+        for r in recipients
+    ]
+    if not rows:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(rows)
+        _add_unread(Counter(n.recipient_id for n in rows))
+    return created
+
+
+def _add_unread(counts):
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=uid) for uid in counts],
+        ignore_conflicts=True,
+    )
+    by_delta = {}
+    for uid, delta in counts.items():
+        by_delta.setdefault(delta, []).append(uid)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread_count=F('unread_count') + delta)
+
+
+def unread_count(user):
+    count = NotificationCounter.objects.filter(user_id=user.pk).values_list('unread_count', flat=True).first()
+    return max(count or 0, 0)
+
+
+def mark_all_read(user):
+    """未読をまとめて既読にする（未読の部分インデックスを使う1回の UPDATE）。既読にした件数を返す。"""
+    with transaction.atomic():
+        updated = Notification.objects.filter(recipient_id=user.pk, is_read=False).update(is_read=True)
+        NotificationCounter.objects.filter(user_id=user.pk).update(unread_count=0)
+    return updated
+
+
+def recount_unread(user):
+    """未読数を通知テーブルから数え直す（カウンタのズレの修復用）。"""
+    count = Notification.objects.filter(recipient_id=user.pk, is_read=False).count()
+    NotificationCounter.objects.update_or_create(user_id=user.pk, defaults={'unread_count': count})
+    return count
+
+
+def to_payload(notification):
+    """API 用の dict（旧 JSON 通知と同じ形: 追加情報のキー + type / message / read / createdAt）。"""
+    return {
+        **(notification.data or {}),
+        'id': str(notification.id),
+        'type': notification.type,
+        'message': notification.message,
+        'read': notification.is_read,
+        'createdAt': notification.created_at.isoformat(),
+    }
+
+
+def list_page(user, cursor=None, limit=20):
+    """新しい順に1ページ読む。(payload のリスト, next_cursor) を返す。不正なカーソルは cursors.InvalidCursor。"""
+    queryset = Notification.objects.filter(recipient_id=user.pk)
+    items, next_cursor = cursors.paginate(queryset, NOTIFICATIONS, cursor, limit)
+    return [to_payload(n) for n in items], next_cursor
@@ -0,0 +1,142 @@
+"""公開プロフィール（ProfileGetView）の閲覧者に依存しない部分のキャッシュ。
+
+キャッシュキーはユーザーごとのバージョン（profile_version:{user_id}）を含み、プロフィール編集・
+アバター変更・称号変更（User / UserMeta の保存）とカウンタの変化（投稿・リアクション・フォロー）で
+バージョンを差し替えて古いエントリを参照されなくする（古いエントリは TTL で消える）。
+閲覧者ごとの isFollowing / isFollower だけはリクエストごとに計算する。
+
+ヒット率と再構築時間は共有キャッシュのカウンタに積算し、`manage.py profile_cache_stats` で確認できる。
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_VERSION_KEY = 'profile_version:{user_id}'
+_PAYLOAD_KEY = 'profile_payload:{user_id}:{version}:{host}'
+_LOOKUP_KEY = 'profile_lookup:{anon_id}'
+_STATS_KEYS = {
+    'hits': 'profile_cache:hits',
+    'misses': 'profile_cache:misses',
+    'rebuilds': 'profile_cache:rebuilds',
+    'rebuild_ms': 'profile_cache:rebuild_ms',
+}
+
+
+def ttl():
+    return getattr(settings, 'PROFILE_CACHE_TTL', 600)
+
+
+# ---------------------------------------------------------------------------
+# 無効化
+# ---------------------------------------------------------------------------
+
+def bump(user_id):
+    """ユーザーのバージョンを差し替え、キャッシュ済みのプロフィールを無効にする。"""
+    try:
+        cache.set(_VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f'[ProfileCache] version bump failed for user {user_id}: {e}')
+
+
+def bump_on_commit(user_id):
+    """コミット後にバージョンを差し替える（コミット前の状態で作り直されてキャッシュされるのを防ぐ）。"""
+    if user_id is not None:
+        transaction.on_commit(lambda: bump(user_id))
+
+
+def _version(user_id):
+    key = _VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+# ---------------------------------------------------------------------------
+# 参照
+# ---------------------------------------------------------------------------
+
+def cached_user_id(anon_id):
+    """anonId（display_id / studysphere_login_code）→ user_id のキャッシュ。無ければ None。"""
+    try:
+        return cache.get(_LOOKUP_KEY.format(anon_id=anon_id))
+    except Exception:
+        return None
+
+
+def remember_user_id(anon_id, user_id):
+    try:
+        cache.set(_LOOKUP_KEY.format(anon_id=anon_id), user_id, ttl())
+    except Exception:
+        pass
+
+
+def forget_user_id(anon_id):
+    try:
+        cache.delete(_LOOKUP_KEY.format(anon_id=anon_id))
+    except Exception:
+        pass
+
+
+def get_payload(user_id, request, build):
+    """キャッシュ済みのプロフィールを返す。無ければ build() で作ってキャッシュする。
+
+    build は (payload, ttl_seconds または None) を返す。payload が None なら（ユーザー不在など）キャッシュしない。
+    """
+    try:
+        key = _PAYLOAD_KEY.format(user_id=user_id, version=_version(user_id), host=request.get_host())
+        payload = cache.get(key)
+    except Exception as e:
+        logger.warning(f'[ProfileCache] lookup failed for user {user_id}: {e}')
+        key, payload = None, None
+    if payload is not None:
+        _record('hits')
+        return payload
+
+    _record('misses')
+    started = time.perf_counter()
+    payload, payload_ttl = build()
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    _record('rebuilds')
+    _record('rebuild_ms', elapsed_ms)
+    if payload is not None and key is not None:
+        try:
+            cache.set(key, payload, payload_ttl or ttl())
+        except Exception as e:
+            logger.warning(f'[ProfileCache] store failed for user {user_id}: {e}')
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# メトリクス
+# ---------------------------------------------------------------------------
+
+def _record(name, amount=1):
+    key = _STATS_KEYS[name]
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key, amount)
+    except Exception:
+        # DummyCache 等では集計しない
+        pass
+
+
+def stats():
+    """{'hits', 'misses', 'rebuilds', 'rebuild_ms', 'hit_rate', 'avg_rebuild_ms'} を返す。"""
+    values = cache.get_many(list(_STATS_KEYS.values()))
+    result = {name: int(values.get(key) or 0) for name, key in _STATS_KEYS.items()}
+    lookups = result['hits'] + result['misses']
+    result['hit_rate'] = result['hits'] / lookups if lookups else 0.0
+    result['avg_rebuild_ms'] = result['rebuild_ms'] / result['rebuilds'] if result['rebuilds'] else 0.0
+    return result
+
+
+def reset_stats():
+    cache.delete_many(list(_STATS_KEYS.values()))
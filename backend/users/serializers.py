@@ -114,7 +114,8 @@ class UserSerializer(serializers.ModelSerializer):
         avatar_url = self.get_avatar_url(obj)
         if avatar_url:
             from toybox.image_optimizer import get_thumbnail_url
-            thumbnail_url = get_thumbnail_url(avatar_url, max_size=300, quality=80)
+            request = self.context.get('request')
+            thumbnail_url = get_thumbnail_url(avatar_url, max_size=300, quality=80, request=request)
             if thumbnail_url and thumbnail_url != avatar_url:
                 return thumbnail_url
         return None
@@ -179,7 +180,7 @@ class UserMetaSerializer(serializers.ModelSerializer):
             
             # サムネイルURLを取得
             if avatar_url:
-                avatar_thumbnail_url = get_thumbnail_url(avatar_url, max_size=300, quality=80)
+                avatar_thumbnail_url = get_thumbnail_url(avatar_url, max_size=300, quality=80, request=request)
                 if avatar_thumbnail_url == avatar_url:
                     avatar_thumbnail_url = None
         
@@ -217,11 +218,11 @@ class UserMetaSerializer(serializers.ModelSerializer):
         
         if active_title:
             try:
-                from gamification.models import Title
+                from gamification.title_registry import get_entry
                 from toybox.image_utils import get_title_image_url
-                title_obj = Title.objects.filter(name=active_title).first()
-                if title_obj:
-                    data['active_title_image_url'] = get_title_image_url(title_obj, request)
+                title_entry = get_entry(active_title)
+                if title_entry:
+                    data['active_title_image_url'] = get_title_image_url(title_entry.title, request)
                     logger.info(f'[UserMetaSerializer] User {user.id} - Found title object for "{active_title}", image_url: {data["active_title_image_url"]}')
                 else:
                     data['active_title_image_url'] = None
@@ -233,10 +234,10 @@ class UserMetaSerializer(serializers.ModelSerializer):
             data['active_title_image_url'] = None
             logger.info(f'[UserMetaSerializer] User {user.id} - No active_title')
 
-        from users.models import UserFollow
-        uu = instance.user
-        data['follower_count'] = UserFollow.objects.filter(following=uu).count()
-        data['following_count'] = UserFollow.objects.filter(follower=uu).count()
+        from users.counters import get_counters
+        counters = get_counters(instance.user)
+        data['follower_count'] = counters.followers_count
+        data['following_count'] = counters.following_count
         data['app_version'] = '2.24'
         data['earned_titles'] = list(instance.earned_titles or [])
         from gamification.services import get_title_color
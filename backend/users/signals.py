@@ -0,0 +1,48 @@
+"""
+Users app signals: invalidate the cached public profile and the cached
+authentication principal when the user or its meta row changes, and keep
+the follow counters and follower timelines in sync with UserFollow.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User, UserFollow, UserMeta
+from . import counters, profile_cache
+from submissions import timelines
+from toybox.authentication import principals
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """アバター・display_id 等の変更でプロフィールのキャッシュを無効にする（ログイン時刻の更新は除く）。"""
+    if raw or created:
+        return
+    # ロール・凍結・BAN・無効化を含む変更は認証キャッシュにも即時反映する
+    principals.invalidate_on_commit(instance.pk)
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    profile_cache.bump_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    principals.invalidate_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=UserMeta)
+def meta_changed(sender, instance, raw=False, **kwargs):
+    """プロフィール編集・ヘッダー画像・称号の変更でプロフィールのキャッシュを無効にする。"""
+    if not raw:
+        profile_cache.bump_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=UserFollow)
+def follow_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.record_follow(instance.follower_id, instance.following_id, 1)
+        timelines.enqueue_follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=UserFollow)
+def follow_removed(sender, instance, **kwargs):
+    counters.record_follow(instance.follower_id, instance.following_id, -1)
+    timelines.enqueue_follow(instance.follower_id, instance.following_id)
@@ -0,0 +1,281 @@
+"""おすすめユーザー（RecommendedUsersView）用の類似クリエイターの事前計算。
+
+直近 SIMILAR_USERS_WINDOW_DAYS 日の公開中の投稿から、ユーザー × 特徴（ハッシュタグ・使用生成AI）の
+疎行列を作り、TF-IDF（tf = 1 + log(その特徴の投稿数)）を行ごとに L2 正規化してコサイン類似度を求める。
+
+- 候補は出現ユーザー数が SIMILAR_USERS_MAX_DF 以下のハッシュタグを共有するユーザーに限る
+  （多くのユーザーが使うタグや生成AIで行列積が密にならないようにする）。候補の類似度は全特徴で計算する。
+- 行列積は SIMILAR_USERS_CHUNK 行ずつ行い、各ユーザーの上位 SIMILAR_USERS_TOP_K 人を UserSimilarity に
+  保存する。フォロー済みユーザーの除外は表示時に行う。
+
+NumPy / SciPy はこのジョブでのみ使う（無い環境では作り直しをスキップし、既存の表をそのまま使う）。
+`manage.py build_user_similarity --benchmark 100000` で合成データでの実行時間とメモリを計測できる。
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import UserSimilarity
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from scipy import sparse
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning('NumPy/SciPy is not available. The user similarity index will not be rebuilt.')
+
+TAG = 'tag'
+AI_TOOL = 'ai'
+# おすすめ理由に表示する共通ハッシュタグの数
+SHARED_TAGS = 3
+
+
+def top_k():
+    return getattr(settings, 'SIMILAR_USERS_TOP_K', 30)
+
+
+def window_days():
+    return getattr(settings, 'SIMILAR_USERS_WINDOW_DAYS', 90)
+
+
+def max_df():
+    return getattr(settings, 'SIMILAR_USERS_MAX_DF', 2000)
+
+
+def chunk_size():
+    return getattr(settings, 'SIMILAR_USERS_CHUNK', 2000)
+
+
+@dataclass
+class Vectors:
+    """ユーザーごとの TF-IDF ベクトル（matrix の i 行目が user_ids[i]、j 列目が features[j]）。"""
+    user_ids: 'np.ndarray'
+    features: list
+    matrix: 'sparse.csr_matrix'
+    df: 'np.ndarray'
+
+
+# ---------------------------------------------------------------------------
+# 特徴量
+# ---------------------------------------------------------------------------
+
+def load_features(since):
+    """公開中の投稿から (author_id, (種類, 名前), 投稿数) を返す。"""
+    from submissions.models import Submission, SubmissionHashtag
+
+    tags = (
+        SubmissionHashtag.objects.filter(created_at__gte=since)
+        .values_list('submission__author_id', 'tag_lower')
+        .annotate(cnt=Count('id'))
+        .order_by()
+    )
+    for author_id, tag, cnt in tags.iterator(chunk_size=10000):
+        yield author_id, (TAG, tag), cnt
+    tools = (
+        Submission.objects.filter(deleted_at__isnull=True, created_at__gte=since)
+        .exclude(ai_tool='')
+        .values_list('author_id', 'ai_tool')
+        .annotate(cnt=Count('id'))
+        .order_by()
+    )
+    for author_id, tool, cnt in tools.iterator(chunk_size=10000):
+        yield author_id, (AI_TOOL, tool), cnt
+
+
+def build_vectors(rows):
+    """(user_id, 特徴, 投稿数) の行から行ごとに L2 正規化した TF-IDF 行列を作る。"""
+    user_index = {}
+    feature_index = {}
+    r, c, v = [], [], []
+    for user_id, feature, cnt in rows:
+        r.append(user_index.setdefault(user_id, len(user_index)))
+        c.append(feature_index.setdefault(feature, len(feature_index)))
+        v.append(cnt)
+    n_users, n_features = len(user_index), len(feature_index)
+    r = np.asarray(r, dtype=np.int32)
+    c = np.asarray(c, dtype=np.int32)
+    tf = 1.0 + np.log(np.maximum(np.asarray(v, dtype=np.float32), 1.0))
+    del v
+
+    df = np.bincount(c, minlength=n_features)
+    idf = (np.log((1.0 + n_users) / (1.0 + df)) + 1.0).astype(np.float32)
+    matrix = sparse.csr_matrix((tf * idf[c], (r, c)), shape=(n_users, n_features), dtype=np.float32)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=np.float32).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix, dtype=np.float32)
+
+    user_ids = np.fromiter(user_index.keys(), dtype=np.int64, count=n_users)
+    return Vectors(user_ids=user_ids, features=list(feature_index.keys()), matrix=matrix, df=df)
+
+
+# ---------------------------------------------------------------------------
+# 類似度
+# ---------------------------------------------------------------------------
+
+def _top_k_by_group(groups, values, k, tiebreak=None):
+    """groups ごとに values の大きい順で k 件までの位置を返す（groups 昇順・values 降順に並ぶ）。"""
+    keys = (values * -1,) if tiebreak is None else (tiebreak, values * -1)
+    order = np.lexsort(keys + (groups,))
+    g = groups[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]]) if len(g) else np.zeros(0, dtype=np.int64)
+    first = np.repeat(starts, np.diff(np.r_[starts, len(g)]))
+    rank = np.arange(len(g)) - first
+    keep = rank < k
+    return order[keep], rank[keep]
+
+
+def _top_per_row(matrix, row_offset, k):
+    """CSR の各行で値の大きい k 列を選ぶ（行ごとの argpartition なので非ゼロ要素数に比例）。(行, 列) を返す。"""
+    rows, cols = [], []
+    indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+    for r in range(matrix.shape[0]):
+        lo, hi = indptr[r], indptr[r + 1]
+        if hi - lo > k:
+            top = lo + np.argpartition(-data[lo:hi], k - 1)[:k]
+        else:
+            top = np.arange(lo, hi)
+        rows.append(np.full(len(top), row_offset + r, dtype=np.int64))
+        cols.append(indices[top])
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(cols).astype(np.int64)
+
+
+def top_similar(vectors, k=None, chunk=None):
+    """各ユーザーの類似度上位 k 人を chunk 行ずつ yield する。
+
+    yield するのは (行の範囲 range, 行, 相手の行, 順位, 類似度, 共通ハッシュタグの列リスト) の組。
+    """
+    k = k or top_k()
+    chunk = chunk or chunk_size()
+    matrix = vectors.matrix
+    is_tag = np.fromiter((kind == TAG for kind, _ in vectors.features), dtype=bool, count=len(vectors.features))
+    candidate_cols = np.flatnonzero(is_tag & (vectors.df >= 2) & (vectors.df <= max_df()))
+    candidates = matrix[:, candidate_cols].tocsr()
+    candidates_t = candidates.T.tocsr()
+
+    n_users = matrix.shape[0]
+    for start in range(0, n_users, chunk):
+        stop = min(start + chunk, n_users)
+        # 候補: 出現ユーザー数の少ないハッシュタグでの部分的な類似度の上位 2k 人
+        partial = (candidates[start:stop] @ candidates_t).tocsr()
+        # 自分自身を除く
+        partial.data[partial.indices == np.repeat(np.arange(start, stop), np.diff(partial.indptr))] = 0
+        partial.eliminate_zeros()
+        rows, cols = _top_per_row(partial, start, 2 * k)
+        del partial
+
+        # 候補の類似度を全特徴で計算し、上位 k 人に絞る
+        contrib = matrix[rows].multiply(matrix[cols]).tocsr()
+        scores = np.asarray(contrib.sum(axis=1)).ravel()
+        picked, ranks = _top_k_by_group(rows, scores, k, tiebreak=cols)
+        contrib = contrib[picked]
+
+        # 寄与の大きい共通ハッシュタグ
+        pair_of_nnz = np.repeat(np.arange(len(picked)), np.diff(contrib.indptr))
+        tag_nnz = is_tag[contrib.indices]
+        positions, _ = _top_k_by_group(pair_of_nnz[tag_nnz], contrib.data[tag_nnz], SHARED_TAGS)
+        shared = [[] for _ in range(len(picked))]
+        for pair, col in zip(pair_of_nnz[tag_nnz][positions].tolist(), contrib.indices[tag_nnz][positions].tolist()):
+            shared[pair].append(col)
+
+        yield range(start, stop), rows[picked], cols[picked], ranks, scores[picked], shared
+
+
+# ---------------------------------------------------------------------------
+# 作り直し
+# ---------------------------------------------------------------------------
+
+def build_index():
+    """類似ユーザー表を作り直す。{'users', 'features', 'pairs', 'seconds'} を返す（NumPy が無ければ None）。"""
+    if not NUMPY_AVAILABLE:
+        logger.warning('[UserSimilarity] NumPy/SciPy is not installed, skipping rebuild')
+        return None
+    started = time.perf_counter()
+    computed_at = timezone.now()
+    vectors = build_vectors(load_features(computed_at - timedelta(days=window_days())))
+    user_ids = vectors.user_ids.tolist()
+    names = [name for _, name in vectors.features]
+
+    pairs = 0
+    for row_range, rows, cols, ranks, scores, shared in top_similar(vectors):
+        objs = [
+            UserSimilarity(
+                user_id=user_ids[i],
+                similar_user_id=user_ids[j],
+                rank=rank + 1,
+                score=round(score, 6),
+                shared_tags=[names[col] for col in tags],
+                computed_at=computed_at,
+            )
+            for i, j, rank, score, tags in zip(rows.tolist(), cols.tolist(), ranks.tolist(), scores.tolist(), shared)
+        ]
+        with transaction.atomic():
+            UserSimilarity.objects.filter(user_id__in=user_ids[row_range.start:row_range.stop]).delete()
+            UserSimilarity.objects.bulk_create(objs, batch_size=2000)
+        pairs += len(objs)
+    # 期間内に投稿の無くなったユーザーの古い行
+    UserSimilarity.objects.filter(computed_at__lt=computed_at).delete()
+
+    result = {
+        'users': len(user_ids),
+        'features': len(names),
+        'pairs': pairs,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info('[UserSimilarity] rebuilt: %s', result)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# ベンチマーク
+# ---------------------------------------------------------------------------
+
+def synthetic_rows(n_users, n_tags=50000, tags_per_user=12, seed=0):
+    """Zipf 分布のハッシュタグと生成AIを持つ合成ユーザーの (user_id, 特徴, 投稿数) 行。"""
+    rng = np.random.default_rng(seed)
+    tools = ['chatgpt', 'gemini', 'claude', 'midjourney', 'stable_diffusion', 'dalle', 'copilot', 'other']
+    for user_id in range(1, n_users + 1):
+        tags = np.unique(np.minimum(rng.zipf(1.3, size=rng.poisson(tags_per_user) + 1), n_tags))
+        counts = rng.integers(1, 6, size=len(tags))
+        for tag, cnt in zip(tags.tolist(), counts.tolist()):
+            yield user_id, (TAG, f'tag{tag}'), cnt
+        if rng.random() < 0.7:
+            yield user_id, (AI_TOOL, tools[int(rng.integers(len(tools)))]), int(rng.integers(1, 10))
+
+
+def _peak_rss_mb():
+    """プロセスの最大 RSS（MB）。resource モジュールの無い環境（Windows）では None。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux の ru_maxrss は KB 単位
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def benchmark(n_users, **kwargs):
+    """合成データで計算部分（DB への保存を除く）の実行時間とプロセスのピークメモリ（最大 RSS）を測る。"""
+    started = time.perf_counter()
+    vectors = build_vectors(synthetic_rows(n_users, **kwargs))
+    built = time.perf_counter()
+    pairs = sum(len(rows) for _, rows, *_ in top_similar(vectors))
+    finished = time.perf_counter()
+    return {
+        'users': n_users,
+        'features': len(vectors.features),
+        'nnz': int(vectors.matrix.nnz),
+        'pairs': pairs,
+        'vectorize_seconds': round(built - started, 2),
+        'similarity_seconds': round(finished - built, 2),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
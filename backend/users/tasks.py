@@ -0,0 +1,16 @@
+"""Users app Celery tasks."""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def build_user_similarity_hourly():
+    """1時間ごとにおすすめユーザー用の類似クリエイター表を作り直す。"""
+    from users.similarity import build_index
+
+    result = build_index()
+    logger.info('build_user_similarity_hourly: %s', result)
+    return result
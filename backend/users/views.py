@@ -17,8 +17,14 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from django.conf import settings
+from django.db import transaction
 from .serializers import UserMetaSerializer, CustomTokenObtainPairSerializer, RegisterSerializer, UserSerializer
-from .models import UserMeta, UserCard, UserRegistration, UserFollow
+from .models import UserMeta, UserCard, UserRegistration, UserFollow, Notification
+from . import notifications as user_notifications
+from . import counters as user_counters
+from . import profile_cache
+from toybox.authentication import request_meta
+from submissions.cursors import InvalidCursor
 from django.contrib.auth import get_user_model
 from .discord_oauth import (
     get_discord_oauth_url,
@@ -57,7 +63,7 @@ class FollowToggleView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, anon_id):
-        from gamification.services import award_points
+        from gamification.services import award_points_once, dedupe_key
         from gamification.models import PointHistory
 
         target = _resolve_user_by_anon_id(anon_id, request)
@@ -69,53 +75,44 @@ class FollowToggleView(APIView):
         follower_awarded = False
         followed_awarded = False
         if link:
-            link.delete()
+            with transaction.atomic():
+                link.delete()
             following = False
         else:
-            _, created = UserFollow.objects.get_or_create(follower=request.user, following=target)
+            # フォロー行とカウンタ（UserCounters）の加算を同じトランザクションで
+            with transaction.atomic():
+                _, created = UserFollow.objects.get_or_create(follower=request.user, following=target)
             following = True
             if created:
-                # フォロワー: 10TP（一度だけ）
-                already_given = PointHistory.objects.filter(
-                    user=request.user,
-                    action_type=PointHistory.ActionType.FOLLOW_GIVEN,
-                    description__contains=f'user:{target.id}',
-                ).exists()
-                if not already_given:
-                    award_points(request.user, PointHistory.ActionType.FOLLOW_GIVEN, 10, f'フォローした user:{target.id}')
-                    follower_awarded = True
-                # フォローされた側: 10TP（一度だけ）
-                already_received = PointHistory.objects.filter(
-                    user=target,
-                    action_type=PointHistory.ActionType.FOLLOW_RECEIVED,
-                    description__contains=f'by:{request.user.id}',
-                ).exists()
-                if not already_received:
-                    award_points(target, PointHistory.ActionType.FOLLOW_RECEIVED, 10, f'フォローされた by:{request.user.id}')
-                    followed_awarded = True
+                # フォロワー: 10TP（相手ごとに一度だけ）
+                follower_awarded = award_points_once(
+                    request.user,
+                    dedupe_key(PointHistory.ActionType.FOLLOW_GIVEN, request.user.id, target.id),
+                    PointHistory.ActionType.FOLLOW_GIVEN,
+                    10,
+                    f'フォローした user:{target.id}',
+                ) is not None
+                # フォローされた側: 10TP（相手ごとに一度だけ）
+                followed_awarded = award_points_once(
+                    target,
+                    dedupe_key(PointHistory.ActionType.FOLLOW_RECEIVED, target.id, request.user.id),
+                    PointHistory.ActionType.FOLLOW_RECEIVED,
+                    10,
+                    f'フォローされた by:{request.user.id}',
+                ) is not None
                 try:
-                    target_meta, _ = UserMeta.objects.get_or_create(user=target)
-                    actor_meta, _ = UserMeta.objects.get_or_create(user=request.user)
+                    actor_meta = request_meta(request)
                     actor_name = actor_meta.display_name or request.user.display_id
-                    notifications = list(target_meta.notifications or [])
-                    notifications.append(
-                        {
-                            'type': 'follow',
-                            'fromAnonId': request.user.display_id,
-                            'fromDisplayName': actor_name,
-                            'message': f'{actor_name} さんがあなたをフォローしました',
-                            'read': False,
-                            'createdAt': str(timezone.now().isoformat()),
-                        }
+                    user_notifications.notify(
+                        target,
+                        Notification.Type.FOLLOW,
+                        f'{actor_name} さんがあなたをフォローしました',
+                        fromAnonId=request.user.display_id,
+                        fromDisplayName=actor_name,
                     )
-                    if len(notifications) > 50:
-                        notifications = notifications[-50:]
-                    target_meta.notifications = notifications
-                    target_meta.save(update_fields=['notifications'])
                 except Exception as e:
                     logger.warning('Follow notification failed: %s', e, exc_info=True)
-        followers_count = UserFollow.objects.filter(following=target).count()
-        following_count = UserFollow.objects.filter(follower=target).count()
+        target_counters = user_counters.get_counters(target)
         mutual = False
         if following:
             mutual = UserFollow.objects.filter(follower=target, following=request.user).exists()
@@ -123,62 +120,41 @@ class FollowToggleView(APIView):
             'ok': True,
             'following': following,
             'mutualFollow': mutual,
-            'targetFollowersCount': followers_count,
-            'targetFollowingCount': following_count,
+            'targetFollowersCount': target_counters.followers_count,
+            'targetFollowingCount': target_counters.following_count,
             'followerAwarded': follower_awarded,
             'followedAwarded': followed_awarded,
         })
 
 
 class RecommendedUsersView(APIView):
-    """自分の直近投稿のハッシュタグと重なるユーザーを最大12件（フォロー済み・自分は除外）。"""
+    """ハッシュタグ・使用生成AIの傾向が近いユーザーを最大12件（フォロー済み・自分は除外）。
+
+    類似度は users.similarity が毎時事前計算した UserSimilarity を使う（1クエリで相手のユーザー情報まで取得）。
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from collections import defaultdict
-        from submissions.models import Submission
+        from toybox.image_utils import get_image_url
+        from .models import UserSimilarity
 
         user = request.user
-        my_tags = set()
-        recent = Submission.objects.filter(author=user, deleted_at__isnull=True).order_by('-created_at')[:40]
-        for sub in recent:
-            for t in (sub.hashtags or []):
-                if isinstance(t, str) and t.strip():
-                    my_tags.add(t.strip().lower())
-        excluded_ids = {user.id}
-        excluded_ids.update(
-            UserFollow.objects.filter(follower=user).values_list('following_id', flat=True)
+        followed = UserFollow.objects.filter(follower=user).values('following_id')
+        rows = (
+            UserSimilarity.objects.filter(user=user)
+            .exclude(similar_user_id__in=followed)
+            .select_related('similar_user', 'similar_user__meta')
+            .order_by('rank')[:12]
         )
-        scores = defaultdict(int)
-        tag_hit = defaultdict(set)
-        since = timezone.now() - timedelta(days=90)
-        for sub in (
-            Submission.objects.filter(deleted_at__isnull=True, created_at__gte=since)
-            .exclude(author_id__in=excluded_ids)
-            .select_related('author', 'author__meta')
-            .only('id', 'author_id', 'hashtags')[:2500]
-        ):
-            for t in (sub.hashtags or []):
-                if not isinstance(t, str) or not t.strip():
-                    continue
-                tl = t.strip().lower()
-                if tl in my_tags:
-                    scores[sub.author_id] += 1
-                    tag_hit[sub.author_id].add(tl)
-        ranked = sorted(scores.items(), key=lambda x: -x[1])[:12]
         out = []
-        for uid, sc in ranked:
-            try:
-                u = User.objects.select_related('meta').get(id=uid)
-            except User.DoesNotExist:
-                continue
+        for row in rows:
+            u = row.similar_user
             meta = getattr(u, 'meta', None)
             anon_id = 'StudySphereUser' if (u.studysphere_user_id or u.studysphere_login_code) else u.display_id
             display_name = (meta.display_name if meta and meta.display_name else None) or anon_id
             url_id = u.studysphere_login_code if (u.studysphere_user_id or u.studysphere_login_code) else anon_id
-            sample_tags = list(tag_hit.get(uid, set()))[:3]
+            sample_tags = (row.shared_tags or [])[:3]
             reason = '共通のハッシュタグ: ' + ', '.join('#' + x for x in sample_tags) if sample_tags else 'おすすめユーザー'
-            from toybox.image_utils import get_image_url
             av = None
             if u.avatar_url:
                 av = get_image_url(image_url_field=u.avatar_url, request=request, verify_exists=False)
@@ -386,7 +362,7 @@ class UserMetaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user's metadata."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         
         # Check title expiration
         if meta.expires_at and meta.expires_at < timezone.now():
@@ -400,7 +376,7 @@ class UserMetaViewSet(viewsets.ModelViewSet):
     
     def list(self, request):
         """Override list to return single user's meta (for GET /api/users/me/meta/)."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         
         # Check title expiration
         if meta.expires_at and meta.expires_at < timezone.now():
@@ -415,7 +391,7 @@ class UserMetaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['patch', 'put'], url_name='update')
     def update_meta(self, request):
         """Update current user's meta (for PATCH/PUT /api/users/me/meta/update_meta/)."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         
         partial = request.method == 'PATCH'
         serializer = self.get_serializer(meta, data=request.data, partial=partial)
@@ -426,7 +402,7 @@ class UserMetaViewSet(viewsets.ModelViewSet):
     
     def partial_update(self, request, pk=None):
         """Override partial_update to update current user's meta (for PATCH /api/users/me/meta/{pk}/)."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         
         serializer = self.get_serializer(meta, data=request.data, partial=True)
         if serializer.is_valid():
@@ -436,7 +412,7 @@ class UserMetaViewSet(viewsets.ModelViewSet):
     
     def update(self, request, pk=None):
         """Override update to update current user's meta (for PUT /api/users/me/meta/{pk}/)."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         
         serializer = self.get_serializer(meta, data=request.data)
         if serializer.is_valid():
@@ -501,11 +477,11 @@ class ProfileResetView(APIView):
                     logger.warning(f'Failed to delete avatar file: {e}')
             
             request.user.avatar_url = None
-            request.user.save()
+            request.user.save(update_fields=['avatar_url', 'updated_at'])
             return Response({'ok': True, 'message': 'アバターをデフォルトに戻しました', 'avatarUrl': None})
         else:  # header
             # ヘッダーをデフォルトに戻す（Noneに設定）
-            meta, _ = UserMeta.objects.get_or_create(user=request.user)
+            meta = request_meta(request)
             if meta.header_url:
                 # ファイルを削除（オプション）
                 try:
@@ -559,11 +535,11 @@ class ProfileUploadView(APIView):
                         logger.warning(f'Failed to delete avatar file: {e}')
                 
                 request.user.avatar_url = None
-                request.user.save()
+                request.user.save(update_fields=['avatar_url', 'updated_at'])
                 return Response({'ok': True, 'message': 'アバターをデフォルトに戻しました', 'avatarUrl': None})
             else:  # header
                 # ヘッダーをデフォルトに戻す（Noneに設定）
-                meta, _ = UserMeta.objects.get_or_create(user=request.user)
+                meta = request_meta(request)
                 if meta.header_url:
                     # ファイルを削除（オプション）
                     try:
@@ -583,6 +559,7 @@ class ProfileUploadView(APIView):
                 return Response({'ok': True, 'message': 'ヘッダーをデフォルトに戻しました', 'headerUrl': None})
         
         # アップロード処理
+        from submissions import media_catalog
         file = request.FILES.get('file')
         
         if not file:
@@ -619,6 +596,7 @@ class ProfileUploadView(APIView):
             full_path = default_storage.path(filepath)
             if not os.path.exists(full_path):
                 return Response({'error': 'ファイルの保存に失敗しました'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            media_catalog.register(filepath)
             relative_url = f'/uploads/profiles/{filename}'
             if hasattr(request, 'build_absolute_uri'):
                 file_url = request.build_absolute_uri(relative_url)
@@ -626,10 +604,10 @@ class ProfileUploadView(APIView):
                 file_url = f"{request.scheme}://{request.get_host()}{relative_url}"
             if upload_type == 'avatar':
                 request.user.avatar_url = file_url
-                request.user.save()
+                request.user.save(update_fields=['avatar_url', 'updated_at'])
                 return Response({'ok': True, 'avatarUrl': file_url, 'avatarThumbnailUrl': None, 'isGif': True})
             else:
-                meta, _ = UserMeta.objects.get_or_create(user=request.user)
+                meta = request_meta(request)
                 meta.header_url = file_url
                 meta.save()
                 return Response({'ok': True, 'headerUrl': file_url, 'isGif': True})
@@ -662,6 +640,8 @@ class ProfileUploadView(APIView):
             logger.error(f'File was not saved correctly: {full_path}')
             return Response({'error': 'ファイルの保存に失敗しました'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+        media_catalog.register(filepath)
+        
         # アバターの場合のみサムネイルを生成（ヘッダーはサムネイル不要）
         thumbnail_filename = None
         if upload_type == 'avatar':
@@ -671,6 +651,7 @@ class ProfileUploadView(APIView):
                 if thumbnail_data:
                     thumbnail_filename = f'{upload_type}_{request.user.id}_{uuid.uuid4().hex[:8]}_thumb.jpg'
                     thumbnail_filepath = default_storage.save(f'profiles/{thumbnail_filename}', ContentFile(thumbnail_data.read()))
+                    media_catalog.register(thumbnail_filepath)
                     logger.info(f'Generated thumbnail: {thumbnail_filepath}')
             except Exception as e:
                 import logging
@@ -696,14 +677,14 @@ class ProfileUploadView(APIView):
         # Update user or meta
         if upload_type == 'avatar':
             request.user.avatar_url = file_url
-            request.user.save()
+            request.user.save(update_fields=['avatar_url', 'updated_at'])
             return Response({
                 'ok': True,
                 'avatarUrl': request.user.avatar_url,
                 'avatarThumbnailUrl': thumbnail_url
             })
         else:  # header
-            meta, _ = UserMeta.objects.get_or_create(user=request.user)
+            meta = request_meta(request)
             meta.header_url = file_url
             meta.save()
             return Response({
@@ -735,11 +716,11 @@ class ProfileUploadView(APIView):
                         logger.warning(f'Failed to delete avatar file: {e}')
                 
                 request.user.avatar_url = None
-                request.user.save()
+                request.user.save(update_fields=['avatar_url', 'updated_at'])
                 return Response({'ok': True, 'message': 'アバターをデフォルトに戻しました', 'avatarUrl': None})
             else:  # header
                 # ヘッダーをデフォルトに戻す（Noneに設定）
-                meta, _ = UserMeta.objects.get_or_create(user=request.user)
+                meta = request_meta(request)
                 if meta.header_url:
                     # ファイルを削除（オプション）
                     try:
@@ -768,30 +749,17 @@ class ProfileUploadView(APIView):
 
 
 class ProfileGetView(APIView):
-    """Get public profile by anonId."""
+    """Get public profile by anonId.
+
+    閲覧者に依存しない部分は users.profile_cache にキャッシュし、isFollowing / isFollower だけ毎回計算する。
+    """
     permission_classes = []  # Allow unauthenticated access
     
     def get(self, request, anon_id):
         """Get public profile."""
         try:
-            # StudySphere経由のユーザーの場合、「StudySphereUser」が渡される可能性がある
-            # その場合は認証済みユーザーのプロフィールを返す
-            if anon_id == 'StudySphereUser' and request.user.is_authenticated:
-                user = request.user
-            else:
-                # Find user by display_id or studysphere_login_code
-                # StudySphereユーザーの場合はトークン（studysphere_login_code）で検索
-                user = None
-                try:
-                    user = User.objects.get(display_id=anon_id)
-                except User.DoesNotExist:
-                    # display_idで見つからない場合、studysphere_login_codeで検索
-                    try:
-                        user = User.objects.get(studysphere_login_code=anon_id)
-                    except User.DoesNotExist:
-                        pass
-            
-            if not user:
+            user_id = self._resolve_user_id(request, anon_id)
+            if user_id is None:
                 # Return empty profile if user not found
                 return Response({
                     'anonId': anon_id,
@@ -809,171 +777,188 @@ class ProfileGetView(APIView):
                 'error': 'プロフィールの取得に失敗しました',
                 'anonId': anon_id
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except Exception as e:
-            logger.error(f'[ProfileGetView] Error finding user {anon_id}: {e}', exc_info=True)
-            return Response({
-                'error': 'プロフィールの取得に失敗しました',
-                'anonId': anon_id
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
         try:
-            # Get or create UserMeta
-            meta, _ = UserMeta.objects.get_or_create(user=user)
-            
-            # Check title expiration
-            active_title = meta.active_title
-            active_title_until = meta.expires_at
-            if active_title and active_title_until:
-                if active_title_until <= timezone.now():
-                    # Title expired, clear it in database
-                    meta.active_title = None
-                    meta.title_color = None
-                    meta.expires_at = None
-                    meta.save(update_fields=['active_title', 'title_color', 'expires_at'])
-                    active_title = None
-                    active_title_until = None
-            
-            # Log title data for debugging (especially for StudySphere users)
-            profile_logger = logging.getLogger(__name__)
-            profile_logger.info(f'[ProfileGetView] User {user.id} (StudySphere: {bool(user.studysphere_user_id or user.studysphere_login_code)}) - active_title: {active_title}, expires_at: {active_title_until}')
-            
-            # Get display_name from display_name field, fallback to bio, then display_id
-            # StudySphere経由のユーザーの場合、display_idの代わりに'StudySphereUser'を使用
-            fallback_id = 'StudySphereUser' if (user.studysphere_user_id or user.studysphere_login_code) else user.display_id
-            display_name = meta.display_name or meta.bio or fallback_id
-            
-            # anonIdもStudySphere経由のユーザーの場合は'StudySphereUser'に変更
-            anon_id = 'StudySphereUser' if (user.studysphere_user_id or user.studysphere_login_code) else user.display_id
-            
-            # アバターURLの取得（絶対URLに変換）
-            avatar_url = None
-            avatar_thumbnail_url = None
-            try:
-                from toybox.image_utils import get_image_url
-                from toybox.image_optimizer import get_thumbnail_url
-                profile_logger = logging.getLogger(__name__)
-                avatar_url_raw = user.avatar_url
-                profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} avatar_url from DB: {avatar_url_raw}')
-                if avatar_url_raw:
-                    avatar_url = get_image_url(
-                        image_url_field=avatar_url_raw,
-                        request=request,
-                        verify_exists=False  # 存在確認を行わない
-                    )
-                    profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} avatar_url after get_image_url: {avatar_url}')
-                    
-                    # サムネイルURLを取得
-                    if avatar_url:
-                        avatar_thumbnail_url = get_thumbnail_url(avatar_url, max_size=300, quality=80)
-                        if avatar_thumbnail_url == avatar_url:
-                            avatar_thumbnail_url = None
-            except Exception as e:
-                profile_logger = logging.getLogger(__name__)
-                profile_logger.error(f'[Profile Image Debug] ProfileGetView - Error getting avatar_url for user {user.id}: {e}', exc_info=True)
-                avatar_url = None
-                avatar_thumbnail_url = None
-            
-            # ヘッダーURLの取得（絶対URLに変換、サムネイルは生成しない）
-            header_url = None
-            try:
-                from toybox.image_utils import get_image_url
-                profile_logger = logging.getLogger(__name__)
-                header_url_raw = meta.header_url
-                profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} header_url from DB: {header_url_raw}')
-                if header_url_raw:
-                    header_url = get_image_url(
-                        image_url_field=header_url_raw,
-                        request=request,
-                        verify_exists=False  # 存在確認を行わない
-                    )
-                    profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} header_url after get_image_url: {header_url}')
-            except Exception as e:
-                profile_logger = logging.getLogger(__name__)
-                profile_logger.error(f'[Profile Image Debug] ProfileGetView - Error getting header_url for user {user.id}: {e}', exc_info=True)
-                header_url = None
-            
-            # 称号のバナー画像URLは v2.0 では常に None（SVGバッジをフロントで生成）
-            # 旧 image_url フィールドは廃止、ImageField に実ファイルがある場合のみ返す
-            active_title_image_url = None
-            
-            # もらったリアクション（全種）件数と TP 相当スコア合計
-            total_reactions = 0
-            total_reaction_score = 0
-            try:
-                from submissions.models import Reaction
-                from django.db.models import Sum, Case, When, Value, IntegerField
-                from gamification.services import REACTION_POINTS
-
-                total_reactions = Reaction.objects.filter(
-                    submission__author=user,
-                    submission__deleted_at__isnull=True,
-                ).count()
-                when_clauses = [When(type=k, then=Value(v)) for k, v in REACTION_POINTS.items()]
-                agg = Reaction.objects.filter(
-                    submission__author=user,
-                    submission__deleted_at__isnull=True,
-                ).aggregate(
-                    s=Sum(Case(*when_clauses, default=Value(0), output_field=IntegerField()))
-                )
-                total_reaction_score = int(agg['s'] or 0)
-            except Exception as e:
-                profile_logger = logging.getLogger(__name__)
-                profile_logger.warning(f'Failed to get reaction stats for user {user.id}: {e}')
+            payload = profile_cache.get_payload(user_id, request, lambda: self._build_payload(user_id, request))
+            if payload is None:
+                profile_cache.forget_user_id(anon_id)
+                return Response({'anonId': anon_id, 'displayName': None}, status=status.HTTP_404_NOT_FOUND)
+            if anon_id != 'StudySphereUser' and anon_id not in payload['lookupKeys']:
+                # display_id / ログインコードが変わった後の古い対応表
+                # （DB から引き直すので再帰は1回で終わる）
+                profile_cache.forget_user_id(anon_id)
+                return self.get(request, anon_id)
 
-            follower_count = UserFollow.objects.filter(following=user).count()
-            following_count = UserFollow.objects.filter(follower=user).count()
             is_following = False
             is_follower = False
             mutual_follow = False
-            if request.user.is_authenticated and request.user.id != user.id:
-                is_following = UserFollow.objects.filter(follower=request.user, following=user).exists()
-                is_follower = UserFollow.objects.filter(follower=user, following=request.user).exists()
+            if request.user.is_authenticated and request.user.id != user_id:
+                is_following = UserFollow.objects.filter(follower=request.user, following_id=user_id).exists()
+                is_follower = UserFollow.objects.filter(follower_id=user_id, following=request.user).exists()
                 mutual_follow = is_following and is_follower
 
-            is_official = 'TOYBOX!公式' in (meta.earned_titles or [])
-            from gamification.services import get_title_color
-            active_title_color = get_title_color(active_title) if active_title else None
-            response_data = {
-                'authorUserId': user.id,
-                'anonId': anon_id,
-                'displayName': display_name,
-                'avatarUrl': avatar_url,
-                'avatarThumbnailUrl': avatar_thumbnail_url,
-                'headerUrl': header_url,
-                'bio': meta.bio,
-                'activeTitle': active_title,
-                'activeTitleColor': active_title_color,
-                'activeTitleImageUrl': active_title_image_url,
-                'activeTitleUntil': active_title_until.isoformat() if active_title_until else None,
-                'earnedTitles': list(meta.earned_titles or []),
-                'isOfficial': is_official,
-                'isStudySphereLinked': bool(user.studysphere_login_code or user.studysphere_user_id),
-                'updatedAt': meta.updated_at.isoformat() if meta.updated_at else None,
-                'totalReactions': total_reactions,
-                'totalReactionScore': total_reaction_score,
-                'followerCount': follower_count,
-                'followingCount': following_count,
+            response_data = {k: v for k, v in payload.items() if k != 'lookupKeys'}
+            response_data.update({
                 'isFollowing': is_following,
                 'isFollower': is_follower,
                 'mutualFollow': mutual_follow,
-            }
-            
-            # Log response data for debugging (especially for StudySphere users)
-            profile_logger.info(f'[ProfileGetView] User {user.id} (StudySphere: {bool(user.studysphere_user_id or user.studysphere_login_code)}) - Response activeTitle: {response_data["activeTitle"]}, activeTitleImageUrl: {response_data["activeTitleImageUrl"]}')
-            
+            })
             return Response(response_data)
         except Exception as e:
             profile_logger = logging.getLogger(__name__)
-            profile_logger.error(f'[ProfileGetView] Error processing profile for user {user.id}: {e}', exc_info=True)
+            profile_logger.error(f'[ProfileGetView] Error processing profile for user {user_id}: {e}', exc_info=True)
             import traceback
             error_traceback = traceback.format_exc()
             profile_logger.error(f'[ProfileGetView] Traceback: {error_traceback}')
             return Response({
                 'error': 'プロフィールの取得に失敗しました',
-                'anonId': user.display_id if user else anon_id,
+                'anonId': anon_id,
                 'details': str(e) if settings.DEBUG else None
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _resolve_user_id(request, anon_id):
+        """anonId からユーザー ID を解決する（対応表はキャッシュ）。"""
+        # StudySphere経由のユーザーの場合、「StudySphereUser」が渡される可能性がある
+        # その場合は認証済みユーザーのプロフィールを返す
+        if anon_id == 'StudySphereUser' and request.user.is_authenticated:
+            return request.user.id
+        user_id = profile_cache.cached_user_id(anon_id)
+        if user_id is not None:
+            return user_id
+        # Find user by display_id or studysphere_login_code
+        # StudySphereユーザーの場合はトークン（studysphere_login_code）で検索
+        user_id = (
+            User.objects.filter(display_id=anon_id).values_list('id', flat=True).first()
+            or User.objects.filter(studysphere_login_code=anon_id).values_list('id', flat=True).first()
+        )
+        if user_id is not None:
+            profile_cache.remember_user_id(anon_id, user_id)
+        return user_id
+
+    def _build_payload(self, user_id, request):
+        """閲覧者に依存しないプロフィールを組み立てる。(payload, キャッシュ秒数) を返す。"""
+        user = User.objects.filter(id=user_id).first()
+        if user is None:
+            return None, None
+        cache_ttl = None
+        # Get or create UserMeta
+        meta, _ = UserMeta.objects.get_or_create(user=user)
+        
+        # Check title expiration
+        active_title = meta.active_title
+        active_title_until = meta.expires_at
+        if active_title and active_title_until:
+            if active_title_until <= timezone.now():
+                # Title expired, clear it in database
+                meta.active_title = None
+                meta.title_color = None
+                meta.expires_at = None
+                meta.save(update_fields=['active_title', 'title_color', 'expires_at'])
+                active_title = None
+                active_title_until = None
+        
+        # Log title data for debugging (especially for StudySphere users)
+        profile_logger = logging.getLogger(__name__)
+        profile_logger.info(f'[ProfileGetView] User {user.id} (StudySphere: {bool(user.studysphere_user_id or user.studysphere_login_code)}) - active_title: {active_title}, expires_at: {active_title_until}')
+        
+        # Get display_name from display_name field, fallback to bio, then display_id
+        # StudySphere経由のユーザーの場合、display_idの代わりに'StudySphereUser'を使用
+        fallback_id = 'StudySphereUser' if (user.studysphere_user_id or user.studysphere_login_code) else user.display_id
+        display_name = meta.display_name or meta.bio or fallback_id
+        
+        # anonIdもStudySphere経由のユーザーの場合は'StudySphereUser'に変更
+        anon_id = 'StudySphereUser' if (user.studysphere_user_id or user.studysphere_login_code) else user.display_id
+        
+        # アバターURLの取得（絶対URLに変換）
+        avatar_url = None
+        avatar_thumbnail_url = None
+        try:
+            from toybox.image_utils import get_image_url
+            from toybox.image_optimizer import get_thumbnail_url
+            profile_logger = logging.getLogger(__name__)
+            avatar_url_raw = user.avatar_url
+            profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} avatar_url from DB: {avatar_url_raw}')
+            if avatar_url_raw:
+                avatar_url = get_image_url(
+                    image_url_field=avatar_url_raw,
+                    request=request,
+                    verify_exists=False  # 存在確認を行わない
+                )
+                profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} avatar_url after get_image_url: {avatar_url}')
+                
+                # サムネイルURLを取得
+                if avatar_url:
+                    avatar_thumbnail_url = get_thumbnail_url(avatar_url, max_size=300, quality=80, request=request)
+                    if avatar_thumbnail_url == avatar_url:
+                        avatar_thumbnail_url = None
+        except Exception as e:
+            profile_logger = logging.getLogger(__name__)
+            profile_logger.error(f'[Profile Image Debug] ProfileGetView - Error getting avatar_url for user {user.id}: {e}', exc_info=True)
+            avatar_url = None
+            avatar_thumbnail_url = None
+        
+        # ヘッダーURLの取得（絶対URLに変換、サムネイルは生成しない）
+        header_url = None
+        try:
+            from toybox.image_utils import get_image_url
+            profile_logger = logging.getLogger(__name__)
+            header_url_raw = meta.header_url
+            profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} header_url from DB: {header_url_raw}')
+            if header_url_raw:
+                header_url = get_image_url(
+                    image_url_field=header_url_raw,
+                    request=request,
+                    verify_exists=False  # 存在確認を行わない
+                )
+                profile_logger.info(f'[Profile Image Debug] ProfileGetView - User {user.id} header_url after get_image_url: {header_url}')
+        except Exception as e:
+            profile_logger = logging.getLogger(__name__)
+            profile_logger.error(f'[Profile Image Debug] ProfileGetView - Error getting header_url for user {user.id}: {e}', exc_info=True)
+            header_url = None
+        
+        # 称号のバナー画像URLは v2.0 では常に None（SVGバッジをフロントで生成）
+        # 旧 image_url フィールドは廃止、ImageField に実ファイルがある場合のみ返す
+        active_title_image_url = None
+        
+        # フォロー数・投稿数・もらったリアクション（全種）件数と TP 相当スコア合計は非正規化カウンタから
+        counters = user_counters.get_counters(user)
+
+        is_official = 'TOYBOX!公式' in (meta.earned_titles or [])
+        from gamification.services import get_title_color
+        active_title_color = get_title_color(active_title) if active_title else None
+        if active_title_until:
+            # 称号の期限切れまでしかキャッシュしない
+            cache_ttl = max(1, min(profile_cache.ttl(), int((active_title_until - timezone.now()).total_seconds())))
+        payload = {
+            'authorUserId': user.id,
+            'anonId': anon_id,
+            'displayName': display_name,
+            'avatarUrl': avatar_url,
+            'avatarThumbnailUrl': avatar_thumbnail_url,
+            'headerUrl': header_url,
+            'bio': meta.bio,
+            'activeTitle': active_title,
+            'activeTitleColor': active_title_color,
+            'activeTitleImageUrl': active_title_image_url,
+            'activeTitleUntil': active_title_until.isoformat() if active_title_until else None,
+            'earnedTitles': list(meta.earned_titles or []),
+            'isOfficial': is_official,
+            'isStudySphereLinked': bool(user.studysphere_login_code or user.studysphere_user_id),
+            'updatedAt': meta.updated_at.isoformat() if meta.updated_at else None,
+            'totalReactions': counters.reactions_received,
+            'totalReactionScore': counters.reaction_score_received,
+            'followerCount': counters.followers_count,
+            'followingCount': counters.following_count,
+            'postCount': counters.posts_count,
+            # キャッシュ済みの対応表（anonId → user_id）が古くないかの確認用（レスポンスには含めない）
+            'lookupKeys': [k for k in (user.display_id, user.studysphere_login_code) if k],
+        }
+
+        # Log response data for debugging (especially for StudySphere users)
+        profile_logger.info(f'[ProfileGetView] User {user.id} (StudySphere: {bool(user.studysphere_user_id or user.studysphere_login_code)}) - Response activeTitle: {payload["activeTitle"]}, activeTitleImageUrl: {payload["activeTitleImageUrl"]}')
+        return payload, cache_ttl
+
 
 class SetActiveTitleView(APIView):
     """獲得済み称号の中から表示称号を変更する。"""
@@ -983,7 +968,7 @@ class SetActiveTitleView(APIView):
         title_name = request.data.get('title', '').strip()
         if not title_name:
             return Response({'error': '称号名が必要です'}, status=status.HTTP_400_BAD_REQUEST)
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         earned = list(meta.earned_titles or [])
         if title_name not in earned:
             return Response({'error': 'この称号はまだ獲得していません'}, status=status.HTTP_403_FORBIDDEN)
@@ -999,7 +984,7 @@ class AchievementsView(APIView):
 
     def get(self, request):
         from gamification.services import ACHIEVEMENT_DEFINITIONS
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
+        meta = request_meta(request)
         earned_set = set(meta.earned_titles or [])
         active = meta.active_title or ''
         is_official_user = request.user.display_id in OFFICIAL_DISPLAY_IDS
@@ -1031,31 +1016,20 @@ class NotificationListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """Get notifications."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
-        notifications = list(meta.notifications or [])
-
-        def _sort_key(n):
-            return str(n.get('createdAt') or n.get('created_at') or '')
-
-        notifications.sort(key=_sort_key, reverse=True)
-
-        # 未読の通知数を計算
-        unread_count = sum(1 for n in notifications if not n.get('read', False))
-
+        """Get notifications（新しい順、cursor でページング）。"""
         try:
             limit = int(request.query_params.get('limit', 20))
             limit = max(1, min(100, limit))
         except (ValueError, TypeError):
             limit = 20
-        try:
-            offset = int(request.query_params.get('offset', 0))
-            offset = max(0, offset)
-        except (ValueError, TypeError):
-            offset = 0
 
-        page = notifications[offset : offset + limit]
-        next_offset = offset + len(page) if offset + len(page) < len(notifications) else None
+        try:
+            page, next_cursor = user_notifications.list_page(
+                request.user, request.query_params.get('cursor'), limit,
+            )
+        except InvalidCursor:
+            return Response({'error': 'カーソルが不正です'}, status=status.HTTP_400_BAD_REQUEST)
+        unread_count = user_notifications.unread_count(request.user)
 
         # フロントエンドとの互換性のため、items と unread も返す
         return Response({
@@ -1063,8 +1037,7 @@ class NotificationListView(APIView):
             'notifications': page,  # 後方互換性
             'unread': unread_count,
             'unreadCount': unread_count,  # 後方互換性
-            'nextOffset': next_offset,
-            'total': len(notifications),
+            'nextCursor': next_cursor,
         })
 
 
@@ -1074,17 +1047,9 @@ class NotificationReadView(APIView):
     
     def post(self, request):
         """Mark notifications as read."""
-        meta, _ = UserMeta.objects.get_or_create(user=request.user)
-        notifications = meta.notifications or []
-        
         # すべての通知を既読にする
-        for notification in notifications:
-            notification['read'] = True
-        
-        meta.notifications = notifications
-        meta.save()
-        
-        return Response({'ok': True})
+        updated = user_notifications.mark_all_read(request.user)
+        return Response({'ok': True, 'updated': updated})
 
 
 class TopicGenerateView(APIView):